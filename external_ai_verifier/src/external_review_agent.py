@@ -14,7 +14,8 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 from pathlib import Path
 import asyncio
-import time # Adicionado para o delay
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Handle both relative and absolute imports
 try:
@@ -24,6 +25,7 @@ try:
     from .services.rule_engine import ExternalRuleEngine
     from .services.contextual_analyzer import ExternalContextualAnalyzer
     from .services.confidence_thresholds import ExternalConfidenceThresholds
+    from .services.llm_rate_limiter import ExternalLLMRateLimiter
 except ImportError:
     try:
         # Fallback for direct execution
@@ -33,6 +35,7 @@ except ImportError:
         from services.rule_engine import ExternalRuleEngine
         from services.contextual_analyzer import ExternalContextualAnalyzer
         from services.confidence_thresholds import ExternalConfidenceThresholds
+        from services.llm_rate_limiter import ExternalLLMRateLimiter
     except ImportError:
         # Final fallback - direct import from current directory
         from sentiment_analyzer import ExternalSentimentAnalyzer
@@ -41,6 +44,7 @@ except ImportError:
         from rule_engine import ExternalRuleEngine
         from contextual_analyzer import ExternalContextualAnalyzer
         from confidence_thresholds import ExternalConfidenceThresholds
+        from llm_rate_limiter import ExternalLLMRateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -67,13 +71,17 @@ class ExternalReviewAgent:
         self.contextual_analyzer = ExternalContextualAnalyzer(self.config)
         self.confidence_thresholds = ExternalConfidenceThresholds(self.config)
 
-        # --- NOVO: ConfiguraÃ§Ã£o para Rate Limiting do LLM ---
-        # Calcula o delay necessÃ¡rio para 9 requisiÃ§Ãµes por minuto (60 segundos)
-        # Delay entre requisiÃ§Ãµes = 60s / 9 = 6.67s (aproximadamente)
-        # Adicionamos um pequeno buffer para garantir o limite.
-        self.llm_call_delay = self.config.get('rate_limiting', {}).get('llm_call_delay_seconds', 10)
-        self.last_llm_call_time = 0.0 # Para rastrear o tempo da Ãºltima chamada LLM
-        # ----------------------------------------------------
+        # Rate limiting do LLM sem bloqueio: intervalo mínimo entre chamadas
+        # (rate_limiting.llm_call_delay_seconds) e teto de chamadas simultâneas
+        # (rate_limiting.max_concurrent_llm_calls)
+        self.llm_rate_limiter = ExternalLLMRateLimiter(self.config)
+        self.llm_call_delay = self.llm_rate_limiter.min_interval
+
+        # Faixa ambígua da confiança preliminar (sem LLM) que justifica revisão pelo LLM
+        ambiguous_range = self.config.get('llm_reasoning', {}).get('ambiguous_range', {}) or {}
+        self.llm_ambiguous_only = self.config.get('llm_reasoning', {}).get('use_for_ambiguous_cases', True)
+        self.llm_ambiguous_min = ambiguous_range.get('min', self.confidence_thresholds.get_threshold('rejection'))
+        self.llm_ambiguous_max = ambiguous_range.get('max', self.confidence_thresholds.get_threshold('approval'))
 
         # Processing statistics
         self.stats = {
@@ -86,8 +94,7 @@ class ExternalReviewAgent:
 
         logger.info(f"âœ… External Review Agent inicializado com sucesso")
         logger.info(f"ðŸ”§ ConfiguraÃ§Ãµes carregadas: {len(self.config)} seÃ§Ãµes")
-        # Log do delay configurado
-        logger.info(f"â³ Rate Limiting LLM: {self.llm_call_delay:.2f}s entre chamadas")
+        logger.info(f"⏳ Rate Limiting LLM: {self.llm_call_delay:.2f}s entre chamadas, até {self.llm_rate_limiter.max_concurrency} simultâneas, faixa ambígua {self.llm_ambiguous_min:.2f}-{self.llm_ambiguous_max:.2f}")
 
     def _load_config(self, config_path: Optional[str] = None) -> Dict[str, Any]:
         """Carrega configuraÃ§Ã£o do mÃ³dulo"""
@@ -131,23 +138,11 @@ class ExternalReviewAgent:
             'contextual_analysis': {'enabled': True},
             'rules': [],
             'rate_limiting': {
-                'llm_call_delay_seconds': 6.7 # PadrÃ£o: ~9 chamadas por minuto
+                'llm_call_delay_seconds': 6.7, # PadrÃ£o: ~9 chamadas por minuto
+                'max_concurrent_llm_calls': 3
             }
         }
 
-    def _enforce_llm_rate_limit(self):
-        """Aplica delay para respeitar o limite de chamadas LLM por minuto."""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_llm_call_time
-
-        if time_since_last_call < self.llm_call_delay:
-            sleep_time = self.llm_call_delay - time_since_last_call
-            logger.debug(f"Rate limiting: aguardando {sleep_time:.2f}s antes da prÃ³xima chamada LLM")
-            time.sleep(sleep_time)
-        
-        self.last_llm_call_time = time.time()
-
-
     def process_item(self, item_data: Dict[str, Any], massive_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Processa um item individual atravÃ©s de todas as anÃ¡lises com validaÃ§Ã£o aprimorada
@@ -200,32 +195,22 @@ class ExternalReviewAgent:
             should_use_llm = self._should_use_llm_analysis(sentiment_result, bias_result)
             if should_use_llm:
                 logger.debug("Executando anÃ¡lise LLM...")
-                # --- Aplica rate limit ANTES da chamada LLM ---
-                self._enforce_llm_rate_limit()
-                # --------------------------------------------
                 context = self._create_llm_context(analysis_result, massive_data)
-                llm_result = self.llm_service.analyze_with_llm(text_content, context)
+                # Rate limit aplicado ANTES da chamada LLM
+                with self.llm_rate_limiter:
+                    llm_result = self.llm_service.analyze_with_llm(text_content, context)
                 analysis_result['llm_reasoning_analysis'] = llm_result
             else:
-                analysis_result['llm_reasoning_analysis'] = {
-                    'llm_confidence': 0.5,
-                    'llm_recommendation': 'NÃƒO_EXECUTADO',
-                    'analysis_reasoning': 'LLM nÃ£o necessÃ¡rio para este item'
-                }
+                analysis_result['llm_reasoning_analysis'] = self._skipped_llm_result()
 
             # Step 4: Contextual Analysis
             logger.debug("Executando anÃ¡lise contextual...")
             contextual_result = self.contextual_analyzer.analyze_context(item_data, massive_data)
             analysis_result['contextual_analysis'] = contextual_result
 
-            # Step 5: Rule Engine Application
+            # Steps 5-6: Rule Engine Application + Final Decision
             logger.debug("Aplicando regras de negÃ³cio...")
-            rule_result = self.rule_engine.apply_rules(analysis_result)
-            analysis_result['rule_decision'] = rule_result
-
-            # Step 6: Final Decision
-            final_decision = self._make_final_decision(analysis_result)
-            analysis_result['ai_review'] = final_decision
+            final_decision = self._apply_rules_and_decide(analysis_result)
 
             # Update statistics
             processing_time = (datetime.now() - start_time).total_seconds()
@@ -243,6 +228,21 @@ class ExternalReviewAgent:
             self._update_stats('error', (datetime.now() - start_time).total_seconds())
             return error_result
 
+    def _skipped_llm_result(self) -> Dict[str, Any]:
+        """Resultado LLM de itens que não passaram pela análise LLM"""
+        return {
+            'llm_confidence': 0.5,
+            'llm_recommendation': 'NÃƒO_EXECUTADO',
+            'analysis_reasoning': 'LLM nÃ£o necessÃ¡rio para este item'
+        }
+
+    def _apply_rules_and_decide(self, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Aplica o motor de regras e a decisão final sobre as análises já presentes no resultado"""
+        analysis_result['rule_decision'] = self.rule_engine.apply_rules(analysis_result)
+        final_decision = self._make_final_decision(analysis_result)
+        analysis_result['ai_review'] = final_decision
+        return final_decision
+
     def _validate_item_data(self, item_data: Dict[str, Any]) -> Dict[str, Any]:
         """Valida dados do item antes do processamento"""
         if not isinstance(item_data, dict):
@@ -671,6 +671,197 @@ class ExternalReviewAgent:
                 'timestamp': datetime.now().isoformat()
             }
 
+    def _needs_llm_review(self, analysis_result: Dict[str, Any]) -> bool:
+        """
+        LLM só para itens cuja confiança preliminar (sem LLM) cai na faixa ambígua;
+        com llm_reasoning.use_for_ambiguous_cases desligado vale o critério de
+        sentimento/viés de process_item
+        """
+        if not self.llm_service.enabled or self.llm_service.client is None:
+            return False
+        if not self.llm_ambiguous_only:
+            return self._should_use_llm_analysis(
+                analysis_result.get('sentiment_analysis', {}),
+                analysis_result.get('bias_disinformation_analysis', {})
+            )
+        confidence = analysis_result.get('ai_review', {}).get('final_confidence', 0.0)
+        return self.llm_ambiguous_min <= confidence < self.llm_ambiguous_max
+
+    async def verify_items_async(self, items: List[Dict[str, Any]], massive_data: Optional[Dict[str, Any]] = None,
+                                 max_concurrent: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Pipeline de verificação em lote
+
+        1. Etapas locais (validação, sentimento, viés, contexto, regras) sobre o lote inteiro
+        2. Decisão preliminar sem LLM
+        3. LLM apenas para itens na faixa ambígua, em paralelo sob o rate limiter
+        4. Nova decisão para os itens revisados pelo LLM
+
+        Args:
+            items: Lista de itens para processar
+            massive_data: Contexto adicional
+            max_concurrent: Máximo de chamadas LLM simultâneas neste lote (padrão: limite do rate limiter)
+
+        Returns:
+            Dict com 'results' (na ordem dos itens) e 'throughput'
+        """
+        started = time.perf_counter()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        pending = []
+
+        # Etapa 1: validação e extração de texto
+        for index, item_data in enumerate(items):
+            try:
+                validation_result = self._validate_item_data(item_data)
+                if not validation_result['valid']:
+                    results[index] = self._create_validation_error_result(item_data, validation_result['reason'])
+                    continue
+                text_content = self._extract_text_content(item_data)
+                if not text_content or len(text_content.strip()) < 5:
+                    results[index] = self._create_insufficient_content_result(item_data)
+                    continue
+                pending.append({
+                    'index': index,
+                    'text': text_content,
+                    'analysis': {
+                        'item_id': item_data.get('id', f'item_{self.stats["total_processed"] + index}'),
+                        'original_item': item_data,
+                        'processing_timestamp': datetime.now().isoformat(),
+                        'text_analyzed': text_content[:500]
+                    },
+                    'llm_seconds': 0.0
+                })
+            except Exception as e:
+                logger.error(f"Erro no processamento do item {index}: {e}")
+                results[index] = self._create_error_result(item_data if isinstance(item_data, dict) else {}, str(e))
+                self._update_stats('error', 0.0)
+
+        # Etapa 2: sentimento e viés do lote inteiro; contexto e regras por item (sem LLM)
+        texts = [entry['text'] for entry in pending]
+        sentiments = self.sentiment_analyzer.analyze_sentiment_batch(texts)
+        biases = self.bias_detector.detect_bias_disinformation_batch(texts)
+        for entry, sentiment_result, bias_result in zip(pending, sentiments, biases):
+            analysis_result = entry['analysis']
+            try:
+                analysis_result['sentiment_analysis'] = sentiment_result
+                analysis_result['bias_disinformation_analysis'] = bias_result
+                analysis_result['llm_reasoning_analysis'] = self._skipped_llm_result()
+                analysis_result['contextual_analysis'] = self.contextual_analyzer.analyze_context(
+                    analysis_result['original_item'], massive_data
+                )
+                self._apply_rules_and_decide(analysis_result)
+            except Exception as e:
+                logger.error(f"Erro no processamento do item {analysis_result['item_id']}: {e}")
+                entry['error'] = str(e)
+        local_seconds = time.perf_counter() - started
+
+        # Etapa 3: LLM apenas para a faixa ambígua
+        ambiguous = [entry for entry in pending if 'error' not in entry and self._needs_llm_review(entry['analysis'])]
+        llm_started = time.perf_counter()
+        llm_calls = 0
+        if ambiguous:
+            logger.info(f"🤖 {len(ambiguous)}/{len(pending)} itens na faixa ambígua enviados ao LLM")
+            batch_slots = asyncio.Semaphore(max_concurrent or self.llm_rate_limiter.max_concurrency)
+            for entry in ambiguous:
+                entry['llm_context'] = self._create_llm_context(entry['analysis'], massive_data)
+
+            def apply_llm_result(entry, llm_result, seconds):
+                entry['analysis']['llm_reasoning_analysis'] = llm_result
+                self._apply_rules_and_decide(entry['analysis'])
+                entry['llm_seconds'] = seconds
+
+            async def review(entry):
+                nonlocal llm_calls
+                call_started = time.perf_counter()
+                try:
+                    async with batch_slots, self.llm_rate_limiter:
+                        llm_calls += 1
+                        llm_result = await asyncio.to_thread(self.llm_service.analyze_with_llm, entry['text'], entry['llm_context'])
+                    apply_llm_result(entry, llm_result, time.perf_counter() - call_started)
+                except Exception as e:
+                    logger.error(f"Erro na análise LLM do item {entry['analysis']['item_id']}: {e}")
+                    entry['error'] = str(e)
+
+            async def review_batch(group):
+                # K itens numa única chamada; só itens com objeto ausente/inválido voltam para chamadas individuais
+                nonlocal llm_calls
+                call_started = time.perf_counter()
+                try:
+                    async with batch_slots, self.llm_rate_limiter:
+                        llm_calls += 1
+                        llm_results = await asyncio.to_thread(
+                            self.llm_service.analyze_batch_with_llm,
+                            [(entry['text'], entry['llm_context']) for entry in group],
+                            False
+                        )
+                except Exception as e:
+                    # Falha da chamada em si: resultado padrão para o grupo, sem N chamadas individuais
+                    logger.error(f"Erro na análise LLM em lote: {e}")
+                    llm_results = [self.llm_service._get_default_result() for _ in group]
+                seconds = (time.perf_counter() - call_started) / len(group)
+                retry = []
+                for entry, llm_result in zip(group, llm_results):
+                    if llm_result is None:
+                        retry.append(entry)
+                    else:
+                        apply_llm_result(entry, llm_result, seconds)
+                await asyncio.gather(*[review(entry) for entry in retry])
+
+            if self.llm_service.batch_mode and len(ambiguous) > 1:
+                groups = [
+                    [ambiguous[i] for i in indices]
+                    for indices in self.llm_service.plan_batches([(entry['text'], entry['llm_context']) for entry in ambiguous])
+                ]
+                logger.info(f"📦 {len(ambiguous)} itens agrupados em {len(groups)} chamadas LLM")
+                await asyncio.gather(*[review_batch(group) for group in groups])
+            else:
+                await asyncio.gather(*[review(entry) for entry in ambiguous])
+        llm_seconds = time.perf_counter() - llm_started
+
+        # Etapa 4: resultados e estatísticas
+        local_share = local_seconds / len(pending) if pending else 0.0
+        for entry in pending:
+            processing_time = local_share + entry['llm_seconds']
+            analysis_result = entry['analysis']
+            if 'error' in entry:
+                results[entry['index']] = self._create_error_result(analysis_result['original_item'], entry['error'])
+                self._update_stats('error', processing_time)
+                continue
+            analysis_result['processing_time_seconds'] = processing_time
+            self._update_stats(analysis_result['ai_review']['status'], processing_time)
+            results[entry['index']] = analysis_result
+
+        wall_seconds = time.perf_counter() - started
+        throughput = {
+            'items': len(items),
+            'wall_seconds': round(wall_seconds, 3),
+            'items_per_second': round(len(items) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+            'local_stage_seconds': round(local_seconds, 3),
+            'llm_stage_seconds': round(llm_seconds, 3),
+            'llm_reviewed': len(ambiguous),
+            'llm_calls': llm_calls,
+            'llm_skipped': len(pending) - len(ambiguous),
+            'ambiguous_band': [self.llm_ambiguous_min, self.llm_ambiguous_max],
+            'rate_limiter': self.llm_rate_limiter.get_stats()
+        }
+        logger.info(
+            f"⚡ Lote verificado: {len(items)} itens em {wall_seconds:.2f}s "
+            f"({throughput['items_per_second']:.2f} itens/s, {len(ambiguous)} revisados pelo LLM em {llm_calls} chamadas)"
+        )
+        return {'results': results, 'throughput': throughput}
+
+    def verify_items(self, items: List[Dict[str, Any]], massive_data: Optional[Dict[str, Any]] = None,
+                     max_concurrent: Optional[int] = None) -> Dict[str, Any]:
+        """Versão síncrona de verify_items_async (para rotas Flask e CLI)"""
+        coro = self.verify_items_async(items, massive_data, max_concurrent)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Já existe um loop rodando nesta thread: executa o pipeline num loop próprio
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+
     def process_batch(self, items: List[Dict[str, Any]], massive_data: Optional[Dict[str, Any]] = None, 
                      batch_size: int = 10) -> Dict[str, Any]:
         """
@@ -686,11 +877,13 @@ class ExternalReviewAgent:
         """
         logger.info(f"ðŸš€ Iniciando processamento em lote: {len(items)} itens, lotes de {batch_size}")
         
+        started = time.perf_counter()
         all_results = []
         approved_items = []
         rejected_items = []
+        throughput = []
         
-        # Processar em lotes
+        # Processar em lotes (cada lote passa pelo pipeline de verify_items)
         for i in range(0, len(items), batch_size):
             batch = items[i:i + batch_size]
             batch_num = (i // batch_size) + 1
@@ -698,12 +891,11 @@ class ExternalReviewAgent:
             
             logger.info(f"ðŸ“¦ Processando lote {batch_num}/{total_batches} ({len(batch)} itens)")
             
-            batch_results = []
-            for item in batch:
-                result = self.process_item(item, massive_data)
-                batch_results.append(result)
-                all_results.append(result)
-                
+            verification = self.verify_items(batch, massive_data)
+            batch_results = verification['results']
+            all_results.extend(batch_results)
+            throughput.append(verification['throughput'])
+            for result in batch_results:
                 # Categorizar resultado
                 status = result.get('ai_review', {}).get('status', 'rejected')
                 if status == 'approved':
@@ -713,6 +905,7 @@ class ExternalReviewAgent:
             
             logger.info(f"âœ… Lote {batch_num} concluÃ­do: {len([r for r in batch_results if r.get('ai_review', {}).get('status') == 'approved'])} aprovados")
         
+        wall_seconds = time.perf_counter() - started
         # Compilar estatÃ­sticas finais
         stats = self.get_statistics()
         
@@ -727,7 +920,10 @@ class ExternalReviewAgent:
                 'total_batches': total_batches,
                 'approved_count': len(approved_items),
                 'rejected_count': len(rejected_items),
-                'approval_rate': len(approved_items) / len(items) if items else 0
+                'approval_rate': len(approved_items) / len(items) if items else 0,
+                'llm_reviewed': sum(t['llm_reviewed'] for t in throughput),
+                'llm_calls': sum(t['llm_calls'] for t in throughput),
+                'items_per_second': round(len(items) / wall_seconds, 2) if wall_seconds > 0 else 0.0
             },
             'metadata': {
                 'timestamp': datetime.now().isoformat(),
@@ -737,53 +933,36 @@ class ExternalReviewAgent:
         }
 
     async def process_batch_async(self, items: List[Dict[str, Any]], massive_data: Optional[Dict[str, Any]] = None,
-                                 max_concurrent: int = 5) -> Dict[str, Any]:
+                                 max_concurrent: Optional[int] = None) -> Dict[str, Any]:
         """
         Processa itens de forma assÃ­ncrona para melhor performance
         
         Args:
             items: Lista de itens para processar
             massive_data: Contexto adicional
-            max_concurrent: MÃ¡ximo de processamentos simultÃ¢neos
+            max_concurrent: Máximo de chamadas LLM simultâneas (padrão: rate_limiting.max_concurrent_llm_calls)
             
         Returns:
             Dict com resultados do processamento assÃ­ncrono
         """
-        logger.info(f"âš¡ Iniciando processamento assÃ­ncrono: {len(items)} itens, mÃ¡x {max_concurrent} simultÃ¢neos")
+        logger.info(f"⚡ Iniciando processamento assíncrono: {len(items)} itens")
         
-        semaphore = asyncio.Semaphore(max_concurrent)
+        verification = await self.verify_items_async(items, massive_data, max_concurrent)
         
-        async def process_single_item(item):
-            async with semaphore:
-                # Como process_item nÃ£o Ã© async, executar em thread
-                loop = asyncio.get_event_loop()
-                return await loop.run_in_executor(None, self.process_item, item, massive_data)
-        
-        # Processar todos os itens
-        tasks = [process_single_item(item) for item in items]
-        all_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Processar resultados e exceÃ§Ãµes
-        valid_results = []
+        # Separar resultados e erros
+        valid_results = verification['results']
         approved_items = []
         rejected_items = []
         errors = []
         
-        for i, result in enumerate(all_results):
-            if isinstance(result, Exception):
-                logger.error(f"âŒ Erro no item {i}: {result}")
-                errors.append({'item_index': i, 'error': str(result)})
-                # Criar resultado de erro
-                error_result = self._create_error_result(items[i], str(result))
-                valid_results.append(error_result)
-                rejected_items.append(error_result)
+        for i, result in enumerate(valid_results):
+            if 'error_details' in result:
+                errors.append({'item_index': i, 'error': result['error_details']})
+            status = result.get('ai_review', {}).get('status', 'rejected')
+            if status == 'approved':
+                approved_items.append(result)
             else:
-                valid_results.append(result)
-                status = result.get('ai_review', {}).get('status', 'rejected')
-                if status == 'approved':
-                    approved_items.append(result)
-                else:
-                    rejected_items.append(result)
+                rejected_items.append(result)
         
         stats = self.get_statistics()
         
@@ -795,12 +974,13 @@ class ExternalReviewAgent:
             'statistics': stats,
             'async_info': {
                 'total_items': len(items),
-                'max_concurrent': max_concurrent,
+                'max_concurrent': max_concurrent or self.llm_rate_limiter.max_concurrency,
                 'approved_count': len(approved_items),
                 'rejected_count': len(rejected_items),
                 'error_count': len(errors),
                 'approval_rate': len(approved_items) / len(items) if items else 0
             },
+            'throughput': verification['throughput'],
             'metadata': {
                 'timestamp': datetime.now().isoformat(),
                 'version': '3.0.0',
@@ -823,29 +1003,9 @@ class ExternalReviewAgent:
 
             self.logger.info(f"ðŸ” Iniciando anÃ¡lise de {len(items)} itens")
 
-            results = []
             total_items = len(items)
-
-            for idx, item in enumerate(items):
-                self.logger.info(f"ðŸ“Š Analisando item {idx + 1}/{total_items}: {item.get('id', 'N/A')}")
-
-                try:
-                    result = self.process_item(item, context) # Use process_item directly
-                    results.append(result)
-
-                    # Pequeno delay entre anÃ¡lises para nÃ£o sobrecarregar outros recursos (opcional)
-                    # if idx < total_items - 1:
-                    #     import time
-                    #     time.sleep(0.1) # 100ms entre itens
-
-                except Exception as e:
-                    self.logger.error(f"âŒ Erro ao analisar item {item.get('id', 'N/A')}: {e}")
-                    results.append({
-                        'item_id': item.get('id', 'N/A'),
-                        'status': 'error',
-                        'error': str(e),
-                        'confidence_score': 0.0
-                    })
+            verification = self.verify_items(items, context)
+            results = verification['results']
 
             # Gera estatÃ­sticas finais
             stats = self._generate_batch_statistics(results)
@@ -855,6 +1015,7 @@ class ExternalReviewAgent:
                 'total_items': total_items,
                 'results': results,
                 'statistics': stats,
+                'throughput': verification['throughput'],
                 'processing_metadata': {
                     'timestamp': datetime.now().isoformat(),
                     'agent_version': '3.0',
@@ -930,8 +1091,8 @@ def run_external_review(input_data: Dict[str, Any], config_path: Optional[str] =
         approved_items = []
         rejected_items = []
 
-        for item in items:
-            result = review_agent.process_item(item, massive_data)
+        verification = review_agent.verify_items(items, massive_data)
+        for result in verification['results']:
             processed_items.append(result)
 
             # Separate approved/rejected for easier consumption
@@ -946,6 +1107,7 @@ def run_external_review(input_data: Dict[str, Any], config_path: Optional[str] =
             'all_items': processed_items,  # All items with full analysis
             'rejected_items': rejected_items,  # Rejected items separately
             'statistics': review_agent.get_statistics(),
+            'throughput': verification['throughput'],
             'metadata': {
                 'timestamp': datetime.now().isoformat(),
                 'version': '3.0.0',
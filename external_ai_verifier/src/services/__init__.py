@@ -9,6 +9,7 @@ from .llm_reasoning_service import ExternalLLMReasoningService
 from .rule_engine import ExternalRuleEngine
 from .contextual_analyzer import ExternalContextualAnalyzer
 from .confidence_thresholds import ExternalConfidenceThresholds
+from .llm_rate_limiter import ExternalLLMRateLimiter
 
 __all__ = [
     'ExternalSentimentAnalyzer',
@@ -16,5 +17,6 @@ __all__ = [
     'ExternalLLMReasoningService',
     'ExternalRuleEngine',
     'ExternalContextualAnalyzer',
-    'ExternalConfidenceThresholds'
+    'ExternalConfidenceThresholds',
+    'ExternalLLMRateLimiter'
 ]
\ No newline at end of file
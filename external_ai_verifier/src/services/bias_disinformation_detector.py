@@ -11,6 +11,30 @@ from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Padrões compilados uma única vez e reaproveitados por todos os itens do lote
+URL_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+MENTION_PATTERN = re.compile(r'[@#](\w+)')
+WHITESPACE_PATTERN = re.compile(r'\\s+')
+
+# Alegações vagas de autoridade
+AUTHORITY_PATTERNS = [re.compile(pattern) for pattern in (
+    r'especialistas? (?:afirmam?|dizem?|garantem?)',
+    r'estudos? (?:comprovam?|mostram?|indicam?)',
+    r'pesquisas? (?:revelam?|demonstram?|apontam?)',
+    r'cientistas? (?:descobriram?|provaram?|confirmaram?)'
+)]
+
+# Padrões de manipulação emocional por dispositivo retórico
+EMOTIONAL_PATTERNS = {
+    device_name: [re.compile(pattern) for pattern in patterns]
+    for device_name, patterns in {
+        'apelo ao medo': [r'perig(o|oso|osa)', r'risco', r'ameaça', r'catástrofe'],
+        'apelo à emoção': [r'imaginem?', r'pensem?', r'sintam?'],
+        'generalização': [r'todos? (?:sabem?|fazem?)', r'ninguém', r'sempre', r'nunca'],
+        'falsa dicotomia': [r'ou (?:você|vocês?)', r'apenas duas? opç']
+    }.items()
+}
+
 class ExternalBiasDisinformationDetector:
     """Detector de viés e desinformação externo independente"""
     
@@ -27,6 +51,21 @@ class ExternalBiasDisinformationDetector:
         logger.info(f"✅ External Bias & Disinformation Detector inicializado")
         logger.debug(f"Bias keywords: {len(self.bias_keywords)}, Patterns: {len(self.disinformation_patterns)}")
     
+    def detect_bias_disinformation_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """
+        Detecção para um lote de textos; textos repetidos são analisados uma única vez
+        
+        Args:
+            texts (List[str]): Textos para análise
+            
+        Returns:
+            List[Dict[str, float]]: Resultados na mesma ordem dos textos
+        """
+        unique = {text: None for text in texts}
+        for text in unique:
+            unique[text] = self.detect_bias_disinformation(text)
+        return [dict(unique[text]) for text in texts]
+    
     def detect_bias_disinformation(self, text: str) -> Dict[str, float]:
         """
         Detecta padrões de viés e desinformação no texto
@@ -94,9 +133,9 @@ class ExternalBiasDisinformationDetector:
             return ""
         
         # Remove URLs, mentions, hashtags but keep text structure
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        text = re.sub(r'[@#](\w+)', r'\\1', text)
-        text = re.sub(r'\\s+', ' ', text).strip()
+        text = URL_PATTERN.sub('', text)
+        text = MENTION_PATTERN.sub(r'\\1', text)
+        text = WHITESPACE_PATTERN.sub(' ', text).strip()
         
         return text
     
@@ -131,15 +170,8 @@ class ExternalBiasDisinformationDetector:
         
         # Additional pattern detection with regex
         # Look for vague authority claims
-        authority_patterns = [
-            r'especialistas? (?:afirmam?|dizem?|garantem?)',
-            r'estudos? (?:comprovam?|mostram?|indicam?)',
-            r'pesquisas? (?:revelam?|demonstram?|apontam?)',
-            r'cientistas? (?:descobriram?|provaram?|confirmaram?)'
-        ]
-        
-        for pattern in authority_patterns:
-            matches = re.findall(pattern, text_lower)
+        for pattern in AUTHORITY_PATTERNS:
+            matches = pattern.findall(text_lower)
             if matches:
                 detected_patterns.extend(matches)
                 disinformation_score += len(matches) * 0.1
@@ -159,16 +191,9 @@ class ExternalBiasDisinformationDetector:
         rhetoric_score = 0.0
         
         # Detect emotional manipulation patterns
-        emotional_patterns = {
-            'apelo ao medo': [r'perig(o|oso|osa)', r'risco', r'ameaça', r'catástrofe'],
-            'apelo à emoção': [r'imaginem?', r'pensem?', r'sintam?'],
-            'generalização': [r'todos? (?:sabem?|fazem?)', r'ninguém', r'sempre', r'nunca'],
-            'falsa dicotomia': [r'ou (?:você|vocês?)', r'apenas duas? opç']
-        }
-        
-        for device_name, patterns in emotional_patterns.items():
+        for device_name, patterns in EMOTIONAL_PATTERNS.items():
             for pattern in patterns:
-                if re.search(pattern, text_lower):
+                if pattern.search(text_lower):
                     detected_devices.append(device_name)
                     rhetoric_score += 0.1
                     break  # Only count each device type once
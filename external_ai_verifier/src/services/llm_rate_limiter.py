@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - External LLM Rate Limiter
+Limitador de chamadas LLM sem bloqueio: cada chamada reserva o próximo horário
+livre (intervalo mínimo entre inícios) e aguarda fora de qualquer lock, com
+um teto configurável de chamadas simultâneas
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ExternalLLMRateLimiter:
+    """Intervalo mínimo entre chamadas LLM + limite de concorrência (async e sync)"""
+
+    def __init__(self, config: Dict[str, Any]):
+        """Inicializa o limitador a partir da seção rate_limiting"""
+        self.config = config.get('rate_limiting', {}) or {}
+        self.min_interval = float(self.config.get('llm_call_delay_seconds', 10))
+        self.max_concurrency = max(1, int(self.config.get('max_concurrent_llm_calls', 3)))
+
+        self._reserve_lock = threading.Lock()
+        self._next_slot = 0.0
+        # Semáforos por event loop (primitivas asyncio não podem ser compartilhadas entre loops),
+        # indexados por id(loop); entradas de loops já fechados são descartadas
+        self._semaphores: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+        self._sync_semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self.stats = {'calls': 0, 'waited_seconds': 0.0}
+
+        logger.info(f"✅ External LLM Rate Limiter inicializado ({self.min_interval:.2f}s entre chamadas, até {self.max_concurrency} simultâneas)")
+
+    def reserve(self) -> float:
+        """Reserva o próximo horário livre e retorna quanto esperar até ele (sem dormir)"""
+        with self._reserve_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+            wait = slot - now
+            self.stats['calls'] += 1
+            self.stats['waited_seconds'] += wait
+            return wait
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._reserve_lock:
+            entry = self._semaphores.get(id(loop))
+            if entry is None or entry[0] is not loop:
+                for key, (other, _) in list(self._semaphores.items()):
+                    if other.is_closed():
+                        del self._semaphores[key]
+                entry = (loop, asyncio.Semaphore(self.max_concurrency))
+                self._semaphores[id(loop)] = entry
+            return entry[1]
+
+    async def __aenter__(self):
+        semaphore = self._semaphore()
+        await semaphore.acquire()
+        try:
+            wait = self.reserve()
+            if wait > 0:
+                logger.debug(f"Rate limiting: aguardando {wait:.2f}s antes da próxima chamada LLM")
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Cancelado durante a espera: __aexit__ não será chamado
+            semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore().release()
+        return False
+
+    def __enter__(self):
+        self._sync_semaphore.acquire()
+        wait = self.reserve()
+        if wait > 0:
+            logger.debug(f"Rate limiting: aguardando {wait:.2f}s antes da próxima chamada LLM")
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._sync_semaphore.release()
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._reserve_lock:
+            return {
+                'calls': self.stats['calls'],
+                'waited_seconds': round(self.stats['waited_seconds'], 2),
+                'min_interval_seconds': self.min_interval,
+                'max_concurrency': self.max_concurrency
+            }
@@ -8,9 +8,11 @@ COM ROTAÇÃO DE API KEYS
 
 import logging
 import os
+import re
+import json
 import time
 import random
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
 # Try to import LLM clients, fallback gracefully
 try:
@@ -27,6 +29,19 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Janela de contexto (tokens) por prefixo de modelo; llm_reasoning.context_window_tokens sobrescreve
+MODEL_CONTEXT_WINDOWS = [
+    ('gemini-2', 1048576),
+    ('gemini-1.5', 1048576),
+    ('gemini', 32768),
+    ('gpt-4o', 128000),
+    ('gpt-4-turbo', 128000),
+    ('gpt-4', 8192),
+    ('gpt-3.5', 16385)
+]
+CHARS_PER_TOKEN = 4
+BATCH_RECOMMENDATIONS = ('APROVAR', 'REJEITAR', 'REVISÃO_MANUAL')
+
 class ExternalLLMReasoningService:
     """Serviço de raciocínio com LLMs externo independente com rotação de API keys"""
     
@@ -45,6 +60,15 @@ class ExternalLLMReasoningService:
         self.base_retry_delay = self.config.get('base_retry_delay', 1.0)
         self.max_retry_delay = self.config.get('max_retry_delay', 60.0)
         
+        # Modo em lote: K itens por prompt, K ajustado à janela de contexto do modelo
+        self.batch_mode = self.config.get('batch_mode', True)
+        self.batch_max_items = self.config.get('batch_max_items', 25)
+        self.batch_max_output_tokens = self.config.get('batch_max_output_tokens', 8192)
+        self.batch_output_tokens_per_item = self.config.get('batch_output_tokens_per_item', 160)
+        self.batch_item_max_chars = self.config.get('batch_item_max_chars', 4000)
+        self.context_window_tokens = self.config.get('context_window_tokens') or self._model_context_window()
+        self.batch_stats = {'batch_calls': 0, 'items_batched': 0, 'parse_failures': 0, 'transport_failures': 0}
+        
         # ✅ NOVO: Sistema de rotação de API keys
         self.api_keys = self._load_api_keys()
         self.current_key_index = 0
@@ -235,7 +259,7 @@ class ExternalLLMReasoningService:
             logger.error(f"Erro na análise LLM: {e}")
             return self._get_default_result()
     
-    def _analyze_with_gemini_with_retry(self, prompt: str) -> str:
+    def _analyze_with_gemini_with_retry(self, prompt: str, max_output_tokens: Optional[int] = None) -> str:
         """Análise com Gemini com lógica de retry e rotação de keys"""
         last_exception = None
         delay = self.base_retry_delay
@@ -246,7 +270,7 @@ class ExternalLLMReasoningService:
                 response = self.client.generate_content(
                     prompt,
                     generation_config=genai.types.GenerationConfig(
-                        max_output_tokens=self.max_tokens,
+                        max_output_tokens=max_output_tokens or self.max_tokens,
                         temperature=self.temperature
                     )
                 )
@@ -334,13 +358,13 @@ CONFIANÇA_ANÁLISE: [0-100]% - [justificativa da confiança]"""
 
         return base_prompt
     
-    def _analyze_with_openai(self, prompt: str) -> str:
+    def _analyze_with_openai(self, prompt: str, max_output_tokens: Optional[int] = None) -> str:
         """Análise com OpenAI"""
         try:
             response = openai.ChatCompletion.create(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
-                max_tokens=self.max_tokens,
+                max_tokens=max_output_tokens or self.max_tokens,
                 temperature=self.temperature
             )
             return response.choices[0].message.content
@@ -462,6 +486,183 @@ CONFIANÇA_ANÁLISE: [0-100]% - [justificativa da confiança]"""
             'api_key_used': 0
         }
     
+    # ------------------------------------------------------------------
+    # Modo em lote
+    # ------------------------------------------------------------------
+    
+    def _model_context_window(self) -> int:
+        """Janela de contexto do modelo configurado (tokens)"""
+        model = self.model.lower()
+        for prefix, window in MODEL_CONTEXT_WINDOWS:
+            if model.startswith(prefix):
+                return window
+        return 8192
+    
+    def _estimate_tokens(self, text: str) -> int:
+        return len(text) // CHARS_PER_TOKEN + 1
+    
+    def plan_batches(self, entries: List[Tuple[str, str]]) -> List[List[int]]:
+        """
+        Agrupa itens (texto, contexto) em lotes para analyze_batch_with_llm.
+        Cada lote cabe na janela de contexto (entrada + saída reservada) e
+        tem no máximo K itens, com K limitado pelo orçamento de saída.
+        
+        Returns:
+            List[List[int]]: Índices dos itens em cada lote
+        """
+        max_output = min(self.batch_max_output_tokens, self.context_window_tokens // 2)
+        k = max(1, min(self.batch_max_items, max_output // self.batch_output_tokens_per_item))
+        input_budget = self.context_window_tokens - max_output - self._estimate_tokens(self._create_batch_prompt([]))
+        
+        batches, current, used = [], [], 0
+        for index, (text, context) in enumerate(entries):
+            cost = self._estimate_tokens(text[:self.batch_item_max_chars] + context) + 20
+            if current and (len(current) >= k or used + cost > input_budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _create_batch_prompt(self, entries: List[Tuple[str, str, str]]) -> str:
+        """Prompt estruturado com vários itens (id, texto, contexto) e resposta em array JSON"""
+        items_block = "\n\n".join(
+            f"[ITEM {item_id}]\n"
+            f"TEXTO: \"{text[:self.batch_item_max_chars]}\""
+            + (f"\nCONTEXTO ADICIONAL: {context}" if context else "")
+            for item_id, text, context in entries
+        )
+        return f"""Analise cada um dos itens abaixo de forma crítica e objetiva, independentemente dos demais.
+
+{items_block}
+
+Para cada item, avalie:
+- qualidade (0-10): clareza, coerência, fundamentação e evidências
+- confiabilidade (0-10): fontes, objetividade, sinais de credibilidade
+- vies (0-10, onde 0=neutro, 10=muito tendencioso): linguagem emotiva, unilateralidade, generalizações
+- desinformacao (0-10): afirmações sem evidência, padrões de desinformação, inconsistências
+- recomendacao: APROVAR, REJEITAR ou REVISÃO_MANUAL
+- confianca (0-100): confiança na própria análise
+- justificativa: uma frase curta
+
+Responda SOMENTE com um array JSON, um objeto por item, usando o id exato de cada item:
+[{{"id": "<id>", "qualidade": 0, "confiabilidade": 0, "vies": 0, "desinformacao": 0, "recomendacao": "REVISÃO_MANUAL", "confianca": 0, "justificativa": "..."}}]"""
+    
+    def _extract_json_array(self, response: str) -> List[Any]:
+        """Array JSON da resposta (tolera cercas de código e texto ao redor)"""
+        cleaned = re.sub(r'```(?:json)?', '', response or '')
+        start, end = cleaned.find('['), cleaned.rfind(']')
+        if start == -1 or end <= start:
+            raise ValueError("Resposta sem array JSON")
+        data = json.loads(cleaned[start:end + 1])
+        if not isinstance(data, list):
+            raise ValueError("Resposta JSON não é um array")
+        return data
+    
+    def _parse_batch_item(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Valida um objeto do array e converte para o formato de _parse_llm_response"""
+        scores = {}
+        for source, target in (('qualidade', 'quality_score'), ('confiabilidade', 'reliability_score'),
+                               ('vies', 'bias_score'), ('desinformacao', 'disinformation_score')):
+            value = float(entry[source])
+            if not 0 <= value <= 10:
+                raise ValueError(f"{source} fora da faixa: {value}")
+            scores[target] = value / 10.0
+        
+        recommendation = str(entry['recomendacao']).strip().upper().replace('REVISAO', 'REVISÃO')
+        if recommendation not in BATCH_RECOMMENDATIONS:
+            raise ValueError(f"Recomendação inválida: {recommendation}")
+        confidence = float(entry['confianca'])
+        if not 0 <= confidence <= 100:
+            raise ValueError(f"Confiança fora da faixa: {confidence}")
+        
+        result = {
+            'llm_response': json.dumps(entry, ensure_ascii=False),
+            **scores,
+            'llm_recommendation': recommendation,
+            'llm_confidence': confidence / 100.0,
+            'analysis_reasoning': str(entry.get('justificativa', '')),
+            'provider': self.provider,
+            'model': self.model,
+            'api_key_used': self.current_key_index + 1,
+            'batched': True
+        }
+        result['llm_confidence'] = self._validate_llm_confidence(result)
+        return result
+    
+    def analyze_batch_with_llm(self, entries: List[Tuple[str, str]], fallback_single: bool = True) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analisa vários itens (texto, contexto) numa única chamada LLM
+        
+        Args:
+            entries: Itens do lote (use plan_batches para dimensioná-lo)
+            fallback_single: Refaz com analyze_with_llm os itens cujo parse falhou;
+                se False, esses itens ficam como None para o chamador decidir
+            
+        Returns:
+            List[Optional[Dict[str, Any]]]: Resultados na ordem dos itens. Se a
+            própria chamada falhar (rede, cota já esgotada nos retries), todos
+            recebem _get_default_result(); só objetos ausentes ou inválidos na
+            resposta contam como falha por item
+        """
+        if not entries:
+            return []
+        if not self.enabled or not self.client:
+            return [self._get_default_result() for _ in entries]
+        
+        ids = [f"item_{i + 1}" for i in range(len(entries))]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+        prompt = self._create_batch_prompt([(item_id, text, context) for item_id, (text, context) in zip(ids, entries)])
+        max_output = min(self.batch_max_output_tokens, len(entries) * self.batch_output_tokens_per_item * 2)
+        try:
+            if self.provider == 'gemini':
+                response = self._analyze_with_gemini_with_retry(prompt, max_output)
+            elif self.provider == 'openai':
+                response = self._analyze_with_openai(prompt, max_output)
+            else:
+                return [self._get_default_result() for _ in entries]
+        except Exception as e:
+            # Falha de transporte: refazer item a item só multiplicaria as chamadas
+            self.batch_stats['transport_failures'] += 1
+            logger.warning(f"⚠️ Falha na chamada LLM em lote ({len(entries)} itens): {e}")
+            return [self._get_default_result() for _ in entries]
+        self.batch_stats['batch_calls'] += 1
+        self._reset_key_failure()
+        
+        try:
+            positions = {item_id: i for i, item_id in enumerate(ids)}
+            for entry in self._extract_json_array(response):
+                if not isinstance(entry, dict) or str(entry.get('id')) not in positions:
+                    continue
+                position = positions[str(entry['id'])]
+                try:
+                    results[position] = self._parse_batch_item(entry)
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.debug(f"Item {entry.get('id')} inválido na resposta em lote: {e}")
+        except Exception as e:
+            logger.warning(f"⚠️ Resposta em lote sem array JSON válido ({len(entries)} itens): {e}")
+        
+        failed = [i for i, result in enumerate(results) if result is None]
+        self.batch_stats['items_batched'] += len(entries) - len(failed)
+        self.batch_stats['parse_failures'] += len(failed)
+        if failed:
+            logger.info(f"🔁 {len(failed)}/{len(entries)} itens sem resultado válido no lote{' - refazendo individualmente' if fallback_single else ''}")
+            if fallback_single:
+                for i in failed:
+                    results[i] = self.analyze_with_llm(*entries[i])
+        return results
+    
+    def get_batch_stats(self) -> Dict[str, Any]:
+        """Estatísticas do modo em lote"""
+        return {
+            **self.batch_stats,
+            'batch_mode': self.batch_mode,
+            'context_window_tokens': self.context_window_tokens,
+            'batch_max_items': self.batch_max_items
+        }
+    
     def get_keys_status(self) -> Dict[str, Any]:
         """Retorna status das API keys"""
         return {
@@ -6,7 +6,7 @@ Módulo independente para análise de sentimento e polaridade
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from textblob import TextBlob
 import re
 
@@ -103,6 +103,21 @@ class ExternalSentimentAnalyzer:
             logger.error(f"Erro na análise de sentimento: {e}")
             return self._get_neutral_sentiment()
     
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """
+        Analisa o sentimento de um lote de textos; textos repetidos são analisados uma única vez
+        
+        Args:
+            texts (List[str]): Textos para análise
+            
+        Returns:
+            List[Dict[str, float]]: Resultados na mesma ordem dos textos
+        """
+        unique = {text: None for text in texts}
+        for text in unique:
+            unique[text] = self.analyze_sentiment(text)
+        return [dict(unique[text]) for text in texts]
+    
     def _clean_text(self, text: str) -> str:
         """Limpa o texto para análise"""
         if not text:
@@ -15,6 +15,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from collections import Counter, defaultdict
 import re
+import time
 import warnings
 warnings.filterwarnings("ignore")
 # Imports condicionais para análise avançada
@@ -77,6 +78,8 @@ try:
 except ImportError:
     HAS_NETWORKX = False
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.nlp_preprocessor import NLPPreprocessor, PORTUGUESE_STOPWORDS
+from services.ocr_service import ocr_service
 logger = logging.getLogger(__name__)
 
 class PredictiveAnalyticsEngine:
@@ -85,6 +88,8 @@ class PredictiveAnalyticsEngine:
     def __init__(self):
         """Inicializa o motor de análise preditiva"""
         self.nlp_model = None
+        self.nlp_preprocessor = None
+        self.stopwords = PORTUGUESE_STOPWORDS
         self.sentiment_analyzer = None
         self.tfidf_vectorizer = None
         self.topic_model = None
@@ -115,6 +120,8 @@ class PredictiveAnalyticsEngine:
                 except OSError:
                     logger.warning("⚠️ Modelo SpaCy não encontrado. Execute: python -m spacy download pt_core_news_sm")
                     self.nlp_model = None
+            if self.nlp_model:
+                self.nlp_preprocessor = NLPPreprocessor(self.nlp_model)
         # Inicializa analisador de sentimento
         if HAS_VADER:
             self.sentiment_analyzer = SentimentIntensityAnalyzer()
@@ -131,16 +138,45 @@ class PredictiveAnalyticsEngine:
             logger.info("✅ TF-IDF Vectorizer configurado")
 
     def _get_portuguese_stopwords(self) -> List[str]:
-        """Retorna lista de stopwords em português"""
-        return [
-            "a", "o", "e", "é", "de", "do", "da", "em", "um", "uma", "para", "com", "não", "que", "se", "na", "por",
-            "mais", "as", "os", "como", "mas", "foi", "ao", "ele", "das", "tem", "à", "seu", "sua", "ou", "ser",
-            "quando", "muito", "há", "nos", "já", "está", "eu", "também", "só", "pelo", "pela", "até", "isso",
-            "ela", "entre", "era", "depois", "sem", "mesmo", "aos", "ter", "seus", "quem", "nas", "me", "esse",
-            "eles", "estão", "você", "tinha", "foram", "essa", "num", "nem", "suas", "meu", "às", "minha", "têm",
-            "numa", "pelos", "elas", "havia", "seja", "qual", "será", "nós", "tenho", "lhe", "deles", "essas",
-            "esses", "pelas", "este", "fosse", "dele", "tu", "te", "vocês", "vos", "lhes", "meus", "minhas"
+        """Retorna lista de stopwords em português (para o TF-IDF; verificações usam self.stopwords)"""
+        return sorted(PORTUGUESE_STOPWORDS)
+
+    def _find_massive_data_file(self, session_dir: Path) -> Optional[Path]:
+        """Localiza o arquivo de dados massivos da sessão"""
+        possible_files = [
+            session_dir / "massive_data_collected.json",
+            session_dir / "consolidado.json",
+            Path(f"analyses_data/pesquisa_web/{session_dir.name}/consolidado.json")
+        ]
+        for file_path in possible_files:
+            if file_path.exists():
+                return file_path
+        return None
+
+    async def _preprocess_session_corpus(self, session_dir: Path) -> Dict[str, Any]:
+        """Processa o corpus da sessão num único nlp.pipe; as fases textuais leem do cache"""
+        if not self.nlp_preprocessor:
+            return {"enabled": False}
+        massive_data_file = self._find_massive_data_file(session_dir)
+        if not massive_data_file:
+            return {"enabled": True, "documents": 0}
+        with open(massive_data_file, "r", encoding="utf-8") as f:
+            massive_data = json.load(f)
+        texts = [
+            str(item.get("content", "")) + str(item.get("snippet", "")) + str(item.get("title", ""))
+            for item in massive_data.get("extracted_content", [])
         ]
+        await asyncio.to_thread(self.nlp_preprocessor.process, texts)
+        return {"enabled": True, "documents": len(texts), **self.nlp_preprocessor.get_stats()}
+
+    async def _run_phase(self, insights: Dict[str, Any], name: str, coro) -> Any:
+        """Executa uma fase registrando sua duração em insights["phase_timings"]"""
+        started = time.perf_counter()
+        result = await coro
+        elapsed = round(time.perf_counter() - started, 3)
+        insights["phase_timings"][name] = elapsed
+        logger.info(f"⏱️ {name}: {elapsed:.2f}s")
+        return result
 
     async def analyze_session_data(self, session_id: str) -> Dict[str, Any]:
         """
@@ -180,69 +216,76 @@ class PredictiveAnalyticsEngine:
             "data_quality_assessment": {},
             # Recomendações estratégicas
             "strategic_recommendations": {},
-            "action_priorities": {}
+            "action_priorities": {},
+            # Pré-processamento NLP e duração de cada fase (segundos)
+            "nlp_preprocessing": {},
+            "phase_timings": {}
         }
 
         try:
+            # FASE 0: Pré-processamento NLP compartilhado (tokens, lemas e entidades do corpus)
+            logger.info("🧩 FASE 0: Pré-processamento NLP do corpus...")
+            insights["nlp_preprocessing"] = await self._run_phase(insights, "nlp_preprocessing", self._preprocess_session_corpus(session_dir))
+
             # FASE 1: Análise Textual Ultra-Profunda
             logger.info("🧠 FASE 1: Análise textual ultra-profunda...")
-            insights["textual_insights"] = await self._perform_ultra_textual_analysis(session_dir)
+            insights["textual_insights"] = await self._run_phase(insights, "textual_insights", self._perform_ultra_textual_analysis(session_dir))
 
             # FASE 2: Análise de Tendências Temporais
             logger.info("📈 FASE 2: Análise de tendências temporais...")
-            insights["temporal_trends"] = await self._perform_temporal_analysis(session_dir)
+            insights["temporal_trends"] = await self._run_phase(insights, "temporal_trends", self._perform_temporal_analysis(session_dir))
 
             # FASE 3: Análise Visual Avançada (OCR + Computer Vision)
             logger.info("👁️ FASE 3: Análise visual avançada...")
-            insights["visual_insights"] = await self._perform_advanced_visual_analysis(session_dir)
+            insights["visual_insights"] = await self._run_phase(insights, "visual_insights", self._perform_advanced_visual_analysis(session_dir))
 
             # FASE 4: Análise de Rede e Conectividade
             logger.info("🕸️ FASE 4: Análise de rede e conectividade...")
-            insights["network_analysis"] = await self._perform_network_analysis(session_dir)
+            insights["network_analysis"] = await self._run_phase(insights, "network_analysis", self._perform_network_analysis(session_dir))
 
             # FASE 5: Dinâmica de Sentimentos
             logger.info("💭 FASE 5: Análise de dinâmica de sentimentos...")
-            insights["sentiment_dynamics"] = await self._analyze_sentiment_dynamics(session_dir)
+            insights["sentiment_dynamics"] = await self._run_phase(insights, "sentiment_dynamics", self._analyze_sentiment_dynamics(session_dir))
 
             # FASE 6: Evolução de Tópicos
             logger.info("🔄 FASE 6: Análise de evolução de tópicos...")
-            insights["topic_evolution"] = await self._analyze_topic_evolution(session_dir)
+            insights["topic_evolution"] = await self._run_phase(insights, "topic_evolution", self._analyze_topic_evolution(session_dir))
 
             # FASE 7: Padrões de Engajamento
             logger.info("📊 FASE 7: Análise de padrões de engajamento...")
-            insights["engagement_patterns"] = await self._analyze_engagement_patterns(session_dir)
+            insights["engagement_patterns"] = await self._run_phase(insights, "engagement_patterns", self._analyze_engagement_patterns(session_dir))
 
             # FASE 8: Geração de Previsões Ultra-Avançadas
             logger.info("🔮 FASE 8: Geração de previsões ultra-avançadas...")
-            insights["predictions"] = await self._generate_ultra_predictions(insights)
+            insights["predictions"] = await self._run_phase(insights, "predictions", self._generate_ultra_predictions(insights))
 
             # FASE 9: Modelagem de Cenários Complexos
             logger.info("🗺️ FASE 9: Modelagem de cenários complexos...")
-            insights["scenarios"] = await self._model_complex_scenarios(insights)
+            insights["scenarios"] = await self._run_phase(insights, "scenarios", self._model_complex_scenarios(insights))
 
             # FASE 10: Avaliação de Riscos e Oportunidades
             logger.info("⚖️ FASE 10: Avaliação de riscos e oportunidades...")
-            insights["risk_assessment"] = await self._assess_risks_and_opportunities(insights)
+            insights["risk_assessment"] = await self._run_phase(insights, "risk_assessment", self._assess_risks_and_opportunities(insights))
 
             # FASE 11: Mapeamento de Oportunidades
             logger.info("🎯 FASE 11: Mapeamento estratégico de oportunidades...")
-            insights["opportunity_mapping"] = await self._map_strategic_opportunities(insights)
+            insights["opportunity_mapping"] = await self._run_phase(insights, "opportunity_mapping", self._map_strategic_opportunities(insights))
 
             # FASE 12: Métricas de Confiança
             logger.info("📏 FASE 12: Cálculo de métricas de confiança...")
-            insights["confidence_metrics"] = await self._calculate_confidence_metrics(insights)
+            insights["confidence_metrics"] = await self._run_phase(insights, "confidence_metrics", self._calculate_confidence_metrics(insights))
 
             # FASE 13: Avaliação de Qualidade dos Dados
             logger.info("🔍 FASE 13: Avaliação de qualidade dos dados...")
-            insights["data_quality_assessment"] = await self._assess_data_quality(session_dir)
+            insights["data_quality_assessment"] = await self._run_phase(insights, "data_quality_assessment", self._assess_data_quality(session_dir))
 
             # FASE 14: Recomendações Estratégicas
             logger.info("💡 FASE 14: Geração de recomendações estratégicas...")
-            insights["strategic_recommendations"] = await self._generate_strategic_recommendations(insights)
+            insights["strategic_recommendations"] = await self._run_phase(insights, "strategic_recommendations", self._generate_strategic_recommendations(insights))
 
             # FASE 15: Priorização de Ações
             logger.info("🎯 FASE 15: Priorização de ações...")
-            insights["action_priorities"] = await self._prioritize_actions(insights)
+            insights["action_priorities"] = await self._run_phase(insights, "action_priorities", self._prioritize_actions(insights))
 
             # Salva insights preditivos
             insights_path = session_dir / "insights_preditivos.json"
@@ -290,15 +333,14 @@ class PredictiveAnalyticsEngine:
                 # Fit e transform em um único documento pode ser problemático para TF-IDF
                 # Idealmente, TF-IDF é treinado em um corpus maior.
                 # Para um único chunk, podemos extrair as palavras mais frequentes após remover stopwords.
-                words = [word for word in re.findall(r'\b\w+\b', text_content.lower()) if word not in self._get_portuguese_stopwords()]
+                words = [word for word in re.findall(r'\b\w+\b', text_content.lower()) if word not in self.stopwords]
                 word_counts = Counter(words)
                 results["key_phrases"] = [word for word, count in word_counts.most_common(10)]
             except Exception as e:
                 logger.warning(f"⚠️ Erro na extração de key_phrases para chunk: {e}")
-        elif HAS_SPACY and self.nlp_model:
+        elif HAS_SPACY and self.nlp_preprocessor:
             try:
-                doc = self.nlp_model(text_content[:100000]) # Limita para performance
-                word_freq = Counter([token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha])
+                word_freq = Counter(self.nlp_preprocessor.lemmas([text_content])[0])
                 results["key_phrases"] = [word for word, count in word_freq.most_common(10)]
             except Exception as e:
                 logger.warning(f"⚠️ Erro na extração de key_phrases com SpaCy para chunk: {e}")
@@ -398,11 +440,11 @@ class PredictiveAnalyticsEngine:
         combined_text = " ".join(all_snippets)
 
         # Extrai palavras-chave e entidades usando SpaCy (se disponível)
-        if HAS_SPACY and self.nlp_model:
+        if HAS_SPACY and self.nlp_preprocessor:
             try:
-                doc = self.nlp_model(combined_text[:100000]) # Limita para performance
-                keywords = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha]
-                entities = [ent.text for ent in doc.ents if ent.label_ in ["ORG", "PERSON", "LOC", "PRODUCT"]]
+                features = self.nlp_preprocessor.process([combined_text])[0]
+                keywords = list(features.lemmas)
+                entities = [text for text, label in features.entities if label in ["ORG", "PERSON", "LOC", "PRODUCT"]]
                 # Combina e seleciona as mais relevantes
                 all_terms = Counter(keywords + entities)
                 top_terms = [term for term, count in all_terms.most_common(5)]
@@ -413,8 +455,8 @@ class PredictiveAnalyticsEngine:
                 logger.warning(f"⚠️ Erro ao usar SpaCy para refinar queries: {e}")
 
         # Fallback simples: extrair bigramas frequentes
-        if not HAS_SPACY or not self.nlp_model:
-            words = [word for word in re.findall(r'\b\w+\b', combined_text.lower()) if word not in self._get_portuguese_stopwords()]
+        if not HAS_SPACY or not self.nlp_preprocessor:
+            words = [word for word in re.findall(r'\b\w+\b', combined_text.lower()) if word not in self.stopwords]
             bigrams = [" ".join(words[i:i+2]) for i in range(len(words) - 1)]
             bigram_counts = Counter(bigrams)
             top_bigrams = [bigram for bigram, count in bigram_counts.most_common(3)]
@@ -494,15 +536,14 @@ class PredictiveAnalyticsEngine:
             }
 
         # Tópicos e Entidades (se SpaCy e Gensim disponíveis)
-        if HAS_SPACY and self.nlp_model and HAS_GENSIM:
+        if HAS_SPACY and self.nlp_preprocessor and HAS_GENSIM:
             try:
                 processed_docs = []
                 all_entities = defaultdict(int)
-                for text in all_text_content:
-                    doc = self.nlp_model(text[:100000]) # Limita para performance
-                    processed_docs.append([token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha])
-                    for ent in doc.ents:
-                        all_entities[ent.label_] += 1
+                for features in self.nlp_preprocessor.process(all_text_content):
+                    processed_docs.append(list(features.lemmas))
+                    for _, label in features.entities:
+                        all_entities[label] += 1
                 textual_insights["top_entities"] = dict(all_entities)
 
                 # Topic Modeling (LDA)
@@ -532,7 +573,7 @@ class PredictiveAnalyticsEngine:
             except Exception as e:
                 logger.warning(f"⚠️ Erro na extração de top_keywords com TF-IDF: {e}")
         elif all_text_content:
-            words_no_stopwords = [word for word in words if word not in self._get_portuguese_stopwords()]
+            words_no_stopwords = [word for word in words if word not in self.stopwords]
             word_counts = Counter(words_no_stopwords)
             textual_insights["top_keywords"] = [word for word, count in word_counts.most_common(20)]
 
@@ -612,13 +653,11 @@ class PredictiveAnalyticsEngine:
             temporal_trends["sentiment_over_time"] = sentiment_over_time.to_dict(orient="records")
 
         # Frequência de tópicos ao longo do tempo (simplificado)
-        if HAS_SPACY and self.nlp_model:
+        if HAS_SPACY and self.nlp_preprocessor:
             topic_freq_data = defaultdict(lambda: defaultdict(int))
-            for _, row in df.iterrows():
-                doc = self.nlp_model(row["text"][:100000])
-                keywords = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha]
+            for date, keywords in zip(df["date"], self.nlp_preprocessor.lemmas(df["text"])):
                 for keyword in Counter(keywords).most_common(5):
-                    topic_freq_data[str(row["date"])][keyword[0]] += keyword[1]
+                    topic_freq_data[str(date)][keyword[0]] += keyword[1]
             temporal_trends["topic_frequency_over_time"] = topic_freq_data
 
         # Modelagem Preditiva com Prophet (se disponível e dados suficientes)
@@ -662,6 +701,9 @@ class PredictiveAnalyticsEngine:
         visual_insights = {
             "total_screenshots_analyzed": 0,
             "text_extracted_from_images": {},
+            "ocr_confidence": {},
+            "ocr_timings": {},
+            "ocr_stats": {},
             "object_detection_summary": {},
             "dominant_colors": {},
             "visual_trends": []
@@ -679,15 +721,37 @@ class PredictiveAnalyticsEngine:
             logger.warning("⚠️ Nenhuma imagem para análise visual.")
             return visual_insights
 
+        # OCR em lote no pool de processos (cache por sha256 da imagem, quase-duplicatas do lote reaproveitadas)
+        ocr_results = {}
+        if HAS_OCR:
+            try:
+                ocr_batch = await asyncio.to_thread(ocr_service.ocr_images, screenshot_files)
+                ocr_results = ocr_batch["results"]
+                visual_insights["ocr_stats"] = ocr_batch["stats"]
+            except Exception as e:
+                logger.warning(f"⚠️ Erro no OCR em lote: {e}")
+
         for img_path in screenshot_files:
             try:
-                # OCR (se disponível)
-                if HAS_OCR:
-                    try:
-                        text = pytesseract.image_to_string(Image.open(img_path), lang='por')
+                ocr = ocr_results.get(str(img_path))
+                if ocr:
+                    if ocr.get("text") is not None:
+                        text = ocr["text"]
                         visual_insights["text_extracted_from_images"][img_path.name] = text[:500] + "..." if len(text) > 500 else text
-                    except Exception as e:
-                        logger.warning(f"⚠️ Erro OCR em {img_path.name}: {e}")
+                        visual_insights["ocr_confidence"][img_path.name] = ocr.get("confidence")
+                    else:
+                        logger.warning(f"⚠️ Erro OCR em {img_path.name}: {ocr.get('error')}")
+                    visual_insights["ocr_timings"][img_path.name] = {
+                        "source": ocr["source"],
+                        "seconds": ocr.get("seconds"),
+                        "duplicate_of": Path(ocr["duplicate_of"]).name if ocr.get("duplicate_of") else None
+                    }
+                    # Screenshot quase idêntico: cores iguais às do original
+                    if ocr.get("duplicate_of"):
+                        original_colors = visual_insights["dominant_colors"].get(Path(ocr["duplicate_of"]).name)
+                        if original_colors is not None:
+                            visual_insights["dominant_colors"][img_path.name] = original_colors
+                            continue
 
                 # Análise de cores dominantes (simplificado)
                 if HAS_OPENCV:
@@ -864,12 +928,9 @@ class PredictiveAnalyticsEngine:
         sentiment_dynamics["sentiment_by_source"] = sentiment_by_source.to_dict(orient="records")
 
         # Sentimento por tópico (requer topic modeling prévio ou aqui)
-        if HAS_SPACY and self.nlp_model and HAS_GENSIM:
+        if HAS_SPACY and self.nlp_preprocessor and HAS_GENSIM:
             try:
-                processed_docs = []
-                for text in df["text"]:
-                    doc = self.nlp_model(text[:100000])
-                    processed_docs.append([token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha])
+                processed_docs = self.nlp_preprocessor.lemmas(df["text"])
                 if processed_docs:
                     dictionary = corpora.Dictionary(processed_docs)
                     corpus = [dictionary.doc2bow(doc) for doc in processed_docs]
@@ -953,15 +1014,12 @@ class PredictiveAnalyticsEngine:
             logger.warning("⚠️ Nenhum conteúdo textual ou datado para análise de evolução de tópicos.")
             return topic_evolution
 
-        if not HAS_SPACY or not self.nlp_model or not HAS_GENSIM:
+        if not HAS_SPACY or not self.nlp_preprocessor or not HAS_GENSIM:
             logger.warning("⚠️ SpaCy ou Gensim não disponíveis para modelagem de tópicos.")
             return topic_evolution
 
         try:
-            processed_docs = []
-            for text in all_text_content:
-                doc = self.nlp_model(text[:100000])
-                processed_docs.append([token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha])
+            processed_docs = self.nlp_preprocessor.lemmas(all_text_content)
             if not processed_docs:
                 return topic_evolution
 
@@ -978,12 +1036,11 @@ class PredictiveAnalyticsEngine:
             df_dated["date"] = pd.to_datetime(df_dated["date"])
             df_dated = df_dated.sort_values("date")
             topic_frequency_over_time = defaultdict(lambda: defaultdict(float))
-            for i, row in df_dated.iterrows():
-                doc = self.nlp_model(row["text"][:100000])
-                bow = dictionary.doc2bow([token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha])
+            for date, lemmas in zip(df_dated["date"], self.nlp_preprocessor.lemmas(df_dated["text"])):
+                bow = dictionary.doc2bow(lemmas)
                 doc_topics = lda_model.get_document_topics(bow)
                 for topic_id, prob in doc_topics:
-                    topic_frequency_over_time[str(row["date"])][f"topic_{topic_id}"] += prob
+                    topic_frequency_over_time[str(date)][f"topic_{topic_id}"] += prob
             topic_evolution["topic_trends_over_time"] = topic_frequency_over_time
 
             # Identificação de tópicos emergentes e em declínio (simplificado)
@@ -993,15 +1050,13 @@ class PredictiveAnalyticsEngine:
                 first_period_data = df_dated[df_dated["date"] == dates[0]]
                 last_period_data = df_dated[df_dated["date"] == dates[-1]]
                 first_period_topics = Counter()
-                for text in first_period_data["text"]:
-                    doc = self.nlp_model(text[:100000])
-                    bow = dictionary.doc2bow([token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha])
+                for lemmas in self.nlp_preprocessor.lemmas(first_period_data["text"]):
+                    bow = dictionary.doc2bow(lemmas)
                     for topic_id, prob in lda_model.get_document_topics(bow):
                         first_period_topics[f"topic_{topic_id}"] += prob
                 last_period_topics = Counter()
-                for text in last_period_data["text"]:
-                    doc = self.nlp_model(text[:100000])
-                    bow = dictionary.doc2bow([token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha])
+                for lemmas in self.nlp_preprocessor.lemmas(last_period_data["text"]):
+                    bow = dictionary.doc2bow(lemmas)
                     for topic_id, prob in lda_model.get_document_topics(bow):
                         last_period_topics[f"topic_{topic_id}"] += prob
                 for topic_id, initial_freq in first_period_topics.items():
@@ -11,6 +11,7 @@ import uuid
 import random
 from datetime import datetime
 from flask import Blueprint, request, jsonify
+from services.job_queue import JobQueueFullError, JobTimeoutError
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +47,29 @@ def get_html_report_converter():
     from services.html_report_converter import HTMLReportConverter
     return HTMLReportConverter()
 
+def get_job_queue():
+    from services.job_queue import job_queue
+    return job_queue
+
+def _request_tenant() -> str:
+    """Tenant da requisição (IP de origem; cabeçalhos só atrás de proxy confiável)"""
+    return get_job_queue().tenant_for(request.remote_addr, request.headers)
+
+def _job_queue_full_response(e: JobQueueFullError):
+    return jsonify({
+        "success": False,
+        "error": str(e),
+        "retry_after": 30
+    }), 429
+
+def _job_timeout_response(e: JobTimeoutError):
+    return jsonify({
+        "success": False,
+        "error": str(e),
+        "message": "Servidor ocupado, tente novamente mais tarde",
+        "retry_after": 60
+    }), 503
+
 def execute_external_ai_verification(search_results, synthesis_result, session_id):
     """
     Executa verificação externa por IA dos resultados da análise
@@ -270,58 +294,45 @@ def execute_complete_analysis():
         # Executa análise com novo sistema aprimorado
         def execute_enhanced_analysis():
             try:
-                import asyncio
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-                try:
-                    # ETAPA 1: Busca massiva real com fallback Jina/EXA para Serper
-                    progress_callback(1, "🌊 Executando busca massiva real com fallback...")
-                    real_search_orchestrator = get_real_search_orchestrator()
-                    search_results = loop.run_until_complete(
-                        real_search_orchestrator.execute_massive_real_search(
-                            query=query,
-                            context=context,
-                            session_id=session_id
-                        )
-                    )
-
-                    # ETAPA 2: Análise de conteúdo com verificação externa por IA
-                    progress_callback(2, "🧠 Executando síntese com IA e verificação externa...")
-                    
-                    # Primeiro executa a síntese
-                    synthesis_result = loop.run_until_complete(
-                        enhanced_synthesis_engine.execute_enhanced_synthesis(
-                            session_id=session_id,
-                            search_results=search_results # Pass search_results to synthesis
-                        )
-                    )
-                    
-                    # Depois executa a verificação externa por IA
-                    progress_callback(2.5, "🔍 Executando verificação externa por IA...")
-                    external_verification_result = execute_external_ai_verification(
-                        search_results, synthesis_result, session_id
-                    )
-                    
-                    # Combina os resultados
-                    synthesis_result['external_verification'] = external_verification_result
-
-                    # ETAPA 3: Análise Preditiva Ultra-Avançada
-                    progress_callback(3, "🔮 Executando análise preditiva ultra-avançada...")
-                    predictive_engine = PredictiveAnalyticsEngine()
-                    predictive_insights = loop.run_until_complete(
-                        predictive_engine.analyze_session_data(session_id)
-                    )
-
-                    # ETAPA 4: Geração de módulos
-                    progress_callback(4, "📝 Gerando 16 módulos...")
-                    from services.enhanced_module_processor import enhanced_module_processor
-                    modules_result = loop.run_until_complete(
-                        enhanced_module_processor.generate_all_modules(session_id)
-                    )
-
-                finally:
-                    loop.close()
+                # Cada etapa assíncrona roda num worker da fila de jobs (event loop compartilhado)
+                job_queue = get_job_queue()
+
+                # ETAPA 1: Busca massiva real com fallback Jina/EXA para Serper
+                progress_callback(1, "🌊 Executando busca massiva real com fallback...")
+                real_search_orchestrator = get_real_search_orchestrator()
+                search_results = job_queue.run_sync(lambda: real_search_orchestrator.execute_massive_real_search(
+                    query=query,
+                    context=context,
+                    session_id=session_id
+                ), tenant=_request_tenant())
+
+                # ETAPA 2: Análise de conteúdo com verificação externa por IA
+                progress_callback(2, "🧠 Executando síntese com IA e verificação externa...")
+                
+                # Primeiro executa a síntese
+                synthesis_result = job_queue.run_sync(lambda: enhanced_synthesis_engine.execute_enhanced_synthesis(
+                    session_id=session_id,
+                    search_results=search_results # Pass search_results to synthesis
+                ), tenant=_request_tenant())
+                
+                # Depois executa a verificação externa por IA
+                progress_callback(2.5, "🔍 Executando verificação externa por IA...")
+                external_verification_result = execute_external_ai_verification(
+                    search_results, synthesis_result, session_id
+                )
+                
+                # Combina os resultados
+                synthesis_result['external_verification'] = external_verification_result
+
+                # ETAPA 3: Análise Preditiva Ultra-Avançada
+                progress_callback(3, "🔮 Executando análise preditiva ultra-avançada...")
+                predictive_engine = PredictiveAnalyticsEngine()
+                predictive_insights = job_queue.run_sync(lambda: predictive_engine.analyze_session_data(session_id), tenant=_request_tenant())
+
+                # ETAPA 4: Geração de módulos
+                progress_callback(4, "📝 Gerando 16 módulos...")
+                from services.enhanced_module_processor import enhanced_module_processor
+                modules_result = job_queue.run_sync(lambda: enhanced_module_processor.generate_all_modules(session_id), tenant=_request_tenant())
 
                 return {
                     "success": True,
@@ -332,6 +343,8 @@ def execute_complete_analysis():
                     "phases_completed": ["busca_massiva", "sintese_ia", "verificacao_externa", "analise_preditiva", "geracao_modulos"]
                 }
 
+            except (JobQueueFullError, JobTimeoutError):
+                raise
             except Exception as e:
                 logger.error(f"❌ Erro na análise aprimorada: {e}")
                 return {
@@ -391,6 +404,11 @@ def execute_complete_analysis():
             logger.error(f"❌ Análise falhou: {session_id} - {analysis_results.get('error')}")
             return jsonify(error_response), 500
 
+    except JobQueueFullError as e:
+        return _job_queue_full_response(e)
+    except JobTimeoutError as e:
+        logger.error(f"⏱️ {e}")
+        return _job_timeout_response(e)
     except Exception as e:
         logger.error(f"❌ Erro crítico na rota de análise: {e}")
         return jsonify({
@@ -509,20 +527,12 @@ def start_collection():
         # Importa o coletor massivo
         from services.massive_data_collector import massive_data_collector
 
-        # Executa coleta de forma assíncrona
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(
-                massive_data_collector.execute_massive_collection(
-                    query=data.get('query', data.get('segmento', 'análise de mercado')),
-                    context=data,
-                    session_id=session_id
-                )
-            )
-        finally:
-            loop.close()
+        # Executa coleta de forma assíncrona (num worker da fila de jobs)
+        result = get_job_queue().run_sync(lambda: massive_data_collector.execute_massive_collection(
+            query=data.get('query', data.get('segmento', 'análise de mercado')),
+            context=data,
+            session_id=session_id
+        ), tenant=_request_tenant())
 
         return jsonify({
             "success": True,
@@ -533,6 +543,11 @@ def start_collection():
             "next_step": "/api/analysis/start"
         })
 
+    except JobQueueFullError as e:
+        return _job_queue_full_response(e)
+    except JobTimeoutError as e:
+        logger.error(f"⏱️ {e}")
+        return _job_timeout_response(e)
     except Exception as e:
         logger.error(f"Erro na coleta: {e}")
         return jsonify({
@@ -553,20 +568,12 @@ def start_analysis():
         # Importa o motor de síntese aprimorado
         from services.enhanced_synthesis_engine import enhanced_synthesis_engine
 
-        # Executa síntese
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            # Aqui, precisamos passar os search_results se eles estiverem disponíveis
-            # Para este exemplo, vamos assumir que eles são buscados ou passados de outra forma
-            # Se search_results não for passado, a chamada pode precisar ser ajustada
-            # Por enquanto, chamamos com o que temos. Uma adaptação pode ser necessária.
-            result = loop.run_until_complete(
-                enhanced_synthesis_engine.analyze_and_synthesize(session_id)
-            )
-        finally:
-            loop.close()
+        # Executa síntese (num worker da fila de jobs)
+        # Aqui, precisamos passar os search_results se eles estiverem disponíveis
+        # Para este exemplo, vamos assumir que eles são buscados ou passados de outra forma
+        # Se search_results não for passado, a chamada pode precisar ser ajustada
+        # Por enquanto, chamamos com o que temos. Uma adaptação pode ser necessária.
+        result = get_job_queue().run_sync(lambda: enhanced_synthesis_engine.analyze_and_synthesize(session_id), tenant=_request_tenant())
 
         return jsonify({
             "success": True,
@@ -577,6 +584,11 @@ def start_analysis():
             "next_step": "/api/generation/start"
         })
 
+    except JobQueueFullError as e:
+        return _job_queue_full_response(e)
+    except JobTimeoutError as e:
+        logger.error(f"⏱️ {e}")
+        return _job_timeout_response(e)
     except Exception as e:
         logger.error(f"Erro na análise: {e}")
         return jsonify({
@@ -598,16 +610,8 @@ def start_generation():
         from services.enhanced_module_processor import enhanced_module_processor
         from services.comprehensive_report_generator_v3 import comprehensive_report_generator_v3
 
-        # Executa geração de módulos
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            modules_result = loop.run_until_complete(
-                enhanced_module_processor.generate_all_modules(session_id)
-            )
-        finally:
-            loop.close()
+        # Executa geração de módulos (num worker da fila de jobs)
+        modules_result = get_job_queue().run_sync(lambda: enhanced_module_processor.generate_all_modules(session_id), tenant=_request_tenant())
 
         # Compila relatório final
         final_report = comprehensive_report_generator_v3.compile_final_markdown_report(session_id)
@@ -622,6 +626,11 @@ def start_generation():
             "workflow_completed": True
         })
 
+    except JobQueueFullError as e:
+        return _job_queue_full_response(e)
+    except JobTimeoutError as e:
+        logger.error(f"⏱️ {e}")
+        return _job_timeout_response(e)
     except Exception as e:
         logger.error(f"Erro na geração: {e}")
         return jsonify({
@@ -674,16 +683,8 @@ def analyze_data_endpoint():
         # Importa o Enhanced Synthesis Engine
         from services.enhanced_synthesis_engine import enhanced_synthesis_engine
 
-        # Executa síntese profunda com IA
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(
-                enhanced_synthesis_engine.analyze_and_synthesize(session_id)
-            )
-        finally:
-            loop.close()
+        # Executa síntese profunda com IA (num worker da fila de jobs)
+        result = get_job_queue().run_sync(lambda: enhanced_synthesis_engine.analyze_and_synthesize(session_id), tenant=_request_tenant())
 
         return jsonify({
             "success": True,
@@ -694,6 +695,11 @@ def analyze_data_endpoint():
             "ai_searches": result.get("ai_searches_performed", 0)
         })
 
+    except JobQueueFullError as e:
+        return _job_queue_full_response(e)
+    except JobTimeoutError as e:
+        logger.error(f"⏱️ {e}")
+        return _job_timeout_response(e)
     except Exception as e:
         logger.error(f"Erro na análise de dados: {e}")
         return jsonify({
@@ -805,16 +811,8 @@ def generate_report_endpoint():
         from services.enhanced_module_processor import enhanced_module_processor
         from services.comprehensive_report_generator_v3 import comprehensive_report_generator_v3
 
-        # Executa geração de módulos de forma assíncrona
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            modules_result = loop.run_until_complete(
-                enhanced_module_processor.generate_all_modules(session_id)
-            )
-        finally:
-            loop.close()
+        # Executa geração de módulos de forma assíncrona (num worker da fila de jobs)
+        modules_result = get_job_queue().run_sync(lambda: enhanced_module_processor.generate_all_modules(session_id), tenant=_request_tenant())
 
         # Compila relatório final
         final_report = comprehensive_report_generator_v3.compile_final_markdown_report(session_id)
@@ -827,6 +825,11 @@ def generate_report_endpoint():
             "final_report": final_report
         })
 
+    except JobQueueFullError as e:
+        return _job_queue_full_response(e)
+    except JobTimeoutError as e:
+        logger.error(f"⏱️ {e}")
+        return _job_timeout_response(e)
     except Exception as e:
         logger.error(f"Erro na geração de relatório: {e}")
         return jsonify({
@@ -857,18 +860,19 @@ def workflow_step3():
 
         # Gera relatório HTML final
         try:
-            import asyncio
             html_converter = get_html_report_converter()
             arquivo_md = f"analyses_data/{session_id}/relatorio_final_completo.md"
-            html_result = asyncio.run(html_converter.converter_relatorio_para_html(
+            html_result = get_job_queue().run_sync(lambda: html_converter.converter_relatorio_para_html(
                 session_id,
                 arquivo_md,
                 {
                     'titulo': 'Relatório de Análise Completa',
                     'subtitulo': f'Análise Profissional - {datetime.now().strftime("%d/%m/%Y")}'
                 }
-            ))
+            ), tenant=_request_tenant())
             logger.info(f"✅ Relatório HTML gerado: {html_result.get('arquivo_html', 'N/A')}")
+        except (JobQueueFullError, JobTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"❌ Erro ao gerar HTML: {e}")
             html_result = {"error": str(e)}
@@ -882,6 +886,11 @@ def workflow_step3():
             "html_report": html_result
         })
 
+    except JobQueueFullError as e:
+        return _job_queue_full_response(e)
+    except JobTimeoutError as e:
+        logger.error(f"⏱️ {e}")
+        return _job_timeout_response(e)
     except Exception as e:
         logger.error(f"Erro na etapa 3: {e}")
         return jsonify({
@@ -9,12 +9,10 @@ import time
 import uuid
 import asyncio
 import os
-import glob
 import json
 from datetime import datetime
 from typing import Dict, Any, List
 from flask import Blueprint, request, jsonify, send_file
-import threading
 
 # Import dos serviços necessários
 # services.auto_save_manager será importado diretamente para evitar circular imports
@@ -56,6 +54,167 @@ from services.auto_save_manager import AutoSaveManager
 auto_save_manager_instance = AutoSaveManager()
 salvar_etapa = auto_save_manager_instance.salvar_etapa
 
+# Fila de jobs: workflows rodam num pool limitado de workers com event loops de longa duração
+from services.job_queue import job_queue, JobQueueFullError
+
+# Índice de estado das etapas (alimentado por salvar_etapa)
+from services.workflow_state_store import workflow_state_store, STAGES as WORKFLOW_STAGES
+
+def _request_tenant() -> str:
+    """Tenant da requisição (IP de origem; cabeçalhos só atrás de proxy confiável)"""
+    return job_queue.tenant_for(request.remote_addr, request.headers)
+
+def _salvar_cancelamento(nome_etapa: str, session_id: str, categoria: str = "workflow"):
+    """Registra como erro a etapa de um job cancelado (pelo usuário ou por tempo limite)"""
+    logger.warning(f"🛑 Job cancelado durante {nome_etapa} - Sessão: {session_id}")
+    salvar_etapa(nome_etapa, {
+        "session_id": session_id,
+        "error": "Job cancelado",
+        "cancelled": True,
+        "timestamp": datetime.now().isoformat()
+    }, categoria=categoria, session_id=session_id)
+
+@job_queue.handler('workflow.step1')
+async def _job_step1_collection(session_id: str, query: str, context: Dict[str, Any]):
+    """ETAPA 1: coleta massiva (executada por um worker da fila de jobs)"""
+    logger.info(f"🚀 INICIANDO JOB DE COLETA - Sessão: {session_id}")
+    # Início da etapa 1 registrado quando o worker pega o job (não ao enfileirar)
+    salvar_etapa("etapa1_iniciada", {
+        "session_id": session_id,
+        "query": query,
+        "context": context,
+        "timestamp": datetime.now().isoformat()
+    }, categoria="workflow", session_id=session_id)
+    try:
+        # Carrega serviços de forma lazy
+        services = get_services()
+        if not services:
+            logger.error("❌ Falha ao carregar serviços necessários")
+            salvar_etapa("etapa1_erro", {
+                "session_id": session_id,
+                "error": "Falha ao carregar serviços",
+                "timestamp": datetime.now().isoformat()
+            }, categoria="workflow", session_id=session_id)
+            return
+
+        async def async_collection_tasks():
+            search_results = {'web_results': [], 'social_results': [], 'youtube_results': []}
+            massive_results = {}
+            viral_analysis = {}
+            try:
+                # PRIMEIRA ETAPA: Busca viral (nova integração)
+                logger.info(f"🔥 Executando busca viral para: {query}")
+                viral_integration_service = services["viral_integration_service"]
+                viral_data = await viral_integration_service.find_viral_images(query=query)
+                viral_results_list = viral_data[0] if viral_data and len(viral_data) > 0 else []
+                viral_results_dicts = [img.__dict__ for img in viral_results_list]
+                viral_results = {
+                     "search_completed_at": datetime.now().isoformat(),
+                     "total_images_found": len(viral_results_list),
+                     "total_images_saved": len([img for img in viral_results_list if img.image_path]),
+                     "platforms_searched": list(set(img.platform for img in viral_results_list)),
+                     "aggregated_metrics": {
+                         "total_engagement_score": sum(img.engagement_score for img in viral_results_list),
+                         "average_engagement": sum(img.engagement_score for img in viral_results_list) / len(viral_results_list) if viral_results_list else 0,
+                         "total_estimated_views": sum(img.views_estimate for img in viral_results_list),
+                         "total_estimated_likes": sum(img.likes_estimate for img in viral_results_list),
+                         "top_performing_platform": max(set(img.platform for img in viral_results_list), key=[img.platform for img in viral_results_list].count) if viral_results_list else None
+                     },
+                     "viral_images": viral_results_dicts,
+                     "fallback_used": False
+                 }
+                salvar_etapa("viral_search_completed", {
+                    "session_id": session_id,
+                    "viral_results": viral_results,
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+
+                # SEGUNDA ETAPA: Busca massiva real
+                logger.info(f"🔍 Executando busca massiva - Sessão: {session_id}")
+                real_search_orch = services["real_search_orchestrator"]
+                if hasattr(real_search_orch, "execute_massive_real_search"):
+                    search_results = await real_search_orch.execute_massive_real_search(
+                        query=query,
+                        context=context,
+                        session_id=session_id
+                    )
+                else:
+                    logger.error("❌ Método execute_massive_real_search não encontrado")
+
+                logger.info(f"✅ Busca massiva concluída - Sessão: {session_id}")
+
+                logger.info(f"🌐 Executando busca ALIBABA WebSailor - Sessão: {session_id}")
+                massive_results = await services['massive_search_engine'].execute_massive_search(
+                    produto=context.get('segmento', context.get('produto', query)),
+                    publico_alvo=context.get('publico', context.get('publico_alvo', 'público brasileiro')),
+                    session_id=session_id
+                )
+                logger.info(f"✅ Busca ALIBABA WebSailor concluída - Sessão: {session_id}")
+
+                logger.info(f"🔥 Analisando e capturando conteúdo viral - Sessão: {session_id}")
+                viral_analysis = await services['viral_content_analyzer'].analyze_and_capture_viral_content(
+                    search_results=search_results,
+                    session_id=session_id,
+                    max_captures=15
+                )
+                logger.info(f"✅ Análise viral concluída - Sessão: {session_id}")
+
+            except Exception as e:
+                logger.error(f"❌ Erro durante as operações assíncronas da Etapa 1: {e}")
+                # Continua mesmo com erro para tentar gerar o relatório com o que foi coletado
+
+            # GERA RELATÓRIO VIRAL AUTOMATICAMENTE
+            logger.info("🔥 Gerando relatório viral automático...")
+            viral_report_generator = services['ViralReportGenerator']()
+            viral_report_success = viral_report_generator.generate_viral_report(session_id)
+            if viral_report_success:
+                logger.info("✅ Relatório viral gerado e salvo automaticamente")
+            else:
+                logger.warning("⚠️ Falha ao gerar relatório viral automático")
+
+            # GERA CONSOLIDAÇÃO FINAL COMPLETA
+            logger.info("🔗 CONSOLIDANDO TODOS OS DADOS DA ETAPA 1...")
+            consolidacao_final = _gerar_consolidacao_final_etapa1(
+                session_id, search_results, viral_analysis, massive_results, viral_results
+            )
+
+            # Gera relatório de coleta
+            collection_report = _generate_collection_report(
+                search_results, viral_analysis, session_id, context
+            )
+            # Salva relatório
+            _save_collection_report(collection_report, session_id)
+
+            # Salva resultado da etapa 1 COM CONSOLIDAÇÃO
+            salvar_etapa("etapa1_concluida", {
+                "session_id": session_id,
+                "search_results": search_results,
+                "viral_analysis": viral_analysis,
+                "massive_results": massive_results,
+                "consolidacao_final": consolidacao_final,
+                "collection_report_generated": True,
+                "timestamp": datetime.now().isoformat(),
+                "estatisticas_finais": consolidacao_final.get("estatisticas", {})
+            }, categoria="workflow", session_id=session_id)
+
+            logger.info(f"✅ ETAPA 1 CONCLUÍDA - Sessão: {session_id}")
+            logger.info(f"📊 CONSOLIDAÇÃO: {consolidacao_final.get('estatisticas', {}).get('total_dados_coletados', 0)} dados únicos")
+
+        await async_collection_tasks()
+
+    except asyncio.CancelledError:
+        _salvar_cancelamento("etapa1_erro", session_id)
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro na execução da Etapa 1: {e}")
+        salvar_etapa("etapa1_erro", {
+            "session_id": session_id,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }, categoria="workflow", session_id=session_id)
+        raise
+
+
 @enhanced_workflow_bp.route('/workflow/step1/start', methods=['POST'])
 def start_step1_collection():
     """ETAPA 1: Coleta Massiva de Dados com Screenshots"""
@@ -87,148 +246,20 @@ def start_step1_collection():
         }
         logger.info(f"🚀 ETAPA 1 INICIADA - Sessão: {session_id}")
         logger.info(f"🔍 Query: {query}")
-        # Salva início da etapa 1
-        salvar_etapa("etapa1_iniciada", {
-            "session_id": session_id,
-            "query": query,
-            "context": context,
-            "timestamp": datetime.now().isoformat()
-        }, categoria="workflow", session_id=session_id)
-        # Executa coleta massiva em thread separada
-        def execute_collection_thread():
-            logger.info(f"🚀 INICIANDO THREAD DE COLETA - Sessão: {session_id}")
-            try:
-                # Carrega serviços de forma lazy
-                services = get_services()
-                if not services:
-                    logger.error("❌ Falha ao carregar serviços necessários")
-                    salvar_etapa("etapa1_erro", {
-                        "session_id": session_id,
-                        "error": "Falha ao carregar serviços",
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="workflow", session_id=session_id)
-                    return
-                
-                async def async_collection_tasks():
-                    search_results = {'web_results': [], 'social_results': [], 'youtube_results': []}
-                    massive_results = {}
-                    viral_analysis = {}
-                    try:
-                        # PRIMEIRA ETAPA: Busca viral (nova integração)
-                        logger.info(f"🔥 Executando busca viral para: {query}")
-                        viral_integration_service = services["viral_integration_service"]
-                        viral_data = await viral_integration_service.find_viral_images(query=query)
-                        viral_results_list = viral_data[0] if viral_data and len(viral_data) > 0 else []
-                        viral_results_dicts = [img.__dict__ for img in viral_results_list]
-                        viral_results = {
-                             "search_completed_at": datetime.now().isoformat(),
-                             "total_images_found": len(viral_results_list),
-                             "total_images_saved": len([img for img in viral_results_list if img.image_path]),
-                             "platforms_searched": list(set(img.platform for img in viral_results_list)),
-                             "aggregated_metrics": {
-                                 "total_engagement_score": sum(img.engagement_score for img in viral_results_list),
-                                 "average_engagement": sum(img.engagement_score for img in viral_results_list) / len(viral_results_list) if viral_results_list else 0,
-                                 "total_estimated_views": sum(img.views_estimate for img in viral_results_list),
-                                 "total_estimated_likes": sum(img.likes_estimate for img in viral_results_list),
-                                 "top_performing_platform": max(set(img.platform for img in viral_results_list), key=[img.platform for img in viral_results_list].count) if viral_results_list else None
-                             },
-                             "viral_images": viral_results_dicts,
-                             "fallback_used": False
-                         }
-                        salvar_etapa("viral_search_completed", {
-                            "session_id": session_id,
-                            "viral_results": viral_results,
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        
-                        # SEGUNDA ETAPA: Busca massiva real
-                        logger.info(f"🔍 Executando busca massiva - Sessão: {session_id}")
-                        real_search_orch = services["real_search_orchestrator"]
-                        if hasattr(real_search_orch, "execute_massive_real_search"):
-                            search_results = await real_search_orch.execute_massive_real_search(
-                                query=query,
-                                context=context,
-                                session_id=session_id
-                            )
-                        else:
-                            logger.error("❌ Método execute_massive_real_search não encontrado")
-                        
-                        logger.info(f"✅ Busca massiva concluída - Sessão: {session_id}")
-                        
-                        logger.info(f"🌐 Executando busca ALIBABA WebSailor - Sessão: {session_id}")
-                        massive_results = await services['massive_search_engine'].execute_massive_search(
-                            produto=context.get('segmento', context.get('produto', query)),
-                            publico_alvo=context.get('publico', context.get('publico_alvo', 'público brasileiro')),
-                            session_id=session_id
-                        )
-                        logger.info(f"✅ Busca ALIBABA WebSailor concluída - Sessão: {session_id}")
-                        
-                        logger.info(f"🔥 Analisando e capturando conteúdo viral - Sessão: {session_id}")
-                        viral_analysis = await services['viral_content_analyzer'].analyze_and_capture_viral_content(
-                            search_results=search_results,
-                            session_id=session_id,
-                            max_captures=15
-                        )
-                        logger.info(f"✅ Análise viral concluída - Sessão: {session_id}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro durante as operações assíncronas da Etapa 1: {e}")
-                        # Continua mesmo com erro para tentar gerar o relatório com o que foi coletado
-                    
-                    # GERA RELATÓRIO VIRAL AUTOMATICAMENTE
-                    logger.info("🔥 Gerando relatório viral automático...")
-                    viral_report_generator = services['ViralReportGenerator']()
-                    viral_report_success = viral_report_generator.generate_viral_report(session_id)
-                    if viral_report_success:
-                        logger.info("✅ Relatório viral gerado e salvo automaticamente")
-                    else:
-                        logger.warning("⚠️ Falha ao gerar relatório viral automático")
-                    
-                    # GERA CONSOLIDAÇÃO FINAL COMPLETA
-                    logger.info("🔗 CONSOLIDANDO TODOS OS DADOS DA ETAPA 1...")
-                    consolidacao_final = _gerar_consolidacao_final_etapa1(
-                        session_id, search_results, viral_analysis, massive_results, viral_results
-                    )
-                    
-                    # Gera relatório de coleta
-                    collection_report = _generate_collection_report(
-                        search_results, viral_analysis, session_id, context
-                    )
-                    # Salva relatório
-                    _save_collection_report(collection_report, session_id)
-                    
-                    # Salva resultado da etapa 1 COM CONSOLIDAÇÃO
-                    salvar_etapa("etapa1_concluida", {
-                        "session_id": session_id,
-                        "search_results": search_results,
-                        "viral_analysis": viral_analysis,
-                        "massive_results": massive_results,
-                        "consolidacao_final": consolidacao_final,
-                        "collection_report_generated": True,
-                        "timestamp": datetime.now().isoformat(),
-                        "estatisticas_finais": consolidacao_final.get("estatisticas", {})
-                    }, categoria="workflow", session_id=session_id)
-                    
-                    logger.info(f"✅ ETAPA 1 CONCLUÍDA - Sessão: {session_id}")
-                    logger.info(f"📊 CONSOLIDAÇÃO: {consolidacao_final.get('estatisticas', {}).get('total_dados_coletados', 0)} dados únicos")
-                
-                asyncio.run(async_collection_tasks())
-                
-            except Exception as e:
-                logger.error(f"❌ Erro na execução da Etapa 1: {e}")
-                salvar_etapa("etapa1_erro", {
-                    "session_id": session_id,
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }, categoria="workflow", session_id=session_id)
-        
-        # Inicia a thread para a coleta
-        thread = threading.Thread(target=execute_collection_thread)
-        thread.start()
+        # Executa coleta massiva num worker da fila de jobs (concorrência limitada por tenant)
+        job_id = job_queue.submit(
+            'workflow.step1',
+            {'session_id': session_id, 'query': query, 'context': context},
+            tenant=_request_tenant(),
+            session_id=session_id
+        )
+        # O início da etapa 1 é registrado pelo job quando um worker o executa
         
         return jsonify({
             "success": True,
             "session_id": session_id,
+            "job_id": job_id,
+            "job_endpoint": f"/api/workflow/jobs/{job_id}?session_id={session_id}",
             "message": "Etapa 1 iniciada: Coleta massiva de dados em segundo plano",
             "query": query,
             "estimated_duration": "3-5 minutos",
@@ -236,6 +267,12 @@ def start_step1_collection():
             "status_endpoint": f"/api/workflow/status/{session_id}"
         }), 200
         
+    except JobQueueFullError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "retry_after": 30
+        }), 429
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar Etapa 1: {e}")
         return jsonify({
@@ -244,6 +281,65 @@ def start_step1_collection():
             "message": "Falha ao iniciar coleta de dados"
         }), 500
 
+@job_queue.handler('workflow.step2')
+async def _job_step2_synthesis(session_id: str):
+    """ETAPA 2: síntese com IA (executada por um worker da fila de jobs)"""
+    salvar_etapa("etapa2_iniciada", {
+        "session_id": session_id,
+        "timestamp": datetime.now().isoformat()
+    }, categoria="workflow", session_id=session_id)
+    try:
+        # Carrega serviços de forma lazy
+        services = get_services()
+        if not services:
+            logger.error("❌ Falha ao carregar serviços necessários")
+            salvar_etapa("etapa2_erro", {
+                "session_id": session_id,
+                "error": "Falha ao carregar serviços",
+                "timestamp": datetime.now().isoformat()
+            }, categoria="workflow", session_id=session_id)
+            return
+
+        async def async_synthesis_tasks():
+            batch_result = {}
+            try:
+                # Sínteses master, comportamental, de mercado e competitiva em paralelo,
+                # com os dados da Etapa 1 carregados uma única vez
+                batch_result = await services['enhanced_synthesis_engine'].execute_synthesis_batch(session_id)
+            except Exception as e:
+                logger.error(f"❌ Erro durante as operações assíncronas da Etapa 2: {e}")
+
+            results = batch_result.get('results', {})
+
+            # Salva resultado da etapa 2
+            salvar_etapa("etapa2_concluida", {
+                "session_id": session_id,
+                "synthesis_result": results.get('master_synthesis', {}),
+                "behavioral_result": results.get('behavioral_analysis', {}),
+                "market_result": results.get('deep_market_analysis', {}),
+                "competitive_result": results.get('competitive_analysis', {}),
+                "synthesis_metrics": batch_result.get('metrics', {}),
+                "total_time_seconds": batch_result.get('total_time_seconds'),
+                "timestamp": datetime.now().isoformat()
+            }, categoria="workflow", session_id=session_id)
+
+            logger.info(f"✅ ETAPA 2 CONCLUÍDA - Sessão: {session_id}")
+
+        await async_synthesis_tasks()
+
+    except asyncio.CancelledError:
+        _salvar_cancelamento("etapa2_erro", session_id)
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro na execução da Etapa 2: {e}")
+        salvar_etapa("etapa2_erro", {
+            "session_id": session_id,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }, categoria="workflow", session_id=session_id)
+        raise
+
+
 @enhanced_workflow_bp.route('/workflow/step2/start', methods=['POST'])
 def start_step2_synthesis():
     """ETAPA 2: Síntese com IA e Busca Ativa"""
@@ -255,77 +351,33 @@ def start_step2_synthesis():
         
         logger.info(f"🧠 ETAPA 2 INICIADA - Síntese para sessão: {session_id}")
         
-        # Salva início da etapa 2
-        salvar_etapa("etapa2_iniciada", {
-            "session_id": session_id,
-            "timestamp": datetime.now().isoformat()
-        }, categoria="workflow", session_id=session_id)
-        
-        # Executa síntese em thread separada
-        def execute_synthesis_thread():
-            try:
-                # Carrega serviços de forma lazy
-                services = get_services()
-                if not services:
-                    logger.error("❌ Falha ao carregar serviços necessários")
-                    salvar_etapa("etapa2_erro", {
-                        "session_id": session_id,
-                        "error": "Falha ao carregar serviços",
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="workflow", session_id=session_id)
-                    return
-                
-                async def async_synthesis_tasks():
-                    synthesis_result = {}
-                    behavioral_result = {}
-                    market_result = {}
-                    try:
-                        # Executa síntese master com busca ativa
-                        synthesis_result = await services['enhanced_synthesis_engine'].execute_enhanced_synthesis(
-                            session_id=session_id,
-                            synthesis_type="master_synthesis"
-                        )
-                        # Executa síntese comportamental
-                        behavioral_result = await services['enhanced_synthesis_engine'].execute_behavioral_synthesis(session_id)
-                        # Executa síntese de mercado
-                        market_result = await services['enhanced_synthesis_engine'].execute_market_synthesis(session_id)
-                    except Exception as e:
-                        logger.error(f"❌ Erro durante as operações assíncronas da Etapa 2: {e}")
-                    
-                    # Salva resultado da etapa 2
-                    salvar_etapa("etapa2_concluida", {
-                        "session_id": session_id,
-                        "synthesis_result": synthesis_result,
-                        "behavioral_result": behavioral_result,
-                        "market_result": market_result,
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="workflow", session_id=session_id)
-                    
-                    logger.info(f"✅ ETAPA 2 CONCLUÍDA - Sessão: {session_id}")
-                
-                asyncio.run(async_synthesis_tasks())
-                
-            except Exception as e:
-                logger.error(f"❌ Erro na execução da Etapa 2: {e}")
-                salvar_etapa("etapa2_erro", {
-                    "session_id": session_id,
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }, categoria="workflow", session_id=session_id)
+        # Executa síntese num worker da fila de jobs (concorrência limitada por tenant)
+        job_id = job_queue.submit(
+            'workflow.step2',
+            {'session_id': session_id},
+            tenant=_request_tenant(),
+            session_id=session_id
+        )
         
-        # Inicia a thread para a síntese
-        thread = threading.Thread(target=execute_synthesis_thread)
-        thread.start()
+        # O início da etapa 2 é registrado pelo job quando um worker o executa
         
         return jsonify({
             "success": True,
             "session_id": session_id,
+            "job_id": job_id,
+            "job_endpoint": f"/api/workflow/jobs/{job_id}?session_id={session_id}",
             "message": "Etapa 2 iniciada: Síntese com IA e busca ativa em segundo plano",
             "estimated_duration": "2-4 minutos",
             "next_step": "/api/workflow/external_ai_verification",
             "status_endpoint": f"/api/workflow/status/{session_id}"
         }), 200
         
+    except JobQueueFullError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "retry_after": 30
+        }), 429
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar Etapa 2: {e}")
         return jsonify({
@@ -334,6 +386,43 @@ def start_step2_synthesis():
             "message": "Falha ao iniciar síntese"
         }), 500
 
+@job_queue.handler('workflow.external_ai_verification')
+async def _job_external_ai_verification(session_id: str):
+    """Verificação AI externa (executada por um worker da fila de jobs)"""
+    salvar_etapa("verificacao_ai_iniciada", {
+        "session_id": session_id,
+        "timestamp": datetime.now().isoformat()
+    }, categoria="workflow", session_id=session_id)
+    try:
+        from services.external_ai_integration import external_ai_integration
+
+        async def async_verification():
+            result = await external_ai_integration.verify_session_data(session_id)
+
+            # Salva resultado da verificação
+            salvar_etapa("verificacao_ai_concluida", {
+                "session_id": session_id,
+                "verification_result": result,
+                "timestamp": datetime.now().isoformat()
+            }, categoria="workflow", session_id=session_id)
+
+            logger.info(f"✅ VERIFICAÇÃO AI CONCLUÍDA - Sessão: {session_id}")
+
+        await async_verification()
+
+    except asyncio.CancelledError:
+        _salvar_cancelamento("verificacao_ai_erro", session_id)
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro na verificação AI: {e}")
+        salvar_etapa("verificacao_ai_erro", {
+            "session_id": session_id,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }, categoria="workflow", session_id=session_id)
+        raise
+
+
 @enhanced_workflow_bp.route('/workflow/external_ai_verification', methods=['POST'])
 def run_external_ai_verification():
     """VERIFICAÇÃO AI EXTERNA: Executa verificação dos dados antes da Etapa 3"""
@@ -345,53 +434,33 @@ def run_external_ai_verification():
 
         logger.info(f"🤖 VERIFICAÇÃO AI INICIADA - Sessão: {session_id}")
 
-        # Salva início da verificação
-        salvar_etapa("verificacao_ai_iniciada", {
-            "session_id": session_id,
-            "timestamp": datetime.now().isoformat()
-        }, categoria="workflow", session_id=session_id)
-
-        # Executa verificação em thread separada
-        def execute_verification_thread():
-            try:
-                import asyncio
-                from services.external_ai_integration import external_ai_integration
-
-                async def async_verification():
-                    result = await external_ai_integration.verify_session_data(session_id)
-
-                    # Salva resultado da verificação
-                    salvar_etapa("verificacao_ai_concluida", {
-                        "session_id": session_id,
-                        "verification_result": result,
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="workflow", session_id=session_id)
-
-                    logger.info(f"✅ VERIFICAÇÃO AI CONCLUÍDA - Sessão: {session_id}")
-
-                asyncio.run(async_verification())
-
-            except Exception as e:
-                logger.error(f"❌ Erro na verificação AI: {e}")
-                salvar_etapa("verificacao_ai_erro", {
-                    "session_id": session_id,
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }, categoria="workflow", session_id=session_id)
+        # Executa verificação num worker da fila de jobs (concorrência limitada por tenant)
+        job_id = job_queue.submit(
+            'workflow.external_ai_verification',
+            {'session_id': session_id},
+            tenant=_request_tenant(),
+            session_id=session_id
+        )
 
-        # Inicia a thread para verificação
-        thread = threading.Thread(target=execute_verification_thread)
-        thread.start()
+        # O início da verificação é registrado pelo job quando um worker o executa
 
         return jsonify({
             "success": True,
             "session_id": session_id,
+            "job_id": job_id,
+            "job_endpoint": f"/api/workflow/jobs/{job_id}?session_id={session_id}",
             "message": "Verificação AI iniciada em segundo plano",
             "estimated_duration": "1-2 minutos",
             "next_step": "/api/workflow/step3/start",
             "status_endpoint": f"/api/workflow/status/{session_id}"
         }), 200
 
+    except JobQueueFullError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "retry_after": 30
+        }), 429
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar verificação AI: {e}")
         return jsonify({
@@ -400,6 +469,62 @@ def run_external_ai_verification():
             "message": "Falha ao iniciar verificação AI"
         }), 500
 
+@job_queue.handler('workflow.step3')
+async def _job_step3_generation(session_id: str):
+    """ETAPA 3: geração dos módulos (executada por um worker da fila de jobs)"""
+    salvar_etapa("etapa3_iniciada", {
+        "session_id": session_id,
+        "timestamp": datetime.now().isoformat()
+    }, categoria="workflow", session_id=session_id)
+    try:
+        # Carrega serviços de forma lazy
+        services = get_services()
+        if not services:
+            logger.error("❌ Falha ao carregar serviços necessários")
+            salvar_etapa("etapa3_erro", {
+                "session_id": session_id,
+                "error": "Falha ao carregar serviços",
+                "timestamp": datetime.now().isoformat()
+            }, categoria="workflow", session_id=session_id)
+            return
+
+        async def async_generation_tasks():
+            modules_result = {}
+            final_report = ""
+            try:
+                # Gera todos os 16 módulos
+                modules_result = await services['enhanced_module_processor'].generate_all_modules(session_id)
+                # Compila relatório final
+                final_report = services['comprehensive_report_generator_v3'].compile_final_markdown_report(session_id)
+            except Exception as e:
+                logger.error(f"❌ Erro durante as operações assíncronas da Etapa 3: {e}")
+
+            # Salva resultado da etapa 3
+            salvar_etapa("etapa3_concluida", {
+                "session_id": session_id,
+                "modules_result": modules_result,
+                "final_report": final_report,
+                "timestamp": datetime.now().isoformat()
+            }, categoria="workflow", session_id=session_id)
+
+            logger.info(f"✅ ETAPA 3 CONCLUÍDA - Sessão: {session_id}")
+            logger.info(f"📊 {modules_result.get('successful_modules', 0)}/16 módulos gerados")
+
+        await async_generation_tasks()
+
+    except asyncio.CancelledError:
+        _salvar_cancelamento("etapa3_erro", session_id)
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro na execução da Etapa 3: {e}")
+        salvar_etapa("etapa3_erro", {
+            "session_id": session_id,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }, categoria="workflow", session_id=session_id)
+        raise
+
+
 @enhanced_workflow_bp.route('/workflow/step3/start', methods=['POST'])
 def start_step3_generation():
     """ETAPA 3: Geração dos 16 Módulos e Relatório Final"""
@@ -411,71 +536,33 @@ def start_step3_generation():
 
         logger.info(f"📝 ETAPA 3 INICIADA - Geração para sessão: {session_id}")
 
-        # Salva início da etapa 3
-        salvar_etapa("etapa3_iniciada", {
-            "session_id": session_id,
-            "timestamp": datetime.now().isoformat()
-        }, categoria="workflow", session_id=session_id)
-        
-        # Executa geração em thread separada
-        def execute_generation_thread():
-            try:
-                # Carrega serviços de forma lazy
-                services = get_services()
-                if not services:
-                    logger.error("❌ Falha ao carregar serviços necessários")
-                    salvar_etapa("etapa3_erro", {
-                        "session_id": session_id,
-                        "error": "Falha ao carregar serviços",
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="workflow", session_id=session_id)
-                    return
-                
-                async def async_generation_tasks():
-                    modules_result = {}
-                    final_report = ""
-                    try:
-                        # Gera todos os 16 módulos
-                        modules_result = await services['enhanced_module_processor'].generate_all_modules(session_id)
-                        # Compila relatório final
-                        final_report = services['comprehensive_report_generator_v3'].compile_final_markdown_report(session_id)
-                    except Exception as e:
-                        logger.error(f"❌ Erro durante as operações assíncronas da Etapa 3: {e}")
-                    
-                    # Salva resultado da etapa 3
-                    salvar_etapa("etapa3_concluida", {
-                        "session_id": session_id,
-                        "modules_result": modules_result,
-                        "final_report": final_report,
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="workflow", session_id=session_id)
-                    
-                    logger.info(f"✅ ETAPA 3 CONCLUÍDA - Sessão: {session_id}")
-                    logger.info(f"📊 {modules_result.get('successful_modules', 0)}/16 módulos gerados")
-                
-                asyncio.run(async_generation_tasks())
-                
-            except Exception as e:
-                logger.error(f"❌ Erro na execução da Etapa 3: {e}")
-                salvar_etapa("etapa3_erro", {
-                    "session_id": session_id,
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }, categoria="workflow", session_id=session_id)
+        # Executa geração num worker da fila de jobs (concorrência limitada por tenant)
+        job_id = job_queue.submit(
+            'workflow.step3',
+            {'session_id': session_id},
+            tenant=_request_tenant(),
+            session_id=session_id
+        )
         
-        # Inicia a thread para a geração
-        thread = threading.Thread(target=execute_generation_thread)
-        thread.start()
+        # O início da etapa 3 é registrado pelo job quando um worker o executa
         
         return jsonify({
             "success": True,
             "session_id": session_id,
+            "job_id": job_id,
+            "job_endpoint": f"/api/workflow/jobs/{job_id}?session_id={session_id}",
             "message": "Etapa 3 iniciada: Geração dos 16 módulos e relatório final em segundo plano",
             "estimated_duration": "4-6 minutos",
             "next_step": "/api/workflow/cpl_devastador/start",
             "status_endpoint": f"/api/workflow/status/{session_id}"
         }), 200
         
+    except JobQueueFullError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "retry_after": 30
+        }), 429
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar Etapa 3: {e}")
         return jsonify({
@@ -488,6 +575,70 @@ def start_step3_generation():
 # ROTAS DO PROTOCOLO CPL DEVASTADOR
 # ==========================================
 
+@job_queue.handler('workflow.cpl_devastador')
+async def _job_cpl_devastador(session_id: str, tema: str, segmento: str, publico_alvo: str):
+    """Protocolo CPL Devastador (executado por um worker da fila de jobs)"""
+    salvar_etapa("cpl_devastador_iniciado", {
+        "session_id": session_id,
+        "tema": tema,
+        "segmento": segmento,
+        "publico_alvo": publico_alvo,
+        "timestamp": datetime.now().isoformat()
+    }, categoria="cpl", session_id=session_id)
+    try:
+        services = get_services()
+        if not services or not services.get('cpl_devastador_protocol'):
+            logger.error("❌ Protocolo CPL Devastador não disponível")
+            salvar_etapa("cpl_devastador_erro", {
+                "session_id": session_id,
+                "error": "Protocolo CPL Devastador não disponível",
+                "timestamp": datetime.now().isoformat()
+            }, categoria="cpl", session_id=session_id)
+            return
+
+        async def async_cpl_devastador():
+            try:
+                cpl_protocol = services['cpl_devastador_protocol']
+
+                resultado = await cpl_protocol.executar_protocolo_completo(
+                    tema=tema,
+                    segmento=segmento,
+                    publico_alvo=publico_alvo,
+                    session_id=session_id
+                )
+
+                # Salva resultado final
+                salvar_etapa("cpl_devastador_concluido", {
+                    "session_id": session_id,
+                    "resultado": resultado,
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="cpl", session_id=session_id)
+
+                logger.info(f"✅ PROTOCOLO CPL DEVASTADOR CONCLUÍDO - Sessão: {session_id}")
+
+            except Exception as e:
+                logger.error(f"❌ Erro na execução do CPL Devastador: {e}")
+                salvar_etapa("cpl_devastador_erro", {
+                    "session_id": session_id,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="cpl", session_id=session_id)
+
+        await async_cpl_devastador()
+
+    except asyncio.CancelledError:
+        _salvar_cancelamento("cpl_devastador_erro", session_id, categoria="cpl")
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro na thread do CPL Devastador: {e}")
+        salvar_etapa("cpl_devastador_erro", {
+            "session_id": session_id,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }, categoria="cpl", session_id=session_id)
+        raise
+
+
 @enhanced_workflow_bp.route('/workflow/cpl_devastador/start', methods=['POST'])
 def start_cpl_devastador():
     """Inicia o protocolo CPL Devastador completo"""
@@ -509,78 +660,32 @@ def start_cpl_devastador():
         logger.info(f"🚀 PROTOCOLO CPL DEVASTADOR INICIADO - Sessão: {session_id}")
         logger.info(f"🎯 Tema: {tema} | Segmento: {segmento} | Público: {publico_alvo}")
         
-        # Salva início do protocolo
-        salvar_etapa("cpl_devastador_iniciado", {
-            "session_id": session_id,
-            "tema": tema,
-            "segmento": segmento,
-            "publico_alvo": publico_alvo,
-            "timestamp": datetime.now().isoformat()
-        }, categoria="cpl", session_id=session_id)
-        
-        # Executa protocolo em thread separada
-        def execute_cpl_devastador_thread():
-            try:
-                services = get_services()
-                if not services or not services.get('cpl_devastador_protocol'):
-                    logger.error("❌ Protocolo CPL Devastador não disponível")
-                    salvar_etapa("cpl_devastador_erro", {
-                        "session_id": session_id,
-                        "error": "Protocolo CPL Devastador não disponível",
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="cpl", session_id=session_id)
-                    return
-                
-                async def async_cpl_devastador():
-                    try:
-                        cpl_protocol = services['cpl_devastador_protocol']
-                        
-                        resultado = await cpl_protocol.executar_protocolo_completo(
-                            tema=tema,
-                            segmento=segmento,
-                            publico_alvo=publico_alvo,
-                            session_id=session_id
-                        )
-                        
-                        # Salva resultado final
-                        salvar_etapa("cpl_devastador_concluido", {
-                            "session_id": session_id,
-                            "resultado": resultado,
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="cpl", session_id=session_id)
-                        
-                        logger.info(f"✅ PROTOCOLO CPL DEVASTADOR CONCLUÍDO - Sessão: {session_id}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro na execução do CPL Devastador: {e}")
-                        salvar_etapa("cpl_devastador_erro", {
-                            "session_id": session_id,
-                            "error": str(e),
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="cpl", session_id=session_id)
-                
-                asyncio.run(async_cpl_devastador())
-                
-            except Exception as e:
-                logger.error(f"❌ Erro na thread do CPL Devastador: {e}")
-                salvar_etapa("cpl_devastador_erro", {
-                    "session_id": session_id,
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }, categoria="cpl", session_id=session_id)
+        # Executa protocolo num worker da fila de jobs (concorrência limitada por tenant)
+        job_id = job_queue.submit(
+            'workflow.cpl_devastador',
+            {'session_id': session_id, 'tema': tema, 'segmento': segmento, 'publico_alvo': publico_alvo},
+            tenant=_request_tenant(),
+            session_id=session_id
+        )
         
-        # Inicia a thread
-        thread = threading.Thread(target=execute_cpl_devastador_thread)
-        thread.start()
+        # O início do protocolo é registrado pelo job quando um worker o executa
         
         return jsonify({
             "success": True,
             "session_id": session_id,
+            "job_id": job_id,
+            "job_endpoint": f"/api/workflow/jobs/{job_id}?session_id={session_id}",
             "message": "Protocolo CPL Devastador iniciado em segundo plano",
             "estimated_duration": "5-8 minutos",
             "status_endpoint": f"/api/workflow/cpl_devastador/status/{session_id}"
         }), 200
         
+    except JobQueueFullError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "retry_after": 30
+        }), 429
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar CPL Devastador: {e}")
         return jsonify({
@@ -611,17 +716,22 @@ def get_cpl_devastador_status(session_id):
             "last_update": datetime.now().isoformat()
         }
         
+        stage = workflow_state_store.get_stages(session_id).get("cpl_devastador")
+        if stage:
+            status["stage"] = stage
+        
         # Verifica se foi concluído
-        if os.path.exists(f"analyses_data/{session_id}/cpl_protocol_result.json"):
+        if stage and stage["status"] == "completed":
             status["status"] = "completed"
             status["progress_percentage"] = 100
             status["current_phase"] = "concluido"
             for phase in status["phases"]:
                 status["phases"][phase] = "completed"
+        elif stage and stage["status"] == "running":
+            status["status"] = "running"
         
         # Verifica se há erros
-        error_files = glob.glob(f"analyses_data/{session_id}/cpl_devastador_erro*")
-        if error_files:
+        if stage and stage["status"] == "failed":
             status["status"] = "failed"
             status["error"] = "Erro detectado na execução do protocolo"
         
@@ -667,6 +777,249 @@ def get_cpl_devastador_results(session_id):
 # WORKFLOW COMPLETO (3 ETAPAS + VERIFICAÇÃO AI + CPL DEVASTADOR)
 # ==========================================
 
+@job_queue.handler('workflow.full_workflow')
+async def _job_full_workflow(session_id: str, query: str, context: Dict[str, Any]):
+    """Workflow completo (executado por um worker da fila de jobs)"""
+    salvar_etapa("workflow_completo_iniciado", {
+        "session_id": session_id,
+        "query": query,
+        "context": context,
+        "timestamp": datetime.now().isoformat()
+    }, categoria="workflow", session_id=session_id)
+    # Prefixo da etapa em andamento (para registrar o cancelamento nela também)
+    etapa_atual = None
+    try:
+        services = get_services()
+        if not services:
+            logger.error("❌ Falha ao carregar serviços necessários para workflow completo")
+            salvar_etapa("workflow_erro", {
+                "session_id": session_id,
+                "error": "Falha ao carregar serviços para workflow completo",
+                "timestamp": datetime.now().isoformat()
+            }, categoria="workflow", session_id=session_id)
+            return
+
+        async def async_full_workflow_tasks():
+            nonlocal etapa_atual
+            search_results = {'web_results': [], 'social_results': [], 'youtube_results': []}
+            massive_results = {}
+            viral_analysis = {}
+            synthesis_result = {}
+            verification_result = {}
+            modules_result = {}
+            final_report = ""
+            cpl_result = {}
+
+            # ETAPA 1: Coleta Massiva de Dados
+            logger.info(f"🚀 INICIANDO ETAPA 1 (Workflow Completo) - Sessão: {session_id}")
+            workflow_state_store.mark_started(session_id, 'step1')
+            etapa_atual = 'etapa1'
+            try:
+                real_search_orch = services['real_search_orchestrator']
+                if hasattr(real_search_orch, 'execute_massive_real_search'):
+                    search_results = await real_search_orch.execute_massive_real_search(
+                        query=query,
+                        context=context,
+                        session_id=session_id
+                    )
+                else:
+                    logger.error("❌ Método execute_massive_real_search não encontrado na Etapa 1 (Workflow Completo)")
+
+                massive_results = await services['massive_search_engine'].execute_massive_search(
+                    produto=context.get('segmento', context.get('produto', query)),
+                    publico_alvo=context.get('publico', context.get('publico_alvo', 'público brasileiro')),
+                    session_id=session_id
+                )
+
+                viral_analysis = await services['viral_content_analyzer'].analyze_and_capture_viral_content(
+                    search_results=search_results,
+                    session_id=session_id,
+                    max_captures=15
+                )
+
+                # GERA RELATÓRIO VIRAL AUTOMATICAMENTE
+                viral_report_generator = services['ViralReportGenerator']()
+                viral_report_generator.generate_viral_report(session_id)
+
+                # GERA CONSOLIDAÇÃO FINAL COMPLETA
+                consolidacao_final = _gerar_consolidacao_final_etapa1(
+                    session_id, search_results, viral_analysis, massive_results
+                )
+
+                # Gera e salva relatório de coleta
+                collection_report = _generate_collection_report(
+                    search_results, viral_analysis, session_id, context
+                )
+                _save_collection_report(collection_report, session_id)
+
+                salvar_etapa("etapa1_concluida_full_workflow", {
+                    "session_id": session_id,
+                    "search_results": search_results,
+                    "viral_analysis": viral_analysis,
+                    "massive_results": massive_results,
+                    "consolidacao_final": consolidacao_final,
+                    "collection_report_generated": True,
+                    "timestamp": datetime.now().isoformat(),
+                    "estatisticas_finais": consolidacao_final.get("estatisticas", {})
+                }, categoria="workflow", session_id=session_id)
+
+                logger.info(f"✅ ETAPA 1 (Workflow Completo) CONCLUÍDA - Sessão: {session_id}")
+
+            except Exception as e:
+                logger.error(f"❌ Erro na Etapa 1 (Workflow Completo): {e}")
+                salvar_etapa("etapa1_erro_full_workflow", {
+                    "session_id": session_id,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+                return # Aborta o workflow se a primeira etapa falhar
+
+            # ETAPA 2: Síntese com IA e Busca Ativa
+            logger.info(f"🧠 INICIANDO ETAPA 2 (Workflow Completo) - Sessão: {session_id}")
+            workflow_state_store.mark_started(session_id, 'step2')
+            etapa_atual = 'etapa2'
+            try:
+                batch_result = await services['enhanced_synthesis_engine'].execute_synthesis_batch(session_id)
+                results = batch_result.get('results', {})
+                synthesis_result = results.get('master_synthesis', {})
+
+                salvar_etapa("etapa2_concluida_full_workflow", {
+                    "session_id": session_id,
+                    "synthesis_result": synthesis_result,
+                    "behavioral_result": results.get('behavioral_analysis', {}),
+                    "market_result": results.get('deep_market_analysis', {}),
+                    "competitive_result": results.get('competitive_analysis', {}),
+                    "synthesis_metrics": batch_result.get('metrics', {}),
+                    "total_time_seconds": batch_result.get('total_time_seconds'),
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+
+                logger.info(f"✅ ETAPA 2 (Workflow Completo) CONCLUÍDA - Sessão: {session_id}")
+
+            except Exception as e:
+                logger.error(f"❌ Erro na Etapa 2 (Workflow Completo): {e}")
+                salvar_etapa("etapa2_erro_full_workflow", {
+                    "session_id": session_id,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+                return # Aborta o workflow se a segunda etapa falhar
+
+            # ETAPA 2.5: Verificação AI Externa
+            logger.info(f"🤖 INICIANDO VERIFICAÇÃO AI EXTERNA (Workflow Completo) - Sessão: {session_id}")
+            workflow_state_store.mark_started(session_id, 'external_ai_verification')
+            etapa_atual = 'verificacao_ai'
+            try:
+                from services.external_ai_integration import external_ai_integration
+                verification_result = await external_ai_integration.verify_session_data(session_id)
+
+                salvar_etapa("verificacao_ai_concluida_full_workflow", {
+                    "session_id": session_id,
+                    "verification_result": verification_result,
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+
+                logger.info(f"✅ VERIFICAÇÃO AI EXTERNA (Workflow Completo) CONCLUÍDA - Sessão: {session_id}")
+
+            except Exception as e:
+                logger.error(f"❌ Erro na Verificação AI Externa (Workflow Completo): {e}")
+                salvar_etapa("verificacao_ai_erro_full_workflow", {
+                    "session_id": session_id,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+                # Não aborta o workflow se a verificação falhar
+
+            # ETAPA 3: Geração dos 16 Módulos e Relatório Final
+            logger.info(f"📝 INICIANDO ETAPA 3 (Workflow Completo) - Sessão: {session_id}")
+            workflow_state_store.mark_started(session_id, 'step3')
+            etapa_atual = 'etapa3'
+            try:
+                modules_result = await services['enhanced_module_processor'].generate_all_modules(session_id)
+                final_report = services['comprehensive_report_generator_v3'].compile_final_markdown_report(session_id)
+
+                salvar_etapa("etapa3_concluida_full_workflow", {
+                    "session_id": session_id,
+                    "modules_result": modules_result,
+                    "final_report": final_report,
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+
+                logger.info(f"✅ ETAPA 3 (Workflow Completo) CONCLUÍDA - Sessão: {session_id}")
+
+            except Exception as e:
+                logger.error(f"❌ Erro na Etapa 3 (Workflow Completo): {e}")
+                salvar_etapa("etapa3_erro_full_workflow", {
+                    "session_id": session_id,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+                return # Aborta o workflow se a terceira etapa falhar
+
+            # ETAPA 4: Protocolo CPL Devastador
+            logger.info(f"🎯 INICIANDO PROTOCOLO CPL DEVASTADOR (Workflow Completo) - Sessão: {session_id}")
+            workflow_state_store.mark_started(session_id, 'cpl_devastador')
+            etapa_atual = 'cpl_devastador'
+            try:
+                cpl_protocol = services['cpl_devastador_protocol']
+                cpl_result = await cpl_protocol.executar_protocolo_completo(
+                    tema=context.get('segmento', context.get('produto', query)),
+                    segmento=context.get('segmento', 'Não especificado'),
+                    publico_alvo=context.get('publico', 'Não especificado'),
+                    session_id=session_id
+                )
+
+                salvar_etapa("cpl_devastador_concluido_full_workflow", {
+                    "session_id": session_id,
+                    "cpl_result": cpl_result,
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+
+                logger.info(f"✅ PROTOCOLO CPL DEVASTADOR (Workflow Completo) CONCLUÍDO - Sessão: {session_id}")
+
+            except Exception as e:
+                logger.error(f"❌ Erro no CPL Devastador (Workflow Completo): {e}")
+                salvar_etapa("cpl_devastador_erro_full_workflow", {
+                    "session_id": session_id,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }, categoria="workflow", session_id=session_id)
+                # Não aborta o workflow se o CPL falhar, apenas registra o erro
+
+            etapa_atual = None
+
+            # Salva resultado final do workflow completo
+            salvar_etapa("workflow_completo_concluido", {
+                "session_id": session_id,
+                "search_results": search_results,
+                "viral_analysis": viral_analysis,
+                "synthesis_result": synthesis_result,
+                "verification_result": verification_result,
+                "modules_result": modules_result,
+                "final_report": final_report,
+                "cpl_result": cpl_result,
+                "timestamp": datetime.now().isoformat()
+            }, categoria="workflow", session_id=session_id)
+
+            logger.info(f"✅ WORKFLOW COMPLETO CONCLUÍDO - Sessão: {session_id}")
+
+        await async_full_workflow_tasks()
+
+    except asyncio.CancelledError:
+        if etapa_atual:
+            _salvar_cancelamento(f"{etapa_atual}_erro_full_workflow", session_id)
+        _salvar_cancelamento("workflow_erro", session_id)
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro no workflow completo: {e}")
+        salvar_etapa("workflow_erro", {
+            "session_id": session_id,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }, categoria="workflow", session_id=session_id)
+        raise
+
+
 @enhanced_workflow_bp.route('/workflow/full_workflow/start', methods=['POST'])
 def start_full_workflow():
     """Inicia o workflow completo em segundo plano"""
@@ -697,236 +1050,21 @@ def start_full_workflow():
         }
         logger.info(f"🚀 WORKFLOW COMPLETO INICIADO - Sessão: {session_id}")
         logger.info(f"🔍 Query: {query}")
-        # Salva início do workflow completo
-        salvar_etapa("workflow_completo_iniciado", {
-            "session_id": session_id,
-            "query": query,
-            "context": context,
-            "timestamp": datetime.now().isoformat()
-        }, categoria="workflow", session_id=session_id)
-        
-        def execute_full_workflow_thread():
-            try:
-                services = get_services()
-                if not services:
-                    logger.error("❌ Falha ao carregar serviços necessários para workflow completo")
-                    salvar_etapa("workflow_erro", {
-                        "session_id": session_id,
-                        "error": "Falha ao carregar serviços para workflow completo",
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="workflow", session_id=session_id)
-                    return
-                
-                async def async_full_workflow_tasks():
-                    search_results = {'web_results': [], 'social_results': [], 'youtube_results': []}
-                    massive_results = {}
-                    viral_analysis = {}
-                    synthesis_result = {}
-                    behavioral_result = {}
-                    market_result = {}
-                    verification_result = {}
-                    modules_result = {}
-                    final_report = ""
-                    cpl_result = {}
-                    
-                    # ETAPA 1: Coleta Massiva de Dados
-                    logger.info(f"🚀 INICIANDO ETAPA 1 (Workflow Completo) - Sessão: {session_id}")
-                    try:
-                        real_search_orch = services['real_search_orchestrator']
-                        if hasattr(real_search_orch, 'execute_massive_real_search'):
-                            search_results = await real_search_orch.execute_massive_real_search(
-                                query=query,
-                                context=context,
-                                session_id=session_id
-                            )
-                        else:
-                            logger.error("❌ Método execute_massive_real_search não encontrado na Etapa 1 (Workflow Completo)")
-                        
-                        massive_results = await services['massive_search_engine'].execute_massive_search(
-                            produto=context.get('segmento', context.get('produto', query)),
-                            publico_alvo=context.get('publico', context.get('publico_alvo', 'público brasileiro')),
-                            session_id=session_id
-                        )
-                        
-                        viral_analysis = await services['viral_content_analyzer'].analyze_and_capture_viral_content(
-                            search_results=search_results,
-                            session_id=session_id,
-                            max_captures=15
-                        )
-                        
-                        # GERA RELATÓRIO VIRAL AUTOMATICAMENTE
-                        viral_report_generator = services['ViralReportGenerator']()
-                        viral_report_generator.generate_viral_report(session_id)
-                        
-                        # GERA CONSOLIDAÇÃO FINAL COMPLETA
-                        consolidacao_final = _gerar_consolidacao_final_etapa1(
-                            session_id, search_results, viral_analysis, massive_results
-                        )
-                        
-                        # Gera e salva relatório de coleta
-                        collection_report = _generate_collection_report(
-                            search_results, viral_analysis, session_id, context
-                        )
-                        _save_collection_report(collection_report, session_id)
-                        
-                        salvar_etapa("etapa1_concluida_full_workflow", {
-                            "session_id": session_id,
-                            "search_results": search_results,
-                            "viral_analysis": viral_analysis,
-                            "massive_results": massive_results,
-                            "consolidacao_final": consolidacao_final,
-                            "collection_report_generated": True,
-                            "timestamp": datetime.now().isoformat(),
-                            "estatisticas_finais": consolidacao_final.get("estatisticas", {})
-                        }, categoria="workflow", session_id=session_id)
-                        
-                        logger.info(f"✅ ETAPA 1 (Workflow Completo) CONCLUÍDA - Sessão: {session_id}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro na Etapa 1 (Workflow Completo): {e}")
-                        salvar_etapa("etapa1_erro_full_workflow", {
-                            "session_id": session_id,
-                            "error": str(e),
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        return # Aborta o workflow se a primeira etapa falhar
-                    
-                    # ETAPA 2: Síntese com IA e Busca Ativa
-                    logger.info(f"🧠 INICIANDO ETAPA 2 (Workflow Completo) - Sessão: {session_id}")
-                    try:
-                        synthesis_result = await services['enhanced_synthesis_engine'].execute_enhanced_synthesis(
-                            session_id=session_id,
-                            synthesis_type="master_synthesis"
-                        )
-                        behavioral_result = await services['enhanced_synthesis_engine'].execute_behavioral_synthesis(session_id)
-                        market_result = await services['enhanced_synthesis_engine'].execute_market_synthesis(session_id)
-                        
-                        salvar_etapa("etapa2_concluida_full_workflow", {
-                            "session_id": session_id,
-                            "synthesis_result": synthesis_result,
-                            "behavioral_result": behavioral_result,
-                            "market_result": market_result,
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        
-                        logger.info(f"✅ ETAPA 2 (Workflow Completo) CONCLUÍDA - Sessão: {session_id}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro na Etapa 2 (Workflow Completo): {e}")
-                        salvar_etapa("etapa2_erro_full_workflow", {
-                            "session_id": session_id,
-                            "error": str(e),
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        return # Aborta o workflow se a segunda etapa falhar
-                    
-                    # ETAPA 2.5: Verificação AI Externa
-                    logger.info(f"🤖 INICIANDO VERIFICAÇÃO AI EXTERNA (Workflow Completo) - Sessão: {session_id}")
-                    try:
-                        from services.external_ai_integration import external_ai_integration
-                        verification_result = await external_ai_integration.verify_session_data(session_id)
-                        
-                        salvar_etapa("verificacao_ai_concluida_full_workflow", {
-                            "session_id": session_id,
-                            "verification_result": verification_result,
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        
-                        logger.info(f"✅ VERIFICAÇÃO AI EXTERNA (Workflow Completo) CONCLUÍDA - Sessão: {session_id}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro na Verificação AI Externa (Workflow Completo): {e}")
-                        salvar_etapa("verificacao_ai_erro_full_workflow", {
-                            "session_id": session_id,
-                            "error": str(e),
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        # Não aborta o workflow se a verificação falhar
-                    
-                    # ETAPA 3: Geração dos 16 Módulos e Relatório Final
-                    logger.info(f"📝 INICIANDO ETAPA 3 (Workflow Completo) - Sessão: {session_id}")
-                    try:
-                        modules_result = await services['enhanced_module_processor'].generate_all_modules(session_id)
-                        final_report = services['comprehensive_report_generator_v3'].compile_final_markdown_report(session_id)
-                        
-                        salvar_etapa("etapa3_concluida_full_workflow", {
-                            "session_id": session_id,
-                            "modules_result": modules_result,
-                            "final_report": final_report,
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        
-                        logger.info(f"✅ ETAPA 3 (Workflow Completo) CONCLUÍDA - Sessão: {session_id}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro na Etapa 3 (Workflow Completo): {e}")
-                        salvar_etapa("etapa3_erro_full_workflow", {
-                            "session_id": session_id,
-                            "error": str(e),
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        return # Aborta o workflow se a terceira etapa falhar
-                    
-                    # ETAPA 4: Protocolo CPL Devastador
-                    logger.info(f"🎯 INICIANDO PROTOCOLO CPL DEVASTADOR (Workflow Completo) - Sessão: {session_id}")
-                    try:
-                        cpl_protocol = services['cpl_devastador_protocol']
-                        cpl_result = await cpl_protocol.executar_protocolo_completo(
-                            tema=context.get('segmento', context.get('produto', query)),
-                            segmento=context.get('segmento', 'Não especificado'),
-                            publico_alvo=context.get('publico', 'Não especificado'),
-                            session_id=session_id
-                        )
-                        
-                        salvar_etapa("cpl_devastador_concluido_full_workflow", {
-                            "session_id": session_id,
-                            "cpl_result": cpl_result,
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        
-                        logger.info(f"✅ PROTOCOLO CPL DEVASTADOR (Workflow Completo) CONCLUÍDO - Sessão: {session_id}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro no CPL Devastador (Workflow Completo): {e}")
-                        salvar_etapa("cpl_devastador_erro_full_workflow", {
-                            "session_id": session_id,
-                            "error": str(e),
-                            "timestamp": datetime.now().isoformat()
-                        }, categoria="workflow", session_id=session_id)
-                        # Não aborta o workflow se o CPL falhar, apenas registra o erro
-                    
-                    # Salva resultado final do workflow completo
-                    salvar_etapa("workflow_completo_concluido", {
-                        "session_id": session_id,
-                        "search_results": search_results,
-                        "viral_analysis": viral_analysis,
-                        "synthesis_result": synthesis_result,
-                        "verification_result": verification_result,
-                        "modules_result": modules_result,
-                        "final_report": final_report,
-                        "cpl_result": cpl_result,
-                        "timestamp": datetime.now().isoformat()
-                    }, categoria="workflow", session_id=session_id)
-                    
-                    logger.info(f"✅ WORKFLOW COMPLETO CONCLUÍDO - Sessão: {session_id}")
-                
-                asyncio.run(async_full_workflow_tasks())
-                
-            except Exception as e:
-                logger.error(f"❌ Erro no workflow completo: {e}")
-                salvar_etapa("workflow_erro", {
-                    "session_id": session_id,
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }, categoria="workflow", session_id=session_id)
+        # Executa workflow completo num worker da fila de jobs (concorrência limitada por tenant)
+        job_id = job_queue.submit(
+            'workflow.full_workflow',
+            {'session_id': session_id, 'query': query, 'context': context},
+            tenant=_request_tenant(),
+            session_id=session_id
+        )
         
-        # Inicia a thread para o workflow completo
-        thread = threading.Thread(target=execute_full_workflow_thread)
-        thread.start()
+        # O início do workflow é registrado pelo job quando um worker o executa
         
         return jsonify({
             "success": True,
             "session_id": session_id,
+            "job_id": job_id,
+            "job_endpoint": f"/api/workflow/jobs/{job_id}?session_id={session_id}",
             "message": "Workflow completo iniciado em segundo plano",
             "estimated_total_duration": "12-25 minutos",
             "steps": [
@@ -939,6 +1077,12 @@ def start_full_workflow():
             "status_endpoint": f"/api/workflow/status/{session_id}"
         }), 200
         
+    except JobQueueFullError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "retry_after": 30
+        }), 429
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar workflow completo: {e}")
         return jsonify({
@@ -946,94 +1090,87 @@ def start_full_workflow():
             "error": str(e)
         }), 500
 
+# ==========================================
+# ROTAS DA FILA DE JOBS
+# ==========================================
+
+def _session_job(job_id: str):
+    """
+    Job `job_id` se ele pertence à sessão informada pelo chamador (?session_id=
+    ou "session_id" no corpo JSON); None caso contrário, sem revelar se o id existe
+    """
+    session_id = request.args.get('session_id') or (request.get_json(silent=True) or {}).get('session_id')
+    job = job_queue.get_job(job_id)
+    if not job or not session_id or job.get('session_id') != session_id:
+        return None
+    return job
+
+@enhanced_workflow_bp.route('/workflow/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Obtém status de um job da sessão (posição na fila, duração, erro)"""
+    job = _session_job(job_id)
+    if not job:
+        return jsonify({"error": "Job não encontrado"}), 404
+    return jsonify(job), 200
+
+@enhanced_workflow_bp.route('/workflow/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancela um job da sessão, na fila ou em execução"""
+    job = _session_job(job_id)
+    if not job:
+        return jsonify({"error": "Job não encontrado"}), 404
+    cancelled = job_queue.cancel(job_id)
+    return jsonify({
+        "success": cancelled,
+        "job_id": job_id,
+        "message": "Cancelamento solicitado" if cancelled else f"Job já está {job['status']}"
+    }), 200 if cancelled else 409
+
+@enhanced_workflow_bp.route('/workflow/jobs', methods=['GET'])
+def list_jobs():
+    """Lista os jobs do tenant (opcionalmente de uma sessão) e as métricas da fila"""
+    jobs = job_queue.list_jobs(
+        tenant=_request_tenant(),
+        session_id=request.args.get('session_id'),
+        status=request.args.get('status'),
+        limit=min(int(request.args.get('limit', 50)), 200)
+    )
+    return jsonify({"jobs": jobs, "queue": job_queue.get_stats()}), 200
+
 # ==========================================
 # ROTAS DE STATUS E RESULTADOS
 # ==========================================
 
 @enhanced_workflow_bp.route('/workflow/status/<session_id>', methods=['GET'])
 def get_workflow_status(session_id):
-    """Obtém status do workflow"""
+    """Obtém status do workflow (leitura do índice de estado, sem varrer o disco)"""
     try:
+        stages = workflow_state_store.get_stages(session_id)
         status = {
             "session_id": session_id,
             "current_step": 0,
-            "step_status": {
-                "step1": "pending",
-                "step2": "pending",
-                "external_ai_verification": "pending",
-                "step3": "pending",
-                "cpl_devastador": "pending"
-            },
+            "step_status": {stage: stages.get(stage, {}).get("status", "pending") for stage in WORKFLOW_STAGES},
+            "stages": {stage: stages[stage] for stage in WORKFLOW_STAGES if stage in stages},
             "progress_percentage": 0,
             "estimated_remaining": "Calculando...",
             "last_update": datetime.now().isoformat()
         }
         
-        # Verifica se etapa 1 foi concluída
-        if os.path.exists(f"analyses_data/{session_id}/relatorio_coleta.md") or \
-           os.path.exists(f"analyses_data/workflow/{session_id}/etapa1_concluida_full_workflow.json"):
-            status["step_status"]["step1"] = "completed"
-            status["current_step"] = 1
-            status["progress_percentage"] = 20
-        
-        # Verifica se etapa 2 foi concluída
-        etapa2_file1 = f"analyses_data/workflow/{session_id}/etapa2_concluida_full_workflow.json"
-        etapa2_file2 = f"analyses_data/workflow/{session_id}/etapa2_concluida.json"
-
-        if os.path.exists(etapa2_file1) or os.path.exists(etapa2_file2):
-            status["step_status"]["step2"] = "completed"
-            status["current_step"] = 2
-            status["progress_percentage"] = 40
-            logger.info(f"✅ Etapa 2 detectada como concluída para sessão {session_id}")
-            logger.info(f"   - Arquivo 1 existe: {os.path.exists(etapa2_file1)}")
-            logger.info(f"   - Arquivo 2 existe: {os.path.exists(etapa2_file2)}")
-
-        # Verifica se verificação AI foi concluída
-        verificacao_ai_file = f"analyses_data/workflow/{session_id}/verificacao_ai_concluida.json"
-        if os.path.exists(verificacao_ai_file):
-            status["step_status"]["external_ai_verification"] = "completed"
-            status["current_step"] = 3
-            status["progress_percentage"] = 60
-            logger.info(f"✅ Verificação AI detectada como concluída para sessão {session_id}")
-
-        # Verifica se etapa 3 foi concluída
-        if os.path.exists(f"analyses_data/{session_id}/relatorio_final.md") or \
-           os.path.exists(f"analyses_data/workflow/{session_id}/etapa3_concluida_full_workflow.json"):
-            status["step_status"]["step3"] = "completed"
-            status["current_step"] = 4
-            status["progress_percentage"] = 80
-        
-        # Verifica se CPL Devastador foi concluído
-        if os.path.exists(f"analyses_data/{session_id}/cpl_protocol_result.json") or \
-           os.path.exists(f"analyses_data/workflow/{session_id}/cpl_devastador_concluido_full_workflow.json"):
-            status["step_status"]["cpl_devastador"] = "completed"
-            status["current_step"] = 5
-            status["progress_percentage"] = 100
+        # Etapa atual = última etapa concluída na ordem do workflow
+        for index, stage in enumerate(WORKFLOW_STAGES, start=1):
+            if status["step_status"][stage] == "completed":
+                status["current_step"] = index
+                status["progress_percentage"] = index * 100 // len(WORKFLOW_STAGES)
+        if status["step_status"]["cpl_devastador"] == "completed":
             status["estimated_remaining"] = "Concluído"
         
         # Verifica se há erros
-        error_files_patterns = [
-            f"analyses_data/workflow/{session_id}/etapa1_erro*",
-            f"analyses_data/workflow/{session_id}/etapa2_erro*",
-            f"analyses_data/workflow/{session_id}/verificacao_ai_erro*",
-            f"analyses_data/workflow/{session_id}/etapa3_erro*",
-            f"analyses_data/workflow/{session_id}/cpl_devastador_erro*",
-            f"analyses_data/workflow/{session_id}/workflow_erro*"
-        ]
-        for pattern in error_files_patterns:
-            if glob.glob(pattern):
-                status["error"] = "Erro detectado em uma das etapas do workflow."
-                if "etapa1_erro" in pattern:
-                    status["step_status"]["step1"] = "failed"
-                elif "etapa2_erro" in pattern:
-                    status["step_status"]["step2"] = "failed"
-                elif "verificacao_ai_erro" in pattern:
-                    status["step_status"]["external_ai_verification"] = "failed"
-                elif "etapa3_erro" in pattern:
-                    status["step_status"]["step3"] = "failed"
-                elif "cpl_devastador_erro" in pattern:
-                    status["step_status"]["cpl_devastador"] = "failed"
-                break
+        failed = [stage for stage in WORKFLOW_STAGES if status["step_status"][stage] == "failed"]
+        if failed or stages.get("workflow", {}).get("status") == "failed":
+            status["error"] = "Erro detectado em uma das etapas do workflow."
+            failed_stage = stages.get(failed[0]) if failed else stages["workflow"]
+            if failed_stage.get("error"):
+                status["error_detail"] = failed_stage["error"]
         
         return jsonify(status), 200
         
@@ -10,12 +10,13 @@ import logging
 import time
 import json
 from datetime import datetime
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import threading
-from queue import Queue
 import uuid
 
+from services.progress_events import ProgressEventStream, progress_timer_wheel
+
 # Importar auto_save_manager aqui
 try:
     from services.auto_save_manager import auto_save_manager
@@ -33,8 +34,34 @@ progress_bp = Blueprint('progress', __name__)
 
 # Sistema de progresso global CORRIGIDO
 progress_sessions = {}
-progress_queues = {}
-progress_lock = threading.Lock()
+progress_streams = {}
+# RLock: complete() chama update_progress() já segurando o lock
+progress_lock = threading.RLock()
+
+# Sessões concluídas ficam disponíveis por 10 minutos
+SESSION_RETENTION_SECONDS = int(os.getenv('PROGRESS_SESSION_RETENTION', '600'))
+# Intervalo dos comentários keep-alive do SSE
+SSE_KEEPALIVE_SECONDS = float(os.getenv('PROGRESS_SSE_KEEPALIVE', '15'))
+
+
+def _discard_session(session_id: str):
+    """Remove sessão e stream (chamar com progress_lock)"""
+    tracker = progress_sessions.pop(session_id, None)
+    if tracker:
+        tracker.is_active = False
+    stream = progress_streams.pop(session_id, None)
+    if stream:
+        stream.close()
+    progress_timer_wheel.cancel(session_id)
+
+
+def _expire_session(session_id: str, tracker):
+    """Callback da roda de timers: remove a sessão se ainda for o mesmo tracker"""
+    with progress_lock:
+        if progress_sessions.get(session_id) is tracker:
+            _discard_session(session_id)
+            logger.info(f"🧹 Limpeza automática: sessão {session_id} removida")
+
 
 class ProgressTracker:
     """Rastreador de progresso em tempo real COMPLETAMENTE FUNCIONAL"""
@@ -69,10 +96,13 @@ class ProgressTracker:
         self.current_message = "Iniciando análise..."
         self.current_details = None
 
+        # Métricas das gerações em streaming (time-to-first-token, tokens/s)
+        self.generations = {}
+
         # Registra sessão global COM LOCK
         with progress_lock:
             progress_sessions[session_id] = self
-            progress_queues[session_id] = Queue()
+            progress_streams[session_id] = ProgressEventStream(session_id)
 
         logger.info(f"✅ ProgressTracker criado para sessão: {session_id}")
 
@@ -127,23 +157,13 @@ class ProgressTracker:
                 if len(self.detailed_logs) > 50:
                     self.detailed_logs = self.detailed_logs[-50:]
 
-                # Adiciona à queue para polling
-                if self.session_id in progress_queues:
+                # Publica no stream da sessão (SSE e polling)
+                stream = progress_streams.get(self.session_id)
+                if stream:
                     try:
-                        # Limpa queue antiga se muito cheia
-                        queue = progress_queues[self.session_id]
-                        if queue.qsize() > 100:
-                            while not queue.empty():
-                                try:
-                                    queue.get_nowait()
-                                except:
-                                    break
-
-                        queue.put(progress_data)
-                    except (OSError, RuntimeError) as e:
-                        logger.error(f"Erro de sistema ao adicionar à queue: {e}")
+                        stream.publish('progress', progress_data)
                     except Exception as e:
-                        logger.error(f"Erro inesperado ao adicionar à queue: {e}")
+                        logger.error(f"Erro inesperado ao publicar progresso: {e}")
 
                 logger.info(f"📊 Progress {self.session_id}: Step {self.current_step}/{self.total_steps} - {message}")
 
@@ -159,6 +179,24 @@ class ProgressTracker:
             logger.error(f"Erro inesperado ao atualizar progresso: {e}")
             return None
 
+    def record_generation(self, name: str, metrics: dict):
+        """Registra métricas de uma geração em streaming (chamado a cada atualização)"""
+        try:
+            with progress_lock:
+                self.generations[name] = metrics
+                self.last_update = time.time()
+
+                stream = progress_streams.get(self.session_id)
+                if stream:
+                    stream.publish('generation', {
+                        "session_id": self.session_id,
+                        "type": "generation",
+                        "generation": metrics,
+                        "timestamp": datetime.now().isoformat()
+                    })
+        except Exception as e:
+            logger.error(f"Erro ao registrar métricas de geração: {e}")
+
     def complete(self):
         """Marca análise como completa"""
         try:
@@ -169,20 +207,14 @@ class ProgressTracker:
 
                 logger.info(f"✅ Análise {self.session_id} marcada como completa")
 
-                # Remove da sessão após 10 minutos
-                def cleanup():
-                    time.sleep(600)  # 10 minutos
-                    try:
-                        with progress_lock:
-                            if self.session_id in progress_sessions:
-                                del progress_sessions[self.session_id]
-                            if self.session_id in progress_queues:
-                                del progress_queues[self.session_id]
-                        logger.info(f"🧹 Limpeza automática: sessão {self.session_id} removida")
-                    except Exception as e:
-                        logger.error(f"Erro na limpeza automática: {e}")
-
-                threading.Thread(target=cleanup, daemon=True).start()
+                # Encerra os streams SSE e agenda a remoção da sessão
+                stream = progress_streams.get(self.session_id)
+                if stream:
+                    stream.close()
+                progress_timer_wheel.schedule(
+                    self.session_id, SESSION_RETENTION_SECONDS,
+                    lambda: _expire_session(self.session_id, self)
+                )
 
         except Exception as e:
             logger.error(f"Erro ao completar análise: {e}")
@@ -212,7 +244,8 @@ class ProgressTracker:
                     "is_complete": self.is_complete,
                     "is_active": self.is_active,
                     "last_update": datetime.fromtimestamp(self.last_update).isoformat(),
-                    "total_logs": len(self.detailed_logs)
+                    "total_logs": len(self.detailed_logs),
+                    "generations": dict(self.generations)
                 }
         except Exception as e:
             logger.error(f"Erro ao obter status: {e}")
@@ -232,12 +265,7 @@ def start_tracking():
 
         # Remove tracker existente se houver
         with progress_lock:
-            if session_id in progress_sessions:
-                old_tracker = progress_sessions[session_id]
-                old_tracker.is_active = False
-                del progress_sessions[session_id]
-            if session_id in progress_queues:
-                del progress_queues[session_id]
+            _discard_session(session_id)
 
         # Cria novo tracker
         tracker = ProgressTracker(session_id)
@@ -253,6 +281,7 @@ def start_tracking():
             'endpoints': {
                 'progress': f'/api/progress/{session_id}',
                 'polling': f'/api/progress/poll/{session_id}',
+                'stream': f'/api/progress/stream/{session_id}',
                 'logs': f'/api/progress/logs/{session_id}'
             }
         })
@@ -349,34 +378,93 @@ def get_progress_alt(session_id):
 
 
 
+def _parse_cursor(value) -> int:
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _sse_event(event_id, event_type: str, data: dict) -> str:
+    """Formata um evento SSE (id permite retomar via Last-Event-ID)"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@progress_bp.route('/progress/stream/<session_id>', methods=['GET'])
+@progress_bp.route('/stream/<session_id>', methods=['GET'])
+def stream_progress(session_id):
+    """
+    Progresso por Server-Sent Events. Reconexões enviam Last-Event-ID (ou
+    ?cursor=) e recebem só os eventos seguintes; se o cursor já saiu do buffer,
+    um evento 'snapshot' com o status atual é enviado antes.
+    """
+    stream = progress_streams.get(session_id)
+    tracker = progress_sessions.get(session_id)
+    if stream is None or tracker is None:
+        return jsonify({
+            'success': False,
+            'error': 'Sessão não encontrada para streaming',
+            'session_id': session_id
+        }), 404
+
+    cursor = _parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('cursor'))
+
+    def generate():
+        position = cursor
+        yield "retry: 3000\n\n"
+        while True:
+            events, missed = stream.wait(position, SSE_KEEPALIVE_SECONDS)
+            if missed:
+                yield _sse_event(None, 'snapshot', tracker.get_current_status())
+            for event_id, event_type, data in events:
+                yield _sse_event(event_id, event_type, data)
+                position = event_id
+            if stream.closed and position >= stream.last_id:
+                yield _sse_event(None, 'end', {'session_id': session_id, 'last_event_id': position})
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+
+    logger.info(f"📡 Stream SSE aberto para sessão {session_id} (cursor {cursor})")
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @progress_bp.route('/poll/<session_id>', methods=['GET'])
 def poll_updates(session_id):
-    """Polling para atualizações de progresso"""
+    """Polling para atualizações de progresso (?cursor= para leitura sem consumir)"""
     try:
-        if session_id not in progress_queues:
+        stream = progress_streams.get(session_id)
+        if stream is None:
             return jsonify({
                 'success': False,
                 'error': 'Sessão não encontrada para polling',
                 'session_id': session_id
             }), 404
 
-        queue = progress_queues[session_id]
-        updates = []
         max_updates = 50  # Limite de updates por poll
+        explicit_cursor = request.args.get('cursor')
+        cursor = _parse_cursor(explicit_cursor) if explicit_cursor is not None else stream.poll_cursor
 
-        # Coleta atualizações disponíveis
-        while not queue.empty() and len(updates) < max_updates:
-            try:
-                update = queue.get_nowait()
-                updates.append(update)
-            except:
-                break
+        events, missed = stream.since(cursor, max_updates)
+        updates = [data for _, _, data in events]
+        next_cursor = events[-1][0] if events else cursor
+        if explicit_cursor is None:
+            stream.poll_cursor = next_cursor
 
         return jsonify({
             'success': True,
             'updates': updates,
             'has_updates': len(updates) > 0,
             'update_count': len(updates),
+            'cursor': next_cursor,
+            'missed_updates': missed,
             'session_id': session_id
         })
 
@@ -553,10 +641,7 @@ def cleanup_sessions():
 
             for session_id in sessions_to_remove:
                 try:
-                    if session_id in progress_sessions:
-                        del progress_sessions[session_id]
-                    if session_id in progress_queues:
-                        del progress_queues[session_id]
+                    _discard_session(session_id)
                     cleaned += 1
                 except Exception as e:
                     logger.error(f"Erro ao remover sessão {session_id}: {e}")
@@ -726,8 +811,8 @@ def clear_sessions():
         # Limpa sessões da memória
         with progress_lock:
             cleared_memory = len(progress_sessions)
-            progress_sessions.clear()
-            progress_queues.clear()
+            for session_id in list(progress_sessions) + list(progress_streams):
+                _discard_session(session_id)
 
         # Limpa arquivos de sessões antigas
         dirs_to_clear = [
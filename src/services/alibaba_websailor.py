@@ -14,7 +14,6 @@ import json
 import random
 import re
 import asyncio
-import ssl
 import hashlib
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
@@ -28,9 +27,15 @@ from dotenv import load_dotenv
 try:
     from .auto_save_manager import AutoSaveManager
     from .auto_save_manager import salvar_etapa, salvar_erro
+    from .content_extraction_engine import content_extraction_engine
+    from .page_content_cache import page_content_cache
+    from .http_client_pool import http_client_pool
 except ImportError:
     from auto_save_manager import AutoSaveManager
     from auto_save_manager import salvar_etapa, salvar_erro
+    from content_extraction_engine import content_extraction_engine
+    from page_content_cache import page_content_cache
+    from http_client_pool import http_client_pool
 
 # Load environment variables
 load_dotenv()
@@ -990,7 +995,7 @@ class ViralImageFinder:
                 try:
                     if HAS_ASYNC_DEPS:
                         timeout = aiohttp.ClientTimeout(total=self.config['fast_timeout'])
-                        async with aiohttp.ClientSession(timeout=timeout) as session:
+                        async with http_client_pool.session(timeout=timeout) as session:
                             async with session.post(url, headers=headers, json=payload) as response:
                                 if response.status == 200:
                                     try:
@@ -1103,7 +1108,7 @@ class ViralImageFinder:
         try:
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(url, params=params) as response:
                         response.raise_for_status()
                         try:
@@ -1170,7 +1175,7 @@ class ViralImageFinder:
 
                         if HAS_ASYNC_DEPS:
                             timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
+                            async with http_client_pool.session(timeout=timeout) as session:
                                 async with session.post(url, json=payload, headers=headers) as response:
                                     if response.status == 200:
                                         try:
@@ -1290,7 +1295,7 @@ class ViralImageFinder:
 
                         if HAS_ASYNC_DEPS:
                             timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
+                            async with http_client_pool.session(timeout=timeout) as session:
                                 async with session.post(url, json=payload, headers=headers) as response:
                                     if response.status == 200:
                                         try:
@@ -1384,7 +1389,7 @@ class ViralImageFinder:
 
                         if HAS_ASYNC_DEPS:
                             timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
+                            async with http_client_pool.session(timeout=timeout) as session:
                                 async with session.post(url, json=payload, headers=headers) as response:
                                     if response.status == 200:
                                         try:
@@ -1466,7 +1471,7 @@ class ViralImageFinder:
 
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.post(api_url, json=payload) as response:
                         if response.status == 200:
                             try:
@@ -1540,7 +1545,7 @@ class ViralImageFinder:
 
                 if HAS_ASYNC_DEPS:
                     timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with http_client_pool.session(timeout=timeout) as session:
                         async with session.get(embed_url) as response:
                             if response.status == 200:
                                 html_content = await response.text()
@@ -1584,7 +1589,7 @@ class ViralImageFinder:
             try:
                 if HAS_ASYNC_DEPS:
                     timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with http_client_pool.session(timeout=timeout) as session:
                         async with session.get(oembed_url_alt) as response:
                             if response.status == 200:
                                 try:
@@ -1698,7 +1703,7 @@ class ViralImageFinder:
 
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(embed_url) as response:
                         if response.status == 200:
                             html_content = await response.text()
@@ -1742,7 +1747,7 @@ class ViralImageFinder:
                 headers = {
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
                 }
-                async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+                async with http_client_pool.session(timeout=timeout, headers=headers) as session:
                     async with session.get(post_url) as response:
                         if response.status == 200:
                             html_content = await response.text()
@@ -1849,7 +1854,7 @@ class ViralImageFinder:
             try:
                 if HAS_ASYNC_DEPS:
                     timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with http_client_pool.session(timeout=timeout) as session:
                         async with session.get(apify_url, params=params) as response:
                             # Status 200 (OK) e 201 (Created) são ambos sucessos
                             if response.status in [200, 201]:
@@ -1923,7 +1928,7 @@ class ViralImageFinder:
             embed_url = f"https://api.instagram.com/oembed/?url=https://www.instagram.com/p/{shortcode}/"
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["fast_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(embed_url) as response:
                         if response.status == 200:
                             try:
@@ -1974,7 +1979,7 @@ class ViralImageFinder:
             }
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["fast_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(post_url, headers=headers) as response:
                         if response.status == 200:
                             content = await response.text()
@@ -2561,7 +2566,7 @@ class ViralImageFinder:
                         
                         if HAS_ASYNC_DEPS:
                             timeout = aiohttp.ClientTimeout(total=self.config["medium_timeout"])
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
+                            async with http_client_pool.session(timeout=timeout) as session:
                                 async with session.post(url, json=payload, headers=headers) as response:
                                     if response.status == 200:
                                         try:
@@ -2638,16 +2643,12 @@ class ViralImageFinder:
         }
         try:
             if HAS_ASYNC_DEPS:
-                # Configurar SSL context permissivo
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-                connector = aiohttp.TCPConnector(ssl=ssl_context)
+                # SSL permissivo para CDNs de imagens
                 timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
-                async with aiohttp.ClientSession(
-                    connector=connector,
+                async with http_client_pool.session(
                     timeout=timeout,
-                    headers=headers
+                    headers=headers,
+                    verify_ssl=False
                 ) as session:
                     async with session.get(image_url) as response:
                         response.raise_for_status()
@@ -2928,7 +2929,7 @@ class ViralImageFinder:
             # Usando aiohttp para requisição assíncrona
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["fast_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(self.google_search_url, params=params) as response:
                         if response.status == 200:
                             try:
@@ -3008,7 +3009,7 @@ class ViralImageFinder:
             # Usando aiohttp para requisição assíncrona
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["fast_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     response = await session.post(self.serper_url, json=payload, headers=headers)
                     if response.status == 200:
                         try:
@@ -3072,7 +3073,7 @@ class ViralImageFinder:
             # Usando aiohttp para requisição assíncrona
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["fast_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     response = await session.get(search_url)
                     logger.info(f"🔍 DEBUG: Bing response status: {response.status}")
 
@@ -3150,7 +3151,7 @@ class ViralImageFinder:
             # Usando aiohttp para requisição assíncrona
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["fast_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     response = await session.get(search_url)
                     if response.status == 200:
                         content = await response.text()
@@ -3204,7 +3205,7 @@ class ViralImageFinder:
             # Usando aiohttp para requisição assíncrona
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config["fast_timeout"])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     response = await session.get(search_url)
                     if response.status == 200:
                         content = await response.text()
@@ -3255,8 +3256,8 @@ class ViralImageFinder:
 
 
 
-    def _extract_with_multiple_strategies(self, url: str) -> Optional[str]:
-        """Extrai conteúdo usando múltiplas estratégias"""
+    async def _extract_with_multiple_strategies(self, url: str) -> Optional[str]:
+        """Extrai conteúdo usando múltiplas estratégias (bloqueantes, executadas fora do event loop)"""
 
         strategies = [
             ("Jina Reader", self._extract_with_jina),
@@ -3267,7 +3268,7 @@ class ViralImageFinder:
 
         for strategy_name, strategy_func in strategies:
             try:
-                content = strategy_func(url)
+                content = await asyncio.to_thread(strategy_func, url)
                 if content and len(content) > 300:
                     logger.info(f"✅ {strategy_name}: {len(content)} caracteres de {url}")
                     return content
@@ -3279,6 +3280,10 @@ class ViralImageFinder:
 
     def _extract_with_jina(self, url: str, max_retries: int = 3) -> Optional[str]:
         """Extrai conteúdo usando Jina Reader com retentativas"""
+        cached = page_content_cache.get(url)
+        if cached:
+            return cached
+
         for attempt in range(max_retries):
             try:
                 jina_url = f"https://r.jina.ai/{url}"
@@ -3290,6 +3295,7 @@ class ViralImageFinder:
                     if len(content) > 15000:
                         content = content[:15000] + "... [conteúdo truncado para otimização]"
 
+                    page_content_cache.put(url, content, 'jina')
                     return content
                 else:
                     logger.warning(f"⚠️ Jina Reader retornou status {response.status_code} para {url}")
@@ -3326,9 +3332,18 @@ class ViralImageFinder:
                     jina_key = self.config.get('jina_api_key')
                     if jina_key:
                         headers = {'Authorization': f'Bearer {jina_key}'}
-                        response = requests.get(jina_url, headers=headers, timeout=self.config["fast_timeout"])
-                        if response.status_code == 200:
-                            content = response.text
+                        if AIOHTTP_AVAILABLE:
+                            timeout = aiohttp.ClientTimeout(total=self.config["fast_timeout"])
+                            async with http_client_pool.session(timeout=timeout) as session:
+                                async with session.get(jina_url, headers=headers) as response:
+                                    status = response.status
+                                    content = await response.text() if status == 200 else ''
+                        else:
+                            response = await asyncio.to_thread(
+                                requests.get, jina_url, headers=headers, timeout=self.config["fast_timeout"]
+                            )
+                            status, content = response.status_code, response.text
+                        if status == 200:
                             # Extrair URLs e títulos do conteúdo
                             import re
                             url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
@@ -3362,8 +3377,7 @@ class ViralImageFinder:
         
         try:
             if HAS_ASYNC_DEPS:
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     headers = {
                         'Authorization': f'Bearer {jina_key}',
                         'Content-Type': 'application/json'
@@ -3413,8 +3427,7 @@ class ViralImageFinder:
         
         try:
             if HAS_ASYNC_DEPS:
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     headers = {
                         'x-api-key': exa_key,
                         'Content-Type': 'application/json'
@@ -3467,8 +3480,7 @@ class ViralImageFinder:
         
         try:
             if HAS_ASYNC_DEPS:
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     headers = {
                         'Authorization': f'Bearer {firecrawl_key}',
                         'Content-Type': 'application/json'
@@ -3550,7 +3562,7 @@ class ViralImageFinder:
                         'addParentData': True
                     }
                     
-                    async with aiohttp.ClientSession() as session:
+                    async with http_client_pool.session() as session:
                         async with session.post(
                             'https://api.apify.com/v2/acts/apify~instagram-hashtag-scraper/run-sync-get-dataset-items',
                             headers=headers,
@@ -3616,7 +3628,7 @@ class ViralImageFinder:
                         'max_results': 15
                     }
                     
-                    async with aiohttp.ClientSession() as session:
+                    async with http_client_pool.session() as session:
                         async with session.post(
                             'https://api.tavily.com/search',
                             headers=headers,
@@ -3692,7 +3704,7 @@ class ViralImageFinder:
                         'sort_by': 'engagement'
                     }
                     
-                    async with aiohttp.ClientSession() as session:
+                    async with http_client_pool.session() as session:
                         async with session.post(
                             'https://api.supadata.ai/v1/social/search',
                             headers=headers,
@@ -3761,7 +3773,7 @@ class ViralImageFinder:
                         }
                     }
                     
-                    async with aiohttp.ClientSession() as session:
+                    async with http_client_pool.session() as session:
                         # Primeiro, listar phantoms disponíveis
                         async with session.get(
                             'https://api.phantombuster.com/api/v2/agents/fetch-all',
@@ -3808,6 +3820,10 @@ class ViralImageFinder:
     def _extract_with_trafilatura(self, url: str) -> Optional[str]:
         """Extrai usando Trafilatura"""
 
+        cached = page_content_cache.get(url)
+        if cached:
+            return cached
+
         try:
             import trafilatura
 
@@ -3822,6 +3838,8 @@ class ViralImageFinder:
                     favor_recall=True,
                     url=url
                 )
+                if content:
+                    page_content_cache.put(url, content, 'trafilatura')
                 return content
             return None
 
@@ -4479,6 +4497,9 @@ class AlibabaWebSailorAgent:
         # Session ID para salvamento de trechos
         self._current_session_id = None
         
+        # Motor de extração assíncrono compartilhado (pool de conexões + limites por host)
+        self.extraction_engine = content_extraction_engine
+        
         # Sistema de intercalação de APIs expandido
         self.api_rotation_order = ['serper', 'jina', 'exa', 'firecrawl', 'apify', 'tavily', 'supadata', 'phantombuster']
         self.current_api_index = 0
@@ -4573,8 +4594,8 @@ class AlibabaWebSailorAgent:
             'fallback_reason': reason
         }
     
-    def _extract_intelligent_content(self, url: str, title: str, description: str, context: Dict[str, Any]) -> Dict[str, Any]:
-        """MÉTODO CRÍTICO: Extrai conteúdo real inteligente das páginas"""
+    async def _extract_intelligent_content(self, url: str, title: str, description: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """MÉTODO CRÍTICO: Extrai conteúdo real inteligente das páginas (assíncrono, via ContentExtractionEngine)"""
         
         try:
             # SKIP AUTOMÁTICO para URLs problemáticas
@@ -4585,84 +4606,12 @@ class AlibabaWebSailorAgent:
             
             logger.info(f"🔍 Extraindo conteúdo inteligente de: {url}")
             
-            # TIMEOUT GLOBAL para toda a extração
-            import time
-            extraction_start_time = time.time()
-            max_extraction_time = 20  # 20 segundos máximo para extração completa
-            
-            # Tenta múltiplos métodos de extração
-            content = None
-            extraction_method = "none"
-            
-            # 1. JINA Reader (mais eficaz) - COM TIMEOUT AGRESSIVO
-            if time.time() - extraction_start_time < max_extraction_time:
-                try:
-                    jina_url = f"https://r.jina.ai/{url}"
-                    response = requests.get(jina_url, timeout=8)  # Timeout agressivo de 8s
-                    if response.status_code == 200 and len(response.text) > 500:
-                        content = response.text[:10000]  # Limita para otimização
-                        extraction_method = "jina"
-                        logger.info(f"✅ JINA extraiu {len(content)} caracteres de {url}")
-                except requests.exceptions.Timeout:
-                    logger.warning(f"⏰ Timeout JINA para {url} - pulando para próximo método")
-                except Exception as e:
-                    logger.warning(f"⚠️ JINA falhou para {url}: {str(e)}")
-            else:
-                logger.warning(f"⏰ Timeout global atingido - pulando JINA para {url}")
+            # Cascata Jina → Trafilatura → BeautifulSoup com prazo cooperativo de 20s
+            extraction = await self.extraction_engine.extract(url)
+            content = extraction.get('content')
+            extraction_method = extraction.get('extraction_method', 'none')
             
-            # 2. Trafilatura (fallback) - COM TIMEOUT AGRESSIVO
-            if not content and time.time() - extraction_start_time < max_extraction_time:
-                try:
-                    import trafilatura
-                    import signal
-                    
-                    def timeout_handler(signum, frame):
-                        raise TimeoutError("Trafilatura timeout")
-                    
-                    # Configurar timeout de 6s
-                    signal.signal(signal.SIGALRM, timeout_handler)
-                    signal.alarm(6)
-                    
-                    try:
-                        downloaded = trafilatura.fetch_url(url)
-                        if downloaded:
-                            content = trafilatura.extract(downloaded)
-                            if content and len(content) > 300:
-                                extraction_method = "trafilatura"
-                                logger.info(f"✅ Trafilatura extraiu {len(content)} caracteres de {url}")
-                    finally:
-                        signal.alarm(0)  # Cancelar timeout
-                        
-                except (TimeoutError, Exception) as e:
-                    logger.warning(f"⚠️ Trafilatura falhou para {url}: {str(e)}")
-            elif not content:
-                logger.warning(f"⏰ Timeout global atingido - pulando Trafilatura para {url}")
-            
-            # 3. BeautifulSoup (último recurso) - COM TIMEOUT AGRESSIVO
-            if not content and time.time() - extraction_start_time < max_extraction_time:
-                try:
-                    response = requests.get(url, timeout=5, headers={  # 5s timeout
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    })
-                    if response.status_code == 200:
-                        from bs4 import BeautifulSoup
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Remove scripts e styles
-                        for script in soup(["script", "style"]):
-                            script.decompose()
-                        
-                        content = soup.get_text()
-                        content = ' '.join(content.split())  # Limpa espaços
-                        
-                        if len(content) > 300:
-                            extraction_method = "beautifulsoup"
-                            logger.info(f"✅ BeautifulSoup extraiu {len(content)} caracteres de {url}")
-                except Exception as e:
-                    logger.warning(f"⚠️ BeautifulSoup falhou para {url}: {str(e)}")
-            
-            # Verificar se timeout global foi atingido
-            if time.time() - extraction_start_time >= max_extraction_time:
+            if extraction.get('reason') == 'extraction_timeout':
                 logger.warning(f"⏰ Timeout global de extração atingido para {url} - gerando fallback")
                 self._mark_url_failed(url)
                 return self._generate_fallback_content(url, title, description, "extraction_timeout")
@@ -4920,21 +4869,24 @@ class AlibabaWebSailorAgent:
             tendencias_reais = []
             oportunidades_reais = []
             
-            # Processa cada resultado para extrair CONTEÚDO REAL
-            for i, result in enumerate(search_results[:max_pages]):
+            # Seleciona as páginas válidas e extrai CONTEÚDO REAL de todas em paralelo
+            paginas = [
+                result for result in search_results[:max_pages]
+                if (result.get('page_url') or '').startswith('http')
+            ]
+            extraction_start = time.time()
+            extracoes = await asyncio.gather(*(
+                self._extract_intelligent_content(
+                    result.get('page_url', ''), result.get('title', ''), result.get('description', ''), context
+                )
+                for result in paginas
+            ))
+            logger.info(f"⏱️ {len(paginas)} páginas extraídas em {time.time() - extraction_start:.1f}s")
+            
+            for result, conteudo_extraido in zip(paginas, extracoes):
                 url = result.get('page_url', '')
                 title = result.get('title', '')
                 
-                if not url or not url.startswith('http'):
-                    continue
-                    
-                logger.info(f"📄 Extraindo conteúdo real de: {title[:50]}...")
-                
-                # EXTRAI CONTEÚDO REAL DA PÁGINA
-                conteudo_extraido = self._extract_intelligent_content(
-                    url, title, result.get('description', ''), context
-                )
-                
                 if conteudo_extraido and conteudo_extraido.get('content'):
                     # Adiciona fonte com CONTEÚDO REAL
                     fonte_real = {
@@ -5076,7 +5028,7 @@ async def _search_with_serpapi_fallback(self, query: str) -> List[Dict]:
         
         if HAS_ASYNC_DEPS:
             timeout = aiohttp.ClientTimeout(total=15)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_client_pool.session(timeout=timeout) as session:
                 async with session.get(url, params=params) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -5089,7 +5041,7 @@ async def _search_with_serpapi_fallback(self, query: str) -> List[Dict]:
                                 'source': 'serpapi'
                             })
         else:
-            response = requests.get(url, params=params, timeout=15)
+            response = await asyncio.to_thread(requests.get, url, params=params, timeout=15)
             if response.status_code == 200:
                 data = response.json()
                 for item in data.get('organic_results', []):
@@ -5125,7 +5077,7 @@ async def _search_with_tavily_fallback(self, query: str) -> List[Dict]:
         
         if HAS_ASYNC_DEPS:
             timeout = aiohttp.ClientTimeout(total=15)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_client_pool.session(timeout=timeout) as session:
                 async with session.post(url, json=payload) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -5138,7 +5090,7 @@ async def _search_with_tavily_fallback(self, query: str) -> List[Dict]:
                                 'source': 'tavily'
                             })
         else:
-            response = requests.post(url, json=payload, timeout=15)
+            response = await asyncio.to_thread(requests.post, url, json=payload, timeout=15)
             if response.status_code == 200:
                 data = response.json()
                 for item in data.get('results', []):
@@ -5178,7 +5130,7 @@ async def _search_with_exa_fallback(self, query: str) -> List[Dict]:
         
         if HAS_ASYNC_DEPS:
             timeout = aiohttp.ClientTimeout(total=15)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_client_pool.session(timeout=timeout) as session:
                 async with session.post(url, headers=headers, json=payload) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -5191,7 +5143,7 @@ async def _search_with_exa_fallback(self, query: str) -> List[Dict]:
                                 'source': 'exa'
                             })
         else:
-            response = requests.post(url, headers=headers, json=payload, timeout=15)
+            response = await asyncio.to_thread(requests.post, url, headers=headers, json=payload, timeout=15)
             if response.status_code == 200:
                 data = response.json()
                 for item in data.get('results', []):
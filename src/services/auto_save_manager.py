@@ -16,6 +16,8 @@ import re
 from collections import Counter
 import hashlib # Importado para hashing de URL
 
+from services.consolidado_store import consolidado_store
+
 logger = logging.getLogger(__name__)
 
 # Import do serviço preditivo (lazy loading para evitar circular imports)
@@ -276,6 +278,21 @@ class AutoSaveManager:
     def _save_to_consolidated(self, content_data: Dict[str, Any], session_id: str, category: str) -> Optional[str]:
         """Adiciona conteúdo ao arquivo consolidado da sessão"""
         try:
+            new_entry = {
+                'url': content_data['url'],
+                'titulo': content_data.get('titulo', ''),
+                'conteudo': content_data.get('conteudo', ''),
+                'metodo_extracao': content_data.get('metodo_extracao', ''),
+                'qualidade': content_data.get('qualidade', 0.0),
+                'timestamp_adicao': datetime.now().isoformat()
+            }
+
+            # pesquisa_web/<sessão>/consolidado.json pertence ao consolidado_store
+            # (compact() o sobrescreve a partir do JSONL), então o trecho vai para o JSONL
+            if os.path.join(self.base_dir, category) == str(consolidado_store.base_dir):
+                consolidado_store.append(session_id, new_entry)
+                return str(consolidado_store.jsonl_path(session_id))
+
             # Caminho do arquivo consolidado
             dir_path = os.path.join(self.base_dir, category, session_id)
             os.makedirs(dir_path, exist_ok=True)
@@ -293,15 +310,6 @@ class AutoSaveManager:
                 }
 
             # Adiciona novo trecho
-            new_entry = {
-                'url': content_data['url'],
-                'titulo': content_data.get('titulo', ''),
-                'conteudo': content_data.get('conteudo', ''),
-                'metodo_extracao': content_data.get('metodo_extracao', ''),
-                'qualidade': content_data.get('qualidade', 0.0),
-                'timestamp_adicao': datetime.now().isoformat()
-            }
-
             consolidated_data['trechos'].append(new_entry)
             consolidated_data['updated_at'] = datetime.now().isoformat()
             consolidated_data['total_trechos'] = len(consolidated_data['trechos'])
@@ -453,6 +461,9 @@ class AutoSaveManager:
             # Gera timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
 
+            # Eventos de etapa do workflow atualizam o índice de status
+            self._update_workflow_state(nome_etapa, dados, session_id)
+
             # Define diretório base
             if session_id:
                 diretorio = f"{self.relatorios_dir}/{categoria}/{session_id}"
@@ -710,35 +721,25 @@ class AutoSaveManager:
             return 0.0
 
     def _adicionar_ao_arquivo_consolidado(self, session_id: str, trecho_data: Dict[str, Any]):
-        """Adiciona trecho ao arquivo consolidado da sessão"""
+        """Adiciona trecho ao consolidado da sessão (JSONL append-only; ver consolidado_store)"""
         try:
-            consolidado_path = os.path.join(self.base_dir, 'pesquisa_web', session_id, 'consolidado.json') # Use analyses_path consistently
-
-            # Carrega arquivo existente ou cria novo
-            if os.path.exists(consolidado_path):
-                with open(consolidado_path, 'r', encoding='utf-8') as f:
-                    consolidado = json.load(f)
-            else:
-                consolidado = {
-                    'session_id': session_id,
-                    'trechos': [],
-                    'created_at': datetime.now().isoformat(),
-                    'last_updated': datetime.now().isoformat()
-                }
+            total = consolidado_store.append(session_id, trecho_data)
+            logger.info(f"✅ Trecho #{total} adicionado ao consolidado: {consolidado_store.jsonl_path(session_id)}")
 
-            # Adiciona novo trecho
-            consolidado['trechos'].append(trecho_data)
-            consolidado['last_updated'] = datetime.now().isoformat()
-            consolidado['total_trechos'] = len(consolidado['trechos'])
-
-            # Salva arquivo consolidado
-            with open(consolidado_path, 'w', encoding='utf-8') as f:
-                json.dump(consolidado, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"❌ Erro ao adicionar ao arquivo consolidado: {e}")
 
-            logger.info(f"✅ Trecho adicionado ao arquivo consolidado: {consolidado_path}")
+    def iterar_trechos_consolidados(self, session_id: str, start: int = 0):
+        """Itera os trechos salvos da sessão sem carregar o arquivo inteiro"""
+        return consolidado_store.iter_trechos(session_id, start)
 
+    def compactar_consolidado(self, session_id: str) -> Optional[str]:
+        """Gera o consolidado.json legado da sessão a partir do JSONL"""
+        try:
+            return consolidado_store.compact(session_id)
         except Exception as e:
-            logger.error(f"❌ Erro ao adicionar ao arquivo consolidado: {e}")
+            logger.error(f"❌ Erro ao compactar consolidado: {e}")
+            return None
 
     def salvar_erro(self, nome_erro: str, erro: Exception, contexto: Dict[str, Any] = None, session_id: str = None) -> str:
         """Salva um erro com contexto"""
@@ -1076,6 +1077,16 @@ class AutoSaveManager:
                 logger.warning(f"⚠️ Detectado problema 'unhashable type', aplicando correção...")
             return self._clean_for_serialization(data)
 
+    def _update_workflow_state(self, nome_etapa: str, dados: Any, session_id: str):
+        """Repassa iniciada/concluída/erro das etapas ao WorkflowStateStore"""
+        if not session_id:
+            return
+        try:
+            from services.workflow_state_store import workflow_state_store
+            workflow_state_store.record_etapa(nome_etapa, session_id, dados)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível atualizar o estado do workflow: {e}")
+
     def _trigger_predictive_analysis(self, nome_etapa: str, dados: Dict[str, Any], categoria: str, session_id: str):
         """
         Aciona análises preditivas automaticamente após salvar dados-chave.
@@ -7,7 +7,7 @@ Gera perfis completos com nomes reais e análises personalizadas
 import os
 import json
 import random
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass, asdict
 from datetime import datetime, date
 import logging
@@ -25,6 +25,8 @@ except ImportError:
     def get_api_manager():
         return None
 
+from services.enhanced_ai_manager import enhanced_ai_manager
+
 @dataclass
 class DadosDemograficos:
     nome_completo: str
@@ -514,7 +516,7 @@ class AvatarGenerationSystem:
                 _, api = self.api_manager.get_fallback_model('qwen')
             
             if api:
-                response = await self._generate_with_ai(prompt, api)
+                response = await self._generate_with_ai(prompt, validate=self._is_valid_json_response)
                 # logger.debug(f"Resposta da IA (psicológico): {response}")
                 psico_data = json.loads(response)
                 return PerfilPsicologico(
@@ -673,7 +675,7 @@ class AvatarGenerationSystem:
                 _, api = self.api_manager.get_fallback_model('qwen')
             
             if api:
-                response = await self._generate_with_ai(prompt, api)
+                response = await self._generate_with_ai(prompt, validate=self._is_valid_json_response)
                 # logger.debug(f"Resposta da IA (dores/objetivos): {response}")
                 dores_data = json.loads(response)
                 return DoresEObjetivos(
@@ -753,7 +755,7 @@ class AvatarGenerationSystem:
         try:
             api = self.api_manager.get_active_api('qwen')
             if api:
-                historia_texto = await self._generate_with_ai(prompt, api)
+                historia_texto = await self._generate_with_ai(prompt)
                 # logger.debug(f"Resposta da IA (história): {historia_texto}")
                 return historia_texto
             else:
@@ -864,15 +866,34 @@ class AvatarGenerationSystem:
             'tempo_decisao_dias': 7 if psicologico.personalidade_mbti[3] == 'J' else 14
         }
 
+    @staticmethod
+    def _is_valid_json_response(response: str) -> bool:
+        """Resposta que o chamador consegue passar em json.loads; só ela vai para o cache de LLM"""
+        try:
+            json.loads(response.strip())
+        except ValueError:
+            return False
+        return True
+
     # --- CORREÇÃO PRINCIPAL AQUI ---
-    async def _generate_with_ai(self, prompt: str, api) -> str:
+    async def _generate_with_ai(self, prompt: str, use_cache: bool = True,
+                                validate: Optional[Callable[[str], bool]] = None) -> str:
         """
         Gera conteúdo usando IA.
         Esta é a função corrigida para fazer a chamada real.
+        A geração passa pela hierarquia do enhanced_ai_manager, cujo cache de LLM
+        é indexado pelo modelo (não pela chave de API sorteada na rotação).
         """
         try:
-            # Chama o método `generate` da instância da API (MockAPI ou real)
-            response = await api.generate(prompt, max_tokens=2048, temperature=0.7)
+            response = await enhanced_ai_manager.generate_text(
+                prompt,
+                max_tokens=2048,
+                temperature=0.7,
+                use_cache=use_cache,
+                validate=validate
+            )
+            if not response:
+                raise Exception("Resposta vazia da IA (hierarquia)")
             return response.strip()
         except Exception as e:
             logger.error(f"❌ Erro na geração com IA: {e}")
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Browser Pool
+Chromium headless compartilhado (Playwright) num event loop dedicado: o browser
+fica aquecido entre capturas, cada tarefa ganha um contexto isolado (até N em
+paralelo), fontes/vídeos/anúncios são bloqueados e a espera é por network-idle
+ou seletor em vez de sleeps fixos. Também guarda o caminho do chromedriver para
+os fluxos que ainda usam Selenium.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Iterable
+
+try:
+    from playwright.async_api import async_playwright
+    HAS_PLAYWRIGHT = True
+except ImportError:
+    HAS_PLAYWRIGHT = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+)
+
+BLOCKED_RESOURCE_TYPES = frozenset({'font', 'media'})
+BLOCKED_HOSTS = (
+    'doubleclick.net', 'googlesyndication.com', 'googleadservices.com', 'adservice.google.',
+    'google-analytics.com', 'googletagmanager.com', 'amazon-adsystem.com', 'adnxs.com',
+    'criteo.com', 'taboola.com', 'outbrain.com', 'scorecardresearch.com', 'hotjar.com',
+    'connect.facebook.net', 'ads-twitter.com', 'analytics.tiktok.com'
+)
+
+LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--no-first-run',
+    '--disable-default-apps'
+]
+
+
+class BrowserPool:
+    """Browser Playwright aquecido e compartilhado por todos os event loops do processo"""
+
+    def __init__(self):
+        self.max_contexts = int(os.getenv('BROWSER_POOL_CONTEXTS', '4'))
+        self.headless = os.getenv('BROWSER_POOL_HEADLESS', 'true').lower() == 'true'
+        self.navigation_timeout = float(os.getenv('BROWSER_POOL_NAV_TIMEOUT', '20'))
+        self.ready_timeout = float(os.getenv('BROWSER_POOL_READY_TIMEOUT', '8'))
+        self.idle_timeout = float(os.getenv('BROWSER_POOL_IDLE_TIMEOUT', '300'))
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._playwright = None
+        self._browser = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._active = 0
+        self._idle_handle = None
+        self._driver_setup: Optional[Dict[str, Any]] = None
+        self.stats = {
+            'browser_launches': 0,
+            'contexts_opened': 0,
+            'screenshots': 0,
+            'screenshot_failures': 0,
+            'requests_blocked': 0,
+            'screenshot_seconds': 0.0
+        }
+
+        logger.info(f"🧭 Browser Pool configurado ({self.max_contexts} contextos, Playwright {'disponível' if HAS_PLAYWRIGHT else 'indisponível'})")
+
+    @property
+    def available(self) -> bool:
+        return HAS_PLAYWRIGHT
+
+    # ------------------------------------------------------------------
+    # Event loop dedicado
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._launch_lock = asyncio.Lock()
+                self._semaphore = asyncio.Semaphore(self.max_contexts)
+                threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _submit(self, coro):
+        """Executa a corrotina no loop do pool e aguarda o resultado no loop do chamador"""
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    # ------------------------------------------------------------------
+    # Browser e contextos (executados no loop do pool)
+    # ------------------------------------------------------------------
+
+    async def _get_browser(self):
+        async with self._launch_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+                self.stats['browser_launches'] += 1
+                logger.info("🧭 Chromium do pool iniciado")
+            return self._browser
+
+    async def _close_browser(self):
+        if self._active:
+            return
+        browser, self._browser = self._browser, None
+        if browser:
+            try:
+                await browser.close()
+                logger.info("🧭 Chromium do pool encerrado por inatividade")
+            except Exception as e:
+                logger.debug(f"Erro ao fechar browser do pool: {e}")
+
+    def _schedule_idle_close(self):
+        if self._idle_handle:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._active == 0 and self.idle_timeout > 0:
+            self._idle_handle = self._loop.call_later(
+                self.idle_timeout, lambda: asyncio.ensure_future(self._close_browser())
+            )
+
+    async def _route(self, route, block_resources: bool, blocked_keywords: Iterable[str]):
+        request = route.request
+        url = request.url.lower()
+        blocked_resource = block_resources and (
+            request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in url for host in BLOCKED_HOSTS)
+        )
+        if blocked_resource or any(keyword in url for keyword in blocked_keywords):
+            self.stats['requests_blocked'] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _with_page(self, fn: Callable[[Any], Awaitable[Any]], block_resources: bool,
+                         blocked_keywords: List[str], context_kwargs: Dict[str, Any]):
+        async with self._semaphore:
+            self._active += 1
+            if self._idle_handle:
+                self._idle_handle.cancel()
+                self._idle_handle = None
+            context = None
+            try:
+                browser = await self._get_browser()
+                options = {'user_agent': DEFAULT_USER_AGENT, 'viewport': {'width': 1920, 'height': 1080}}
+                options.update(context_kwargs)
+                context = await browser.new_context(**options)
+                self.stats['contexts_opened'] += 1
+                if block_resources or blocked_keywords:
+                    keywords = [k.lower() for k in blocked_keywords]
+                    await context.route('**/*', lambda route: self._route(route, block_resources, keywords))
+                page = await context.new_page()
+                page.set_default_timeout(self.navigation_timeout * 1000)
+                return await fn(page)
+            finally:
+                if context:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.debug(f"Erro ao fechar contexto: {e}")
+                self._active -= 1
+                self._schedule_idle_close()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    async def with_page(self, fn: Callable[[Any], Awaitable[Any]], block_resources: bool = True,
+                        blocked_keywords: Optional[List[str]] = None, **context_kwargs) -> Any:
+        """
+        Executa `fn(page)` numa página de um contexto novo e isolado do browser
+        compartilhado. `fn` roda no loop do pool; o contexto é fechado ao final.
+        """
+        if not HAS_PLAYWRIGHT:
+            raise RuntimeError("Playwright não instalado")
+        return await self._submit(self._with_page(fn, block_resources, blocked_keywords or [], context_kwargs))
+
+    async def wait_ready(self, page, selector: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Aguarda o seletor (se informado) ou network-idle, limitado a `timeout` segundos"""
+        timeout_ms = (timeout if timeout is not None else self.ready_timeout) * 1000
+        try:
+            if selector:
+                await page.wait_for_selector(selector, state='visible', timeout=timeout_ms)
+            else:
+                await page.wait_for_load_state('networkidle', timeout=timeout_ms)
+            return True
+        except Exception:
+            return False
+
+    async def screenshot(self, url: str, path: str, wait_selector: Optional[str] = None,
+                         full_page: bool = False, **context_kwargs) -> Dict[str, Any]:
+        """Navega até `url` e salva o screenshot em `path`"""
+        started = time.perf_counter()
+
+        async def capture(page):
+            await page.goto(url, wait_until='domcontentloaded', timeout=self.navigation_timeout * 1000)
+            await self.wait_ready(page, wait_selector)
+            await page.screenshot(path=path, full_page=full_page)
+            return {'title': await page.title(), 'final_url': page.url}
+
+        try:
+            info = await self.with_page(capture, **context_kwargs)
+            success = os.path.exists(path) and os.path.getsize(path) > 0
+            result = {'success': success, 'url': url, 'filepath': path, **info}
+            if not success:
+                result['error'] = 'Screenshot não foi criado ou está vazio'
+        except Exception as e:
+            result = {'success': False, 'url': url, 'error': str(e)}
+
+        elapsed = time.perf_counter() - started
+        result['seconds'] = round(elapsed, 2)
+        self.stats['screenshots' if result['success'] else 'screenshot_failures'] += 1
+        self.stats['screenshot_seconds'] += elapsed
+        return result
+
+    async def screenshot_many(self, jobs: List[Dict[str, Any]], **defaults) -> List[Dict[str, Any]]:
+        """
+        Screenshots em paralelo (limitados ao número de contextos). Cada job é um
+        dict com `url`, `path` e opcionalmente `wait_selector`/`full_page`.
+        """
+        started = time.perf_counter()
+        results = await asyncio.gather(*[self.screenshot(**{**defaults, **job}) for job in jobs])
+        ok = sum(1 for r in results if r['success'])
+        logger.info(f"📸 {ok}/{len(jobs)} screenshots em {time.perf_counter() - started:.1f}s via browser pool")
+        return list(results)
+
+    def chromedriver_setup(self) -> Dict[str, Any]:
+        """
+        Verificação do Selenium e instalação do chromedriver feitas uma única vez
+        por processo: {'selenium_ready', 'chrome_binary', 'driver_path'}
+        """
+        with self._lock:
+            if self._driver_setup is not None:
+                return self._driver_setup
+            setup = {'selenium_ready': False, 'chrome_binary': None, 'driver_path': None}
+            try:
+                from services.selenium_checker import selenium_checker
+                check_results = selenium_checker.full_check()
+                setup['selenium_ready'] = check_results['selenium_ready']
+                setup['chrome_binary'] = check_results['best_chrome_path']
+            except Exception as e:
+                logger.warning(f"⚠️ Verificação do Selenium falhou: {e}")
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                setup['driver_path'] = ChromeDriverManager().install()
+            except Exception as e:
+                logger.warning(f"⚠️ ChromeDriverManager falhou: {e}, usando chromedriver do sistema")
+            self._driver_setup = setup
+            return setup
+
+    def get_stats(self) -> Dict[str, Any]:
+        shots = self.stats['screenshots'] + self.stats['screenshot_failures']
+        return {
+            **self.stats,
+            'screenshot_seconds': round(self.stats['screenshot_seconds'], 2),
+            'avg_screenshot_seconds': round(self.stats['screenshot_seconds'] / shots, 2) if shots else 0.0,
+            'browser_running': bool(self._browser and self._browser.is_connected()),
+            'active_contexts': self._active,
+            'max_contexts': self.max_contexts,
+            'available': HAS_PLAYWRIGHT
+        }
+
+
+# Instância global
+browser_pool = BrowserPool()
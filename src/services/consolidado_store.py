@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Consolidado Store
+Armazenamento append-only (JSON Lines) dos trechos de pesquisa web por sessão,
+com índice lateral de contagem/offsets, leitura preguiçosa e compactação
+para o consolidado.json legado
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ConsolidadoStore:
+    """Trechos de pesquisa web em pesquisa_web/<sessão>/consolidado.jsonl"""
+
+    # Um offset é registrado no índice a cada N trechos (índice esparso)
+    OFFSET_STRIDE = 64
+
+    def __init__(self, base_dir: str = "analyses_data/pesquisa_web"):
+        self.base_dir = Path(base_dir)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._indexes: Dict[str, Dict[str, Any]] = {}
+
+    def _lock(self, session_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(session_id, threading.Lock())
+
+    def _session_dir(self, session_id: str) -> Path:
+        return self.base_dir / session_id
+
+    def jsonl_path(self, session_id: str) -> Path:
+        return self._session_dir(session_id) / "consolidado.jsonl"
+
+    def index_path(self, session_id: str) -> Path:
+        return self._session_dir(session_id) / "consolidado.index.json"
+
+    def legacy_path(self, session_id: str) -> Path:
+        return self._session_dir(session_id) / "consolidado.json"
+
+    def _new_index(self, session_id: str) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        return {
+            'session_id': session_id,
+            'created_at': now,
+            'last_updated': now,
+            'total_trechos': 0,
+            'bytes': 0,
+            'offset_stride': self.OFFSET_STRIDE,
+            'offsets': []
+        }
+
+    def _load_index(self, session_id: str) -> Dict[str, Any]:
+        index = self._indexes.get(session_id)
+        if index is not None:
+            return index
+
+        index_path = self.index_path(session_id)
+        if index_path.exists():
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ Índice do consolidado corrompido ({e}), reconstruindo")
+                index = self._rebuild_index(session_id)
+        else:
+            index = self._rebuild_index(session_id)
+
+        self._indexes[session_id] = index
+        return index
+
+    def _rebuild_index(self, session_id: str) -> Dict[str, Any]:
+        """Recria o índice a partir do JSONL (ex.: índice ausente após falha)"""
+        index = self._new_index(session_id)
+        jsonl_path = self.jsonl_path(session_id)
+        if not jsonl_path.exists():
+            return index
+        with open(jsonl_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    if index['total_trechos'] % self.OFFSET_STRIDE == 0:
+                        index['offsets'].append(offset)
+                    index['total_trechos'] += 1
+                offset += len(line)
+            index['bytes'] = offset
+        return index
+
+    def _import_legacy(self, session_id: str):
+        """
+        Copia para o JSONL os trechos de um consolidado.json legado já existente,
+        antes do primeiro append (load/compact passam a usar só o JSONL)
+        """
+        legacy = self._read_legacy(session_id)
+        trechos = (legacy or {}).get('trechos') or []
+        if not trechos:
+            return
+        with open(self.jsonl_path(session_id), 'w', encoding='utf-8') as f:
+            for trecho in trechos:
+                f.write(json.dumps(trecho, ensure_ascii=False, default=str) + '\n')
+        self._indexes.pop(session_id, None)
+        if self.index_path(session_id).exists():
+            self.index_path(session_id).unlink()
+        logger.info(f"📥 {len(trechos)} trechos do consolidado legado migrados para {self.jsonl_path(session_id)}")
+
+    def _write_index(self, session_id: str, index: Dict[str, Any]):
+        index_path = self.index_path(session_id)
+        tmp_path = index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_path, index_path)
+
+    def append(self, session_id: str, trecho: Dict[str, Any]) -> int:
+        """
+        Acrescenta um trecho ao final do JSONL da sessão.
+
+        Returns:
+            Total de trechos da sessão após a inclusão
+        """
+        line = (json.dumps(trecho, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        with self._lock(session_id):
+            self._session_dir(session_id).mkdir(parents=True, exist_ok=True)
+            if not self.jsonl_path(session_id).exists():
+                self._import_legacy(session_id)
+            index = self._load_index(session_id)
+
+            with open(self.jsonl_path(session_id), 'ab') as f:
+                offset = f.tell()
+                f.write(line)
+
+            if index['total_trechos'] % self.OFFSET_STRIDE == 0:
+                index['offsets'].append(offset)
+            index['total_trechos'] += 1
+            index['bytes'] = offset + len(line)
+            index['last_updated'] = datetime.now().isoformat()
+            self._write_index(session_id, index)
+            return index['total_trechos']
+
+    def count(self, session_id: str) -> int:
+        """Total de trechos sem ler o conteúdo"""
+        if self.jsonl_path(session_id).exists():
+            with self._lock(session_id):
+                return self._load_index(session_id)['total_trechos']
+        legacy = self._read_legacy(session_id)
+        return len(legacy.get('trechos', [])) if legacy else 0
+
+    def get_index(self, session_id: str) -> Dict[str, Any]:
+        with self._lock(session_id):
+            index = self._load_index(session_id)
+            return {k: v for k, v in index.items() if k != 'offsets'}
+
+    def iter_trechos(self, session_id: str, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Itera os trechos da sessão sem carregá-los todos em memória.
+        Sessões antigas (apenas consolidado.json) são lidas do arquivo legado.
+        """
+        jsonl_path = self.jsonl_path(session_id)
+        if not jsonl_path.exists():
+            legacy = self._read_legacy(session_id)
+            if legacy:
+                yield from legacy.get('trechos', [])[start:]
+            return
+
+        with self._lock(session_id):
+            index = self._load_index(session_id)
+            stride = index.get('offset_stride', self.OFFSET_STRIDE)
+            offsets = list(index['offsets'])
+            end_offset = index['bytes']
+
+        # Posiciona no checkpoint mais próximo antes de `start`
+        checkpoint = min(start // stride, len(offsets) - 1) if offsets else 0
+        position = checkpoint * stride if offsets else 0
+        with open(jsonl_path, 'rb') as f:
+            if offsets:
+                f.seek(offsets[checkpoint])
+            # Lê apenas até o fim registrado no índice (ignora escrita em andamento)
+            while f.tell() < end_offset:
+                line = f.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if position >= start:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"⚠️ Linha inválida ignorada em {jsonl_path}")
+                position += 1
+
+    def _read_legacy(self, session_id: str) -> Optional[Dict[str, Any]]:
+        legacy_path = self.legacy_path(session_id)
+        if not legacy_path.exists():
+            return None
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"❌ Erro ao ler consolidado legado {legacy_path}: {e}")
+            return None
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Consolidado completo no formato legado (carrega todos os trechos)"""
+        if not self.jsonl_path(session_id).exists():
+            return self._read_legacy(session_id)
+        index = self.get_index(session_id)
+        return {
+            'session_id': session_id,
+            'trechos': list(self.iter_trechos(session_id)),
+            'created_at': index['created_at'],
+            'last_updated': index['last_updated'],
+            'total_trechos': index['total_trechos']
+        }
+
+    def compact(self, session_id: str) -> Optional[str]:
+        """
+        Gera o consolidado.json legado a partir do JSONL, escrevendo trecho a
+        trecho (sem montar a lista inteira em memória)
+        """
+        if not self.jsonl_path(session_id).exists():
+            legacy_path = self.legacy_path(session_id)
+            return str(legacy_path) if legacy_path.exists() else None
+
+        index = self.get_index(session_id)
+        legacy_path = self.legacy_path(session_id)
+        tmp_path = legacy_path.with_suffix('.json.tmp')
+        written = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('{\n')
+            f.write(f'  "session_id": {json.dumps(session_id, ensure_ascii=False)},\n')
+            f.write('  "trechos": [')
+            for trecho in self.iter_trechos(session_id):
+                f.write(',\n    ' if written else '\n    ')
+                f.write(json.dumps(trecho, ensure_ascii=False, default=str))
+                written += 1
+            f.write('\n  ],\n' if written else '],\n')
+            f.write(f'  "created_at": {json.dumps(index["created_at"])},\n')
+            f.write(f'  "last_updated": {json.dumps(index["last_updated"])},\n')
+            f.write(f'  "total_trechos": {written}\n')
+            f.write('}\n')
+        os.replace(tmp_path, legacy_path)
+
+        logger.info(f"🗜️ Consolidado compactado: {written} trechos em {legacy_path}")
+        return str(legacy_path)
+
+
+# Instância global
+consolidado_store = ConsolidadoStore()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Content Extraction Engine
+Extração assíncrona de conteúdo de páginas: Jina → Trafilatura → BeautifulSoup
+com sessão aiohttp compartilhada, limites por host e prazos cooperativos
+"""
+
+import os
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+from urllib.parse import urlparse
+
+from services.page_content_cache import page_content_cache
+from services.http_client_pool import LoopLocal, bind_session_to_loop, discard_session
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+try:
+    import trafilatura
+    HAS_TRAFILATURA = True
+except ImportError:
+    HAS_TRAFILATURA = False
+
+try:
+    from bs4 import BeautifulSoup
+    HAS_BS4 = True
+except ImportError:
+    HAS_BS4 = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+def _parse_with_trafilatura(html: str) -> Optional[str]:
+    """Extração principal do texto (executada no pool de threads)"""
+    if not HAS_TRAFILATURA:
+        return None
+    return trafilatura.extract(html)
+
+
+def _parse_with_beautifulsoup(html: str) -> Optional[str]:
+    """Texto bruto da página sem scripts/styles (executada no pool de threads)"""
+    if not HAS_BS4:
+        return None
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    return ' '.join(soup.get_text().split())
+
+
+class ContentExtractionEngine:
+    """Motor de extração de páginas com pool de conexões e parsing fora do event loop"""
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv('EXTRACTION_MAX_CONCURRENCY', '10'))
+        self.max_per_host = int(os.getenv('EXTRACTION_MAX_PER_HOST', '2'))
+        self.max_extraction_time = float(os.getenv('EXTRACTION_MAX_TIME', '20'))
+        self.stage_timeouts = {
+            'jina': 8.0,
+            'html': 6.0
+        }
+        self.jina_api_key = os.getenv('JINA_API_KEY')
+        self.cache = page_content_cache
+
+        # Parsing de HTML é CPU-bound: fica fora do event loop
+        self._parser_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('EXTRACTION_PARSER_WORKERS', str(min(8, (os.cpu_count() or 2) * 2)))),
+            thread_name_prefix='extraction-parser'
+        )
+
+        # Sessões, semáforos globais e por host são vinculados ao event loop
+        self._sessions = LoopLocal(discard=discard_session)
+        self._semaphores = LoopLocal()
+        self._host_semaphores = LoopLocal()
+
+        self.stats = {
+            'requests': 0,
+            'success': 0,
+            'failed': 0,
+            'timeouts': 0,
+            'cache_hits': 0,
+            'queue_wait_seconds': 0.0,
+            'by_method': {'jina': 0, 'trafilatura': 0, 'beautifulsoup': 0}
+        }
+
+        logger.info(f"🚀 Content Extraction Engine inicializado (concorrência {self.max_concurrency}, {self.max_per_host}/host)")
+
+    async def _get_session(self) -> 'aiohttp.ClientSession':
+        """Sessão aiohttp compartilhada por event loop (keep-alive + cache de DNS)"""
+        session, _ = self._sessions.get((None, None))
+        if session is None or session.closed:
+            # Sem limite por host no conector: todas as chamadas Jina vão para r.jina.ai;
+            # o limite por host dos sites de origem é aplicado via semáforo
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency * 2,
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS)
+            self._sessions.set((session, await bind_session_to_loop(session)))
+        return session
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        return self._semaphores.setdefault(lambda: asyncio.Semaphore(self.max_concurrency))
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host_semaphores = self._host_semaphores.setdefault(dict)
+        host = urlparse(url).netloc.lower()
+        if host not in host_semaphores:
+            host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return host_semaphores[host]
+
+    async def _fetch(self, url: str, timeout: float, headers: Optional[Dict[str, str]] = None) -> Tuple[int, Optional[str], Dict[str, str]]:
+        """GET retornando (status, texto, cabeçalhos); texto só é lido em respostas 200"""
+        if timeout <= 0:
+            return 0, None, {}
+        session = await self._get_session()
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200:
+                logger.debug(f"HTTP {response.status} para {url}")
+                return response.status, None, dict(response.headers)
+            return response.status, await response.text(errors='ignore'), dict(response.headers)
+
+    async def _fetch_text(self, url: str, timeout: float, headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+        _, text, _ = await self._fetch(url, timeout, headers)
+        return text
+
+    async def _run_parser(self, func, html: str, timeout: float) -> Optional[str]:
+        if timeout <= 0:
+            return None
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self._parser_pool, func, html), timeout=timeout)
+
+    async def extract(self, url: str) -> Dict[str, Any]:
+        """
+        Extrai o conteúdo de uma URL pela cascata Jina → Trafilatura → BeautifulSoup.
+
+        Returns:
+            Dict com 'content', 'extraction_method' e 'elapsed'; 'content' é None
+            quando nenhum estágio produziu texto suficiente ('reason' indica o motivo)
+        """
+        if not HAS_AIOHTTP:
+            return {'content': None, 'extraction_method': 'none', 'reason': 'aiohttp_unavailable', 'elapsed': 0.0}
+
+        start = time.monotonic()
+        self.stats['requests'] += 1
+
+        def remaining(stage_timeout: float) -> float:
+            return min(stage_timeout, deadline - time.monotonic())
+
+        # Cache persistente de páginas (compartilhado entre sessões)
+        cached = await asyncio.to_thread(self.cache.lookup, url)
+        if cached and cached.is_fresh:
+            await asyncio.to_thread(self.cache.record_hit, url)
+            return self._cached_result(cached, start)
+
+        content, method, reason = None, 'none', 'no_content_extracted'
+        html, etag, last_modified = None, None, None
+
+        async with self._get_semaphore():
+            # O prazo só começa a contar quando a extração sai da fila do semáforo
+            acquired = time.monotonic()
+            queue_wait = acquired - start
+            self.stats['queue_wait_seconds'] += queue_wait
+            deadline = acquired + self.max_extraction_time
+
+            # 0. Entrada expirada com validadores: GET condicional (304 reaproveita o cache)
+            if cached and cached.can_revalidate:
+                try:
+                    async with self._get_host_semaphore(url):
+                        status, html, headers = await self._fetch(
+                            url, remaining(self.stage_timeouts['html']), cached.revalidation_headers()
+                        )
+                    if status == 304:
+                        await asyncio.to_thread(self.cache.mark_revalidated, url)
+                        return self._cached_result(cached, start)
+                    etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+                except Exception as e:
+                    logger.debug(f"Revalidação falhou para {url}: {e}")
+            self.cache.record_miss(stale=cached is not None)
+
+            # 1. JINA Reader (mais eficaz)
+            try:
+                jina_headers = {'Authorization': f'Bearer {self.jina_api_key}'} if self.jina_api_key else None
+                text = await self._fetch_text(f"https://r.jina.ai/{url}", remaining(self.stage_timeouts['jina']), jina_headers)
+                if text and len(text) > 500:
+                    content, method = text[:10000], 'jina'
+            except asyncio.TimeoutError:
+                logger.warning(f"⏰ Timeout JINA para {url} - pulando para próximo método")
+            except Exception as e:
+                logger.warning(f"⚠️ JINA falhou para {url}: {str(e)}")
+
+            # 2 e 3. HTML original baixado uma única vez para Trafilatura e BeautifulSoup
+            if not content and not html:
+                try:
+                    async with self._get_host_semaphore(url):
+                        _, html, headers = await self._fetch(url, remaining(self.stage_timeouts['html']))
+                    etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+                except asyncio.TimeoutError:
+                    logger.warning(f"⏰ Timeout ao baixar {url}")
+                except Exception as e:
+                    logger.warning(f"⚠️ Download falhou para {url}: {str(e)}")
+
+            if not content:
+                for parser_method, parser in (('trafilatura', _parse_with_trafilatura), ('beautifulsoup', _parse_with_beautifulsoup)):
+                    if not html or content:
+                        break
+                    try:
+                        text = await self._run_parser(parser, html, deadline - time.monotonic())
+                        if text and len(text) > 300:
+                            content, method = text, parser_method
+                    except asyncio.TimeoutError:
+                        logger.warning(f"⏰ Timeout no parsing {parser_method} de {url}")
+                    except Exception as e:
+                        logger.warning(f"⚠️ {parser_method} falhou para {url}: {str(e)}")
+
+        if content:
+            await asyncio.to_thread(self.cache.put, url, content, method, etag, last_modified)
+
+        elapsed = time.monotonic() - start
+        if not content and time.monotonic() >= deadline:
+            reason = 'extraction_timeout'
+            self.stats['timeouts'] += 1
+
+        if content:
+            self.stats['success'] += 1
+            self.stats['by_method'][method] += 1
+            logger.info(f"✅ {method} extraiu {len(content)} caracteres de {url} em {elapsed:.1f}s")
+        else:
+            self.stats['failed'] += 1
+
+        return {
+            'content': content,
+            'extraction_method': method,
+            'reason': None if content else reason,
+            'elapsed': elapsed,
+            'queue_wait': queue_wait
+        }
+
+    def _cached_result(self, cached, start: float) -> Dict[str, Any]:
+        self.stats['success'] += 1
+        self.stats['cache_hits'] += 1
+        logger.info(f"💾 Cache: {len(cached.content)} caracteres de {cached.url}")
+        return {
+            'content': cached.content,
+            'extraction_method': cached.extraction_method,
+            'reason': None,
+            'elapsed': time.monotonic() - start,
+            'from_cache': True
+        }
+
+    async def extract_many(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """Extrai várias URLs em paralelo, preservando a ordem de entrada"""
+        return await asyncio.gather(*(self.extract(url) for url in urls))
+
+    async def close(self):
+        """Fecha a sessão do event loop atual"""
+        session, _ = self._sessions.pop((None, None))
+        if session and not session.closed:
+            await session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            open_sessions=sum(1 for s, _ in self._sessions.values() if not s.closed),
+            page_cache=self.cache.get_stats()
+        )
+
+
+# Instância global
+content_extraction_engine = ContentExtractionEngine()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Context Packer
+Empacotamento do corpus da sessão para síntese: divide os dados em trechos
+com ID de fonte, ranqueia com BM25 por tipo de síntese e seleciona os de maior
+valor dentro de um orçamento explícito de tokens, em formato tabular compacto
+"""
+
+import os
+import re
+import math
+import logging
+import hashlib
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Orçamento de contexto (tokens) por modelo alvo; sobrescrevível via SYNTHESIS_CONTEXT_TOKENS
+MODEL_CONTEXT_BUDGETS = {
+    'x-ai/grok-4-fast:free': 32000,
+    'google/gemini-2.0-flash-exp:free': 24000,
+    'gemini-2.0-flash-exp': 24000
+}
+DEFAULT_CONTEXT_BUDGET = 24000
+
+# Termos de consulta por tipo de síntese
+SYNTHESIS_QUERY_TERMS = {
+    'master_synthesis': [
+        'mercado', 'publico', 'cliente', 'dor', 'desejo', 'problema', 'solucao', 'concorrente',
+        'preco', 'tendencia', 'oportunidade', 'crescimento', 'engajamento', 'seguidores',
+        'influenciador', 'produto', 'estrategia', 'vendas', 'dados', 'pesquisa'
+    ],
+    'deep_market_analysis': [
+        'mercado', 'tamanho', 'crescimento', 'tendencia', 'preco', 'ticket', 'faturamento',
+        'receita', 'demanda', 'segmento', 'nicho', 'oportunidade', 'barreira', 'regulamentacao',
+        'sazonalidade', 'canal', 'distribuicao', 'percentual', 'bilhoes', 'milhoes'
+    ],
+    'behavioral_analysis': [
+        'comportamento', 'dor', 'medo', 'desejo', 'sonho', 'objecao', 'crenca', 'frustracao',
+        'motivacao', 'emocao', 'linguagem', 'comentario', 'reclamacao', 'depoimento', 'habito',
+        'decisao', 'compra', 'confianca', 'publico', 'perfil'
+    ],
+    'competitive_analysis': [
+        'concorrente', 'concorrencia', 'lider', 'marca', 'empresa', 'diferencial', 'posicionamento',
+        'preco', 'oferta', 'produto', 'curso', 'servico', 'influenciador', 'canal', 'seguidores',
+        'engajamento', 'gap', 'vantagem', 'fraqueza', 'estrategia'
+    ]
+}
+
+STOPWORDS = frozenset("""
+a o as os de da do das dos e em no na nos nas um uma uns umas para por com sem que se
+ao aos como mais menos mas ou ja nao sim sua seu suas seus ele ela eles elas isso isto
+esse essa este esta ser ter foi sao tem pelo pela pelos pelas entre sobre ate muito
+the and for with from this that are was were you your have has not but all can will
+""".split())
+
+URL_KEYS = ('url', 'link', 'source_url', 'page_url')
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n{2,}')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Mesma heurística usada no restante do sistema (~4 caracteres por token)"""
+    return len(text) // 4
+
+
+def _strip_accents(text: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        word for word in _WORD_RE.findall(_strip_accents(text.lower()))
+        if len(word) > 2 and word not in STOPWORDS and not word.isdigit()
+    ]
+
+
+@dataclass
+class ContextChunk:
+    """Trecho do corpus com identificador de fonte"""
+    chunk_id: str
+    section: str
+    origin: str
+    group: str
+    text: str
+    url: str = ''
+    position: int = 0
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text) + 8
+
+
+@dataclass
+class PreparedCorpus:
+    """Corpus dividido e tokenizado uma vez, reutilizável para vários tipos de síntese"""
+    chunks: List[ContextChunk]
+    documents: List[Counter]
+    document_frequency: Counter
+    avg_length: float
+
+
+@dataclass
+class PackedContext:
+    """Resultado do empacotamento"""
+    text: str
+    chunks: List[ContextChunk] = field(default_factory=list)
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+class ContextPacker:
+    """Seleciona os trechos mais relevantes do corpus dentro de um orçamento de tokens"""
+
+    def __init__(self):
+        self.chunk_chars = int(os.getenv('CONTEXT_CHUNK_CHARS', '1200'))
+        self.min_text_chars = 40
+        self.default_budget = int(os.getenv('SYNTHESIS_CONTEXT_TOKENS', str(DEFAULT_CONTEXT_BUDGET)))
+        self.k1 = 1.5
+        self.b = 0.75
+
+    def budget_for_models(self, model_names: Iterable[str]) -> int:
+        """Menor orçamento entre os modelos que podem receber o prompt (hierarquia com fallback)"""
+        if os.getenv('SYNTHESIS_CONTEXT_TOKENS'):
+            return self.default_budget
+        budgets = [MODEL_CONTEXT_BUDGETS.get(name, self.default_budget) for name in model_names]
+        return min(budgets) if budgets else self.default_budget
+
+    # ------------------------------------------------------------------
+    # Chunking
+    # ------------------------------------------------------------------
+
+    def _split_text(self, text: str) -> List[str]:
+        text = _WHITESPACE_RE.sub(' ', text).strip()
+        if len(text) <= self.chunk_chars:
+            return [text]
+        pieces, current = [], ''
+        for sentence in _SENTENCE_RE.split(text):
+            if current and len(current) + len(sentence) + 1 > self.chunk_chars:
+                pieces.append(current)
+                current = ''
+            while len(sentence) > self.chunk_chars:
+                # Sem pontuação: corta no último espaço antes do limite
+                cut = sentence.rfind(' ', 0, self.chunk_chars)
+                cut = cut if cut > self.chunk_chars // 2 else self.chunk_chars
+                pieces.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            current = f"{current} {sentence}".strip()
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def _walk(self, value: Any, path: str, group: str, url: str, out: List[Dict[str, str]]):
+        if isinstance(value, dict):
+            url = next((str(value[k]) for k in URL_KEYS if isinstance(value.get(k), str) and value[k].startswith('http')), url)
+            fields = []
+            for key, item in value.items():
+                if key in URL_KEYS:
+                    continue
+                if isinstance(item, str):
+                    if len(item) > 200:
+                        self._walk(item, f"{path}.{key}", group, url, out)
+                    elif item.strip():
+                        fields.append(f"{key}={_WHITESPACE_RE.sub(' ', item.strip())}")
+                elif isinstance(item, (int, float)) and not isinstance(item, bool):
+                    fields.append(f"{key}={item}")
+                elif isinstance(item, (dict, list)):
+                    self._walk(item, f"{path}.{key}", group, url, out)
+            if fields:
+                record = '; '.join(fields)
+                if len(record) >= self.min_text_chars:
+                    for piece in self._split_text(record):
+                        out.append({'origin': path, 'group': group, 'text': piece, 'url': url})
+        elif isinstance(value, list):
+            scalars = [str(item) for item in value if isinstance(item, (str, int, float)) and not isinstance(item, bool)]
+            short = [s for s in scalars if len(s) <= 200]
+            for index, item in enumerate(value):
+                child_path = f"{path}[{index}]"
+                # Cada elemento de primeiro nível de uma lista é uma fonte (agrupamento para cobertura)
+                child_group = child_path if group == path.split('.')[0] else group
+                if isinstance(item, (dict, list)) or (isinstance(item, str) and len(item) > 200):
+                    self._walk(item, child_path, child_group, url, out)
+            if short:
+                record = '; '.join(_WHITESPACE_RE.sub(' ', s.strip()) for s in short if s.strip())
+                if len(record) >= self.min_text_chars:
+                    for piece in self._split_text(record):
+                        out.append({'origin': path, 'group': group, 'text': piece, 'url': url})
+        elif isinstance(value, str) and len(value.strip()) >= self.min_text_chars:
+            for piece in self._split_text(value):
+                out.append({'origin': path, 'group': group, 'text': piece, 'url': url})
+
+    def chunk_sources(self, sources: Dict[str, Any]) -> List[ContextChunk]:
+        """Divide as fontes (seção → dados) em trechos, descartando repetições exatas"""
+        raw: List[Dict[str, str]] = []
+        section_of: List[str] = []
+        for section, data in sources.items():
+            if not data:
+                continue
+            before = len(raw)
+            self._walk(data, section, section, '', raw)
+            section_of.extend([section] * (len(raw) - before))
+
+        chunks, seen = [], set()
+        for position, (item, section) in enumerate(zip(raw, section_of)):
+            digest = hashlib.md5(_WHITESPACE_RE.sub(' ', item['text'].lower()).encode('utf-8')).hexdigest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            origin = item['origin'][len(section) + 1:] if item['origin'].startswith(section + '.') else item['origin']
+            chunks.append(ContextChunk(
+                chunk_id=f"S{len(chunks) + 1}",
+                section=section,
+                origin=origin or section,
+                group=item['group'],
+                text=item['text'],
+                url=item['url'],
+                position=position
+            ))
+        return chunks
+
+    # ------------------------------------------------------------------
+    # Ranking e seleção
+    # ------------------------------------------------------------------
+
+    def prepare(self, sources: Dict[str, Any]) -> PreparedCorpus:
+        """Divide e tokeniza as fontes (etapa cara, independente do tipo de síntese)"""
+        chunks = self.chunk_sources(sources)
+        documents = [Counter(tokenize(chunk.text)) for chunk in chunks]
+        document_frequency = Counter()
+        for document in documents:
+            document_frequency.update(document.keys())
+        avg_length = (sum(sum(d.values()) for d in documents) / len(documents)) if documents else 0.0
+        return PreparedCorpus(chunks, documents, document_frequency, avg_length or 1.0)
+
+    def _score_bm25(self, corpus: PreparedCorpus, query_terms: List[str]) -> List[float]:
+        total = len(corpus.documents)
+        query = Counter(term for t in query_terms for term in tokenize(t))
+        idf = {
+            term: math.log(1 + (total - corpus.document_frequency[term] + 0.5) / (corpus.document_frequency[term] + 0.5))
+            for term in query
+        }
+
+        scores = []
+        for chunk, document in zip(corpus.chunks, corpus.documents):
+            length = sum(document.values())
+            score = 0.0
+            for term, weight in query.items():
+                frequency = document.get(term)
+                if not frequency:
+                    continue
+                score += weight * idf[term] * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * (1 - self.b + self.b * length / corpus.avg_length)
+                )
+            # Números concretos (métricas, preços) são valiosos para a síntese
+            scores.append(score + 0.1 * min(5, sum(1 for w in _WORD_RE.findall(chunk.text) if w.isdigit())))
+        return scores
+
+    def _select(self, chunks: List[ContextChunk], scores: List[float], budget: int) -> List[ContextChunk]:
+        """
+        Seleção em rodadas: cada rodada pega o melhor trecho ainda não usado de
+        cada fonte (ordenadas pela relevância), maximizando cobertura de fontes
+        antes de aprofundar nas mais relevantes
+        """
+        by_group: Dict[str, List[int]] = defaultdict(list)
+        for index, chunk in enumerate(chunks):
+            by_group[chunk.group].append(index)
+        for group_indices in by_group.values():
+            group_indices.sort(key=lambda i: scores[i], reverse=True)
+        groups = sorted(by_group.values(), key=lambda g: scores[g[0]], reverse=True)
+
+        selected, used = [], 0
+        round_index = 0
+        while groups:
+            remaining_groups = []
+            for group_indices in groups:
+                if round_index >= len(group_indices):
+                    continue
+                chunk = chunks[group_indices[round_index]]
+                if used + chunk.tokens <= budget:
+                    selected.append(chunk)
+                    used += chunk.tokens
+                remaining_groups.append(group_indices)
+            if used >= budget * 0.98:
+                break
+            groups = remaining_groups
+            round_index += 1
+        return selected
+
+    # ------------------------------------------------------------------
+    # Formato compacto
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cell(value: str) -> str:
+        return value.replace('|', '/').replace('\n', ' ')
+
+    def _render(self, selected: List[ContextChunk], section_titles: Dict[str, str], total_chunks: int) -> str:
+        lines = [
+            f"# CORPUS DA SESSÃO: {len(selected)} de {total_chunks} trechos selecionados por relevância",
+            "# Formato: id|origem|url|texto — cite os ids (ex.: [S12]) ao usar cada informação"
+        ]
+        by_section: Dict[str, List[ContextChunk]] = defaultdict(list)
+        for chunk in selected:
+            by_section[chunk.section].append(chunk)
+        for section, section_chunks in by_section.items():
+            section_chunks.sort(key=lambda c: c.position)
+            lines.append("")
+            lines.append(f"## {section_titles.get(section, section)} [{len(section_chunks)}]")
+            lines.append("id|origem|url|texto")
+            for chunk in section_chunks:
+                lines.append('|'.join((chunk.chunk_id, self._cell(chunk.origin), self._cell(chunk.url), self._cell(chunk.text))))
+        return "\n".join(lines)
+
+    def pack(
+        self,
+        sources: Dict[str, Any],
+        synthesis_type: str = 'master_synthesis',
+        token_budget: Optional[int] = None,
+        extra_terms: Optional[List[str]] = None,
+        section_titles: Optional[Dict[str, str]] = None
+    ) -> PackedContext:
+        """
+        Empacota as fontes para o tipo de síntese dentro do orçamento de tokens.
+
+        Args:
+            sources: Mapa seção → dados (dict, lista ou texto)
+            synthesis_type: Define os termos de consulta do BM25
+            token_budget: Orçamento de tokens do contexto (padrão: SYNTHESIS_CONTEXT_TOKENS)
+            extra_terms: Termos adicionais da sessão (produto, segmento...)
+            section_titles: Títulos legíveis por seção
+        """
+        return self.pack_corpus(self.prepare(sources), synthesis_type, token_budget, extra_terms, section_titles)
+
+    def pack_corpus(
+        self,
+        corpus: PreparedCorpus,
+        synthesis_type: str = 'master_synthesis',
+        token_budget: Optional[int] = None,
+        extra_terms: Optional[List[str]] = None,
+        section_titles: Optional[Dict[str, str]] = None
+    ) -> PackedContext:
+        """Empacota um corpus já preparado (ver prepare) para o tipo de síntese"""
+        budget = token_budget or self.default_budget
+        chunks = corpus.chunks
+        query_terms = SYNTHESIS_QUERY_TERMS.get(synthesis_type, SYNTHESIS_QUERY_TERMS['master_synthesis']) + list(extra_terms or [])
+        scores = self._score_bm25(corpus, query_terms)
+        # Reserva para cabeçalhos de seção e instruções de formato
+        selected = self._select(chunks, scores, max(0, budget - 200))
+        text = self._render(selected, section_titles or {}, len(chunks))
+
+        corpus_tokens = sum(chunk.tokens for chunk in chunks)
+        stats = {
+            'synthesis_type': synthesis_type,
+            'token_budget': budget,
+            'total_chunks': len(chunks),
+            'selected_chunks': len(selected),
+            'total_sources': len({c.group for c in chunks}),
+            'covered_sources': len({c.group for c in selected}),
+            'corpus_tokens': corpus_tokens,
+            'packed_tokens': estimate_tokens(text)
+        }
+        logger.info(
+            f"📦 Contexto empacotado ({synthesis_type}): {stats['selected_chunks']}/{stats['total_chunks']} trechos, "
+            f"{stats['covered_sources']}/{stats['total_sources']} fontes, "
+            f"~{stats['packed_tokens']:,} tokens (corpus ~{corpus_tokens:,})"
+        )
+        return PackedContext(text=text, chunks=selected, stats=stats)
+
+
+# Instância global
+context_packer = ContextPacker()
@@ -25,6 +25,8 @@ try:
 except ImportError:
     HAS_SEARCH_ENGINE = False
 
+from services.enhanced_ai_manager import enhanced_ai_manager
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -287,12 +289,24 @@ class CPLDevastadorProtocol:
             logger.error(f"❌ Erro ao gerar resposta fallback: {e}")
             return '{"error": "Falha na geração de resposta", "status": "error"}'
     
-    async def _generate_with_ai(self, prompt: str, api) -> str:
-        """Gera resposta usando API de IA"""
+    def _is_valid_json_response(self, response: str) -> bool:
+        """Resposta que vira JSON depois da limpeza de markdown; só ela vai para o cache de LLM"""
+        cleaned = self._clean_json_response(response)
+        if not cleaned:
+            return False
+        try:
+            json.loads(cleaned)
+        except ValueError:
+            return False
+        return True
+    
+    async def _generate_with_ai(self, prompt: str, use_cache: bool = True) -> str:
+        """Gera resposta via hierarquia do enhanced_ai_manager (fases já geradas vêm do cache de LLM, indexado por modelo)"""
         try:
-            # Implementação simplificada - adapte conforme sua API
-            response = await api.generate(prompt)
-            return response
+            response = await enhanced_ai_manager.generate_text(
+                prompt, use_cache=use_cache, validate=self._is_valid_json_response
+            )
+            return response or ""
         except Exception as e:
             logger.error(f"❌ Erro ao gerar com AI: {e}")
             return ""
@@ -489,11 +503,7 @@ class CPLDevastadorProtocol:
         """
         
         try:
-            api = self.api_manager.get_active_api('qwen')
-            if not api:
-                _, api = self.api_manager.get_fallback_model('qwen')
-            
-            response = await self._generate_with_ai(prompt, api)
+            response = await self._generate_with_ai(prompt)
             
             # CORREÇÃO CRÍTICA: Validar e limpar resposta
             if not response or not isinstance(response, str):
@@ -576,11 +586,7 @@ class CPLDevastadorProtocol:
         """
         
         try:
-            api = self.api_manager.get_active_api('qwen')
-            if not api:
-                _, api = self.api_manager.get_fallback_model('qwen')
-            
-            response = await self._generate_with_ai(prompt, api)
+            response = await self._generate_with_ai(prompt)
             
             # Limpar e validar resposta
             response = self._clean_json_response(response)
@@ -658,11 +664,7 @@ class CPLDevastadorProtocol:
         """
         
         try:
-            api = self.api_manager.get_active_api('qwen')
-            if not api:
-                _, api = self.api_manager.get_fallback_model('qwen')
-            
-            response = await self._generate_with_ai(prompt, api)
+            response = await self._generate_with_ai(prompt)
             
             # Limpar e validar resposta
             response = self._clean_json_response(response)
@@ -736,11 +738,7 @@ class CPLDevastadorProtocol:
         """
         
         try:
-            api = self.api_manager.get_active_api('qwen')
-            if not api:
-                _, api = self.api_manager.get_fallback_model('qwen')
-            
-            response = await self._generate_with_ai(prompt, api)
+            response = await self._generate_with_ai(prompt)
             
             # Limpar e validar resposta
             response = self._clean_json_response(response)
@@ -813,11 +811,7 @@ class CPLDevastadorProtocol:
         """
         
         try:
-            api = self.api_manager.get_active_api('qwen')
-            if not api:
-                _, api = self.api_manager.get_fallback_model('qwen')
-            
-            response = await self._generate_with_ai(prompt, api)
+            response = await self._generate_with_ai(prompt)
             
             # Limpar e validar resposta
             response = self._clean_json_response(response)
@@ -4,24 +4,82 @@
 ARQV30 Enhanced v3.0 - Enhanced AI Manager
 Gerenciador de IA com hierarquia OpenRouter: Grok-4 → Gemini-2.0 e fallbacks robustos
 ZERO SIMULAÇÃO - Apenas modelos reais funcionais
-Com delay de 10s entre requisições e rotação inteligente de APIs
+Com rate limiting por (provedor, chave, modelo) e despacho para a chave com capacidade
 """
 
 import os
 import logging
 import asyncio
 import json
+import threading
 import aiohttp
-from typing import Dict, List, Optional, Any, Union
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Union, AsyncIterator, Callable
+from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
 import time
 
+from .rate_limiter import (
+    rate_limit_registry,
+    parse_retry_after,
+    parse_retry_delay_from_error,
+    is_rate_limit_error
+)
+from .http_client_pool import http_client_pool
+from .llm_streaming import (
+    StreamHTTPError,
+    StreamMetrics,
+    PartialOutputWriter,
+    stream_openai_compatible,
+    stream_gemini,
+    continuation_messages,
+    continuation_contents,
+    resumable_stream,
+    report_stream_metrics
+)
+from .request_hedging import hedge_policy, hedged_call, hedged_stream
+from .model_router import model_router, ModelProfile, RouteConstraints
+from .llm_response_cache import llm_response_cache
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+class _GeminiConfigGate:
+    """
+    genai.configure é global no processo: chamadas com a chave já configurada rodam
+    juntas, uma chave diferente espera as chamadas em andamento terminarem para
+    reconfigurar (a requisição sai sempre pela chave que o rate limiter cobrou)
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._api_key: Optional[str] = None
+        self._in_flight = 0
+
+    @contextmanager
+    def configured(self, genai, api_key: str):
+        with self._condition:
+            while self._api_key != api_key and self._in_flight:
+                self._condition.wait()
+            if self._api_key != api_key:
+                genai.configure(api_key=api_key)
+                self._api_key = api_key
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+
+_gemini_config_gate = _GeminiConfigGate()
+
+
 class EnhancedAIManager:
     """Gerenciador de IA aprimorado com hierarquia OpenRouter e fallbacks"""
 
@@ -29,11 +87,9 @@ class EnhancedAIManager:
         """Inicializa o gerenciador aprimorado com hierarquia OpenRouter"""
         # Carregar chaves OpenRouter
         self.openrouter_keys = self._load_openrouter_keys()
-        self.current_key_index = 0
         
         # Carregar chaves Gemini para fallback
         self.gemini_keys = self._load_gemini_keys()
-        self.current_gemini_key_index = 0
         
         # Configurar hierarquia de modelos
         self.model_hierarchy = [
@@ -42,28 +98,50 @@ class EnhancedAIManager:
                 'provider': 'openrouter',
                 'priority': 1,
                 'max_tokens': 4000,
-                'temperature': 0.7
+                'temperature': 0.7,
+                'context_window': 2000000,
+                'is_free': True
             },
             {
                 'name': 'google/gemini-2.0-flash-exp:free',
                 'provider': 'openrouter',
                 'priority': 2,
                 'max_tokens': 8000,
-                'temperature': 0.7
+                'temperature': 0.7,
+                'context_window': 1048576,
+                'is_free': True
             },
             {
                 'name': 'gemini-2.0-flash-exp',
                 'provider': 'gemini_direct',
                 'priority': 3,
                 'max_tokens': 4000,
-                'temperature': 0.7
+                'temperature': 0.7,
+                'context_window': 1048576,
+                'is_free': True
             }
         ]
         
-        # Controle de rate limiting e delays
-        self.last_request_time = 0
-        self.request_delay = 10  # 10 segundos entre requisições
-        self.request_lock = asyncio.Lock()
+        # Controle de rate limiting: um token bucket por (provedor, chave, modelo)
+        self.rate_limiter = rate_limit_registry
+        
+        # Hedge: prazo por modelo derivado do p95 e vitórias/derrotas por modelo
+        self.hedge_policy = hedge_policy
+        self.usage_stats = {"hedging": {}}
+        
+        # Cache de respostas: reexecuções não repetem chamadas já bem-sucedidas
+        self.response_cache = llm_response_cache
+        
+        # Roteador adaptativo: ordem dos modelos por EWMA de latência/erros/custo
+        self.router = model_router
+        for model_config in self.model_hierarchy:
+            self.router.register(ModelProfile(
+                provider=model_config['provider'],
+                model=model_config['name'],
+                context_window=model_config['context_window'],
+                is_free=model_config['is_free'],
+                priority=model_config['priority']
+            ))
         
         self.search_orchestrator = None
         
@@ -78,7 +156,7 @@ class EnhancedAIManager:
         logger.info("🤖 Enhanced AI Manager inicializado com hierarquia Grok-4 → Gemini-2.0")
         logger.info(f"🔑 {len(self.openrouter_keys)} chaves OpenRouter carregadas")
         logger.info(f"🔑 {len(self.gemini_keys)} chaves Gemini carregadas")
-        logger.info(f"⏱️ Delay configurado: {self.request_delay}s entre requisições")
+        logger.info(f"⏱️ Rate limiting por chave: {self.rate_limiter.get_status()['limits']}")
     
     def _load_openrouter_keys(self) -> List[str]:
         """Carrega múltiplas chaves OpenRouter"""
@@ -116,38 +194,11 @@ class EnhancedAIManager:
         logger.info(f"✅ {len(keys)} chaves Gemini carregadas")
         return keys
     
-    def _get_next_openrouter_key(self) -> Optional[str]:
-        """Obtém próxima chave OpenRouter com rotação"""
-        if not self.openrouter_keys:
-            return None
-            
-        key = self.openrouter_keys[self.current_key_index]
-        self.current_key_index = (self.current_key_index + 1) % len(self.openrouter_keys)
-        logger.info(f"🔄 Rotacionando para chave OpenRouter #{self.current_key_index + 1}/{len(self.openrouter_keys)}")
-        return key
-    
-    def _get_next_gemini_key(self) -> Optional[str]:
-        """Obtém próxima chave Gemini com rotação"""
-        if not self.gemini_keys:
-            return None
-            
-        key = self.gemini_keys[self.current_gemini_key_index]
-        self.current_gemini_key_index = (self.current_gemini_key_index + 1) % len(self.gemini_keys)
-        logger.info(f"🔄 Rotacionando para chave Gemini #{self.current_gemini_key_index + 1}/{len(self.gemini_keys)}")
-        return key
-
-    async def _apply_rate_limit_delay(self):
-        """Aplica delay de 10 segundos entre requisições"""
-        async with self.request_lock:
-            current_time = time.time()
-            time_since_last_request = current_time - self.last_request_time
-            
-            if time_since_last_request < self.request_delay:
-                wait_time = self.request_delay - time_since_last_request
-                logger.info(f"⏱️ Aguardando {wait_time:.2f}s antes da próxima requisição...")
-                await asyncio.sleep(wait_time)
-            
-            self.last_request_time = time.time()
+    @staticmethod
+    def _estimate_tokens(prompt: str, system_prompt: Optional[str], max_tokens: int) -> int:
+        """Estimativa de tokens (entrada + saída) para reservar no bucket"""
+        input_chars = len(prompt) + len(system_prompt or '')
+        return input_chars // 4 + max_tokens
 
     async def _generate_with_openrouter(
         self,
@@ -157,7 +208,7 @@ class EnhancedAIManager:
         temperature: float = 0.7,
         system_prompt: Optional[str] = None
     ) -> Optional[str]:
-        """Gera conteúdo usando OpenRouter com rotação de chaves e delay"""
+        """Gera conteúdo usando OpenRouter com rotação de chaves por capacidade"""
         
         # Preparar mensagens
         messages = []
@@ -165,14 +216,19 @@ class EnhancedAIManager:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
-        # Tentar com todas as chaves disponíveis
+        estimated_tokens = self._estimate_tokens(prompt, system_prompt, max_tokens)
+        tried_keys = set()
+        
+        # Tentar com todas as chaves disponíveis, sempre pela que tiver capacidade
         for attempt in range(len(self.openrouter_keys)):
-            # Aplicar delay antes de cada requisição
-            await self._apply_rate_limit_delay()
-            
-            api_key = self._get_next_openrouter_key()
+            api_key = await self.rate_limiter.acquire(
+                'openrouter', model_name, self.openrouter_keys,
+                estimated_tokens=estimated_tokens, exclude=tried_keys
+            )
             if not api_key:
-                continue
+                break
+            tried_keys.add(api_key)
+            key_id = self.rate_limiter.key_id(api_key)
                 
             try:
                 headers = {
@@ -191,8 +247,9 @@ class EnhancedAIManager:
                 }
                 
                 logger.info(f"📤 Enviando requisição para OpenRouter ({model_name}) - Tentativa {attempt + 1}/{len(self.openrouter_keys)}")
+                started = time.monotonic()
                 
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     async with session.post(
                         "https://openrouter.ai/api/v1/chat/completions",
                         headers=headers,
@@ -203,19 +260,41 @@ class EnhancedAIManager:
                         if response.status == 200:
                             result = await response.json()
                             content = result["choices"][0]["message"]["content"]
-                            logger.info(f"✅ OpenRouter {model_name} sucesso (chave #{self.current_key_index})")
+                            usage = result.get("usage") or {}
+                            if usage.get("total_tokens"):
+                                self.rate_limiter.record_usage(
+                                    'openrouter', api_key, model_name,
+                                    estimated_tokens, usage["total_tokens"]
+                                )
+                            self.router.record_success(
+                                'openrouter', model_name, key_id,
+                                latency=time.monotonic() - started,
+                                input_tokens=usage.get("prompt_tokens", 0),
+                                output_tokens=usage.get("completion_tokens", 0)
+                            )
+                            logger.info(f"✅ OpenRouter {model_name} sucesso (chave {key_id})")
                             return content
+                        elif response.status == 429:
+                            retry_after = parse_retry_after(response.headers)
+                            self.rate_limiter.record_rate_limited('openrouter', api_key, model_name, retry_after)
+                            self.router.record_failure('openrouter', model_name, key_id, rate_limited=True, retry_after=retry_after, aggregate=False)
                         else:
                             error_text = await response.text()
+                            self.router.record_failure('openrouter', model_name, key_id, aggregate=False)
                             logger.warning(f"⚠️ OpenRouter key {attempt + 1} falhou: {response.status} - {error_text[:200]}")
                             
             except asyncio.TimeoutError:
+                self.router.record_failure('openrouter', model_name, key_id, aggregate=False)
                 logger.warning(f"⏱️ Timeout na requisição OpenRouter key {attempt + 1}")
                 continue
             except Exception as e:
+                self.router.record_failure('openrouter', model_name, key_id, aggregate=False)
                 logger.warning(f"⚠️ Erro OpenRouter key {attempt + 1}: {str(e)[:100]}")
                 continue
         
+        if tried_keys:
+            # Um resultado por requisição no agregado do modelo, não um por chave
+            self.router.record_failure('openrouter', model_name)
         logger.error(f"❌ Todas as {len(self.openrouter_keys)} chaves OpenRouter falharam para {model_name}")
         return None
     
@@ -226,24 +305,26 @@ class EnhancedAIManager:
         temperature: float = 0.7,
         system_prompt: Optional[str] = None
     ) -> Optional[str]:
-        """Gera conteúdo usando Gemini direto com rotação de chaves e delay"""
+        """Gera conteúdo usando Gemini direto com rotação de chaves por capacidade"""
         
         try:
             import google.generativeai as genai
             
-            # Tentar com todas as chaves Gemini
+            model_name = "gemini-2.0-flash-exp"
+            estimated_tokens = self._estimate_tokens(prompt, system_prompt, max_tokens)
+            tried_keys = set()
+            
+            # Tentar com todas as chaves Gemini, sempre pela que tiver capacidade
             for attempt in range(len(self.gemini_keys)):
-                # Aplicar delay antes de cada requisição
-                await self._apply_rate_limit_delay()
-                
-                api_key = self._get_next_gemini_key()
+                api_key = await self.rate_limiter.acquire(
+                    'gemini_direct', model_name, self.gemini_keys,
+                    estimated_tokens=estimated_tokens, exclude=tried_keys
+                )
                 if not api_key:
-                    continue
+                    break
+                tried_keys.add(api_key)
                     
                 try:
-                    genai.configure(api_key=api_key)
-                    model = genai.GenerativeModel("gemini-2.0-flash-exp")
-                    
                     # Combinar system prompt e user prompt se necessário
                     full_prompt = prompt
                     if system_prompt:
@@ -257,20 +338,40 @@ class EnhancedAIManager:
                     }
                     
                     logger.info(f"📤 Enviando requisição para Gemini Direct - Tentativa {attempt + 1}/{len(self.gemini_keys)}")
+                    started = time.monotonic()
                     
-                    response = model.generate_content(
-                        full_prompt,
-                        generation_config=generation_config
-                    )
+                    def _generate():
+                        # Configuração global do SDK + geração sob a mesma chave
+                        with _gemini_config_gate.configured(genai, api_key):
+                            model = genai.GenerativeModel(model_name)
+                            return model.generate_content(full_prompt, generation_config=generation_config)
+                    
+                    # SDK síncrono: roda em thread para não bloquear o event loop
+                    response = await asyncio.to_thread(_generate)
                     
                     if response.text:
-                        logger.info(f"✅ Gemini direto sucesso (chave #{self.current_gemini_key_index})")
+                        self.router.record_success(
+                            'gemini_direct', model_name, self.rate_limiter.key_id(api_key),
+                            latency=time.monotonic() - started,
+                            output_tokens=len(response.text) // 4
+                        )
+                        logger.info(f"✅ Gemini direto sucesso (chave {self.rate_limiter.key_id(api_key)})")
                         return response.text
                         
                 except Exception as e:
+                    rate_limited = is_rate_limit_error(e)
+                    retry_after = parse_retry_delay_from_error(e) if rate_limited else None
+                    if rate_limited:
+                        self.rate_limiter.record_rate_limited('gemini_direct', api_key, model_name, retry_after)
+                    self.router.record_failure(
+                        'gemini_direct', model_name, self.rate_limiter.key_id(api_key),
+                        rate_limited=rate_limited, retry_after=retry_after, aggregate=False
+                    )
                     logger.warning(f"⚠️ Erro Gemini key {attempt + 1}: {str(e)[:100]}")
                     continue
             
+            if tried_keys:
+                self.router.record_failure('gemini_direct', model_name)
             logger.error(f"❌ Todas as {len(self.gemini_keys)} chaves Gemini falharam")
             return None
             
@@ -332,11 +433,14 @@ class EnhancedAIManager:
         system_prompt: Optional[str] = None,
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
-        model_override: Optional[str] = None
+        model_override: Optional[str] = None,
+        constraints: Optional[RouteConstraints] = None,
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None
     ) -> str:
         """
         Gera texto usando hierarquia de modelos: Grok-4 → Gemini-2.0 → Gemini Direct
-        Com delay de 10s entre requisições e rotação de APIs
+        Com rate limiting por chave e despacho para a chave com capacidade
         
         Args:
             prompt: Prompt do usuário
@@ -344,6 +448,9 @@ class EnhancedAIManager:
             max_tokens: Máximo de tokens (opcional)
             temperature: Temperatura (opcional)
             model_override: Modelo específico (opcional)
+            constraints: Restrições de roteamento (contexto mínimo, latência máxima, apenas gratuitos)
+            use_cache: False ignora o cache de respostas (leitura e escrita)
+            validate: Só respostas aprovadas por ele são gravadas/reaproveitadas do cache
         
         Returns:
             String com a resposta da IA
@@ -351,41 +458,51 @@ class EnhancedAIManager:
         max_tokens = max_tokens or 4000
         temperature = temperature or 0.7
         
-        # Se modelo específico foi solicitado, tentar apenas ele
-        if model_override:
-            target_models = [m for m in self.model_hierarchy if m['name'] == model_override]
-            if not target_models:
-                # Se modelo não encontrado, usar hierarquia normal
-                target_models = self.model_hierarchy
-        else:
-            target_models = self.model_hierarchy
+        return await self.response_cache.get_or_generate(
+            model_override,
+            prompt,
+            lambda: self._generate_text_uncached(prompt, system_prompt, max_tokens, temperature, model_override, constraints),
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            use_cache=use_cache,
+            validate=validate
+        )
+
+    async def _generate_text_uncached(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        model_override: Optional[str],
+        constraints: Optional[RouteConstraints]
+    ) -> str:
+        """Geração pela hierarquia (hedge ou sequencial), sem consultar o cache"""
+        target_models = self._route_models(model_override, constraints)
+        
+        # Modo hedge: dispara o próximo modelo se o atual passar do prazo (p95)
+        if self.hedge_policy.enabled and len(target_models) > 1:
+            candidates = [
+                (m['name'], lambda m=m: self._generate_with_model(m, prompt, system_prompt, max_tokens, temperature))
+                for m in target_models
+            ]
+            try:
+                model_name, result = await hedged_call(candidates, self.usage_stats['hedging'], self.hedge_policy)
+                logger.info(f"✅ Sucesso com {model_name}")
+                return result
+            except Exception as e:
+                logger.error(f"❌ Todos os modelos da hierarquia falharam: {str(e)[:100]}")
+                raise Exception("Todos os modelos de IA falharam. Verifique as configurações das APIs.")
         
         # Tentar cada modelo na hierarquia
         for model_config in target_models:
             try:
-                logger.info(f"🤖 Tentando {model_config['name']} ({model_config['provider']})")
-                
-                if model_config['provider'] == 'openrouter':
-                    result = await self._generate_with_openrouter(
-                        prompt=prompt,
-                        model_name=model_config['name'],
-                        max_tokens=min(max_tokens, model_config['max_tokens']),
-                        temperature=temperature,
-                        system_prompt=system_prompt
-                    )
-                    
-                elif model_config['provider'] == 'gemini_direct':
-                    result = await self._generate_with_gemini_direct(
-                        prompt=prompt,
-                        max_tokens=min(max_tokens, model_config['max_tokens']),
-                        temperature=temperature,
-                        system_prompt=system_prompt
-                    )
-                else:
-                    logger.warning(f"⚠️ Provider desconhecido: {model_config['provider']}")
-                    continue
+                started = time.monotonic()
+                result = await self._generate_with_model(model_config, prompt, system_prompt, max_tokens, temperature)
                 
                 if result:
+                    self.hedge_policy.record('total', model_config['name'], time.monotonic() - started)
                     logger.info(f"✅ Sucesso com {model_config['name']}")
                     return result
                 else:
@@ -398,6 +515,388 @@ class EnhancedAIManager:
         # Se todos os modelos falharam, usar fallback básico
         logger.error("❌ Todos os modelos da hierarquia falharam")
         raise Exception("Todos os modelos de IA falharam. Verifique as configurações das APIs.")
+
+    def _route_models(
+        self,
+        model_override: Optional[str] = None,
+        constraints: Optional[RouteConstraints] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Modelos na ordem do roteador adaptativo (EWMA de latência, erros, 429 e
+        custo), respeitando as restrições e pulando circuitos abertos
+        """
+        # Se modelo específico foi solicitado, tentar apenas ele
+        if model_override:
+            target_models = [m for m in self.model_hierarchy if m['name'] == model_override]
+            if target_models:
+                return target_models
+        
+        by_name = {m['name']: m for m in self.model_hierarchy}
+        candidates = [(m['provider'], m['name']) for m in self.model_hierarchy]
+        ranked = self.router.rank(candidates, constraints)
+        if not ranked:
+            # Todos os circuitos abertos: tenta mesmo assim, do melhor para o pior
+            logger.warning("⚠️ Todos os circuitos abertos, usando último recurso")
+            ranked = self.router.rank(candidates, constraints, include_open=True)
+        return [by_name[name] for _, name in ranked]
+
+    async def _generate_with_model(
+        self,
+        model_config: Dict[str, Any],
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        temperature: float
+    ) -> Optional[str]:
+        """Gera com um modelo da hierarquia (None se o modelo não retornou resultado)"""
+        logger.info(f"🤖 Tentando {model_config['name']} ({model_config['provider']})")
+        
+        if model_config['provider'] == 'openrouter':
+            return await self._generate_with_openrouter(
+                prompt=prompt,
+                model_name=model_config['name'],
+                max_tokens=min(max_tokens, model_config['max_tokens']),
+                temperature=temperature,
+                system_prompt=system_prompt
+            )
+        elif model_config['provider'] == 'gemini_direct':
+            return await self._generate_with_gemini_direct(
+                prompt=prompt,
+                max_tokens=min(max_tokens, model_config['max_tokens']),
+                temperature=temperature,
+                system_prompt=system_prompt
+            )
+        
+        logger.warning(f"⚠️ Provider desconhecido: {model_config['provider']}")
+        return None
+
+    async def _stream_with_openrouter(
+        self,
+        prompt: str,
+        model_name: str,
+        max_tokens: int = 4000,
+        temperature: float = 0.7,
+        system_prompt: Optional[str] = None,
+        partial: str = ""
+    ) -> AsyncIterator[str]:
+        """Stream SSE do OpenRouter; troca de chave enquanto nenhum delta foi emitido"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        messages = continuation_messages(messages, partial)
+
+        estimated_tokens = self._estimate_tokens(prompt + partial, system_prompt, max_tokens)
+        tried_keys = set()
+
+        for attempt in range(len(self.openrouter_keys)):
+            api_key = await self.rate_limiter.acquire(
+                'openrouter', model_name, self.openrouter_keys,
+                estimated_tokens=estimated_tokens, exclude=tried_keys
+            )
+            if not api_key:
+                break
+            tried_keys.add(api_key)
+
+            headers = {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://github.com/joscarmao/v1800finalv2",
+                "X-Title": "ARQV30 Enhanced v3.0"
+            }
+            payload = {
+                "model": model_name,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature
+            }
+
+            key_id = self.rate_limiter.key_id(api_key)
+            started = time.monotonic()
+            emitted = 0
+            try:
+                async for delta in stream_openai_compatible(
+                    "https://openrouter.ai/api/v1/chat/completions", headers, payload
+                ):
+                    emitted += len(delta)
+                    yield delta
+                self.router.record_success(
+                    'openrouter', model_name, key_id,
+                    latency=time.monotonic() - started, output_tokens=emitted // 4
+                )
+                return
+            except StreamHTTPError as e:
+                if e.status == 429:
+                    retry_after = parse_retry_after(e.headers)
+                    self.rate_limiter.record_rate_limited('openrouter', api_key, model_name, retry_after)
+                    self.router.record_failure('openrouter', model_name, key_id, rate_limited=True, retry_after=retry_after, aggregate=False)
+                else:
+                    self.router.record_failure('openrouter', model_name, key_id, aggregate=False)
+                    logger.warning(f"⚠️ Stream OpenRouter key {attempt + 1} falhou: {str(e)[:200]}")
+            except Exception as e:
+                # Falha após emitir encerra a requisição: registra já o resultado do modelo
+                self.router.record_failure('openrouter', model_name, key_id, aggregate=bool(emitted))
+                if emitted:
+                    raise
+                logger.warning(f"⚠️ Erro no stream OpenRouter key {attempt + 1}: {str(e)[:100]}")
+
+        if tried_keys:
+            self.router.record_failure('openrouter', model_name)
+        raise Exception(f"Stream OpenRouter indisponível para {model_name}")
+
+    async def _stream_with_gemini_direct(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        temperature: float = 0.7,
+        system_prompt: Optional[str] = None,
+        partial: str = ""
+    ) -> AsyncIterator[str]:
+        """Stream do Gemini (streamGenerateContent) com rotação de chaves por capacidade"""
+        model_name = "gemini-2.0-flash-exp"
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        request_data = {
+            "contents": continuation_contents([{"role": "user", "parts": [{"text": full_prompt}]}], partial),
+            "generationConfig": {
+                "temperature": temperature,
+                "topP": 0.95,
+                "topK": 64,
+                "maxOutputTokens": max_tokens
+            }
+        }
+
+        estimated_tokens = self._estimate_tokens(prompt + partial, system_prompt, max_tokens)
+        tried_keys = set()
+
+        for attempt in range(len(self.gemini_keys)):
+            api_key = await self.rate_limiter.acquire(
+                'gemini_direct', model_name, self.gemini_keys,
+                estimated_tokens=estimated_tokens, exclude=tried_keys
+            )
+            if not api_key:
+                break
+            tried_keys.add(api_key)
+
+            key_id = self.rate_limiter.key_id(api_key)
+            started = time.monotonic()
+            emitted = 0
+            try:
+                async for delta in stream_gemini(
+                    "https://generativelanguage.googleapis.com/v1beta", model_name, api_key, request_data
+                ):
+                    emitted += len(delta)
+                    yield delta
+                self.router.record_success(
+                    'gemini_direct', model_name, key_id,
+                    latency=time.monotonic() - started, output_tokens=emitted // 4
+                )
+                return
+            except StreamHTTPError as e:
+                if e.status == 429:
+                    retry_after = parse_retry_after(e.headers)
+                    self.rate_limiter.record_rate_limited('gemini_direct', api_key, model_name, retry_after)
+                    self.router.record_failure('gemini_direct', model_name, key_id, rate_limited=True, retry_after=retry_after, aggregate=False)
+                else:
+                    self.router.record_failure('gemini_direct', model_name, key_id, aggregate=False)
+                    logger.warning(f"⚠️ Stream Gemini key {attempt + 1} falhou: {str(e)[:200]}")
+            except Exception as e:
+                # Falha após emitir encerra a requisição: registra já o resultado do modelo
+                self.router.record_failure('gemini_direct', model_name, key_id, aggregate=bool(emitted))
+                if emitted:
+                    raise
+                logger.warning(f"⚠️ Erro no stream Gemini key {attempt + 1}: {str(e)[:100]}")
+
+        if tried_keys:
+            self.router.record_failure('gemini_direct', model_name)
+        raise Exception("Stream Gemini indisponível")
+
+    async def stream_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        model_override: Optional[str] = None,
+        metrics: Optional[StreamMetrics] = None,
+        initial_partial: str = "",
+        constraints: Optional[RouteConstraints] = None
+    ) -> AsyncIterator[str]:
+        """
+        Versão em streaming de generate_text: itera os deltas de texto à medida
+        que chegam, percorrendo a mesma hierarquia de modelos.
+
+        Se a conexão cair no meio da geração, o stream é reaberto com o texto
+        parcial (no mesmo modelo e, esgotadas as retomadas, no próximo), de modo
+        que quem consome recebe uma sequência contínua de deltas.
+        `initial_partial` retoma uma geração interrompida anteriormente (os
+        deltas emitidos são apenas a continuação).
+        """
+        max_tokens = max_tokens or 4000
+        temperature = temperature or 0.7
+
+        target_models = self._route_models(model_override, constraints)
+        target_models = [m for m in target_models if m['provider'] in ('openrouter', 'gemini_direct')]
+
+        def model_stream(model_config: Dict[str, Any], base: str) -> AsyncIterator[str]:
+            model_max_tokens = min(max_tokens, model_config['max_tokens'])
+
+            def open_stream(model_partial: str) -> AsyncIterator[str]:
+                # Junta o que veio de modelos anteriores ao parcial deste modelo
+                combined = base + model_partial
+                if model_config['provider'] == 'openrouter':
+                    return self._stream_with_openrouter(
+                        prompt, model_config['name'], model_max_tokens, temperature, system_prompt, combined
+                    )
+                return self._stream_with_gemini_direct(
+                    prompt, model_max_tokens, temperature, system_prompt, combined
+                )
+
+            return resumable_stream(open_stream, metrics=metrics)
+
+        partial = initial_partial
+
+        # Modo hedge: corrida pelo primeiro token entre os modelos da hierarquia
+        if self.hedge_policy.enabled and len(target_models) > 1:
+            winner = {}
+
+            def on_winner(model_name: str):
+                winner['name'] = model_name
+                if metrics:
+                    metrics.model = model_name
+
+            candidates = [(m['name'], lambda m=m: model_stream(m, initial_partial)) for m in target_models]
+            try:
+                async for delta in hedged_stream(candidates, self.usage_stats['hedging'], self.hedge_policy, on_winner):
+                    partial += delta
+                    yield delta
+                logger.info(f"✅ Stream concluído com {winner['name']}")
+                return
+            except Exception as e:
+                if 'name' not in winner:
+                    logger.error(f"❌ Todos os modelos da hierarquia falharam no streaming: {str(e)[:100]}")
+                    raise Exception("Todos os modelos de IA falharam. Verifique as configurações das APIs.")
+                logger.error(f"❌ Stream falhou com {winner['name']}: {str(e)[:100]}")
+                names = [m['name'] for m in target_models]
+                target_models = target_models[names.index(winner['name']) + 1:]
+
+        for model_config in target_models:
+            logger.info(f"🌊 Streaming com {model_config['name']} ({model_config['provider']})")
+            if metrics:
+                metrics.model = model_config['name']
+            started = time.monotonic()
+            first = True
+            try:
+                async for delta in model_stream(model_config, partial):
+                    if first:
+                        self.hedge_policy.record('ttft', model_config['name'], time.monotonic() - started)
+                        first = False
+                    partial += delta
+                    yield delta
+                logger.info(f"✅ Stream concluído com {model_config['name']}")
+                return
+            except Exception as e:
+                logger.error(f"❌ Stream falhou com {model_config['name']}: {str(e)[:100]}")
+                continue
+
+        logger.error("❌ Todos os modelos da hierarquia falharam no streaming")
+        raise Exception("Todos os modelos de IA falharam. Verifique as configurações das APIs.")
+
+    async def generate_text_streaming(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        model_override: Optional[str] = None,
+        session_id: Optional[str] = None,
+        output_path: Optional[Union[str, Path]] = None,
+        name: str = "geracao",
+        constraints: Optional[RouteConstraints] = None,
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """
+        Gera texto via streaming e retorna a resposta completa.
+
+        Args:
+            session_id: Sessão cujo ProgressTracker recebe time-to-first-token e tokens/s
+            output_path: Arquivo final; a saída parcial vai para <arquivo>.partial
+                enquanto os tokens chegam e o arquivo final é gravado ao concluir.
+                Um .partial deixado por execução anterior interrompida é retomado
+                só se vier do mesmo prompt/modelo/parâmetros (.partial.meta)
+            name: Identificador da geração nas métricas
+            constraints: Restrições de roteamento repassadas a stream_text
+            use_cache: False ignora o cache de respostas; um acerto grava o
+                arquivo final direto, sem abrir stream
+            validate: Validação do chamador (ex.: recusa, conteúdo curto); só
+                respostas aprovadas são gravadas no cache ou servidas dele
+        """
+        cache_params = dict(
+            system_prompt=system_prompt,
+            temperature=temperature or 0.7,
+            max_tokens=max_tokens or 4000
+        )
+        if use_cache:
+            cached = await self.response_cache.get(model_override, prompt, **cache_params)
+            if cached is not None and self.response_cache.accepts(cached, validate):
+                if output_path:
+                    PartialOutputWriter(Path(output_path)).finalize(cached)
+                metrics = StreamMetrics(name=name, status='cached')
+                metrics.on_delta(cached)
+                metrics.finished_at = time.monotonic()
+                report_stream_metrics(session_id, metrics)
+                return cached
+        else:
+            self.response_cache.stats['bypassed'] += 1
+
+        metrics = StreamMetrics(name=name)
+        fingerprint = PartialOutputWriter.fingerprint(model=model_override, prompt=prompt, **cache_params)
+        previous = PartialOutputWriter.read_partial(Path(output_path), fingerprint) if output_path else ""
+        writer = PartialOutputWriter(Path(output_path), fingerprint) if output_path else None
+        chunks = [previous] if previous else []
+        if previous:
+            writer.write(previous)
+            logger.info(f"🔁 Retomando {name} a partir de {len(previous)} caracteres salvos")
+
+        try:
+            async for delta in self.stream_text(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                model_override=model_override,
+                metrics=metrics,
+                initial_partial=previous,
+                constraints=constraints
+            ):
+                chunks.append(delta)
+                metrics.on_delta(delta)
+                if writer:
+                    writer.write(delta)
+                if metrics.chunks == 1:
+                    report_stream_metrics(session_id, metrics)
+            metrics.status = 'completed'
+        except Exception:
+            metrics.status = 'failed'
+            raise
+        finally:
+            metrics.finished_at = time.monotonic()
+            if writer:
+                writer.close()
+            report_stream_metrics(session_id, metrics)
+
+        content = "".join(chunks)
+        if writer:
+            writer.finalize(content)
+        if use_cache and self.response_cache.accepts(content, validate):
+            await self.response_cache.set(model_override, prompt, content, **cache_params)
+
+        summary = metrics.to_dict()
+        logger.info(
+            f"🌊 {name}: TTFT {summary['time_to_first_token']}s, "
+            f"{summary['tokens_per_second']} tokens/s, {summary['tokens']} tokens, {summary['resumes']} retomada(s)"
+        )
+        return content
     
     def generate_text_sync(
         self,
@@ -485,11 +984,12 @@ class EnhancedAIManager:
         session_id: str = None,
         max_search_iterations: int = 3,
         preferred_model: str = None,
-        min_processing_time: int = 0
+        min_processing_time: int = 0,
+        validate: Optional[Callable[[str], bool]] = None
     ) -> str:
         """
         Gera conteúdo com busca ativa usando hierarquia Grok-4 → Gemini
-        Com delay de 10s entre requisições
+        Com rate limiting por chave; só respostas aprovadas por `validate` vão para o cache
         """
         logger.info(f"🔍 Iniciando geração com busca ativa (modelo: {preferred_model or 'hierarquia'})")
         
@@ -511,12 +1011,14 @@ class EnhancedAIManager:
                     for result in search_results:
                         additional_context += f"- {result.get('title', 'Sem título')}: {result.get('snippet', result.get('description', ''))}\n"
 
+        # Contexto já embutido no prompt (ex.: síntese) não é enviado duas vezes
+        context_section = f"CONTEXTO PRINCIPAL:\n{context}" if context and context not in prompt else ""
+
         # Prepara prompt com instruções de busca e contexto
         enhanced_prompt = f"""
 {prompt}
 
-CONTEXTO PRINCIPAL:
-{context}
+{context_section}
 
 {additional_context if additional_context else ""}
 
@@ -546,7 +1048,8 @@ IMPORTANTE: Gere uma análise completa e profissional baseando-se em TODOS os da
                 system_prompt=system_prompt,
                 max_tokens=4000,
                 temperature=0.7,
-                model_override=preferred_model
+                model_override=preferred_model,
+                validate=validate
             )
             
             # Garantir tempo mínimo de processamento se especificado
@@ -564,7 +1067,7 @@ IMPORTANTE: Gere uma análise completa e profissional baseando-se em TODOS os da
             logger.error(f"❌ Erro na geração com busca ativa: {e}")
             # Fallback simples
             try:
-                return await self.generate_text(enhanced_prompt, system_prompt)
+                return await self.generate_text(enhanced_prompt, system_prompt, validate=validate)
             except Exception as e2:
                 logger.error(f"❌ Erro no fallback: {e2}")
                 raise
@@ -605,7 +1108,7 @@ IMPORTANTE: Gere uma análise completa e profissional baseando-se em TODOS os da
         model_preference: str = None
     ) -> str:
         """
-        Analisa conteúdo usando hierarquia OpenRouter com delay
+        Analisa conteúdo usando hierarquia OpenRouter com rate limiting
         
         Args:
             content: Conteúdo para análise
@@ -658,7 +1161,7 @@ Seja específico, prático e acionável em suas recomendações.
         depth: str = "deep"
     ) -> str:
         """
-        Gera insights baseados em dados usando hierarquia OpenRouter com delay
+        Gera insights baseados em dados usando hierarquia OpenRouter com rate limiting
         
         Args:
             data: Dados para análise
@@ -707,21 +1210,21 @@ Seja específico, use números quando relevante e forneça insights acionáveis.
         return {
             "openrouter_keys_count": len(self.openrouter_keys),
             "gemini_keys_count": len(self.gemini_keys),
-            "current_openrouter_key_index": self.current_key_index,
-            "current_gemini_key_index": self.current_gemini_key_index,
-            "request_delay_seconds": self.request_delay,
-            "last_request_time": self.last_request_time,
+            "rate_limits": self.rate_limiter.get_status(),
             "search_orchestrator_available": self.search_orchestrator is not None,
             "model_hierarchy": [m['name'] for m in self.model_hierarchy],
+            "usage_stats": self.usage_stats,
+            "hedging": self.hedge_policy.get_stats(),
+            "routing": self.router.get_status(),
+            "response_cache": self.response_cache.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
 
     def reset_failed_models(self):
-        """Reseta índices de rotação de chaves"""
-        self.current_key_index = 0
-        self.current_gemini_key_index = 0
-        self.last_request_time = 0
-        logger.info("✅ Índices de rotação resetados")
+        """Reseta os buckets de rate limiting de todos os provedores"""
+        for provider, config in list(self.rate_limiter.provider_limits.items()):
+            self.rate_limiter.configure(provider, config.requests_per_minute, config.tokens_per_minute)
+        logger.info("✅ Buckets de rate limiting resetados")
 
 # Instância global para uso em todo o projeto
 enhanced_ai_manager = EnhancedAIManager()
@@ -765,8 +1268,7 @@ if __name__ == "__main__":
         try:
             manager = EnhancedAIManager()
             
-            print("🧪 Testando geração de texto com delay e rotação de APIs...")
-            print(f"⏱️ Delay configurado: {manager.request_delay}s entre requisições")
+            print("🧪 Testando geração de texto com rate limiting por chave...")
             print(f"🔑 Chaves OpenRouter disponíveis: {len(manager.openrouter_keys)}")
             print(f"🔑 Chaves Gemini disponíveis: {len(manager.gemini_keys)}")
             print()
@@ -780,8 +1282,8 @@ if __name__ == "__main__":
             print(f"✅ Resposta 1 (primeiros 200 chars): {response1[:200]}...")
             print()
             
-            # Teste 2: Segunda requisição (deve aguardar 10s)
-            print("📝 Teste 2: Segunda requisição (testando delay)")
+            # Teste 2: Segunda requisição (usa capacidade restante do bucket)
+            print("📝 Teste 2: Segunda requisição (testando rate limiting)")
             response2 = await manager.generate_text(
                 prompt="O que é machine learning?",
                 system_prompt="Você é um especialista em IA"
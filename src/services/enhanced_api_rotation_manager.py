@@ -8,7 +8,7 @@ import os
 import time
 import random
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, AsyncIterator
 from dataclasses import dataclass
 from enum import Enum
 import json
@@ -23,6 +23,17 @@ except ImportError:
     AIOHTTP_AVAILABLE = False
 from dotenv import load_dotenv
 
+from services.http_client_pool import http_client_pool
+from services.llm_streaming import (
+    stream_openai_compatible,
+    stream_gemini,
+    continuation_messages,
+    continuation_contents,
+    resumable_stream
+)
+from services.model_router import model_router, ModelProfile
+from services.llm_response_cache import llm_response_cache
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
@@ -92,6 +103,13 @@ class EnhancedAPIRotationManager:
             'content_extraction': [['firecrawl'], ['jina'], ['apify'], ['scrapingant'], ['serper'], ['rapidapi']],
             'url_analysis': [['firecrawl'], ['jina'], ['exa'], ['apify'], ['serper'], ['serpapi']]
         }
+        # Roteador adaptativo: ordena cada grupo da cadeia de IA por latência/erros
+        # e substitui a recuperação por tempo fixo por circuit breakers por chave
+        self.model_router = model_router
+        for priority, group in enumerate(self.fallback_chains['ai_generation'], 1):
+            for service in group:
+                self.model_router.register(ModelProfile(provider='rotation', model=service, priority=priority))
+        
         self.current_api_index = {}
         self.lock = threading.Lock()
         self.health_check_interval = 300  # 5 minutos
@@ -448,17 +466,41 @@ class EnhancedAPIRotationManager:
                 return True
             return False
         
-        if api.status == APIStatus.ERROR and api.error_count > 5:
-            return False
+        if api.status == APIStatus.ERROR:
+            # Circuito da chave fechado/half-open libera nova tentativa
+            return self.model_router.is_available('rotation', self._service_of(api), api.name)
         
         return True
     
+    def _service_of(self, api: APIEndpoint) -> Optional[str]:
+        """Serviço (chave de self.apis) ao qual a API pertence"""
+        for service, apis in self.apis.items():
+            if api in apis:
+                return service
+        return None
+    
+    def _ranked_chain(self, service_type: str) -> List[List[str]]:
+        """
+        Cadeia de fallback do tipo de serviço. A ordem dos grupos é a configurada
+        pelo operador; para geração de IA, o roteador adaptativo só reordena os
+        serviços dentro de cada grupo (mesma prioridade)
+        """
+        chain = self.fallback_chains[service_type]
+        if service_type not in ('ai_models', 'ai_generation'):
+            return chain
+        return [
+            [service for _, service in self.model_router.rank([('rotation', s) for s in group], include_open=True)]
+            if len(group) > 1 else group
+            for group in chain
+        ]
+    
     def mark_api_error(self, service: str, api_name: str, error: Exception):
         """Marca API como com erro e força rotação imediata"""
         with self.lock:
             for i, api in enumerate(self.apis[service]):
                 if api.name == api_name:
                     api.error_count += 1
+                    self.model_router.record_failure('rotation', service, api_name)
                     
                     # Rotação IMEDIATA na primeira falha para garantir disponibilidade
                     api.status = APIStatus.ERROR
@@ -482,26 +524,9 @@ class EnhancedAPIRotationManager:
                         if not next_api_found:
                             logger.error(f"❌ Nenhuma API alternativa disponível para {service}")
                     
-                    # Recuperação mais rápida - 1 minuto para tentar novamente
-                    self._schedule_api_recovery(service, api_name, recovery_time=60)
+                    # Retorno controlado pelo circuit breaker da chave (sem thread de recuperação)
                     break
     
-    def _schedule_api_recovery(self, service: str, api_name: str, recovery_time: int = 60):
-        """Agenda recuperação automática da API após período de cooldown"""
-        def recover_api():
-            time.sleep(recovery_time)  # Cooldown configurável (padrão 1 minuto)
-            with self.lock:
-                for api in self.apis[service]:
-                    if api.name == api_name:
-                        api.status = APIStatus.ACTIVE
-                        api.error_count = 0
-                        logger.info(f"✅ API {api_name} RECUPERADA automaticamente após {recovery_time}s")
-                        break
-        
-        import threading
-        threading.Thread(target=recover_api, daemon=True).start()
-        logger.info(f"⏱️ Recuperação de {api_name} agendada para {recovery_time} segundos")
-    
     def mark_api_rate_limited(self, service: str, api_name: str, reset_time: Optional[datetime] = None):
         """Marca API como rate limited"""
         with self.lock:
@@ -509,6 +534,10 @@ class EnhancedAPIRotationManager:
                 if api.name == api_name:
                     api.status = APIStatus.RATE_LIMITED
                     api.rate_limit_reset = reset_time or (datetime.now() + timedelta(minutes=1))
+                    self.model_router.record_failure(
+                        'rotation', service, api_name, rate_limited=True,
+                        retry_after=max(0.0, (api.rate_limit_reset - datetime.now()).total_seconds())
+                    )
                     logger.warning(f"⚠️ API {api_name} rate limited até {api.rate_limit_reset}")
                     break
     
@@ -520,7 +549,7 @@ class EnhancedAPIRotationManager:
             logger.warning(f"⚠️ Tipo de serviço desconhecido: {service_type}")
             return None
         
-        chain = self.fallback_chains[service_type]
+        chain = self._ranked_chain(service_type)
         
         # Se um serviço específico falhou, começar do próximo na cadeia
         start_index = 0
@@ -586,8 +615,8 @@ class EnhancedAPIRotationManager:
         if service_type not in self.fallback_chains:
             return None
         
-        # Tentar primeiro serviço da cadeia
-        primary_services = self.fallback_chains[service_type][0]
+        # Tentar primeiro serviço da cadeia (melhor segundo o roteador)
+        primary_services = self._ranked_chain(service_type)[0]
         
         for service_name in primary_services:
             if service_name in self.apis and self.apis[service_name]:
@@ -627,6 +656,9 @@ class EnhancedAPIRotationManager:
             
             report['services'][service] = service_status
         
+        report['routing'] = self.model_router.get_status()
+        report['response_cache'] = llm_response_cache.get_stats()
+        report['ai_chain'] = [group[0] for group in self._ranked_chain('ai_generation')]
         return report
     
     def reset_api_errors(self, service: str = None):
@@ -678,7 +710,22 @@ class EnhancedAPIRotationManager:
         """
         Método generate_text para compatibilidade com código legado
         Usa rotação automática de APIs para geração de texto
+        Respostas bem-sucedidas vão para o cache de LLM (use_cache=False ignora)
         """
+        use_cache = kwargs.pop('use_cache', True)
+        cache_model = model or 'rotation'
+        cache_params = {
+            'system_prompt': kwargs.get('system_prompt'),
+            'temperature': kwargs.get('temperature'),
+            'max_tokens': kwargs.get('max_tokens')
+        }
+        if use_cache:
+            cached = await llm_response_cache.get(cache_model, prompt, **cache_params)
+            if cached is not None:
+                return cached
+        else:
+            llm_response_cache.stats['bypassed'] += 1
+        
         try:
             # Determinar tipo de serviço baseado no modelo
             service_type = 'ai_generation'
@@ -700,6 +747,8 @@ class EnhancedAPIRotationManager:
             
             if response:
                 logger.info(f"✅ Texto gerado com sucesso via {api.name}")
+                if use_cache:
+                    await llm_response_cache.set(cache_model, prompt, response, **cache_params)
                 return response
             else:
                 raise Exception(f"Falha na geração de texto via {api.name}")
@@ -713,6 +762,8 @@ class EnhancedAPIRotationManager:
                     response = await self._make_api_call(fallback_api, prompt, model, **kwargs)
                     if response:
                         logger.info(f"✅ Texto gerado via fallback {fallback_api.name}")
+                        if use_cache:
+                            await llm_response_cache.set(cache_model, prompt, response, **cache_params)
                         return response
             except Exception as fallback_error:
                 logger.error(f"❌ Fallback também falhou: {fallback_error}")
@@ -724,23 +775,37 @@ class EnhancedAPIRotationManager:
         """
         Faz chamada para API específica
         """
+        service = self._service_of(api)
+        started = time.monotonic()
         try:
             if 'qwen' in api.name or 'openrouter' in api.name:
-                return await self._call_openrouter_api(api, prompt, model, **kwargs)
+                response = await self._call_openrouter_api(api, prompt, model, **kwargs)
             elif 'gemini' in api.name:
-                return await self._call_gemini_api(api, prompt, **kwargs)
+                response = await self._call_gemini_api(api, prompt, **kwargs)
             elif 'groq' in api.name:
-                return await self._call_groq_api(api, prompt, model, **kwargs)
+                response = await self._call_groq_api(api, prompt, model, **kwargs)
             elif 'openai' in api.name:
-                return await self._call_openai_api(api, prompt, model, **kwargs)
+                response = await self._call_openai_api(api, prompt, model, **kwargs)
             else:
                 logger.warning(f"⚠️ Tipo de API não reconhecido: {api.name}")
                 return None
+            
+            if response:
+                self.model_router.record_success(
+                    'rotation', service, api.name,
+                    latency=time.monotonic() - started,
+                    output_tokens=len(response) // 4
+                )
+                if api.status == APIStatus.ERROR:
+                    api.status = APIStatus.ACTIVE
+                    api.error_count = 0
+            return response
                 
         except Exception as e:
             logger.error(f"❌ Erro na chamada da API {api.name}: {e}")
             # Marcar API como com erro
-            self.mark_api_error(api.name.split('_')[0], api.name, e)
+            if service:
+                self.mark_api_error(service, api.name, e)
             raise e
     
     async def _call_openrouter_api(self, api: APIEndpoint, prompt: str, model: str = None, **kwargs) -> str:
@@ -762,7 +827,7 @@ class EnhancedAPIRotationManager:
                 'temperature': kwargs.get('temperature', 0.7)
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_client_pool.session() as session:
                 async with session.post(
                     f"{api.base_url}/chat/completions",
                     headers=headers,
@@ -797,7 +862,7 @@ class EnhancedAPIRotationManager:
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_client_pool.session() as session:
                 async with session.post(
                     url,
                     json=data,
@@ -831,7 +896,7 @@ class EnhancedAPIRotationManager:
                 'temperature': kwargs.get('temperature', 0.7)
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_client_pool.session() as session:
                 async with session.post(
                     f"{api.base_url}/chat/completions",
                     headers=headers,
@@ -866,7 +931,7 @@ class EnhancedAPIRotationManager:
                 'temperature': kwargs.get('temperature', 0.7)
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_client_pool.session() as session:
                 async with session.post(
                     f"{api.base_url}/chat/completions",
                     headers=headers,
@@ -884,6 +949,75 @@ class EnhancedAPIRotationManager:
             logger.error(f"❌ Erro na chamada OpenAI: {e}")
             raise e
     
+    async def stream_text(self, prompt: str, model: str = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Versão em streaming de generate_text: itera os deltas de texto.
+        Falha antes do primeiro delta passa para a API de fallback; queda no
+        meio da geração é retomada a partir do texto parcial.
+        """
+        service_type = 'ai_generation'
+        api = self.get_api_with_fallback(service_type)
+        if not api:
+            raise Exception("Nenhuma API disponível para geração de texto")
+
+        candidates = [api]
+        fallback_api = self.get_fallback_api(service_type)
+        if fallback_api and fallback_api != api:
+            candidates.append(fallback_api)
+
+        partial = ""
+        for candidate in candidates:
+            def open_stream(api_partial: str, candidate=candidate, base=partial):
+                return self._stream_api_call(candidate, prompt, model, base + api_partial, **kwargs)
+
+            try:
+                async for delta in resumable_stream(open_stream):
+                    partial += delta
+                    yield delta
+                logger.info(f"✅ Stream concluído via {candidate.name}")
+                return
+            except Exception as e:
+                logger.error(f"❌ Stream falhou via {candidate.name}: {e}")
+                service = self._service_of(candidate)
+                if service:
+                    self.mark_api_error(service, candidate.name, e)
+
+        raise Exception("Falha no streaming de texto em todas as APIs")
+
+    def _stream_api_call(self, api: APIEndpoint, prompt: str, model: str = None, partial: str = "", **kwargs) -> AsyncIterator[str]:
+        """Abre o stream da API específica (mesmo despacho de _make_api_call)"""
+        max_tokens = kwargs.get('max_tokens', 4000)
+        temperature = kwargs.get('temperature', 0.7)
+
+        if 'gemini' in api.name:
+            request_data = {
+                'contents': continuation_contents([{'role': 'user', 'parts': [{'text': prompt}]}], partial),
+                'generationConfig': {'maxOutputTokens': max_tokens, 'temperature': temperature}
+            }
+            return stream_gemini(api.base_url, 'gemini-2.0-flash-exp', api.api_key, request_data)
+
+        headers = {
+            'Authorization': f'Bearer {api.api_key}',
+            'Content-Type': 'application/json'
+        }
+        if 'qwen' in api.name or 'openrouter' in api.name:
+            headers.update({'HTTP-Referer': 'https://arqv30.com', 'X-Title': 'ARQV30 Enhanced'})
+            default_model = 'qwen/qwen-2.5-72b-instruct'
+        elif 'groq' in api.name:
+            default_model = 'llama-3.1-70b-versatile'
+        elif 'openai' in api.name:
+            default_model = 'gpt-3.5-turbo'
+        else:
+            raise Exception(f"Tipo de API não reconhecido: {api.name}")
+
+        data = {
+            'model': model or default_model,
+            'messages': continuation_messages([{'role': 'user', 'content': prompt}], partial),
+            'max_tokens': max_tokens,
+            'temperature': temperature
+        }
+        return stream_openai_compatible(f"{api.base_url}/chat/completions", headers, data)
+
     def _generate_fallback_response(self, prompt: str) -> str:
         """
         Gera resposta estruturada básica quando todas as APIs falham
@@ -9,6 +9,7 @@ import os
 import logging
 import asyncio
 import json
+import time
 from typing import Dict, List, Any
 from datetime import datetime
 from pathlib import Path
@@ -144,7 +145,8 @@ class EnhancedModuleProcessor:
                 'description': 'Protocolo completo para criação de sequência de 4 CPLs de alta performance',
                 'use_active_search': True,
                 'type': 'specialized',
-                'requires': ['sintese_master', 'avatar_data', 'contexto_estrategico', 'dados_web']
+                'requires': ['sintese_master', 'avatar_data', 'contexto_estrategico', 'dados_web'],
+                'depends_on': ['avatars', 'drivers_mentais']
             },
             # Módulos adicionais para completar os 26 módulos
             'analise_sentimento': {
@@ -179,8 +181,39 @@ class EnhancedModuleProcessor:
             }
         }
 
+        # Limite de módulos gerados em paralelo (respeitando 'depends_on')
+        self.max_concurrent_modules = max(1, int(os.getenv('MODULES_MAX_CONCURRENCY', '4')))
+
         logger.info("🚀 Enhanced Module Processor inicializado")
 
+    def _resolve_module_dependencies(self) -> Dict[str, List[str]]:
+        """Valida 'depends_on' dos módulos e descarta dependências inválidas ou cíclicas"""
+        dependencies = {}
+        for module_name, config in self.modules_config.items():
+            deps = []
+            for dep in config.get('depends_on', []):
+                if dep in self.modules_config and dep != module_name:
+                    deps.append(dep)
+                else:
+                    logger.warning(f"⚠️ Dependência inválida ignorada: {module_name} -> {dep}")
+            dependencies[module_name] = deps
+
+        # Ordenação topológica (Kahn) para detectar ciclos
+        pending = {name: set(deps) for name, deps in dependencies.items()}
+        resolved = set()
+        while pending:
+            ready = [name for name, deps in pending.items() if deps <= resolved]
+            if not ready:
+                logger.error(f"❌ Ciclo de dependências entre módulos: {sorted(pending)} - executando sem dependências")
+                for name in pending:
+                    dependencies[name] = []
+                break
+            for name in ready:
+                resolved.add(name)
+                del pending[name]
+
+        return dependencies
+
     async def generate_all_modules(self, session_id: str) -> Dict[str, Any]:
         """Gera todos os módulos (16 padrão + 1 especializado CPL)"""
         logger.info(f"🚀 Iniciando geração de todos os módulos para sessão: {session_id}")
@@ -201,85 +234,131 @@ class EnhancedModuleProcessor:
         modules_dir = Path(f"analyses_data/{session_id}/modules")
         modules_dir.mkdir(parents=True, exist_ok=True)
 
-        # Gera cada módulo
-        for module_name, config in self.modules_config.items():
+        # Gera os módulos em paralelo respeitando as dependências declaradas
+        dependencies = self._resolve_module_dependencies()
+        semaphore = asyncio.Semaphore(self.max_concurrent_modules)
+        finished = {name: asyncio.Event() for name in self.modules_config}
+        results["module_timings"] = {}
+        step_start = time.perf_counter()
+
+        async def run_module(module_name: str, config: Dict[str, Any]):
             try:
-                logger.info(f"📝 Gerando módulo: {module_name}")
+                for dep in dependencies[module_name]:
+                    await finished[dep].wait()
 
-                # Verifica se é o módulo especializado CPL
-                if module_name == 'cpl_completo':
-                    # CORREÇÃO 2: Usar método direto do protocolo CPL
+                async with semaphore:
+                    module_start = time.perf_counter()
                     try:
-                        from services.cpl_devastador_protocol import CPLDevastadorProtocol
-                        cpl_protocol = CPLDevastadorProtocol()
-
-                        # Corrigida a referência a 'context' para 'base_data' e corrigida a chave 'publico'
-                        tema = base_data.get('contexto_estrategico', {}).get('tema', 'Produto/Serviço')
-                        segmento = base_data.get('contexto_estrategico', {}).get('segmento', 'Mercado')
-                        publico_alvo = base_data.get('contexto_estrategico', {}).get('publico_alvo', 'Público-alvo')
-
-                        cpl_content = await cpl_protocol.executar_protocolo_completo(
-                            tema=tema,
-                            segmento=segmento,
-                            publico_alvo=publico_alvo,
-                            session_id=session_id
-                        )
-                    except ImportError:
-                        logger.warning("CPL Protocol não disponível, usando conteúdo padrão")
-                        cpl_content = {
-                            'titulo': 'Protocolo de CPLs Devastadores',
-                            'descricao': 'Módulo CPL em desenvolvimento',
-                            'status': 'fallback'
-                        }
-                else:
-                    # Gera conteúdo do módulo padrão
-                    if config.get('use_active_search', False):
-                        content = await self.ai_manager.generate_with_active_search(
-                            prompt=self._get_module_prompt(module_name, config, base_data),
-                            context=base_data.get('context', ''),
-                            session_id=session_id
-                        )
-                    else:
-                        content = await self.ai_manager.generate_text(
-                            prompt=self._get_module_prompt(module_name, config, base_data)
-                        )
-
-                    # CORREÇÃO: Verificar se a IA recusou gerar conteúdo
-                    if self._is_ai_refusal(content):
-                        logger.warning(f"⚠️ IA recusou gerar {module_name}, usando fallback")
-                        content = self._generate_fallback_content(module_name, config, base_data)
-                    
-                    # Verificar se conteúdo é válido
-                    if not content or len(content.strip()) < 100:
-                        logger.warning(f"⚠️ Conteúdo insuficiente para {module_name}, gerando fallback")
-                        content = self._generate_fallback_content(module_name, config, base_data)
-
-                    # Salva módulo padrão
-                    module_path = modules_dir / f"{module_name}.md"
-                    with open(module_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-
-                results["successful_modules"] += 1
-                results["modules_generated"].append(module_name)
-
-                logger.info(f"✅ Módulo {module_name} gerado com sucesso")
-
-            except Exception as e:
-                logger.error(f"❌ Erro ao gerar módulo {module_name}: {e}")
-                salvar_erro(f"modulo_{module_name}", e, contexto={"session_id": session_id})
-                results["failed_modules"] += 1
-                results["modules_failed"].append({
-                    "module": module_name,
-                    "error": str(e)
-                })
+                        await self._generate_module(session_id, module_name, config, base_data, modules_dir)
+
+                        results["successful_modules"] += 1
+                        results["modules_generated"].append(module_name)
+
+                        logger.info(f"✅ Módulo {module_name} gerado com sucesso")
+
+                    except Exception as e:
+                        logger.error(f"❌ Erro ao gerar módulo {module_name}: {e}")
+                        salvar_erro(f"modulo_{module_name}", e, contexto={"session_id": session_id})
+                        results["failed_modules"] += 1
+                        results["modules_failed"].append({
+                            "module": module_name,
+                            "error": str(e)
+                        })
+                    finally:
+                        results["module_timings"][module_name] = round(time.perf_counter() - module_start, 2)
+            finally:
+                finished[module_name].set()
+
+        await asyncio.gather(*(
+            run_module(module_name, config)
+            for module_name, config in self.modules_config.items()
+        ))
+
+        # Mantém a ordem declarada para o relatório consolidado
+        order = list(self.modules_config)
+        results["modules_generated"].sort(key=order.index)
+        results["modules_failed"].sort(key=lambda item: order.index(item["module"]))
+        results["total_time_seconds"] = round(time.perf_counter() - step_start, 2)
+        results["sequential_time_seconds"] = round(sum(results["module_timings"].values()), 2)
 
         # Gera relatório consolidado
         await self._generate_consolidated_report(session_id, results)
 
         logger.info(f"✅ Geração concluída: {results['successful_modules']}/{results['total_modules']} módulos")
+        logger.info(f"⏱️ Tempo total: {results['total_time_seconds']}s (soma dos módulos: {results['sequential_time_seconds']}s)")
 
         return results
 
+    async def _generate_module(
+        self,
+        session_id: str,
+        module_name: str,
+        config: Dict[str, Any],
+        base_data: Dict[str, Any],
+        modules_dir: Path
+    ) -> None:
+        """Gera um único módulo e grava o .md assim que ele fica pronto"""
+        logger.info(f"📝 Gerando módulo: {module_name}")
+
+        # Verifica se é o módulo especializado CPL
+        if module_name == 'cpl_completo':
+            # CORREÇÃO 2: Usar método direto do protocolo CPL
+            try:
+                from services.cpl_devastador_protocol import CPLDevastadorProtocol
+                cpl_protocol = CPLDevastadorProtocol()
+
+                # Corrigida a referência a 'context' para 'base_data' e corrigida a chave 'publico'
+                tema = base_data.get('contexto_estrategico', {}).get('tema', 'Produto/Serviço')
+                segmento = base_data.get('contexto_estrategico', {}).get('segmento', 'Mercado')
+                publico_alvo = base_data.get('contexto_estrategico', {}).get('publico_alvo', 'Público-alvo')
+
+                cpl_content = await cpl_protocol.executar_protocolo_completo(
+                    tema=tema,
+                    segmento=segmento,
+                    publico_alvo=publico_alvo,
+                    session_id=session_id
+                )
+            except ImportError:
+                logger.warning("CPL Protocol não disponível, usando conteúdo padrão")
+                cpl_content = {
+                    'titulo': 'Protocolo de CPLs Devastadores',
+                    'descricao': 'Módulo CPL em desenvolvimento',
+                    'status': 'fallback'
+                }
+        else:
+            # Gera conteúdo do módulo padrão
+            if config.get('use_active_search', False):
+                content = await self.ai_manager.generate_with_active_search(
+                    prompt=self._get_module_prompt(module_name, config, base_data),
+                    context=base_data.get('context', ''),
+                    session_id=session_id,
+                    validate=self._is_valid_module_content
+                )
+            else:
+                # Streaming: saída parcial gravada em <módulo>.md.partial enquanto gera
+                content = await self.ai_manager.generate_text_streaming(
+                    prompt=self._get_module_prompt(module_name, config, base_data),
+                    session_id=session_id,
+                    output_path=modules_dir / f"{module_name}.md",
+                    name=module_name,
+                    validate=self._is_valid_module_content
+                )
+
+            # CORREÇÃO: Verificar se a IA recusou gerar conteúdo
+            if self._is_ai_refusal(content):
+                logger.warning(f"⚠️ IA recusou gerar {module_name}, usando fallback")
+                content = self._generate_fallback_content(module_name, config, base_data)
+            
+            # Verificar se conteúdo é válido
+            if not content or len(content.strip()) < 100:
+                logger.warning(f"⚠️ Conteúdo insuficiente para {module_name}, gerando fallback")
+                content = self._generate_fallback_content(module_name, config, base_data)
+
+            # Salva módulo padrão
+            module_path = modules_dir / f"{module_name}.md"
+            with open(module_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
     def _load_base_data(self, session_id: str) -> Dict[str, Any]:
         """Carrega dados base da sessão"""
         try:
@@ -386,6 +465,10 @@ Gere um conteúdo extremamente detalhado e prático.
 
         return base_prompt
 
+    def _is_valid_module_content(self, content: str) -> bool:
+        """Conteúdo aproveitável (sem recusa e com tamanho mínimo); só ele vai para o cache de LLM"""
+        return not self._is_ai_refusal(content) and len(content.strip()) >= 100
+
     def _is_ai_refusal(self, content: str) -> bool:
         """Detecta se a IA recusou gerar conteúdo"""
         if not content or len(content.strip()) < 50:
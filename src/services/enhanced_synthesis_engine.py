@@ -16,6 +16,9 @@ from pathlib import Path
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from services.consolidado_store import consolidado_store
+from services.context_packer import context_packer, PreparedCorpus
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,6 +60,9 @@ class EnhancedSynthesisEngine:
         self.ai_manager = None
         self._initialize_ai_manager()
         self.metrics_cache = {}
+        # Empacotamento do contexto por relevância (false = JSON completo como antes)
+        self.context_packing_enabled = os.getenv('SYNTHESIS_CONTEXT_PACKING', 'true').lower() == 'true'
+        self.context_stats = {}
         
         logger.info("🧠 Enhanced Synthesis Engine v4.0 inicializado")
 
@@ -351,79 +357,26 @@ TORNE-SE O MAIOR EXPERT NESTE MERCADO BASEADO NO QUE APRENDEU!
             
             # 2. CONSTRUÇÃO DO CONTEXTO COMPLETO
             logger.info("🗂️ FASE 2: Construindo contexto COMPLETO...")
-            full_context = self._build_synthesis_context_from_json(**data_sources)
+            full_context = self._build_synthesis_context_from_json(
+                **data_sources,
+                synthesis_type=synthesis_type,
+                session_id=session_id
+            )
             
             context_size = len(full_context)
             logger.info(f"📊 Contexto: {context_size:,} chars (~{context_size//4:,} tokens)")
             
-            if context_size < 500000:
+            if not self.context_packing_enabled and context_size < 500000:
                 logger.warning("⚠️ Contexto pode ser insuficiente para especialização profunda")
             
-            # 3. PROMPT DE ESPECIALIZAÇÃO PROFUNDA
-            specialization_prompt = self._create_deep_specialization_prompt(
-                synthesis_type, 
-                full_context
-            )
-            
-            # 4. EXECUÇÃO DA ESPECIALIZAÇÃO
-            logger.info("🧠 FASE 3: Executando ESPECIALIZAÇÃO PROFUNDA...")
-            logger.info("⏱️ Este processo pode levar 5-10 minutos")
-            
-            if not self.ai_manager:
-                raise SynthesisExecutionError("AI Manager não disponível")
-            
-            synthesis_result = await self.ai_manager.generate_with_active_search(
-                prompt=specialization_prompt,
-                context=full_context,
-                session_id=session_id,
-                max_search_iterations=15
-            )
-            
-            # 5. PROCESSA E VALIDA RESULTADO
-            processed_synthesis = self._process_synthesis_result(synthesis_result)
-            
-            # 6. CALCULA MÉTRICAS
-            processing_time = (datetime.now() - start_time).total_seconds()
-            metrics = SynthesisMetrics(
-                context_size=context_size,
-                processing_time=processing_time,
-                ai_searches=self._count_ai_searches(synthesis_result),
-                data_sources=sum(1 for v in data_sources.values() if v),
-                confidence_level=float(processed_synthesis.get('validacao_dados', {})
-                                     .get('nivel_confianca', '0%').rstrip('%')),
-                timestamp=datetime.now().isoformat()
-            )
-            
-            self.metrics_cache[session_id] = metrics
-            
-            # 7. SALVA SÍNTESE
-            synthesis_path = self._save_synthesis_result(
-                session_id, 
-                processed_synthesis, 
-                synthesis_type,
-                metrics
-            )
-            
-            # 8. GERA RELATÓRIO
-            synthesis_report = self._generate_synthesis_report(
-                processed_synthesis, 
+            return await self._run_synthesis(
                 session_id,
-                metrics
+                synthesis_type,
+                full_context,
+                data_sources_count=sum(1 for v in data_sources.values() if v),
+                start_time=start_time
             )
             
-            logger.info(f"✅ Síntese concluída em {processing_time:.2f}s: {synthesis_path}")
-            
-            return {
-                "success": True,
-                "session_id": session_id,
-                "synthesis_type": synthesis_type,
-                "synthesis_path": synthesis_path,
-                "synthesis_data": processed_synthesis,
-                "synthesis_report": synthesis_report,
-                "metrics": asdict(metrics),
-                "timestamp": datetime.now().isoformat()
-            }
-            
         except DataLoadError as e:
             logger.error(f"❌ Erro ao carregar dados: {e}")
             return self._create_error_response(session_id, str(e), "data_load_error")
@@ -436,6 +389,145 @@ TORNE-SE O MAIOR EXPERT NESTE MERCADO BASEADO NO QUE APRENDEU!
             logger.error(f"❌ Erro inesperado na síntese: {e}", exc_info=True)
             return self._create_error_response(session_id, str(e), "unexpected_error")
 
+    async def _run_synthesis(
+        self,
+        session_id: str,
+        synthesis_type: str,
+        full_context: str,
+        data_sources_count: int,
+        start_time: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Fases 3-8 da síntese: prompt, geração, processamento, métricas, salvamento e relatório"""
+        start_time = start_time or datetime.now()
+        context_size = len(full_context)
+        
+        # 3. PROMPT DE ESPECIALIZAÇÃO PROFUNDA
+        specialization_prompt = self._create_deep_specialization_prompt(
+            synthesis_type, 
+            full_context
+        )
+        
+        # 4. EXECUÇÃO DA ESPECIALIZAÇÃO
+        logger.info("🧠 FASE 3: Executando ESPECIALIZAÇÃO PROFUNDA...")
+        logger.info("⏱️ Este processo pode levar 5-10 minutos")
+        
+        if not self.ai_manager:
+            raise SynthesisExecutionError("AI Manager não disponível")
+        
+        synthesis_result = await self.ai_manager.generate_with_active_search(
+            prompt=specialization_prompt,
+            context=full_context,
+            session_id=session_id,
+            max_search_iterations=15
+        )
+        
+        # 5. PROCESSA E VALIDA RESULTADO
+        processed_synthesis = self._process_synthesis_result(synthesis_result)
+        
+        # 6. CALCULA MÉTRICAS
+        processing_time = (datetime.now() - start_time).total_seconds()
+        metrics = SynthesisMetrics(
+            context_size=context_size,
+            processing_time=processing_time,
+            ai_searches=self._count_ai_searches(synthesis_result),
+            data_sources=data_sources_count,
+            confidence_level=float(processed_synthesis.get('validacao_dados', {})
+                                 .get('nivel_confianca', '0%').rstrip('%')),
+            timestamp=datetime.now().isoformat()
+        )
+        
+        self.metrics_cache[session_id] = metrics
+        
+        # 7. SALVA SÍNTESE
+        synthesis_path = self._save_synthesis_result(
+            session_id, 
+            processed_synthesis, 
+            synthesis_type,
+            metrics
+        )
+        
+        # 8. GERA RELATÓRIO
+        synthesis_report = self._generate_synthesis_report(
+            processed_synthesis, 
+            session_id,
+            metrics
+        )
+        
+        logger.info(f"✅ Síntese concluída em {processing_time:.2f}s: {synthesis_path}")
+        
+        return {
+            "success": True,
+            "session_id": session_id,
+            "synthesis_type": synthesis_type,
+            "synthesis_path": synthesis_path,
+            "synthesis_data": processed_synthesis,
+            "synthesis_report": synthesis_report,
+            "metrics": asdict(metrics),
+            "context_packing": self.context_stats.get(session_id, {}).get(synthesis_type),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def execute_synthesis_batch(
+        self,
+        session_id: str,
+        synthesis_types: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa várias sínteses da mesma sessão em paralelo.
+        Os dados da Etapa 1 são carregados e o corpus é preparado uma única vez;
+        cada tipo recebe seu próprio contexto empacotado e as chamadas de IA
+        concorrem pelo rate limiter compartilhado.
+        """
+        synthesis_types = synthesis_types or [t.value for t in SynthesisType]
+        start_time = datetime.now()
+        logger.info(f"🧠 Lote de sínteses para sessão {session_id}: {', '.join(synthesis_types)}")
+        
+        data_sources = await self._load_all_data_sources(session_id)
+        if not data_sources['consolidacao']:
+            return self._create_error_response(
+                session_id, "Arquivo de consolidação da Etapa 1 não encontrado", "data_load_error"
+            )
+        data_sources_count = sum(1 for v in data_sources.values() if v)
+        
+        if self.context_packing_enabled:
+            sections = self._json_sections(**data_sources)
+            corpus = await asyncio.to_thread(
+                context_packer.prepare, {key: data for key, (data, _) in sections.items() if data}
+            )
+            contexts = {t: self._pack_context(sections, t, session_id, corpus) for t in synthesis_types}
+        else:
+            full_context = self._build_synthesis_context_from_json(**data_sources)
+            contexts = {t: full_context for t in synthesis_types}
+        
+        outcomes = await asyncio.gather(
+            *(self._run_synthesis(session_id, t, contexts[t], data_sources_count) for t in synthesis_types),
+            return_exceptions=True
+        )
+        
+        results = {}
+        for synthesis_type, outcome in zip(synthesis_types, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"❌ Síntese {synthesis_type} falhou: {outcome}")
+                results[synthesis_type] = self._create_error_response(session_id, str(outcome), "execution_error")
+            else:
+                results[synthesis_type] = outcome
+        
+        total_time = (datetime.now() - start_time).total_seconds()
+        sequential_time = sum(
+            r['metrics']['processing_time'] for r in results.values() if r.get('success') and r.get('metrics')
+        )
+        logger.info(f"✅ Lote de sínteses concluído em {total_time:.2f}s (soma sequencial: {sequential_time:.2f}s)")
+        
+        return {
+            "success": any(r.get('success') for r in results.values()),
+            "session_id": session_id,
+            "results": results,
+            "metrics": {t: r.get('metrics') for t, r in results.items()},
+            "total_time_seconds": total_time,
+            "sequential_time_seconds": sequential_time,
+            "timestamp": datetime.now().isoformat()
+        }
+
     async def _load_all_data_sources(self, session_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
         """Carrega todas as fontes de dados de forma assíncrona"""
         tasks = {
@@ -455,18 +547,16 @@ TORNE-SE O MAIOR EXPERT NESTE MERCADO BASEADO NO QUE APRENDEU!
         return results
 
     def _load_consolidacao_etapa1(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Carrega arquivo consolidado.json da pesquisa web"""
+        """Carrega o consolidado da pesquisa web (JSONL append-only ou consolidado.json legado)"""
         try:
-            consolidado_path = Path(f"analyses_data/pesquisa_web/{session_id}/consolidado.json")
+            data = consolidado_store.load(session_id)
             
-            if not consolidado_path.exists():
-                logger.warning(f"⚠️ Consolidado não encontrado: {consolidado_path}")
+            if data is None:
+                logger.warning(f"⚠️ Consolidado não encontrado para sessão: {session_id}")
                 return None
             
-            with open(consolidado_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logger.info(f"✅ Consolidação carregada: {len(data.get('trechos', []))} trechos")
-                return data
+            logger.info(f"✅ Consolidação carregada: {len(data.get('trechos', []))} trechos")
+            return data
                 
         except Exception as e:
             logger.error(f"❌ Erro ao carregar consolidação: {e}")
@@ -519,30 +609,41 @@ TORNE-SE O MAIOR EXPERT NESTE MERCADO BASEADO NO QUE APRENDEU!
             logger.error(f"❌ Erro ao carregar viral search: {e}")
             return None
 
+    def _json_sections(
+        self,
+        consolidacao: Optional[Dict[str, Any]] = None,
+        viral_results: Optional[Dict[str, Any]] = None,
+        viral_search: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Seções do contexto (chave → (dados, título)) a partir dos JSONs da Etapa 1"""
+        return {
+            'consolidacao': (consolidacao, "DADOS DE CONSOLIDAÇÃO DA ETAPA 1"),
+            'viral_results': (viral_results, "DADOS DE ANÁLISE VIRAL"),
+            'viral_search': (viral_search, "DADOS DE BUSCA VIRAL COMPLETADA")
+        }
+
     def _build_synthesis_context_from_json(
         self, 
         consolidacao: Optional[Dict[str, Any]] = None,
         viral_results: Optional[Dict[str, Any]] = None,
-        viral_search: Optional[Dict[str, Any]] = None
+        viral_search: Optional[Dict[str, Any]] = None,
+        synthesis_type: str = "master_synthesis",
+        session_id: Optional[str] = None
     ) -> str:
-        """Constrói contexto COMPLETO para síntese - SEM COMPRESSÃO"""
+        """Constrói contexto para síntese - trechos mais relevantes dentro do orçamento de tokens"""
         
-        context_parts = []
+        sections = self._json_sections(consolidacao, viral_results, viral_search)
         
-        if consolidacao:
-            context_parts.append("# DADOS COMPLETOS DE CONSOLIDAÇÃO DA ETAPA 1")
-            context_parts.append(json.dumps(consolidacao, indent=2, ensure_ascii=False))
-            context_parts.append("\n" + "="*80 + "\n")
+        if self.context_packing_enabled:
+            return self._pack_context(sections, synthesis_type, session_id)
         
-        if viral_results:
-            context_parts.append("# DADOS COMPLETOS DE ANÁLISE VIRAL")
-            context_parts.append(json.dumps(viral_results, indent=2, ensure_ascii=False))
-            context_parts.append("\n" + "="*80 + "\n")
+        context_parts = []
         
-        if viral_search:
-            context_parts.append("# DADOS COMPLETOS DE BUSCA VIRAL COMPLETADA")
-            context_parts.append(json.dumps(viral_search, indent=2, ensure_ascii=False))
-            context_parts.append("\n" + "="*80 + "\n")
+        for data, title in sections.values():
+            if data:
+                context_parts.append(f"# {title}")
+                context_parts.append(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+                context_parts.append("\n" + "="*80 + "\n")
         
         full_context = "\n".join(context_parts)
         
@@ -550,6 +651,27 @@ TORNE-SE O MAIOR EXPERT NESTE MERCADO BASEADO NO QUE APRENDEU!
         
         return full_context
 
+    def _pack_context(
+        self,
+        sections: Dict[str, Any],
+        synthesis_type: str,
+        session_id: Optional[str] = None,
+        corpus: Optional[PreparedCorpus] = None
+    ) -> str:
+        """Empacota as seções com o context_packer usando o orçamento dos modelos da hierarquia"""
+        model_names = [m['name'] for m in getattr(self.ai_manager, 'model_hierarchy', [])]
+        if corpus is None:
+            corpus = context_packer.prepare({key: data for key, (data, _) in sections.items() if data})
+        packed = context_packer.pack_corpus(
+            corpus,
+            synthesis_type=synthesis_type,
+            token_budget=context_packer.budget_for_models(model_names),
+            section_titles={key: title for key, (_, title) in sections.items()}
+        )
+        if session_id:
+            self.context_stats.setdefault(session_id, {})[synthesis_type] = packed.stats
+        return packed.text
+
     def _process_synthesis_result(self, synthesis_result: str) -> Dict[str, Any]:
         """Processa resultado da síntese com validação aprimorada - VERSÃO CORRIGIDA"""
         logger.info(f"📊 Processando síntese: {len(synthesis_result)} chars")
@@ -1188,7 +1310,9 @@ TORNE-SE O MAIOR EXPERT NESTE MERCADO BASEADO NO QUE APRENDEU!
                 viral_results=viral_results,
                 collection_report=collection_report,
                 consolidated_text=consolidated_text,
-                statistics=statistics
+                statistics=statistics,
+                synthesis_type=synthesis_type,
+                session_id=session_id
             )
             
             context_size = len(full_context)
@@ -1256,6 +1380,7 @@ TORNE-SE O MAIOR EXPERT NESTE MERCADO BASEADO NO QUE APRENDEU!
                 "synthesis_data": processed_synthesis,
                 "synthesis_report": synthesis_report,
                 "metrics": asdict(metrics),
+                "context_packing": self.context_stats.get(session_id, {}).get(synthesis_type),
                 "timestamp": datetime.now().isoformat(),
                 "massive_data_used": True
             }
@@ -1279,74 +1404,37 @@ TORNE-SE O MAIOR EXPERT NESTE MERCADO BASEADO NO QUE APRENDEU!
         viral_results: Dict[str, Any],
         collection_report: str,
         consolidated_text: str,
-        statistics: Dict[str, Any]
+        statistics: Dict[str, Any],
+        synthesis_type: str = "master_synthesis",
+        session_id: Optional[str] = None
     ) -> str:
-        """Constrói contexto completo a partir dos dados massivos"""
+        """Constrói contexto a partir dos dados massivos"""
+        sections = {
+            'statistics': (statistics, "ESTATÍSTICAS CONSOLIDADAS DA COLETA"),
+            'search_results': (search_results, "RESULTADOS DE BUSCA WEB"),
+            'viral_analysis': (viral_analysis, "ANÁLISE DE CONTEÚDO VIRAL"),
+            'viral_results': (viral_results, "RESULTADOS VIRAIS DETALHADOS"),
+            'collection_report': (collection_report, "RELATÓRIO DE COLETA"),
+            'consolidated_text': (consolidated_text, "CONTEÚDO TEXTUAL CONSOLIDADO")
+        }
+        
+        if self.context_packing_enabled:
+            full_context = self._pack_context(sections, synthesis_type, session_id)
+            logger.info(f"📊 Contexto construído do massive data: {len(full_context):,} chars")
+            return full_context
+        
         context_parts = []
         
-        # Estatísticas gerais
-        if statistics:
-            context_parts.append("# ESTATÍSTICAS CONSOLIDADAS DA COLETA")
-            context_parts.append(json.dumps(statistics, indent=2, ensure_ascii=False))
-            context_parts.append("\n" + "="*80 + "\n")
-        
-        # Resultados de busca
-        if search_results:
-            context_parts.append("# RESULTADOS DE BUSCA WEB")
-            if isinstance(search_results, dict):
-                context_parts.append(json.dumps(search_results, indent=2, ensure_ascii=False))
-            else:
-                context_parts.append(str(search_results))
-            context_parts.append("\n" + "="*80 + "\n")
-        
-        # Análise viral
-        if viral_analysis:
-            context_parts.append("# ANÁLISE DE CONTEÚDO VIRAL")
-            if isinstance(viral_analysis, dict):
-                context_parts.append(json.dumps(viral_analysis, indent=2, ensure_ascii=False))
-            else:
-                context_parts.append(str(viral_analysis))
-            context_parts.append("\n" + "="*80 + "\n")
-        
-        # Resultados virais
-        if viral_results:
-            context_parts.append("# RESULTADOS VIRAIS DETALHADOS")
-            if isinstance(viral_results, dict):
-                context_parts.append(json.dumps(viral_results, indent=2, ensure_ascii=False))
-            else:
-                context_parts.append(str(viral_results))
-            context_parts.append("\n" + "="*80 + "\n")
-        
-        # Relatório de coleta
-        if collection_report:
-            context_parts.append("# RELATÓRIO DE COLETA")
-            if isinstance(collection_report, dict):
-                context_parts.append(json.dumps(collection_report, indent=2, ensure_ascii=False))
-            else:
-                context_parts.append(str(collection_report))
-            context_parts.append("\n" + "="*80 + "\n")
-        
-        # Texto consolidado
-        if consolidated_text:
-            context_parts.append("# CONTEÚDO TEXTUAL CONSOLIDADO")
-            if isinstance(consolidated_text, dict):
-                context_parts.append(json.dumps(consolidated_text, indent=2, ensure_ascii=False))
-            else:
-                context_parts.append(str(consolidated_text))
-            context_parts.append("\n" + "="*80 + "\n")
-        
-        # Garante que todos os itens são strings antes do join
-        context_parts_str = []
-        for i, part in enumerate(context_parts):
-            if isinstance(part, dict):
-                logger.warning(f"⚠️ Item {i} ainda é dict, convertendo...")
-                context_parts_str.append(json.dumps(part, indent=2, ensure_ascii=False))
-            elif isinstance(part, str):
-                context_parts_str.append(part)
-            else:
-                context_parts_str.append(str(part))
+        for data, title in sections.values():
+            if data:
+                context_parts.append(f"# {title}")
+                if isinstance(data, (dict, list)):
+                    context_parts.append(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+                else:
+                    context_parts.append(str(data))
+                context_parts.append("\n" + "="*80 + "\n")
         
-        full_context = "\n".join(context_parts_str)
+        full_context = "\n".join(context_parts)
         
         logger.info(f"📊 Contexto construído do massive data: {len(full_context):,} chars")
         
@@ -15,6 +15,8 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 from dotenv import load_dotenv
 
+from services.http_client_pool import http_client_pool
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -158,7 +160,7 @@ class GeminiDirectClient:
                 
                 logger.info(f"🤖 Tentativa {attempt + 1} com chave Gemini {self.current_key_index + 1}")
                 
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     async with session.post(
                         url,
                         headers=headers,
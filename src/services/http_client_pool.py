@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - HTTP Client Pool
+Camada HTTP compartilhada por todos os provedores de IA e de busca: uma sessão
+aiohttp de longa duração por event loop (keep-alive, cache de DNS, limite de
+conexões por host), timeouts e retries uniformes e métricas de reuso. A sessão
+de um loop é fechada quando ele termina (asyncio.run) ou descartada quando o
+loop aparece fechado
+"""
+
+import os
+import ssl
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, Callable, Tuple
+from dotenv import load_dotenv
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Métodos que podem ser repetidos (queda de conexão ou resposta 5xx) sem efeitos colaterais
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+class LoopLocal:
+    """
+    Valores por event loop, indexados por id(loop). Guardar o loop como chave fraca
+    não funciona (sessões e semáforos mantêm referência forte a ele), então entradas
+    de loops já fechados são removidas (e passadas a `discard`) a cada acesso
+    """
+
+    def __init__(self, discard: Optional[Callable[[Any], None]] = None):
+        self._entries: Dict[int, Tuple[asyncio.AbstractEventLoop, Any]] = {}
+        self._discard = discard
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        closed = [key for key, (loop, _) in self._entries.items() if loop.is_closed()]
+        for key in closed:
+            _, value = self._entries.pop(key)
+            if self._discard:
+                self._discard(value)
+
+    def get(self, default: Any = None) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._prune()
+            entry = self._entries.get(id(loop))
+        return entry[1] if entry and entry[0] is loop else default
+
+    def set(self, value: Any):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._prune()
+            self._entries[id(loop)] = (loop, value)
+
+    def setdefault(self, factory: Callable[[], Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._prune()
+            entry = self._entries.get(id(loop))
+            if entry is None or entry[0] is not loop:
+                entry = self._entries[id(loop)] = (loop, factory())
+        return entry[1]
+
+    def pop(self, default: Any = None) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._entries.pop(id(loop), None)
+        return entry[1] if entry else default
+
+    def values(self) -> list:
+        with self._lock:
+            self._prune()
+            return [value for _, value in self._entries.values()]
+
+
+async def _close_on_loop_shutdown(session: 'aiohttp.ClientSession'):
+    """Gerador sentinela: asyncio.run (shutdown_asyncgens) o finaliza e a sessão é fechada"""
+    try:
+        yield
+    finally:
+        if not session.closed:
+            await session.close()
+
+
+async def bind_session_to_loop(session: 'aiohttp.ClientSession'):
+    """
+    Fecha `session` quando o event loop atual encerrar seus geradores assíncronos.
+    Retorna o gerador sentinela, que deve ser mantido junto da sessão
+    """
+    sentinel = _close_on_loop_shutdown(session)
+    await sentinel.__anext__()
+    return sentinel
+
+
+def discard_session(entry: Tuple['aiohttp.ClientSession', Any]):
+    """Descarta a sessão de um loop já fechado sem aguardar (o loop não roda mais)"""
+    session = entry[0]
+    if session.closed:
+        return
+    connector = session.connector
+    try:
+        # close() é corrotina nas versões recentes; _close() faz o fechamento síncrono
+        closing = connector._close() if hasattr(connector, '_close') else connector.close()
+        if asyncio.iscoroutine(closing):
+            closing.close()
+    except Exception:
+        pass
+    session.detach()
+
+
+class _RetryingRequest:
+    """
+    Context manager de requisição com retries.
+    Falhas ao abrir a conexão (nada foi enviado) são repetidas para qualquer método.
+    Quedas depois do envio (ex.: keep-alive fechado pelo servidor) e respostas
+    502/503/504 só para métodos idempotentes ou com `retry=True` explícito: um POST
+    a um provedor de LLM repetido gera (e cobra) uma segunda geração.
+    """
+
+    def __init__(self, pool: 'HTTPClientPool', method: str, url: str, kwargs: Dict[str, Any],
+                 retry: Optional[bool] = None):
+        self._pool = pool
+        self._method = method.upper()
+        self._url = url
+        self._kwargs = kwargs
+        self._resendable = self._method in IDEMPOTENT_METHODS if retry is None else retry
+        self._response = None
+
+    def __await__(self):
+        return self.__aenter__().__await__()
+
+    async def __aenter__(self):
+        session = await self._pool.get_session()
+        retries = self._pool.max_retries
+        for attempt in range(retries + 1):
+            try:
+                response = await session.request(self._method, self._url, **self._kwargs)
+            except (aiohttp.ClientConnectionError, aiohttp.ServerDisconnectedError) as e:
+                not_sent = isinstance(e, aiohttp.ClientConnectorError)
+                if (attempt >= retries or isinstance(e, aiohttp.ClientSSLError)
+                        or not (not_sent or self._resendable)):
+                    raise
+                self._pool.stats['retries'] += 1
+                logger.debug(f"🔁 Retry {attempt + 1} de {self._method} {self._url}: {e}")
+                await asyncio.sleep(self._pool.backoff(attempt))
+                continue
+
+            if response.status in RETRY_STATUSES and self._resendable and attempt < retries:
+                response.release()
+                self._pool.stats['retries'] += 1
+                await asyncio.sleep(self._pool.backoff(attempt))
+                continue
+
+            self._response = response
+            return response
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._response is not None:
+            self._response.release()
+
+
+class PooledSession:
+    """
+    Visão de uma sessão compartilhada com timeout/cabeçalhos padrão próprios.
+    Substitui `aiohttp.ClientSession(...)` nos módulos: sair do `async with`
+    não fecha as conexões do pool.
+    """
+
+    def __init__(self, pool: 'HTTPClientPool', timeout=None, headers: Optional[Dict[str, str]] = None, verify_ssl: bool = True):
+        self._pool = pool
+        self._timeout = timeout
+        self._headers = headers
+        self._verify_ssl = verify_ssl
+
+    async def __aenter__(self) -> 'PooledSession':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    def request(self, method: str, url: str, retry: Optional[bool] = None, **kwargs) -> _RetryingRequest:
+        """`retry=True` habilita retries também para métodos não idempotentes"""
+        if self._timeout is not None:
+            kwargs.setdefault('timeout', self._timeout)
+        else:
+            kwargs.setdefault('timeout', self._pool.default_timeout)
+        if self._headers:
+            kwargs['headers'] = {**self._headers, **(kwargs.get('headers') or {})}
+        if not self._verify_ssl:
+            kwargs.setdefault('ssl', False)
+        return _RetryingRequest(self._pool, method, url, kwargs, retry=retry)
+
+    def get(self, url: str, **kwargs) -> _RetryingRequest:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> _RetryingRequest:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> _RetryingRequest:
+        return self.request('PUT', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> _RetryingRequest:
+        return self.request('HEAD', url, **kwargs)
+
+    async def close(self):
+        """As conexões pertencem ao pool; nada a fechar aqui"""
+        return None
+
+    @property
+    def closed(self) -> bool:
+        return False
+
+
+class HTTPClientPool:
+    """Dono das sessões aiohttp de longa duração (uma por event loop)"""
+
+    def __init__(self):
+        self.max_connections = int(os.getenv('HTTP_POOL_MAX_CONNECTIONS', '100'))
+        self.max_per_host = int(os.getenv('HTTP_POOL_MAX_PER_HOST', '10'))
+        self.keepalive_timeout = float(os.getenv('HTTP_POOL_KEEPALIVE', '30'))
+        self.dns_cache_ttl = int(os.getenv('HTTP_POOL_DNS_TTL', '300'))
+        self.max_retries = int(os.getenv('HTTP_POOL_RETRIES', '2'))
+        self.default_timeout = aiohttp.ClientTimeout(
+            # Mesmo total padrão do aiohttp (chamadas longas de LLM); chamadas curtas passam o próprio timeout
+            total=float(os.getenv('HTTP_POOL_TIMEOUT', '300')),
+            connect=float(os.getenv('HTTP_POOL_CONNECT_TIMEOUT', '10'))
+        ) if HAS_AIOHTTP else None
+
+        # (sessão, sentinela) por event loop
+        self._sessions = LoopLocal(discard=discard_session)
+        self.stats = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+            'retries': 0,
+            'sessions_created': 0
+        }
+
+        logger.info(f"🌐 HTTP Client Pool inicializado ({self.max_connections} conexões, {self.max_per_host}/host)")
+
+    def backoff(self, attempt: int) -> float:
+        return min(4.0, 0.25 * (2 ** attempt)) + random.uniform(0, 0.1)
+
+    def _trace_config(self) -> 'aiohttp.TraceConfig':
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.stats['requests'] += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats['connections_reused'] += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.stats['dns_cache_hits'] += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.stats['dns_cache_misses'] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace
+
+    async def get_session(self) -> 'aiohttp.ClientSession':
+        """Sessão aiohttp do event loop atual (criada sob demanda)"""
+        if not HAS_AIOHTTP:
+            raise RuntimeError("aiohttp não instalado")
+        session, _ = self._sessions.get((None, None))
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=ssl.create_default_context()
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                headers=DEFAULT_HEADERS,
+                timeout=self.default_timeout,
+                trace_configs=[self._trace_config()]
+            )
+            self._sessions.set((session, await bind_session_to_loop(session)))
+            self.stats['sessions_created'] += 1
+        return session
+
+    def session(self, timeout=None, headers: Optional[Dict[str, str]] = None, verify_ssl: bool = True) -> PooledSession:
+        """
+        Substituto de `aiohttp.ClientSession(timeout=..., headers=...)`:
+
+            async with http_client_pool.session(timeout=timeout) as session:
+                async with session.get(url) as response:
+                    ...
+        """
+        return PooledSession(self, timeout=timeout, headers=headers, verify_ssl=verify_ssl)
+
+    async def close(self):
+        """Fecha a sessão do event loop atual"""
+        session, _ = self._sessions.pop((None, None))
+        if session and not session.closed:
+            await session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        connections = self.stats['connections_created'] + self.stats['connections_reused']
+        return dict(
+            self.stats,
+            open_sessions=sum(1 for s, _ in self._sessions.values() if not s.closed),
+            connection_reuse_rate=round(self.stats['connections_reused'] / connections, 3) if connections else 0.0
+        )
+
+
+# Instância global
+http_client_pool = HTTPClientPool()
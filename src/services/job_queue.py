@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Job Queue
+Execução de jobs em segundo plano: fila persistente em SQLite com
+prioridades, cancelamento e limite de concorrência por tenant, atendida por
+um pool limitado de workers, cada um dono de um event loop de longa duração
+(as sessões do pool HTTP e demais recursos por loop são reaproveitados entre jobs)
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[..., Awaitable[Any]]
+
+# Estados de um job
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    """Fila (global ou do tenant) no limite: o chamador deve tentar mais tarde"""
+
+
+class JobTimeoutError(Exception):
+    """Chamada síncrona (run_sync) não terminou dentro do tempo limite"""
+
+
+class SQLiteJobStore:
+    """Persistência dos jobs em SQLite"""
+
+    def __init__(self, db_path: str = "analyses_data/jobs.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    tenant TEXT NOT NULL,
+                    session_id TEXT,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    owner TEXT,
+                    heartbeat_at REAL
+                )
+            """)
+            # Bancos criados antes do controle de dono/heartbeat dos jobs em execução
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'owner' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            if 'heartbeat_at' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, priority, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs(session_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def insert(self, job: Dict[str, Any]):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, payload, tenant, session_id, priority, status, created_at) "
+                "VALUES (:job_id, :kind, :payload, :tenant, :session_id, :priority, :status, :created_at)",
+                job
+            )
+
+    def count_queued(self, tenant: Optional[str] = None) -> int:
+        with self._lock, self._connect() as conn:
+            if tenant is None:
+                return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND tenant = ?", (QUEUED, tenant)
+            ).fetchone()[0]
+
+    def claim_next(self, kinds: List[str], busy_tenants: List[str], owner: str) -> Optional[Dict[str, Any]]:
+        """Marca como running (em nome de `owner`) o job de maior prioridade (mais antigo) elegível"""
+        if not kinds:
+            return None
+        kind_marks = ','.join('?' * len(kinds))
+        tenant_filter = f"AND tenant NOT IN ({','.join('?' * len(busy_tenants))})" if busy_tenants else ''
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE status = ? AND kind IN ({kind_marks}) {tenant_filter} "
+                "ORDER BY priority DESC, created_at ASC LIMIT 1",
+                (QUEUED, *kinds, *busy_tenants)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            claimed = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, owner = ?, attempts = attempts + 1 "
+                "WHERE job_id = ? AND status = ?",
+                (RUNNING, now, now, owner, row['job_id'], QUEUED)
+            ).rowcount
+        # Outro processo (mesmo banco) pode ter pegado o job entre o SELECT e o UPDATE
+        return dict(row, status=RUNNING, owner=owner) if claimed else None
+
+    def heartbeat(self, owner: str) -> int:
+        """Renova o heartbeat dos jobs em execução deste dono"""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?", (time.time(), owner, RUNNING)
+            ).rowcount
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE job_id = ?",
+                (status, time.time(), json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                 error, job_id)
+            )
+
+    def cancel_queued(self, job_id: str) -> bool:
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED)
+            ).rowcount > 0
+
+    def requeue_interrupted(self, stale_before: float, max_attempts: int) -> Tuple[int, int]:
+        """
+        Jobs running cujo dono parou de renovar o heartbeat (processo caiu) voltam
+        para a fila; os que já esgotaram `max_attempts` tentativas falham.
+        Jobs de processos vivos (heartbeat recente) não são tocados.
+
+        Returns:
+            (reenfileirados, falhos)
+        """
+        orphaned = "status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        with self._lock, self._connect() as conn:
+            failed = conn.execute(
+                f"UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE {orphaned} AND attempts >= ?",
+                (FAILED, time.time(), f"Interrompido {max_attempts} vez(es); limite de tentativas atingido",
+                 RUNNING, stale_before, max_attempts)
+            ).rowcount
+            requeued = conn.execute(
+                f"UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, heartbeat_at = NULL WHERE {orphaned}",
+                (QUEUED, RUNNING, stale_before)
+            ).rowcount
+        return requeued, failed
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, tenant: Optional[str] = None, session_id: Optional[str] = None,
+             status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        for column, value in (('tenant', tenant), ('session_id', session_id), ('status', status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+class _Worker:
+    """Thread com um event loop de longa duração que executa um job por vez"""
+
+    def __init__(self, index: int):
+        self.name = f"job-worker-{index}"
+        self.loop = asyncio.new_event_loop()
+        self.current_job: Optional[str] = None
+        self.current_tenant: Optional[str] = None
+        self.current_task: Optional[asyncio.Task] = None
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def idle(self) -> bool:
+        return self.current_job is None
+
+
+class JobQueue:
+    """
+    Pool de workers + fila persistente.
+
+    Configuração via ambiente:
+        JOB_WORKERS               workers (jobs simultâneos no processo) (padrão: 4)
+        JOB_TENANT_CONCURRENCY    jobs simultâneos por tenant (padrão: 2)
+        JOB_MAX_QUEUED            jobs aguardando na fila antes de recusar (padrão: 100)
+        JOB_TENANT_MAX_QUEUED     jobs aguardando por tenant (padrão: 10)
+        JOB_INLINE_TIMEOUT        segundos de espera de uma chamada run_sync (padrão: 1800)
+        JOB_MAX_ATTEMPTS          execuções interrompidas antes de o job falhar (padrão: 3)
+        JOB_STALE_SECONDS         heartbeat mais antigo que isso marca o job como órfão (padrão: 300)
+        JOB_TRUSTED_PROXIES       IPs de proxies confiáveis, separados por vírgula; só atrás
+                                  deles X-Tenant-ID / X-Forwarded-For definem o tenant (padrão: nenhum)
+
+    Chamadas run_sync contam nos mesmos limites de fila e de concorrência por tenant.
+    """
+
+    # Intervalo de varredura da fila quando nada acorda o despachante
+    POLL_INTERVAL = 2.0
+    # Intervalo de renovação do heartbeat dos jobs em execução
+    HEARTBEAT_INTERVAL = 30.0
+
+    def __init__(self):
+        self.num_workers = int(os.getenv('JOB_WORKERS', '4'))
+        self.tenant_concurrency = int(os.getenv('JOB_TENANT_CONCURRENCY', '2'))
+        self.max_queued = int(os.getenv('JOB_MAX_QUEUED', '100'))
+        self.tenant_max_queued = int(os.getenv('JOB_TENANT_MAX_QUEUED', '10'))
+        self.inline_timeout = float(os.getenv('JOB_INLINE_TIMEOUT', '1800'))
+        self.max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        self.stale_seconds = float(os.getenv('JOB_STALE_SECONDS', '300'))
+        self.trusted_proxies = {ip.strip() for ip in os.getenv('JOB_TRUSTED_PROXIES', '').split(',') if ip.strip()}
+        # Dono dos jobs que este processo executa (hostname:pid:id)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_heartbeat = 0.0
+        self._last_orphan_sweep = 0.0
+
+        self.store = SQLiteJobStore()
+        self.handlers: Dict[str, JobHandler] = {}
+        self.workers: List[_Worker] = []
+        # Chamadas síncronas de rotas legadas (não persistidas), atendidas antes da fila:
+        # (inline_id, factory, future, tenant)
+        self._inline: List[tuple] = []
+        self._condition = threading.Condition()
+        self._started = False
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'rejected': 0,
+            'requeued_interrupted': 0,
+            'failed_interrupted': 0,
+            'inline_calls': 0,
+            'inline_timeouts': 0
+        }
+
+        logger.info(f"🧵 Job Queue inicializada ({self.num_workers} workers, {self.tenant_concurrency} por tenant)")
+
+    # ------------------------------------------------------------------
+    # Registro e submissão
+    # ------------------------------------------------------------------
+
+    def register(self, kind: str, handler: JobHandler):
+        """Associa um tipo de job a uma coroutine `handler(**payload)`"""
+        self.handlers[kind] = handler
+        with self._condition:
+            self._condition.notify_all()
+
+    def handler(self, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """Decorator equivalente a register()"""
+        def decorator(func: JobHandler) -> JobHandler:
+            self.register(kind, func)
+            return func
+        return decorator
+
+    def tenant_for(self, remote_addr: Optional[str], headers: Any) -> str:
+        """
+        Tenant de uma requisição HTTP: o IP de origem. Cabeçalhos só valem se a
+        conexão vem de um proxy em JOB_TRUSTED_PROXIES (X-Tenant-ID definido pelo
+        proxy ou, na falta dele, o último salto de X-Forwarded-For)
+        """
+        if remote_addr in self.trusted_proxies:
+            tenant = headers.get('X-Tenant-ID')
+            if tenant:
+                return tenant
+            forwarded = [hop.strip() for hop in (headers.get('X-Forwarded-For') or '').split(',') if hop.strip()]
+            if forwarded:
+                return forwarded[-1]
+        return remote_addr or 'default'
+
+    def submit(self, kind: str, payload: Optional[Dict[str, Any]] = None, tenant: str = 'default',
+               priority: int = 0, session_id: Optional[str] = None) -> str:
+        """
+        Enfileira um job e retorna seu id.
+        Levanta JobQueueFullError quando a fila global ou a do tenant está cheia.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de job não registrado: {kind}")
+        self._ensure_started()
+
+        self._check_capacity(tenant)
+
+        job_id = f"job_{uuid.uuid4().hex[:12]}"
+        self.store.insert({
+            'job_id': job_id,
+            'kind': kind,
+            'payload': json.dumps(payload or {}, ensure_ascii=False, default=str),
+            'tenant': tenant,
+            'session_id': session_id,
+            'priority': priority,
+            'status': QUEUED,
+            'created_at': time.time()
+        })
+        self.stats['submitted'] += 1
+        logger.info(f"📥 Job {job_id} ({kind}) enfileirado para {tenant}")
+        with self._condition:
+            self._condition.notify_all()
+        return job_id
+
+    def _check_capacity(self, tenant: str):
+        """Levanta JobQueueFullError se a fila (persistida + síncrona) do processo ou do tenant está cheia"""
+        with self._condition:
+            inline_total = len(self._inline)
+            inline_tenant = sum(1 for entry in self._inline if entry[3] == tenant)
+        if (self.store.count_queued() + inline_total >= self.max_queued
+                or self.store.count_queued(tenant) + inline_tenant >= self.tenant_max_queued):
+            self.stats['rejected'] += 1
+            raise JobQueueFullError("Fila de jobs cheia, tente novamente em instantes")
+
+    def run_sync(self, factory: Callable[[], Awaitable[Any]], timeout: Optional[float] = None,
+                 tenant: str = 'default') -> Any:
+        """
+        Executa uma coroutine num worker e bloqueia até o resultado (rotas síncronas).
+        Chamado de dentro de um worker, roda num thread à parte para não esperar por si mesmo.
+
+        Levanta JobQueueFullError se a fila está cheia e JobTimeoutError se a execução não
+        termina em `timeout` segundos (padrão: JOB_INLINE_TIMEOUT); nesse caso ela é cancelada.
+        """
+        timeout = self.inline_timeout if timeout is None else timeout
+        if any(worker.thread is threading.current_thread() for worker in self.workers):
+            return self._run_in_own_loop(factory, timeout)
+
+        self._ensure_started()
+        self._check_capacity(tenant)
+        future: Future = Future()
+        entry = (f"inline_{uuid.uuid4().hex[:12]}", factory, future, tenant)
+        with self._condition:
+            self._inline.append(entry)
+            self._condition.notify_all()
+        self.stats['inline_calls'] += 1
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.done():
+                return future.result()
+            self._abandon_inline(entry)
+            self.stats['inline_timeouts'] += 1
+            raise JobTimeoutError(f"Execução síncrona excedeu {timeout:g}s")
+
+    def _run_in_own_loop(self, factory: Callable[[], Awaitable[Any]], timeout: float) -> Any:
+        """run_sync chamado de dentro de um worker: asyncio.run num thread à parte, cancelado no tempo limite"""
+        lock = threading.Lock()
+        # loop/task da execução, ou 'abandoned' se o tempo esgotou antes de ela começar
+        state: Dict[str, Any] = {}
+
+        async def runner():
+            with lock:
+                if state.get('abandoned'):
+                    raise asyncio.CancelledError()
+                state['loop'], state['task'] = asyncio.get_running_loop(), asyncio.current_task()
+            return await factory()
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(asyncio.run, runner())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.done():
+                return future.result()
+            with lock:
+                state['abandoned'] = True
+                if 'task' in state:
+                    state['loop'].call_soon_threadsafe(state['task'].cancel)
+            self.stats['inline_timeouts'] += 1
+            logger.warning(f"⏱️ Chamada síncrona aninhada excedeu {timeout:g}s e foi cancelada")
+            raise JobTimeoutError(f"Execução síncrona excedeu {timeout:g}s")
+        finally:
+            executor.shutdown(wait=False)
+
+    def _abandon_inline(self, entry: tuple):
+        """Tira da fila (ou cancela no worker) uma chamada síncrona cujo tempo esgotou"""
+        with self._condition:
+            if entry in self._inline:
+                self._inline.remove(entry)
+                return
+            worker = next((w for w in self.workers if w.current_job == entry[0]), None)
+            if worker is not None and worker.current_task is not None:
+                worker.loop.call_soon_threadsafe(worker.current_task.cancel)
+        logger.warning(f"⏱️ Chamada síncrona {entry[0]} excedeu o tempo limite e foi cancelada")
+
+    # ------------------------------------------------------------------
+    # Consulta e cancelamento
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        job = dict(job)
+        job['payload'] = json.loads(job['payload']) if job.get('payload') else {}
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        started, finished = job.get('started_at'), job.get('finished_at')
+        job['duration_seconds'] = round((finished or time.time()) - started, 2) if started else None
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        if not job:
+            return None
+        job = self._public(job)
+        if job['status'] == QUEUED:
+            job['queue_position'] = self._queue_position(job)
+        return job
+
+    def _queue_position(self, job: Dict[str, Any]) -> int:
+        queued = self.store.list(status=QUEUED, limit=self.max_queued)
+        ordered = sorted(queued, key=lambda j: (-j['priority'], j['created_at']))
+        return next((i for i, j in enumerate(ordered) if j['job_id'] == job['job_id']), len(ordered)) + 1
+
+    def list_jobs(self, tenant: Optional[str] = None, session_id: Optional[str] = None,
+                  status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        return [self._public(job) for job in self.store.list(tenant, session_id, status, limit)]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela um job na fila ou em execução"""
+        if self.store.cancel_queued(job_id):
+            self.stats['cancelled'] += 1
+            logger.info(f"🛑 Job {job_id} cancelado antes de iniciar")
+            return True
+        with self._condition:
+            worker = next((w for w in self.workers if w.current_job == job_id), None)
+            if worker is None or worker.current_task is None:
+                return False
+            worker.loop.call_soon_threadsafe(worker.current_task.cancel)
+        logger.info(f"🛑 Cancelamento solicitado para o job {job_id}")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            running = [
+                {'job_id': w.current_job, 'tenant': w.current_tenant, 'worker': w.name}
+                for w in self.workers if not w.idle
+            ]
+            inline_waiting = len(self._inline)
+        return dict(
+            self.stats,
+            workers=self.num_workers,
+            tenant_concurrency=self.tenant_concurrency,
+            running=running,
+            inline_waiting=inline_waiting,
+            by_status=self.store.status_counts()
+        )
+
+    # ------------------------------------------------------------------
+    # Despacho
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        with self._condition:
+            if self._started:
+                return
+            self._started = True
+            self.workers = [_Worker(i) for i in range(self.num_workers)]
+        self._sweep_orphans()
+        threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True).start()
+
+    def _sweep_orphans(self):
+        """Recupera jobs running de processos que caíram (heartbeat vencido)"""
+        self._last_orphan_sweep = time.monotonic()
+        try:
+            requeued, failed = self.store.requeue_interrupted(time.time() - self.stale_seconds, self.max_attempts)
+        except Exception as e:
+            logger.error(f"❌ Erro ao recuperar jobs interrompidos: {e}")
+            return
+        self.stats['requeued_interrupted'] += requeued
+        self.stats['failed_interrupted'] += failed
+        if requeued:
+            logger.warning(f"🔁 {requeued} job(s) interrompidos voltaram para a fila")
+        if failed:
+            logger.error(f"❌ {failed} job(s) interrompidos {self.max_attempts} vez(es) marcados como falhos")
+
+    def _maintenance(self):
+        """Heartbeat dos jobs deste processo e varredura periódica de órfãos (thread do despachante)"""
+        now = time.monotonic()
+        if now - self._last_heartbeat >= self.HEARTBEAT_INTERVAL:
+            self._last_heartbeat = now
+            try:
+                self.store.heartbeat(self.owner)
+            except Exception as e:
+                logger.error(f"❌ Erro ao renovar heartbeat dos jobs: {e}")
+        if now - self._last_orphan_sweep >= self.stale_seconds:
+            self._sweep_orphans()
+
+    def _busy_tenants(self) -> List[str]:
+        counts: Dict[str, int] = {}
+        for worker in self.workers:
+            if worker.current_tenant is not None:
+                counts[worker.current_tenant] = counts.get(worker.current_tenant, 0) + 1
+        return [tenant for tenant, count in counts.items() if count >= self.tenant_concurrency]
+
+    def _dispatch_loop(self):
+        while True:
+            self._maintenance()
+            with self._condition:
+                worker = next((w for w in self.workers if w.idle), None)
+                if worker is None:
+                    self._condition.wait(self.POLL_INTERVAL)
+                    continue
+                busy_tenants = self._busy_tenants()
+                entry = next((e for e in self._inline if e[3] not in busy_tenants), None)
+                if entry is not None:
+                    self._inline.remove(entry)
+                    inline_id, factory, future, tenant = entry
+                    worker.current_job = inline_id
+                    worker.current_tenant = tenant
+                    asyncio.run_coroutine_threadsafe(self._execute_inline(worker, factory, future), worker.loop)
+                    continue
+
+            try:
+                job = self.store.claim_next(list(self.handlers), busy_tenants, self.owner)
+            except Exception as e:
+                logger.error(f"❌ Erro ao ler fila de jobs: {e}")
+                job = None
+
+            with self._condition:
+                if job is None:
+                    self._condition.wait(self.POLL_INTERVAL)
+                    continue
+                worker.current_job = job['job_id']
+                worker.current_tenant = job['tenant']
+            asyncio.run_coroutine_threadsafe(self._execute(worker, job), worker.loop)
+
+    def _release(self, worker: _Worker):
+        with self._condition:
+            worker.current_job = None
+            worker.current_tenant = None
+            worker.current_task = None
+            self._condition.notify_all()
+
+    async def _execute_inline(self, worker: _Worker, factory: Callable[[], Awaitable[Any]], future: Future):
+        worker.current_task = asyncio.current_task()
+        try:
+            future.set_result(await factory())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._release(worker)
+
+    async def _execute(self, worker: _Worker, job: Dict[str, Any]):
+        job_id, kind = job['job_id'], job['kind']
+        worker.current_task = asyncio.current_task()
+        logger.info(f"▶️ Job {job_id} ({kind}) iniciado em {worker.name}")
+        try:
+            result = await self.handlers[kind](**json.loads(job['payload']))
+            self.store.finish(job_id, COMPLETED, result=result)
+            self.stats['completed'] += 1
+            logger.info(f"✅ Job {job_id} ({kind}) concluído")
+        except asyncio.CancelledError:
+            self.store.finish(job_id, CANCELLED, error="Cancelado pelo usuário")
+            self.stats['cancelled'] += 1
+            logger.info(f"🛑 Job {job_id} ({kind}) cancelado")
+        except Exception as e:
+            self.store.finish(job_id, FAILED, error=str(e))
+            self.stats['failed'] += 1
+            logger.error(f"❌ Job {job_id} ({kind}) falhou: {e}")
+        finally:
+            self._release(worker)
+
+
+# Instância global
+job_queue = JobQueue()
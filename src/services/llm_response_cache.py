@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - LLM Response Cache
+Cache de respostas de LLM por impressão digital do prompt: chave exata
+(modelo, prompt normalizado, prompt do sistema, temperatura, max_tokens) em
+SQLite com TTL e despejo LRU, busca opcional por quase-duplicatas (MinHash)
+e métricas de acerto. Reexecuções de um workflow não pagam de novo pelas
+etapas que já tiveram sucesso.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
+from dotenv import load_dotenv
+
+from utils.duplicate_remover import NearDuplicateIndex
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Modelo usado na chave quando a hierarquia escolhe o modelo (sem override)
+HIERARCHY_MODEL = 'hierarchy'
+
+
+class SQLiteLLMCacheBackend:
+    """Armazenamento local em SQLite com TTL e despejo LRU"""
+
+    def __init__(self, db_path: str = "analyses_data/llm_cache.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    scope TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_scope ON llm_cache(scope)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT response, expires_at FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if not row or row[1] < now:
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?", (now, key)
+            )
+        return row[0]
+
+    def set(self, key: str, scope: str, model: str, prompt: str, response: str,
+            ttl_seconds: float, max_entries: int) -> int:
+        """Grava a resposta e retorna quantas entradas foram despejadas"""
+        now = time.time()
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(cache_key, scope, model, prompt, response, stored_at, expires_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, scope, model, prompt, response, now, now + ttl_seconds, now)
+            )
+            evicted = conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,)).rowcount
+            count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > max_entries:
+                # LRU: remove as entradas acessadas há mais tempo
+                evicted += conn.execute(
+                    "DELETE FROM llm_cache WHERE cache_key IN "
+                    "(SELECT cache_key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - max_entries,)
+                ).rowcount
+        return evicted
+
+    def scope_entries(self, scope: str) -> List[Tuple[str, str]]:
+        """(chave, prompt normalizado) das entradas válidas de um escopo"""
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            return conn.execute(
+                "SELECT cache_key, prompt FROM llm_cache WHERE scope = ? AND expires_at >= ?",
+                (scope, time.time())
+            ).fetchall()
+
+    def delete(self, model: Optional[str] = None) -> int:
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            if model is None:
+                return conn.execute("DELETE FROM llm_cache").rowcount
+            return conn.execute("DELETE FROM llm_cache WHERE model = ?", (model,)).rowcount
+
+    def count(self) -> int:
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class LLMResponseCache:
+    """
+    Cache de respostas de LLM.
+
+    Configuração via ambiente:
+        LLM_CACHE_ENABLED            liga/desliga o cache (padrão: true)
+        LLM_CACHE_TTL_HOURS          validade das respostas (padrão: 72)
+        LLM_CACHE_MAX_ENTRIES        limite de entradas antes do despejo LRU (padrão: 5000)
+        LLM_CACHE_NEAR_DUPLICATES    busca por prompts quase idênticos (padrão: false)
+        LLM_CACHE_NEAR_THRESHOLD     similaridade mínima para quase-duplicatas (padrão: 0.97)
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        self.ttl_seconds = float(os.getenv('LLM_CACHE_TTL_HOURS', '72')) * 3600
+        self.max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+        self.near_duplicates = os.getenv('LLM_CACHE_NEAR_DUPLICATES', 'false').lower() == 'true'
+        self.near_threshold = float(os.getenv('LLM_CACHE_NEAR_THRESHOLD', '0.97'))
+
+        self.stats = {
+            'hits': 0,
+            'near_hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'rejected': 0,
+            'stores': 0,
+            'evictions': 0,
+            'errors': 0,
+            'by_model': {}
+        }
+        # Índices MinHash por escopo (construídos sob demanda a partir do SQLite)
+        self._near_indexes: Dict[str, Tuple[NearDuplicateIndex, List[str]]] = {}
+        self._index_lock = threading.Lock()
+        self.backend = self._create_backend() if self.enabled else None
+
+        if self.backend:
+            logger.info(f"✅ LLM Response Cache inicializado (TTL {self.ttl_seconds / 3600:.0f}h, "
+                        f"máx. {self.max_entries} entradas, quase-duplicatas: {'sim' if self.near_duplicates else 'não'})")
+
+    def _create_backend(self) -> Optional[SQLiteLLMCacheBackend]:
+        try:
+            return SQLiteLLMCacheBackend()
+        except Exception as e:
+            logger.error(f"❌ Erro ao inicializar cache de LLM: {e}")
+            self.enabled = False
+            return None
+
+    @staticmethod
+    def normalize_prompt(prompt: Optional[str]) -> str:
+        """Unicode NFKC e espaços colapsados (diferenças só de formatação não mudam a chave)"""
+        normalized = unicodedata.normalize('NFKC', prompt or '')
+        return re.sub(r'\s+', ' ', normalized).strip()
+
+    def make_scope(self, model: Optional[str], system_prompt: Optional[str],
+                   temperature: Optional[float], max_tokens: Optional[int]) -> str:
+        """Tudo da chave exceto o prompt do usuário (quase-duplicatas só casam dentro do escopo)"""
+        raw = json.dumps(
+            {
+                'model': model or HIERARCHY_MODEL,
+                'system': self.normalize_prompt(system_prompt),
+                'temperature': temperature,
+                'max_tokens': max_tokens
+            },
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def make_key(self, model: Optional[str], prompt: str, system_prompt: Optional[str] = None,
+                 temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        scope = self.make_scope(model, system_prompt, temperature, max_tokens)
+        raw = f"{scope}:{self.normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _model_stats(self, model: Optional[str]) -> Dict[str, int]:
+        return self.stats['by_model'].setdefault(model or HIERARCHY_MODEL, {'hits': 0, 'misses': 0})
+
+    def _near_index(self, scope: str) -> Tuple[NearDuplicateIndex, List[str]]:
+        with self._index_lock:
+            entry = self._near_indexes.get(scope)
+            if entry is None:
+                index, keys = NearDuplicateIndex(self.near_threshold), []
+                for key, prompt in self.backend.scope_entries(scope):
+                    index.add(prompt)
+                    keys.append(key)
+                entry = self._near_indexes[scope] = (index, keys)
+            return entry
+
+    def _lookup(self, key: str, scope: str, prompt: str, near: bool) -> Tuple[Optional[str], bool]:
+        """(resposta, veio_de_quase_duplicata) — executado fora do event loop"""
+        response = self.backend.get(key)
+        if response is not None or not near:
+            return response, False
+        index, keys = self._near_index(scope)
+        with self._index_lock:
+            similar = [keys[i] for i in index.find_similar(prompt) if keys[i] != key]
+        for similar_key in similar:
+            response = self.backend.get(similar_key)
+            if response is not None:
+                return response, True
+        return None, False
+
+    def _store(self, key: str, scope: str, model: Optional[str], prompt: str, response: str):
+        evicted = self.backend.set(key, scope, model or HIERARCHY_MODEL, prompt, response,
+                                   self.ttl_seconds, self.max_entries)
+        if evicted:
+            # Índices podem apontar para chaves despejadas: reconstruídos na próxima consulta
+            with self._index_lock:
+                self._near_indexes.clear()
+        else:
+            with self._index_lock:
+                entry = self._near_indexes.get(scope)
+                if entry is not None:
+                    entry[0].add(prompt)
+                    entry[1].append(key)
+        return evicted
+
+    async def get(
+        self,
+        model: Optional[str],
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        near_duplicates: Optional[bool] = None
+    ) -> Optional[str]:
+        """Resposta em cache para a chamada (ou None)"""
+        if not self.enabled or not self.backend:
+            return None
+
+        near = self.near_duplicates if near_duplicates is None else near_duplicates
+        normalized = self.normalize_prompt(prompt)
+        scope = self.make_scope(model, system_prompt, temperature, max_tokens)
+        key = self.make_key(model, prompt, system_prompt, temperature, max_tokens)
+        try:
+            response, from_near = await asyncio.to_thread(self._lookup, key, scope, normalized, near)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ Erro ao ler cache de LLM: {e}")
+            return None
+
+        model_stats = self._model_stats(model)
+        if response is None:
+            self.stats['misses'] += 1
+            model_stats['misses'] += 1
+            return None
+
+        self.stats['near_hits' if from_near else 'hits'] += 1
+        model_stats['hits'] += 1
+        logger.info(f"💾 Cache de LLM{' (quase-duplicata)' if from_near else ''}: {model or HIERARCHY_MODEL}, "
+                    f"{len(response)} caracteres sem chamada à API")
+        return response
+
+    async def set(
+        self,
+        model: Optional[str],
+        prompt: str,
+        response: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ):
+        """Grava uma resposta bem-sucedida (respostas vazias não são gravadas)"""
+        if not self.enabled or not self.backend or not response or not response.strip():
+            return
+
+        scope = self.make_scope(model, system_prompt, temperature, max_tokens)
+        key = self.make_key(model, prompt, system_prompt, temperature, max_tokens)
+        try:
+            evicted = await asyncio.to_thread(self._store, key, scope, model, self.normalize_prompt(prompt), response)
+            self.stats['stores'] += 1
+            self.stats['evictions'] += evicted
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ Erro ao gravar cache de LLM: {e}")
+
+    async def get_or_generate(
+        self,
+        model: Optional[str],
+        prompt: str,
+        generate: Callable[[], Awaitable[str]],
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        near_duplicates: Optional[bool] = None,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """
+        Retorna a resposta em cache ou executa `generate` e grava o resultado.
+        `use_cache=False` ignora o cache na leitura e na escrita. `validate`
+        decide se a resposta pode ser reaproveitada: respostas rejeitadas não
+        são gravadas e entradas antigas rejeitadas contam como ausentes.
+        """
+        if not use_cache:
+            self.stats['bypassed'] += 1
+            return await generate()
+
+        cached = await self.get(model, prompt, system_prompt, temperature, max_tokens, near_duplicates)
+        if cached is not None and self.accepts(cached, validate):
+            return cached
+
+        response = await generate()
+        if isinstance(response, str) and self.accepts(response, validate):
+            await self.set(model, prompt, response, system_prompt, temperature, max_tokens)
+        return response
+
+    def accepts(self, response: str, validate: Optional[Callable[[str], bool]]) -> bool:
+        """Aplica o validador do chamador (sem validador, toda resposta é aceita)"""
+        if validate is None:
+            return True
+        try:
+            accepted = bool(validate(response))
+        except Exception as e:
+            logger.warning(f"⚠️ Erro no validador de resposta do cache: {e}")
+            accepted = False
+        if not accepted:
+            self.stats['rejected'] += 1
+        return accepted
+
+    async def invalidate(self, model: Optional[str] = None) -> int:
+        """Remove as respostas de um modelo (ou todas)"""
+        if not self.backend:
+            return 0
+        removed = await asyncio.to_thread(self.backend.delete, model)
+        with self._index_lock:
+            self._near_indexes.clear()
+        logger.info(f"🧹 Cache de LLM: {removed} entradas removidas")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['near_hits'] + self.stats['misses']
+        served = self.stats['hits'] + self.stats['near_hits']
+        try:
+            entries = self.backend.count() if self.backend else 0
+        except Exception:
+            entries = None
+        return dict(
+            self.stats,
+            enabled=self.enabled,
+            near_duplicates=self.near_duplicates,
+            entries=entries,
+            hit_rate=round(served / lookups, 3) if lookups else 0.0
+        )
+
+
+# Instância global
+llm_response_cache = LLMResponseCache()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - LLM Streaming
+Geração em streaming: leitura de SSE (OpenRouter/OpenAI-compatível e Gemini
+streamGenerateContent), métricas de time-to-first-token e tokens/s, gravação
+incremental da saída parcial em disco e retomada a partir do texto parcial
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Any, Optional, AsyncIterator, Callable
+from dotenv import load_dotenv
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+from services.http_client_pool import http_client_pool
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Sem timeout total: o stream só falha se ficar sem receber bytes por STREAM_IDLE_TIMEOUT
+STREAM_IDLE_TIMEOUT = float(os.getenv('LLM_STREAM_IDLE_TIMEOUT', '60'))
+STREAM_CONNECT_TIMEOUT = float(os.getenv('LLM_STREAM_CONNECT_TIMEOUT', '15'))
+STREAM_MAX_RESUMES = int(os.getenv('LLM_STREAM_MAX_RESUMES', '2'))
+
+CONTINUATION_INSTRUCTION = (
+    "Sua resposta anterior foi interrompida. Continue exatamente do ponto onde parou, "
+    "sem repetir o que já foi escrito e sem comentários sobre a interrupção."
+)
+
+
+class StreamHTTPError(Exception):
+    """Resposta não-200 ao abrir um stream"""
+
+    def __init__(self, status: int, body: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+@dataclass
+class StreamMetrics:
+    """Métricas de uma geração em streaming"""
+    name: str
+    model: Optional[str] = None
+    started_at: float = field(default_factory=time.monotonic)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    chars: int = 0
+    chunks: int = 0
+    resumes: int = 0
+    status: str = 'streaming'
+
+    def on_delta(self, delta: str):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.chars += len(delta)
+        self.chunks += 1
+
+    @property
+    def tokens(self) -> int:
+        # Mesma estimativa de ~4 caracteres por token usada no rate limiter
+        return self.chars // 4
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> float:
+        if self.first_token_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.monotonic()) - self.first_token_at
+        return self.tokens / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        ttft = self.time_to_first_token
+        return {
+            'name': self.name,
+            'model': self.model,
+            'status': self.status,
+            'time_to_first_token': round(ttft, 3) if ttft is not None else None,
+            'tokens_per_second': round(self.tokens_per_second, 1),
+            'tokens': self.tokens,
+            'chars': self.chars,
+            'resumes': self.resumes,
+            'elapsed': round((self.finished_at or time.monotonic()) - self.started_at, 2)
+        }
+
+
+class PartialOutputWriter:
+    """
+    Grava os deltas em <arquivo>.partial à medida que chegam. A impressão digital
+    da geração (prompt, modelo, parâmetros) vai em <arquivo>.partial.meta para que
+    só uma execução com a mesma geração retome o parcial
+    """
+
+    def __init__(self, path: Path, fingerprint: Optional[str] = None):
+        self.path = Path(path)
+        self.partial_path = self._partial_path(self.path)
+        self.meta_path = self._meta_path(self.path)
+        self.partial_path.parent.mkdir(parents=True, exist_ok=True)
+        if fingerprint:
+            self.meta_path.write_text(json.dumps({'fingerprint': fingerprint}), encoding='utf-8')
+        else:
+            self.meta_path.unlink(missing_ok=True)
+        self._file = open(self.partial_path, 'w', encoding='utf-8')
+
+    @staticmethod
+    def _partial_path(path: Path) -> Path:
+        return Path(path).with_name(Path(path).name + '.partial')
+
+    @staticmethod
+    def _meta_path(path: Path) -> Path:
+        return Path(path).with_name(Path(path).name + '.partial.meta')
+
+    @staticmethod
+    def fingerprint(**params: Any) -> str:
+        """Impressão digital estável dos parâmetros da geração"""
+        raw = json.dumps(params, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def write(self, delta: str):
+        self._file.write(delta)
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def finalize(self, content: str) -> Path:
+        """Grava o conteúdo final e remove o parcial"""
+        self.close()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.partial_path.unlink(missing_ok=True)
+        self.meta_path.unlink(missing_ok=True)
+        return self.path
+
+    @classmethod
+    def read_partial(cls, path: Path, fingerprint: Optional[str] = None) -> str:
+        """
+        Texto parcial de uma geração anterior interrompida (se houver). Com
+        `fingerprint`, um parcial de outra geração (prompt/modelo diferentes
+        ou sem .meta) é descartado
+        """
+        partial_path = cls._partial_path(path)
+        if not partial_path.exists():
+            return ''
+        if fingerprint:
+            meta_path = cls._meta_path(path)
+            try:
+                stored = json.loads(meta_path.read_text(encoding='utf-8')).get('fingerprint')
+            except (OSError, ValueError):
+                stored = None
+            if stored != fingerprint:
+                logger.info(f"🗑️ Parcial de outra geração descartado: {partial_path}")
+                partial_path.unlink(missing_ok=True)
+                meta_path.unlink(missing_ok=True)
+                return ''
+        return partial_path.read_text(encoding='utf-8')
+
+
+def stream_timeout() -> 'aiohttp.ClientTimeout':
+    return aiohttp.ClientTimeout(total=None, connect=STREAM_CONNECT_TIMEOUT, sock_read=STREAM_IDLE_TIMEOUT)
+
+
+async def iter_sse_data(response) -> AsyncIterator[str]:
+    """Payloads `data:` de uma resposta Server-Sent Events"""
+    async for raw_line in response.content:
+        line = raw_line.decode('utf-8', errors='ignore').strip()
+        # Linhas vazias separam eventos; ':' são comentários/keep-alive (ex.: OPENROUTER PROCESSING)
+        if not line or line.startswith(':') or not line.startswith('data:'):
+            continue
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return
+        yield data
+
+
+async def stream_openai_compatible(url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> AsyncIterator[str]:
+    """Deltas de texto de um endpoint /chat/completions com `stream: true` (OpenRouter, Groq, OpenAI)"""
+    payload = dict(payload, stream=True)
+    async with http_client_pool.session() as session:
+        async with session.post(url, headers=headers, json=payload, timeout=stream_timeout()) as response:
+            if response.status != 200:
+                raise StreamHTTPError(response.status, await response.text(), dict(response.headers))
+            async for data in iter_sse_data(response):
+                try:
+                    event = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                if 'error' in event:
+                    raise Exception(f"Erro no stream: {event['error']}")
+                choices = event.get('choices') or []
+                if not choices:
+                    continue
+                delta = (choices[0].get('delta') or {}).get('content')
+                if delta:
+                    yield delta
+
+
+async def stream_gemini(base_url: str, model_name: str, api_key: str, request_data: Dict[str, Any]) -> AsyncIterator[str]:
+    """Deltas de texto do Gemini streamGenerateContent (alt=sse)"""
+    url = f"{base_url}/models/{model_name}:streamGenerateContent?alt=sse"
+    headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
+    async with http_client_pool.session() as session:
+        async with session.post(url, headers=headers, json=request_data, timeout=stream_timeout()) as response:
+            if response.status != 200:
+                raise StreamHTTPError(response.status, await response.text(), dict(response.headers))
+            async for data in iter_sse_data(response):
+                try:
+                    event = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                for candidate in event.get('candidates') or []:
+                    for part in (candidate.get('content') or {}).get('parts') or []:
+                        if part.get('text'):
+                            yield part['text']
+
+
+def continuation_messages(messages: List[Dict[str, str]], partial: str) -> List[Dict[str, str]]:
+    """Mensagens no formato chat para continuar a partir de `partial`"""
+    if not partial:
+        return messages
+    return messages + [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": CONTINUATION_INSTRUCTION}
+    ]
+
+
+def continuation_contents(contents: List[Dict[str, Any]], partial: str) -> List[Dict[str, Any]]:
+    """Conteúdos no formato Gemini para continuar a partir de `partial`"""
+    if not partial:
+        return contents
+    return contents + [
+        {"role": "model", "parts": [{"text": partial}]},
+        {"role": "user", "parts": [{"text": CONTINUATION_INSTRUCTION}]}
+    ]
+
+
+async def resumable_stream(
+    open_stream: Callable[[str], AsyncIterator[str]],
+    max_resumes: int = STREAM_MAX_RESUMES,
+    metrics: Optional[StreamMetrics] = None
+) -> AsyncIterator[str]:
+    """
+    Repassa os deltas de `open_stream(parcial)`; se o stream cair depois de ter
+    produzido texto, reabre com o texto parcial para a IA continuar de onde parou.
+    Falhas antes do primeiro delta são propagadas (o chamador troca de modelo/chave).
+    """
+    partial = ''
+    resumes = 0
+    while True:
+        try:
+            async for delta in open_stream(partial):
+                partial += delta
+                yield delta
+            return
+        except Exception as e:
+            if not partial or resumes >= max_resumes:
+                raise
+            resumes += 1
+            if metrics:
+                metrics.resumes = resumes
+            logger.warning(f"🔁 Stream interrompido após {len(partial)} caracteres ({e}); retomando ({resumes}/{max_resumes})")
+
+
+def report_stream_metrics(session_id: Optional[str], metrics: StreamMetrics):
+    """Envia as métricas ao ProgressTracker da sessão, se houver um ativo"""
+    if not session_id:
+        return
+    try:
+        from routes.progress import progress_sessions
+    except ImportError:
+        return
+    tracker = progress_sessions.get(session_id)
+    if tracker is not None and hasattr(tracker, 'record_generation'):
+        tracker.record_generation(metrics.name, metrics.to_dict())
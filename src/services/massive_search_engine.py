@@ -37,6 +37,14 @@ class MassiveSearchEngine:
 
         os.makedirs(self.data_dir, exist_ok=True)
 
+        # Fan-out concorrente (query × backend) com limites por backend
+        self.concurrent_search = os.getenv('MASSIVE_SEARCH_CONCURRENT', 'true').lower() == 'true'
+        self.max_workers = max(1, int(os.getenv('MASSIVE_SEARCH_WORKERS', '6')))
+        self.backend_concurrency = {
+            'alibaba_websailor': max(1, int(os.getenv('MASSIVE_SEARCH_WEBSAILOR_CONCURRENCY', '3'))),
+            'real_search_orchestrator': max(1, int(os.getenv('MASSIVE_SEARCH_ORCHESTRATOR_CONCURRENCY', '3')))
+        }
+
         logger.info(f"🔍 Massive Search Engine inicializado - Mínimo: {self.min_size_kb}KB")
 
     async def execute_massive_search(self, produto: str, publico_alvo: str, session_id: str, **kwargs) -> Dict[str, Any]:
@@ -75,60 +83,31 @@ class MassiveSearchEngine:
                     'total_searches': 0,
                     'apis_used': [],
                     'size_kb': 0,
+                    'size_bytes': 0,
                     'sem_limites': True,  # NOVO: Flag indicando sem limites
                     'target_size_kb': 'ILIMITADO'
                 }
             }
 
+            # Tamanho base; a partir daqui só os itens novos são medidos
+            self._init_size_tracking(massive_data)
+
             # Queries de busca massiva - EXPANDIDAS
             search_queries = self._generate_search_queries(produto, publico_alvo)
             logger.info(f"📋 {len(search_queries)} queries geradas para busca massiva ILIMITADA")
 
             # Executar buscas com LIMITE INTELIGENTE para performance
-            search_count = 0
             max_queries = min(15, len(search_queries))  # LIMITE: máximo 15 queries
-            
-            for query in search_queries[:max_queries]:  # LIMITADO para performance
-                if (time.time() - start_time) > TIME_LIMIT_SECONDS:
-                    logger.warning(f"⏰ Limite de tempo de {TIME_LIMIT_SECONDS/60} minutos atingido. Encerrando busca massiva.")
-                    break
-
-                search_count += 1
-                logger.info(f"🔍 Busca {search_count}: {query}")
-
-                # ALIBABA WebSailor - PRINCIPAL
-                try:
-                    websailor_result = await self._search_alibaba_websailor(query, session_id)
-                    if websailor_result:
-                        massive_data['busca_massiva']['alibaba_websailor_results'].append(websailor_result)
-                        massive_data['metadata']['apis_used'].append('alibaba_websailor')
-                        
-                        # SALVAMENTO SIMULTÂNEO - NOVO
-                        await self._save_search_result_simultaneously(websailor_result, session_id, 'alibaba_websailor')
-                        logger.info(f"✅ ALIBABA WebSailor: dados coletados e salvos simultaneamente")
-                except Exception as e:
-                    logger.warning(f"⚠️ ALIBABA WebSailor falhou: {e}")
-
-                # Real Search Orchestrator - EXECUTAR TAMBÉM
-                try:
-                    real_search_result = await self._search_real_orchestrator(query, session_id)
-                    if real_search_result:
-                        massive_data['busca_massiva']['real_search_orchestrator_results'].append(real_search_result)
-                        massive_data['metadata']['apis_used'].append('real_search_orchestrator')
-                        
-                        # SALVAMENTO SIMULTÂNEO - NOVO
-                        await self._save_search_result_simultaneously(real_search_result, session_id, 'real_search_orchestrator')
-                        logger.info(f"✅ Real Search Orchestrator: dados coletados e salvos simultaneamente")
-                except Exception as e:
-                    logger.warning(f"⚠️ Real Search Orchestrator falhou: {e}")
+            deadline = start_time + TIME_LIMIT_SECONDS
 
-                # Verificar tamanho atual - SEM LIMITES
-                current_json = json.dumps(massive_data, ensure_ascii=False, indent=2)
-                current_size = len(current_json.encode('utf-8'))
-                logger.info(f"📊 Tamanho atual: {current_size/1024:.1f}KB (SEM LIMITES)")
-
-                # Pequena pausa entre buscas
-                await asyncio.sleep(0.5)  # Reduzido para acelerar
+            if self.concurrent_search:
+                search_count = await self._run_concurrent_search(
+                    search_queries[:max_queries], session_id, massive_data, deadline
+                )
+            else:
+                search_count = await self._run_sequential_search(
+                    search_queries[:max_queries], session_id, massive_data, deadline
+                )
 
             # CONSOLIDAÇÃO FINAL - NOVO PROCESSO
             logger.info("🔄 Consolidando TODOS os dados para IA da etapa 2...")
@@ -137,7 +116,7 @@ class MassiveSearchEngine:
             # Finalizar dados
             massive_data['timestamp_fim'] = datetime.now().isoformat()
             massive_data['metadata']['total_searches'] = search_count
-            massive_data['metadata']['size_kb'] = current_size / 1024
+            massive_data['metadata']['size_kb'] = self._calculate_final_size(massive_data)
             massive_data['metadata']['apis_used'] = list(set(massive_data['metadata']['apis_used']))
 
             # Salva resultado final unificado - ARQUIVO CONSOLIDADO ETAPA 1
@@ -162,6 +141,113 @@ class MassiveSearchEngine:
                 'file_path': None
             }
 
+    def _search_backends(self) -> Dict[str, Any]:
+        """Backends de busca e a lista de massive_data['busca_massiva'] que cada um alimenta"""
+        return {
+            'alibaba_websailor': (self._search_alibaba_websailor, 'alibaba_websailor_results'),
+            'real_search_orchestrator': (self._search_real_orchestrator, 'real_search_orchestrator_results')
+        }
+
+    async def _merge_search_result(self, massive_data: Dict[str, Any], result: Dict[str, Any], session_id: str, backend: str):
+        """Incorpora um resultado em massive_data assim que ele chega"""
+        result_key = self._search_backends()[backend][1]
+        massive_data['busca_massiva'][result_key].append(result)
+        massive_data['metadata']['apis_used'].append(backend)
+
+        # SALVAMENTO SIMULTÂNEO - NOVO
+        await self._save_search_result_simultaneously(result, session_id, backend)
+        logger.info(f"✅ {backend}: dados coletados e salvos simultaneamente")
+
+        # Verificar tamanho atual - SEM LIMITES (apenas o item novo é serializado)
+        self._track_size(massive_data, result)
+        logger.info(f"📊 Tamanho atual: {massive_data['metadata']['size_kb']:.1f}KB (SEM LIMITES)")
+
+    def _init_size_tracking(self, massive_data: Dict[str, Any]):
+        """Mede uma única vez a estrutura base de massive_data"""
+        base_size = len(json.dumps(massive_data, ensure_ascii=False, default=str).encode('utf-8'))
+        massive_data['metadata']['size_bytes'] = base_size
+        massive_data['metadata']['size_kb'] = round(base_size / 1024, 2)
+
+    def _track_size(self, massive_data: Dict[str, Any], item: Any) -> int:
+        """Soma ao tamanho acumulado o tamanho codificado (JSON compacto) de um item novo"""
+        try:
+            item_size = len(json.dumps(item, ensure_ascii=False, default=str).encode('utf-8')) + 2  # separador ", "
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao medir item: {e}")
+            return 0
+        metadata = massive_data['metadata']
+        metadata['size_bytes'] = metadata.get('size_bytes', 0) + item_size
+        metadata['size_kb'] = round(metadata['size_bytes'] / 1024, 2)
+        return item_size
+
+    async def _run_sequential_search(self, queries: List[str], session_id: str, massive_data: Dict[str, Any], deadline: float) -> int:
+        """Executa as queries uma a uma em cada backend (modo legado)"""
+        search_count = 0
+        for query in queries:
+            if time.time() > deadline:
+                logger.warning("⏰ Limite de tempo atingido. Encerrando busca massiva.")
+                break
+
+            search_count += 1
+            logger.info(f"🔍 Busca {search_count}: {query}")
+
+            for backend, (search_fn, _) in self._search_backends().items():
+                try:
+                    result = await search_fn(query, session_id)
+                    if result:
+                        await self._merge_search_result(massive_data, result, session_id, backend)
+                except Exception as e:
+                    logger.warning(f"⚠️ {backend} falhou: {e}")
+
+            # Pequena pausa entre buscas
+            await asyncio.sleep(0.5)  # Reduzido para acelerar
+
+        return search_count
+
+    async def _run_concurrent_search(self, queries: List[str], session_id: str, massive_data: Dict[str, Any], deadline: float) -> int:
+        """
+        Fan-out concorrente sobre os pares (query × backend) com pool limitado.
+        Tarefas ainda pendentes no prazo final são canceladas; os resultados
+        já recebidos permanecem em massive_data.
+        """
+        backends = self._search_backends()
+        pool = asyncio.Semaphore(self.max_workers)
+        backend_limits = {
+            backend: asyncio.Semaphore(self.backend_concurrency.get(backend, 1))
+            for backend in backends
+        }
+        completed_queries = set()
+
+        async def run_pair(query: str, backend: str):
+            search_fn = backends[backend][0]
+            async with backend_limits[backend], pool:
+                logger.info(f"🔍 {backend}: {query}")
+                try:
+                    result = await search_fn(query, session_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ {backend} falhou para '{query}': {e}")
+                    return
+            if result:
+                await self._merge_search_result(massive_data, result, session_id, backend)
+            completed_queries.add(query)
+
+        tasks = [
+            asyncio.create_task(run_pair(query, backend))
+            for query in queries
+            for backend in backends
+        ]
+        logger.info(f"🚀 Fan-out de {len(tasks)} buscas ({len(queries)} queries × {len(backends)} backends), {self.max_workers} workers")
+
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline - time.time()))
+            if pending:
+                logger.warning(f"⏰ Limite de tempo atingido. Cancelando {len(pending)} buscas pendentes.")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        return len(completed_queries)
+
     def _generate_search_queries(self, produto: str, publico_alvo: str) -> List[str]:
         """Gera queries de busca massiva"""
         base_queries = [
@@ -300,7 +386,10 @@ class MassiveSearchEngine:
             logger.error(f"❌ Erro ao salvar resultado simultâneo para {api_name}: {e}")
 
     def _calculate_final_size(self, massive_data: Dict[str, Any]) -> float:
-        """Calcula tamanho final em KB"""
+        """Calcula tamanho final em KB (usa o contador incremental quando disponível)"""
+        size_bytes = massive_data.get('metadata', {}).get('size_bytes')
+        if size_bytes:
+            return size_bytes / 1024
         try:
             json_str = json.dumps(massive_data, ensure_ascii=False)
             return len(json_str.encode('utf-8')) / 1024
@@ -416,6 +505,27 @@ class MassiveSearchEngine:
             except Exception as e:
                 logger.warning(f"⚠️ Erro ao processar resultados do Real Search Orchestrator para consolidação: {e}")
 
+            # 3. TRECHOS SALVOS DURANTE A EXTRAÇÃO (lidos em streaming do consolidado.jsonl)
+            try:
+                for trecho in auto_save_manager.iterar_trechos_consolidados(session_id):
+                    texto = trecho.get('conteudo') or ''
+                    if len(texto) > 50:
+                        dados_consolidados['textos_pesquisa_web'].append({
+                            'fonte': f"trecho_{trecho.get('metodo_extracao', 'desconhecido')}",
+                            'texto': texto,
+                            'caracteres': len(texto)
+                        })
+                        caracteres_totais += len(texto)
+                        textos_processados += 1
+                    if trecho.get('url'):
+                        urls_unicas.add(trecho['url'])
+
+                # Mantém o consolidado.json legado para leitores que ainda o usam
+                auto_save_manager.compactar_consolidado(session_id)
+
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao processar trechos salvos para consolidação: {e}")
+
             # Atualizar metadados da consolidação
             dados_consolidados['metadata_consolidacao']['total_textos_processados'] = textos_processados
             dados_consolidados['metadata_consolidacao']['caracteres_totais'] = caracteres_totais
@@ -489,6 +599,7 @@ class MassiveSearchEngine:
             
             # Adicionar ao massive_data
             massive_data['consolidado_etapa1'] = consolidado_ia
+            self._track_size(massive_data, consolidado_ia)
             
             logger.info(f"🤖 Consolidado para IA preparado: {total_sources} fontes, {total_chars:,} caracteres")
             
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Model Router
+Roteamento adaptativo entre modelos: EWMA de latência por token de saída,
+tokens/s, taxa de erro e de 429 e custo por (provedor, modelo, chave),
+restrições do chamador (janela de contexto, latência máxima, apenas gratuitos)
+e circuit breakers no lugar de bloqueios por tempo fixo
+"""
+
+import os
+import time
+import logging
+import threading
+import statistics
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple, Iterable
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Chave agregada do modelo (todas as chaves de API)
+ALL_KEYS = '*'
+
+
+@dataclass
+class ModelProfile:
+    """Características estáticas de um modelo"""
+    provider: str
+    model: str
+    context_window: int = 128000
+    is_free: bool = True
+    # Custo em US$ por 1k tokens
+    cost_per_1k_input: float = 0.0
+    cost_per_1k_output: float = 0.0
+    # Posição na hierarquia estática (usada como prior enquanto não há medições)
+    priority: int = 1
+
+
+@dataclass
+class RouteConstraints:
+    """Restrições de roteamento informadas pelo chamador"""
+    min_context_tokens: int = 0
+    max_latency: Optional[float] = None
+    free_only: bool = False
+
+
+class CircuitBreaker:
+    """
+    closed → open após N falhas consecutivas (ou 429) → half_open quando o
+    cooldown expira; sucesso em half_open fecha, falha reabre com cooldown dobrado
+    """
+
+    def __init__(self, failure_threshold: int, base_cooldown: float, max_cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.cooldown = base_cooldown
+        self.open_until = 0.0
+        self.times_opened = 0
+
+    def current_state(self, now: float) -> str:
+        if self.state == 'open' and now >= self.open_until:
+            self.state = 'half_open'
+        return self.state
+
+    def allows(self, now: float) -> bool:
+        return self.current_state(now) != 'open'
+
+    def on_success(self):
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.cooldown = self.base_cooldown
+
+    def on_failure(self, now: float, retry_after: Optional[float] = None, force_open: bool = False):
+        self.consecutive_failures += 1
+        reopen = self.current_state(now) == 'half_open'
+        if not (force_open or reopen or self.consecutive_failures >= self.failure_threshold):
+            return
+        if reopen:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        wait = retry_after if retry_after is not None else self.cooldown
+        self.state = 'open'
+        self.open_until = now + wait
+        self.times_opened += 1
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        state = self.current_state(now)
+        return {
+            'state': state,
+            'consecutive_failures': self.consecutive_failures,
+            'reopens_in': round(max(0.0, self.open_until - now), 1) if state == 'open' else 0.0,
+            'times_opened': self.times_opened
+        }
+
+
+class RouteStats:
+    """Médias móveis exponenciais de uma rota (provedor, modelo, chave)"""
+
+    def __init__(self, alpha: float, breaker: CircuitBreaker):
+        self.alpha = alpha
+        self.breaker = breaker
+        self.latency: Optional[float] = None
+        self.seconds_per_token: Optional[float] = None
+        self.tokens_per_second: Optional[float] = None
+        self.error_rate = 0.0
+        self.rate_limit_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.cost = 0.0
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else self.alpha * value + (1 - self.alpha) * current
+
+    def on_success(self, latency: float, output_tokens: int, cost: float):
+        self.requests += 1
+        self.latency = self._ewma(self.latency, latency)
+        if output_tokens and latency > 0:
+            self.seconds_per_token = self._ewma(self.seconds_per_token, latency / output_tokens)
+            self.tokens_per_second = self._ewma(self.tokens_per_second, output_tokens / latency)
+        self.error_rate = self._ewma(self.error_rate, 0.0)
+        self.rate_limit_rate = self._ewma(self.rate_limit_rate, 0.0)
+        self.cost += cost
+        self.breaker.on_success()
+
+    def on_failure(self, now: float, rate_limited: bool, retry_after: Optional[float]):
+        self.requests += 1
+        self.failures += 1
+        self.error_rate = self._ewma(self.error_rate, 1.0)
+        self.rate_limit_rate = self._ewma(self.rate_limit_rate, 1.0 if rate_limited else 0.0)
+        self.breaker.on_failure(now, retry_after=retry_after, force_open=rate_limited)
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            'latency_ewma': round(self.latency, 3) if self.latency is not None else None,
+            'seconds_per_token_ewma': round(self.seconds_per_token, 4) if self.seconds_per_token is not None else None,
+            'tokens_per_second_ewma': round(self.tokens_per_second, 1) if self.tokens_per_second is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'rate_limit_rate': round(self.rate_limit_rate, 3),
+            'requests': self.requests,
+            'failures': self.failures,
+            'cost_usd': round(self.cost, 6),
+            'circuit': self.breaker.to_dict(now)
+        }
+
+
+class ModelRouter:
+    """
+    Ordena candidatos pelo custo esperado de atendê-los:
+
+        score = latência_esperada × (1 + W_ERR·erro + W_429·taxa_429) + W_CUSTO·custo/1k
+
+    A latência esperada é a EWMA de segundos por token de saída escalada para
+    ROUTER_REFERENCE_TOKENS, então respostas longas não penalizam o modelo que
+    as gerou. Modelos sem medições usam como prior a mediana dos candidatos já
+    medidos (ou ROUTER_PRIOR_LATENCY se nenhum foi medido) e empates seguem a
+    prioridade estática. Modelos pagos só entram depois dos gratuitos, a menos
+    que ROUTER_MIX_PAID=true, quando competem pelo score com o custo ponderado.
+    """
+
+    def __init__(self):
+        self.alpha = float(os.getenv('ROUTER_EWMA_ALPHA', '0.3'))
+        self.failure_threshold = int(os.getenv('ROUTER_BREAKER_FAILURES', '3'))
+        self.base_cooldown = float(os.getenv('ROUTER_BREAKER_COOLDOWN', '30'))
+        self.max_cooldown = float(os.getenv('ROUTER_BREAKER_MAX_COOLDOWN', '600'))
+        self.prior_latency = float(os.getenv('ROUTER_PRIOR_LATENCY', '10'))
+        self.reference_tokens = int(os.getenv('ROUTER_REFERENCE_TOKENS', '1000'))
+        self.mix_paid = os.getenv('ROUTER_MIX_PAID', 'false').lower() == 'true'
+        self.error_weight = float(os.getenv('ROUTER_ERROR_WEIGHT', '4'))
+        self.rate_limit_weight = float(os.getenv('ROUTER_429_WEIGHT', '2'))
+        self.cost_weight = float(os.getenv('ROUTER_COST_WEIGHT', '100'))
+
+        self.profiles: Dict[Tuple[str, str], ModelProfile] = {}
+        self._routes: Dict[Tuple[str, str, str], RouteStats] = {}
+        self._lock = threading.Lock()
+
+        logger.info(f"🧭 Model Router inicializado (EWMA α={self.alpha}, breaker {self.failure_threshold} falhas/{self.base_cooldown:.0f}s)")
+
+    def register(self, profile: ModelProfile):
+        with self._lock:
+            self.profiles[(profile.provider, profile.model)] = profile
+
+    def _route(self, provider: str, model: str, key: str) -> RouteStats:
+        route_key = (provider, model, key)
+        route = self._routes.get(route_key)
+        if route is None:
+            route = RouteStats(self.alpha, CircuitBreaker(self.failure_threshold, self.base_cooldown, self.max_cooldown))
+            self._routes[route_key] = route
+        return route
+
+    def record_success(self, provider: str, model: str, key: Optional[str] = None, latency: float = 0.0,
+                       input_tokens: int = 0, output_tokens: int = 0):
+        profile = self.profiles.get((provider, model))
+        cost = 0.0
+        if profile:
+            cost = input_tokens / 1000 * profile.cost_per_1k_input + output_tokens / 1000 * profile.cost_per_1k_output
+        with self._lock:
+            for route_key in {key or ALL_KEYS, ALL_KEYS}:
+                self._route(provider, model, route_key).on_success(latency, output_tokens, cost)
+
+    def record_failure(self, provider: str, model: str, key: Optional[str] = None,
+                       rate_limited: bool = False, retry_after: Optional[float] = None,
+                       aggregate: bool = True):
+        """
+        Com `aggregate=False` só a chave é penalizada: o chamador que tenta várias
+        chaves na mesma requisição registra o resultado do modelo uma única vez
+        """
+        now = time.monotonic()
+        with self._lock:
+            if key:
+                self._route(provider, model, key).on_failure(now, rate_limited, retry_after)
+                # 429 numa chave não derruba o modelo inteiro: conta como erro comum no agregado
+                if aggregate:
+                    self._route(provider, model, ALL_KEYS).on_failure(now, False, None)
+            else:
+                self._route(provider, model, ALL_KEYS).on_failure(now, rate_limited, retry_after)
+        logger.debug(f"🧭 Falha registrada em {provider}/{model} ({key or 'todas as chaves'})")
+
+    def is_available(self, provider: str, model: str, key: Optional[str] = None) -> bool:
+        """Circuit breaker fechado/half-open para o modelo (ou para a chave, se informada)"""
+        now = time.monotonic()
+        with self._lock:
+            route = self._routes.get((provider, model, key or ALL_KEYS))
+            return route is None or route.breaker.allows(now)
+
+    def circuit_state(self, provider: str, model: str, key: Optional[str] = None) -> str:
+        now = time.monotonic()
+        with self._lock:
+            route = self._routes.get((provider, model, key or ALL_KEYS))
+            return route.breaker.current_state(now) if route else 'closed'
+
+    def _measured_latency(self, route: Optional[RouteStats]) -> Optional[float]:
+        """Latência medida para ROUTER_REFERENCE_TOKENS tokens (bruta se não houve contagem de tokens)"""
+        if route is None:
+            return None
+        if route.seconds_per_token is not None:
+            return route.seconds_per_token * self.reference_tokens
+        return route.latency
+
+    def _peer_prior(self, candidates: Iterable[Tuple[str, str]]) -> float:
+        """Mediana da latência dos candidatos já medidos"""
+        with self._lock:
+            measured = [
+                latency for latency in (
+                    self._measured_latency(self._routes.get((provider, model, ALL_KEYS)))
+                    for provider, model in candidates
+                ) if latency is not None
+            ]
+        return statistics.median(measured) if measured else self.prior_latency
+
+    def expected_latency(self, provider: str, model: str, prior: Optional[float] = None) -> float:
+        with self._lock:
+            latency = self._measured_latency(self._routes.get((provider, model, ALL_KEYS)))
+        if latency is not None:
+            return latency
+        return prior if prior is not None else self._peer_prior(self.profiles)
+
+    def score(self, provider: str, model: str, prior: Optional[float] = None) -> float:
+        profile = self.profiles.get((provider, model))
+        latency = self.expected_latency(provider, model, prior)
+        with self._lock:
+            route = self._routes.get((provider, model, ALL_KEYS))
+            error_rate = route.error_rate if route else 0.0
+            rate_limit_rate = route.rate_limit_rate if route else 0.0
+        cost = (profile.cost_per_1k_input + profile.cost_per_1k_output) if profile else 0.0
+        return latency * (1 + self.error_weight * error_rate + self.rate_limit_weight * rate_limit_rate) + self.cost_weight * cost
+
+    def rank(self, candidates: Iterable[Tuple[str, str]], constraints: Optional[RouteConstraints] = None,
+             include_open: bool = False) -> List[Tuple[str, str]]:
+        """
+        Ordena (provedor, modelo) do melhor para o pior.
+        Janela de contexto e `free_only` são restrições rígidas; `max_latency`
+        é aplicada sobre a latência estimada (para ROUTER_REFERENCE_TOKENS
+        tokens) e, se nenhum candidato a cumprir, os mais rápidos são mantidos. Modelos com circuito aberto ficam de fora,
+        a menos que `include_open` (último recurso quando todos estão abertos).
+        """
+        constraints = constraints or RouteConstraints()
+        eligible = []
+        for provider, model in candidates:
+            profile = self.profiles.get((provider, model))
+            if profile:
+                if constraints.free_only and not profile.is_free:
+                    continue
+                if constraints.min_context_tokens and profile.context_window < constraints.min_context_tokens:
+                    continue
+            if not include_open and not self.is_available(provider, model):
+                continue
+            eligible.append((provider, model))
+
+        prior = self._peer_prior(eligible)
+        if constraints.max_latency is not None:
+            fast = [c for c in eligible if self.expected_latency(*c, prior=prior) <= constraints.max_latency]
+            eligible = fast or eligible
+
+        def sort_key(candidate: Tuple[str, str]) -> Tuple[int, float, int]:
+            profile = self.profiles.get(candidate)
+            paid = int(bool(profile) and not profile.is_free and not self.mix_paid)
+            return paid, self.score(*candidate, prior=prior), profile.priority if profile else 0
+
+        return sorted(eligible, key=sort_key)
+
+    def reset(self, provider: Optional[str] = None, model: Optional[str] = None):
+        """Descarta medições e fecha os circuitos (de um modelo ou de todos)"""
+        with self._lock:
+            for route_key in list(self._routes):
+                if (provider is None or route_key[0] == provider) and (model is None or route_key[1] == model):
+                    del self._routes[route_key]
+
+    def get_status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            routes = {f"{p}/{m}" + ('' if k == ALL_KEYS else f"#{k}"): r.to_dict(now) for (p, m, k), r in self._routes.items()}
+        prior = self._peer_prior(self.profiles)
+        return {
+            'weights': {
+                'error': self.error_weight,
+                'rate_limit': self.rate_limit_weight,
+                'cost': self.cost_weight
+            },
+            'reference_tokens': self.reference_tokens,
+            'mix_paid': self.mix_paid,
+            'scores': {f"{p}/{m}": round(self.score(p, m, prior), 3) for p, m in self.profiles},
+            'routes': routes
+        }
+
+
+# Instância global
+model_router = ModelRouter()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - NLP Preprocessor
+Pré-processamento NLP compartilhado: tokeniza, lematiza e extrai entidades do
+corpus da sessão uma única vez com nlp.pipe (em lotes, opcionalmente em vários
+processos) e guarda as features por hash do conteúdo para as fases seguintes
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Any, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+PORTUGUESE_STOPWORDS = frozenset([
+    "a", "o", "e", "é", "de", "do", "da", "em", "um", "uma", "para", "com", "não", "que", "se", "na", "por",
+    "mais", "as", "os", "como", "mas", "foi", "ao", "ele", "das", "tem", "à", "seu", "sua", "ou", "ser",
+    "quando", "muito", "há", "nos", "já", "está", "eu", "também", "só", "pelo", "pela", "até", "isso",
+    "ela", "entre", "era", "depois", "sem", "mesmo", "aos", "ter", "seus", "quem", "nas", "me", "esse",
+    "eles", "estão", "você", "tinha", "foram", "essa", "num", "nem", "suas", "meu", "às", "minha", "têm",
+    "numa", "pelos", "elas", "havia", "seja", "qual", "será", "nós", "tenho", "lhe", "deles", "essas",
+    "esses", "pelas", "este", "fosse", "dele", "tu", "te", "vocês", "vos", "lhes", "meus", "minhas"
+])
+
+# Componentes que nenhuma fase usa (lemas e entidades não dependem deles)
+UNUSED_COMPONENTS = ('parser', 'senter', 'textcat', 'textcat_multilabel', 'entity_linker', 'spancat')
+
+
+@dataclass(frozen=True)
+class DocFeatures:
+    """Features de um documento usadas pelas fases de análise"""
+    # Lemas de tokens alfabéticos que não são stopword nem pontuação
+    lemmas: Tuple[str, ...]
+    # (texto, rótulo) das entidades nomeadas
+    entities: Tuple[Tuple[str, str], ...]
+
+
+class NLPPreprocessor:
+    """Cache de DocFeatures por hash do texto, preenchido em lotes via nlp.pipe"""
+
+    def __init__(self, nlp_model, max_chars: int = 100000):
+        self.nlp_model = nlp_model
+        self.max_chars = max_chars
+        self.batch_size = int(os.getenv('NLP_BATCH_SIZE', '64'))
+        self.n_process = int(os.getenv('NLP_N_PROCESS', '1'))
+        self.max_entries = int(os.getenv('NLP_CACHE_MAX_DOCS', '5000'))
+        self.disabled = [name for name in nlp_model.pipe_names if name in UNUSED_COMPONENTS]
+        self._cache: 'OrderedDict[str, DocFeatures]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'documents_parsed': 0, 'cache_hits': 0, 'parse_seconds': 0.0}
+
+        logger.info(f"🧩 NLP Preprocessor: lotes de {self.batch_size}, {self.n_process} processo(s), desativados: {self.disabled or 'nenhum'}")
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(text[:self.max_chars].encode('utf-8', 'ignore')).hexdigest()
+
+    @staticmethod
+    def _extract(doc) -> DocFeatures:
+        return DocFeatures(
+            lemmas=tuple(token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha),
+            entities=tuple((ent.text, ent.label_) for ent in doc.ents)
+        )
+
+    def process(self, texts: Iterable[str]) -> List[DocFeatures]:
+        """Features de cada texto, na ordem; textos novos são processados num único nlp.pipe"""
+        texts = [text or '' for text in texts]
+        keys = [self._key(text) for text in texts]
+
+        with self._lock:
+            found: Dict[str, DocFeatures] = {}
+            pending: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+                    self.stats['cache_hits'] += 1
+                elif key not in pending:
+                    pending[key] = text[:self.max_chars]
+
+        if pending:
+            started = time.perf_counter()
+            n_process = self.n_process if len(pending) >= self.batch_size else 1
+            docs = self.nlp_model.pipe(
+                pending.values(), batch_size=self.batch_size, n_process=n_process, disable=self.disabled
+            )
+            parsed = {key: self._extract(doc) for key, doc in zip(pending.keys(), docs)}
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self.stats['documents_parsed'] += len(parsed)
+                self.stats['parse_seconds'] += elapsed
+                self._cache.update(parsed)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            logger.info(f"🧩 {len(parsed)} documentos processados em {elapsed:.2f}s")
+            found.update(parsed)
+
+        return [found[key] for key in keys]
+
+    def lemmas(self, texts: Iterable[str]) -> List[List[str]]:
+        return [list(features.lemmas) for features in self.process(texts)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'parse_seconds': round(self.stats['parse_seconds'], 3),
+                'cached_documents': len(self._cache),
+                'batch_size': self.batch_size,
+                'n_process': self.n_process,
+                'disabled_components': list(self.disabled)
+            }
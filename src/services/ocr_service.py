@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - OCR Service
+OCR de screenshots num pool de processos (um por núcleo): imagens reduzidas e
+binarizadas antes do Tesseract, resultado (texto + confiança) em cache pelo
+sha256 dos bytes da imagem e screenshots quase idênticos (dHash) do mesmo lote
+reaproveitando o OCR do original
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    from PIL import Image
+    import pytesseract
+    HAS_OCR = True
+except ImportError:
+    HAS_OCR = False
+
+try:
+    import cv2
+    import numpy as np
+    HAS_OPENCV = True
+except ImportError:
+    HAS_OPENCV = False
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def image_dhash(path: str) -> Optional[str]:
+    """dHash de 64 bits (hex): gradiente horizontal de uma miniatura 9x8 em tons de cinza"""
+    try:
+        with Image.open(path) as img:
+            pixels = list(img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:016x}"
+
+
+def hamming(hash_a: str, hash_b: str) -> int:
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+
+def image_fingerprint(path: str) -> Tuple[Optional[str], Optional[str]]:
+    """(sha256 dos bytes, dHash) da imagem; o sha256 é a chave do cache, o dHash só agrupa o lote"""
+    try:
+        with open(path, 'rb') as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None, None
+    return sha256, image_dhash(path)
+
+
+def _prepare_image(img, max_side: int):
+    """Tons de cinza, redução para no máximo `max_side` px e binarização (Otsu com OpenCV)"""
+    img = img.convert('L')
+    if max(img.size) > max_side:
+        scale = max_side / max(img.size)
+        img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+    if HAS_OPENCV:
+        _, binary = cv2.threshold(np.array(img), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return Image.fromarray(binary)
+    return img.point(lambda value: 255 if value > 128 else 0)
+
+
+def _ocr_worker(path: str, max_side: int, lang: str) -> Dict[str, Any]:
+    """Executado no pool: pré-processa e roda o Tesseract uma vez (texto e confiança via image_to_data)"""
+    started = time.perf_counter()
+    with Image.open(path) as img:
+        width, height = img.size
+        prepared = _prepare_image(img, max_side)
+    prepared_at = time.perf_counter()
+
+    data = pytesseract.image_to_data(prepared, lang=lang, output_type=pytesseract.Output.DICT)
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences = []
+    for i, word in enumerate(data.get('text', [])):
+        word = (word or '').strip()
+        if not word:
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(word)
+        try:
+            conf = float(data['conf'][i])
+        except (TypeError, ValueError):
+            continue
+        if conf >= 0:
+            confidences.append(conf)
+    finished = time.perf_counter()
+
+    return {
+        'text': '\n'.join(' '.join(words) for _, words in sorted(lines.items())),
+        'confidence': round(sum(confidences) / len(confidences), 1) if confidences else 0.0,
+        'width': width,
+        'height': height,
+        'preprocess_seconds': round(prepared_at - started, 3),
+        'ocr_seconds': round(finished - prepared_at, 3)
+    }
+
+
+class OCRService:
+    """OCR em lote com pool de processos e cache SQLite por sha256 da imagem"""
+
+    def __init__(self, db_path: str = "analyses_data/ocr_cache.db"):
+        self.workers = int(os.getenv('OCR_WORKERS', str(os.cpu_count() or 2)))
+        self.max_side = int(os.getenv('OCR_MAX_SIDE', '2000'))
+        self.lang = os.getenv('OCR_LANG', 'por')
+        self.near_distance = int(os.getenv('OCR_NEAR_DUPLICATE_DISTANCE', '4'))
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ocr_results (
+                    sha256 TEXT NOT NULL,
+                    lang TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (sha256, lang)
+                )
+            """)
+
+        logger.info(f"🔤 OCR Service: {self.workers} processos, lado máximo {self.max_side}px, quase-duplicatas até {self.near_distance} bits")
+
+    # ------------------------------------------------------------------
+    # Pool e cache
+    # ------------------------------------------------------------------
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # forkserver/spawn: fork de um processo com threads (Flask, event loops) pode herdar locks travados
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+            return self._pool
+
+    def _map(self, fn, *iterables) -> List[Any]:
+        """Executa no pool; se o pool falhar (ex.: worker morto), descarta-o e executa no processo atual"""
+        args = list(zip(*iterables))
+        if len(args) > 1 and self.workers > 1:
+            try:
+                return list(self._get_pool().map(fn, *zip(*args)))
+            except Exception as e:
+                logger.warning(f"⚠️ Pool de OCR indisponível, processando em série: {e}")
+                with self._lock:
+                    if self._pool is not None:
+                        self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+        return [fn(*a) for a in args]
+
+    def _cache_lookup(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Resultado já conhecido para exatamente estes bytes de imagem (e idioma)"""
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT text, confidence, width, height FROM ocr_results WHERE sha256 = ? AND lang = ?",
+                (sha256, self.lang)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE ocr_results SET hits = hits + 1 WHERE sha256 = ? AND lang = ?", (sha256, self.lang))
+        return {'text': row[0], 'confidence': row[1], 'width': row[2], 'height': row[3]}
+
+    def _cache_store(self, sha256: str, result: Dict[str, Any]):
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_results (sha256, lang, text, confidence, width, height, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, self.lang, result['text'], result['confidence'], result.get('width'), result.get('height'),
+                 time.time())
+            )
+
+    # ------------------------------------------------------------------
+    # OCR em lote
+    # ------------------------------------------------------------------
+
+    def ocr_images(self, paths: List[str]) -> Dict[str, Any]:
+        """
+        OCR de um lote de imagens. Cada resultado indica a origem:
+        'ocr' (Tesseract), 'cache' (mesmos bytes já processados) ou 'duplicate'
+        (idêntica ou quase idêntica, por dHash, a outra imagem do mesmo lote).
+        """
+        paths = [str(p) for p in paths]
+        started = time.perf_counter()
+        stats = {'images': len(paths), 'ocr_runs': 0, 'cache_hits': 0, 'duplicates': 0, 'errors': 0, 'workers': self.workers}
+        if not HAS_OCR or not paths:
+            return {'results': {}, 'stats': {**stats, 'available': HAS_OCR}}
+
+        fingerprints = self._map(image_fingerprint, paths)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        to_ocr: List[Tuple[str, Optional[str], Optional[str]]] = []
+        batch_originals: List[Tuple[str, str, Optional[str]]] = []
+        for path, (sha256, dhash) in zip(paths, fingerprints):
+            if sha256:
+                original = next((
+                    p for p, sha, h in batch_originals
+                    if sha == sha256 or (dhash and h and hamming(dhash, h) <= self.near_distance)
+                ), None)
+                if original:
+                    results[path] = {'source': 'duplicate', 'duplicate_of': original, 'sha256': sha256, 'dhash': dhash}
+                    stats['duplicates'] += 1
+                    continue
+                batch_originals.append((path, sha256, dhash))
+                cached = self._cache_lookup(sha256)
+                if cached:
+                    results[path] = {**cached, 'source': 'cache', 'sha256': sha256, 'dhash': dhash, 'seconds': 0.0}
+                    stats['cache_hits'] += 1
+                    continue
+            to_ocr.append((path, sha256, dhash))
+
+        if to_ocr:
+            ocr_paths = [path for path, _, _ in to_ocr]
+            outputs = self._map(_safe_ocr_worker, ocr_paths, [self.max_side] * len(ocr_paths), [self.lang] * len(ocr_paths))
+            for (path, sha256, dhash), output in zip(to_ocr, outputs):
+                if 'error' in output:
+                    results[path] = {'source': 'error', 'error': output['error'], 'sha256': sha256, 'dhash': dhash}
+                    stats['errors'] += 1
+                    continue
+                output['seconds'] = round(output['preprocess_seconds'] + output['ocr_seconds'], 3)
+                results[path] = {**output, 'source': 'ocr', 'sha256': sha256, 'dhash': dhash}
+                stats['ocr_runs'] += 1
+                if sha256:
+                    self._cache_store(sha256, output)
+
+        # Duplicatas herdam o resultado do original
+        for path, result in results.items():
+            if result['source'] == 'duplicate':
+                original = results.get(result['duplicate_of'], {})
+                result.update({k: original.get(k) for k in ('text', 'confidence', 'width', 'height')})
+                result['seconds'] = 0.0
+
+        wall = time.perf_counter() - started
+        stats['wall_seconds'] = round(wall, 3)
+        stats['cpu_seconds'] = round(sum(r.get('seconds') or 0.0 for r in results.values()), 3)
+        stats['images_per_second'] = round(len(paths) / wall, 2) if wall > 0 else 0.0
+        logger.info(
+            f"🔤 OCR: {len(paths)} imagens em {wall:.2f}s ({stats['ocr_runs']} OCR, "
+            f"{stats['cache_hits']} cache, {stats['duplicates']} duplicatas)"
+        )
+        return {'results': results, 'stats': stats}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            cached, hits = conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM ocr_results").fetchone()
+        return {
+            'available': HAS_OCR,
+            'workers': self.workers,
+            'cached_images': cached,
+            'cache_hits_total': hits,
+            'max_side': self.max_side,
+            'near_duplicate_distance': self.near_distance
+        }
+
+
+def _safe_ocr_worker(path: str, max_side: int, lang: str) -> Dict[str, Any]:
+    try:
+        return _ocr_worker(path, max_side, lang)
+    except Exception as e:
+        return {'error': str(e)}
+
+
+# Instância global
+ocr_service = OCRService()
@@ -13,11 +13,23 @@ import asyncio
 import aiohttp
 import re
 import math
-from typing import Dict, List, Optional, Any, Union, Tuple
+from typing import Dict, List, Optional, Any, Union, Tuple, AsyncIterator
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from services.http_client_pool import http_client_pool
+from services.llm_streaming import (
+    StreamHTTPError,
+    StreamMetrics,
+    stream_openai_compatible,
+    continuation_messages,
+    resumable_stream
+)
+from services.request_hedging import hedge_policy, hedged_call, hedged_stream
+from services.model_router import model_router, ModelProfile, RouteConstraints
+from services.rate_limiter import parse_retry_after
+
 load_dotenv()
 
 # Configuração de logging
@@ -425,6 +437,10 @@ class AIModel:
     # Configuração do transformer
     transforms: Optional[List[str]] = None
     middle_out_config: Optional[MiddleOutConfig] = None
+    # Características usadas pelo roteador adaptativo
+    context_window: int = 128000
+    cost_per_1k_input: float = 0.0
+    cost_per_1k_output: float = 0.0
 
 class OpenRouterHierarchyManager:
     """Gerenciador centralizado da hierarquia de IAs via OpenRouter com Middle-Out Transformer"""
@@ -438,6 +454,9 @@ class OpenRouterHierarchyManager:
         # Inicializar Middle-Out Transformer
         self.middle_out_transformer = MiddleOutTransformer()
 
+        # Hedge entre modelos (prazo derivado do p95 de latência)
+        self.hedge_policy = hedge_policy
+
         # HIERARQUIA DEFINIDA COM GROK-4 COMO PRIMÁRIO
         self.models_hierarchy = [
             AIModel(
@@ -448,6 +467,7 @@ class OpenRouterHierarchyManager:
                 temperature=0.7,
                 is_free=True,
                 priority=1,
+                context_window=2000000,
                 transforms=["middle-out"],
                 middle_out_config=MiddleOutConfig(
                     enabled=True,
@@ -464,6 +484,7 @@ class OpenRouterHierarchyManager:
                 temperature=0.7,
                 is_free=True,
                 priority=2,
+                context_window=1048576,
                 transforms=["middle-out"],
                 middle_out_config=MiddleOutConfig(
                     enabled=True,
@@ -480,6 +501,7 @@ class OpenRouterHierarchyManager:
                 temperature=0.7,
                 is_free=True,
                 priority=3,
+                context_window=262144,
                 transforms=["middle-out"],
                 middle_out_config=MiddleOutConfig(
                     enabled=True,
@@ -496,6 +518,9 @@ class OpenRouterHierarchyManager:
                 temperature=0.7,
                 is_free=False, # Pago
                 priority=4,
+                context_window=16385,
+                cost_per_1k_input=0.0005,
+                cost_per_1k_output=0.0015,
                 transforms=["middle-out"],
                 middle_out_config=MiddleOutConfig(
                     enabled=True,
@@ -512,6 +537,9 @@ class OpenRouterHierarchyManager:
                 temperature=0.7,
                 is_free=False, # Pago
                 priority=5,
+                context_window=200000,
+                cost_per_1k_input=0.00025,
+                cost_per_1k_output=0.00125,
                 transforms=["middle-out"],
                 middle_out_config=MiddleOutConfig(
                     enabled=True,
@@ -522,6 +550,19 @@ class OpenRouterHierarchyManager:
             )
         ]
 
+        # Roteamento adaptativo (EWMA de latência/erros/custo + circuit breakers)
+        self.router = model_router
+        for model in self.models_hierarchy:
+            self.router.register(ModelProfile(
+                provider="openrouter",
+                model=model.name,
+                context_window=model.context_window,
+                is_free=model.is_free,
+                cost_per_1k_input=model.cost_per_1k_input,
+                cost_per_1k_output=model.cost_per_1k_output,
+                priority=model.priority
+            ))
+
         # Estatísticas de uso
         self.usage_stats = {
             "total_requests": 0,
@@ -529,6 +570,7 @@ class OpenRouterHierarchyManager:
             "failed_requests": 0,
             "model_usage": {},
             "transformer_usage": {},
+            "hedging": {},
             "last_reset": datetime.now()
         }
 
@@ -569,35 +611,53 @@ class OpenRouterHierarchyManager:
         self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
         return key
 
-    def _get_next_available_model(self) -> Optional[AIModel]:
-        """Obtém próximo modelo disponível na hierarquia"""
-        for model in sorted(self.models_hierarchy, key=lambda x: x.priority):
-            if model.status == "active":
-                return model
+    def _is_model_available(self, model: AIModel) -> bool:
+        """Modelo não desativado e com circuito fechado/half-open"""
+        return model.status != "disabled" and self.router.is_available("openrouter", model.name)
+
+    def _ranked_models(
+        self,
+        constraints: Optional[RouteConstraints] = None,
+        exclude: Optional[List[str]] = None
+    ) -> List[AIModel]:
+        """Modelos elegíveis do melhor para o pior segundo o roteador"""
+        by_name = {m.name: m for m in self.models_hierarchy if m.status != "disabled" and m.name not in (exclude or [])}
+        candidates = [("openrouter", name) for name in by_name]
+        ranked = self.router.rank(candidates, constraints)
+        if not ranked and candidates and not exclude:
+            # Todos os circuitos abertos: tenta mesmo assim, do melhor para o pior
+            logger.warning("⚠️ Todos os circuitos abertos, usando último recurso")
+            ranked = self.router.rank(candidates, constraints, include_open=True)
+        return [by_name[name] for _, name in ranked]
+
+    def _get_next_available_model(self, constraints: Optional[RouteConstraints] = None) -> Optional[AIModel]:
+        """Obtém o melhor modelo disponível segundo o roteador adaptativo"""
+        ranked = self._ranked_models(constraints)
+        if ranked:
+            return ranked[0]
 
         logger.error("❌ Nenhum modelo disponível na hierarquia!")
         return None
 
-    def _mark_model_failed(self, model: AIModel, error: str, duration: int = 300):
-        """Marca modelo como falhado temporariamente"""
+    def _mark_model_failed(self, model: AIModel, error: str, rate_limited: bool = False, retry_after: Optional[float] = None):
+        """Registra falha no roteador; o circuit breaker decide quando o modelo volta"""
         model.failure_count += 1
-        model.status = "failed"
-
-        logger.warning(f"⚠️ Modelo {model.name} marcado como falhado: {error}")
-
-        # Reabilitar após 'duration' segundos
-        async def reactivate_model():
-            await asyncio.sleep(duration)
-            model.status = "active"
-            logger.info(f"✅ Modelo {model.name} reativado após {duration}s")
+        self.router.record_failure("openrouter", model.name, rate_limited=rate_limited, retry_after=retry_after)
+        state = self.router.circuit_state("openrouter", model.name)
+        if state == "open":
+            model.status = "failed"
 
-        asyncio.create_task(reactivate_model())
+        logger.warning(f"⚠️ Falha em {model.name} (circuito {state}): {error}")
 
-    def _mark_model_success(self, model: AIModel):
+    def _mark_model_success(self, model: AIModel, latency: float = 0.0, input_tokens: int = 0, output_tokens: int = 0):
         """Marca modelo como bem-sucedido"""
         model.success_count += 1
         model.last_used = datetime.now()
         model.status = "active"
+        self.router.record_success(
+            "openrouter", model.name, latency=latency,
+            input_tokens=input_tokens, output_tokens=output_tokens
+        )
 
     def _apply_middle_out_transform(self, prompt: str, system_prompt: Optional[str], model: AIModel) -> Tuple[str, Optional[str], Dict[str, Any]]:
         """Aplica transformação middle-out se configurada para o modelo"""
@@ -639,7 +699,10 @@ class OpenRouterHierarchyManager:
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
         model_override: Optional[str] = None,
-        enable_transforms: bool = True
+        enable_transforms: bool = True,
+        allow_fallback: bool = True,
+        constraints: Optional[RouteConstraints] = None,
+        exclude_models: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """
         Gera completion usando hierarquia de modelos com Middle-Out Transformer
@@ -651,20 +714,52 @@ class OpenRouterHierarchyManager:
             temperature: Temperatura (opcional)
             model_override: Forçar modelo específico (opcional)
             enable_transforms: Habilitar transformações (padrão: True)
+            allow_fallback: Descer para o próximo modelo da hierarquia em caso de falha
+            constraints: Restrições de roteamento (contexto mínimo, latência máxima, apenas gratuitos)
+            exclude_models: Modelos já tentados nesta chamada
 
         Returns:
             Dict com resposta e metadados
         """
+        # Uma requisição nas estatísticas, mesmo com hedge ou fallback entre modelos
         self.usage_stats["total_requests"] += 1
+        try:
+            # Modo hedge: cada modelo é um candidato sem fallback próprio
+            if allow_fallback and not model_override and self.hedge_policy.enabled:
+                return await self._generate_completion_hedged(
+                    prompt, system_prompt, max_tokens, temperature, enable_transforms, constraints
+                )
+            return await self._generate_completion(
+                prompt, system_prompt, max_tokens, temperature, model_override,
+                enable_transforms, allow_fallback, constraints, exclude_models
+            )
+        except Exception:
+            self.usage_stats["failed_requests"] += 1
+            raise
+
+    async def _generate_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        model_override: Optional[str],
+        enable_transforms: bool,
+        allow_fallback: bool,
+        constraints: Optional[RouteConstraints],
+        exclude_models: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Tentativas num modelo e fallback para os seguintes (sem contar em total/failed_requests)"""
+        started = time.monotonic()
 
         # Determinar modelo a usar
         if model_override:
             target_model = next((m for m in self.models_hierarchy if m.name == model_override), None)
             if not target_model:
                 logger.error(f"❌ Modelo override não encontrado: {model_override}")
-                target_model = self._get_next_available_model()
+                target_model = self._get_next_available_model(constraints)
         else:
-            target_model = self._get_next_available_model()
+            target_model = self._get_next_available_model(constraints)
 
         if not target_model:
             raise Exception("Nenhum modelo disponível")
@@ -711,8 +806,9 @@ class OpenRouterHierarchyManager:
                 }
 
                 logger.info(f"🤖 Tentativa {attempt + 1} com {target_model.name}")
+                attempt_started = time.monotonic()
 
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     async with session.post(
                         target_model.endpoint,
                         headers=headers,
@@ -724,7 +820,13 @@ class OpenRouterHierarchyManager:
                             result = await response.json()
 
                             # Sucesso!
-                            self._mark_model_success(target_model)
+                            usage = result.get("usage") or {}
+                            self._mark_model_success(
+                                target_model,
+                                latency=time.monotonic() - attempt_started,
+                                input_tokens=usage.get("prompt_tokens", 0),
+                                output_tokens=usage.get("completion_tokens", 0)
+                            )
                             self.usage_stats["successful_requests"] += 1
 
                             # Atualizar estatísticas
@@ -733,6 +835,7 @@ class OpenRouterHierarchyManager:
                             self.usage_stats["model_usage"][target_model.name] += 1
 
                             logger.info(f"✅ Sucesso com {target_model.name}")
+                            self.hedge_policy.record('total', target_model.name, time.monotonic() - started)
 
                             return {
                                 "content": result["choices"][0]["message"]["content"],
@@ -754,7 +857,10 @@ class OpenRouterHierarchyManager:
                             # Se erro 429 (rate limit) ou contém "rate", marcar modelo como falhado por curto período
                             if response.status == 429 or "rate" in error_text.lower():
                                 logger.warning(f"⚠️ Modelo {target_model.name} com rate limit, tentando próximo")
-                                self._mark_model_failed(target_model, f"HTTP {response.status}", duration=60) # 1 minuto apenas
+                                self._mark_model_failed(
+                                    target_model, f"HTTP {response.status}", rate_limited=True,
+                                    retry_after=parse_retry_after(response.headers)
+                                )
                                 break  # Sair do loop de tentativas para este modelo e tentar o próximo
 
                             # Para outros erros, tentar novamente
@@ -778,24 +884,170 @@ class OpenRouterHierarchyManager:
                     break
                 await asyncio.sleep(2 ** attempt)
 
-        # Se chegou aqui, o modelo atual falhou - tentar próximo na hierarquia
-        remaining_models = [m for m in self.models_hierarchy if m.status == "active" and m.priority > target_model.priority]
+        # Se chegou aqui, o modelo atual falhou - tentar o próximo melhor segundo o roteador
+        tried = (exclude_models or []) + [target_model.name]
+        remaining_models = self._ranked_models(constraints, exclude=tried)
 
-        if remaining_models:
-            next_model = min(remaining_models, key=lambda x: x.priority)
+        if remaining_models and allow_fallback:
+            next_model = remaining_models[0]
             logger.info(f"🔄 Tentando próximo modelo: {next_model.name}")
 
             # Chamada recursiva com próximo modelo
-            return await self.generate_completion(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                model_override=next_model.name,
-                enable_transforms=enable_transforms
+            return await self._generate_completion(
+                prompt, system_prompt, max_tokens, temperature, next_model.name,
+                enable_transforms, True, constraints, tried
             )
 
         # Todos os modelos falharam
+        raise Exception("Todos os modelos da hierarquia falharam")
+
+    async def _generate_completion_hedged(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        enable_transforms: bool,
+        constraints: Optional[RouteConstraints] = None
+    ) -> Dict[str, Any]:
+        """
+        Dispara o modelo primário e, se ele passar do prazo de hedge (p95 das
+        latências recentes), o próximo modelo ativo; usa a primeira resposta e
+        cancela a outra
+        """
+        models = self._ranked_models(constraints)
+        if not models:
+            raise Exception("Nenhum modelo disponível")
+
+        candidates = [
+            (m.name, lambda m=m: self._generate_completion(
+                prompt, system_prompt, max_tokens, temperature, m.name,
+                enable_transforms, False, constraints, None
+            ))
+            for m in models
+        ]
+        model_name, result = await hedged_call(candidates, self.usage_stats["hedging"], self.hedge_policy)
+        return result
+
+    async def stream_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        model_override: Optional[str] = None,
+        enable_transforms: bool = True,
+        metrics: Optional[StreamMetrics] = None,
+        constraints: Optional[RouteConstraints] = None
+    ) -> AsyncIterator[str]:
+        """
+        Versão em streaming de generate_completion (SSE com "stream": true).
+
+        Itera os deltas de texto; modelos que falham antes do primeiro delta são
+        trocados pelo próximo da hierarquia, e quedas no meio da geração são
+        retomadas a partir do texto parcial.
+        """
+        self.usage_stats["total_requests"] += 1
+
+        models = self._ranked_models(constraints)
+        if model_override:
+            override = next((m for m in self.models_hierarchy if m.name == model_override), None)
+            if override:
+                models = [override] + [m for m in models if m is not override]
+
+        def model_stream(target_model: AIModel, base: str) -> AsyncIterator[str]:
+            transformed_prompt, transformed_system = prompt, system_prompt
+            if enable_transforms:
+                transformed_prompt, transformed_system, _ = self._apply_middle_out_transform(
+                    prompt, system_prompt, target_model
+                )
+
+            messages = []
+            if transformed_system:
+                messages.append({"role": "system", "content": transformed_system})
+            messages.append({"role": "user", "content": transformed_prompt})
+
+            request_params = {
+                "model": target_model.name,
+                "max_tokens": max_tokens or target_model.max_tokens,
+                "temperature": temperature or target_model.temperature
+            }
+            if target_model.transforms:
+                request_params["transforms"] = target_model.transforms
+
+            def open_stream(model_partial: str) -> AsyncIterator[str]:
+                headers = {
+                    "Authorization": f"Bearer {self._get_current_api_key()}",
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://github.com/joscarmao/v1800finalv2",
+                    "X-Title": "ARQV30 Enhanced v3.0"
+                }
+                payload = dict(request_params, messages=continuation_messages(messages, base + model_partial))
+                return stream_openai_compatible(f"{self.base_url}/chat/completions", headers, payload)
+
+            return resumable_stream(open_stream, metrics=metrics)
+
+        partial = ""
+
+        # Modo hedge: corrida pelo primeiro token entre os modelos ativos
+        if self.hedge_policy.enabled and len(models) > 1:
+            winner = {}
+
+            def on_winner(model_name: str):
+                winner['name'] = model_name
+                if metrics:
+                    metrics.model = model_name
+
+            candidates = [(m.name, lambda m=m: model_stream(m, "")) for m in models]
+            started = time.monotonic()
+            try:
+                async for delta in hedged_stream(candidates, self.usage_stats["hedging"], self.hedge_policy, on_winner):
+                    partial += delta
+                    yield delta
+            except Exception as e:
+                if 'name' not in winner:
+                    self.usage_stats["failed_requests"] += 1
+                    raise Exception("Todos os modelos da hierarquia falharam")
+                winner_model = next(m for m in models if m.name == winner['name'])
+                self._mark_model_failed(winner_model, str(e))
+                models = models[models.index(winner_model) + 1:]
+            else:
+                winner_model = next(m for m in models if m.name == winner['name'])
+                self._mark_model_success(winner_model, latency=time.monotonic() - started, output_tokens=len(partial) // 4)
+                self.usage_stats["successful_requests"] += 1
+                self.usage_stats["model_usage"][winner_model.name] = self.usage_stats["model_usage"].get(winner_model.name, 0) + 1
+                logger.info(f"✅ Stream concluído com {winner_model.name}")
+                return
+
+        for target_model in models:
+            logger.info(f"🌊 Streaming com {target_model.name}")
+            if metrics:
+                metrics.model = target_model.name
+            started = time.monotonic()
+            first = True
+            try:
+                async for delta in model_stream(target_model, partial):
+                    if first:
+                        self.hedge_policy.record('ttft', target_model.name, time.monotonic() - started)
+                        first = False
+                    partial += delta
+                    yield delta
+            except StreamHTTPError as e:
+                self._mark_model_failed(
+                    target_model, f"HTTP {e.status}", rate_limited=e.status == 429,
+                    retry_after=parse_retry_after(e.headers)
+                )
+                continue
+            except Exception as e:
+                self._mark_model_failed(target_model, str(e))
+                continue
+
+            self._mark_model_success(target_model, latency=time.monotonic() - started, output_tokens=len(partial) // 4)
+            self.usage_stats["successful_requests"] += 1
+            self.usage_stats["model_usage"][target_model.name] = self.usage_stats["model_usage"].get(target_model.name, 0) + 1
+            logger.info(f"✅ Stream concluído com {target_model.name}")
+            return
+
         self.usage_stats["failed_requests"] += 1
         raise Exception("Todos os modelos da hierarquia falharam")
 
@@ -808,6 +1060,7 @@ class OpenRouterHierarchyManager:
                     "provider": model.provider,
                     "priority": model.priority,
                     "status": model.status,
+                    "circuit": self.router.circuit_state("openrouter", model.name),
                     "success_count": model.success_count,
                     "failure_count": model.failure_count,
                     "last_used": model.last_used.isoformat() if model.last_used else None,
@@ -818,15 +1071,17 @@ class OpenRouterHierarchyManager:
             ],
             "usage_stats": self.usage_stats,
             "api_keys_count": len(self.api_keys),
-            "active_models": len([m for m in self.models_hierarchy if m.status == "active"]),
-            "middle_out_metrics": self.middle_out_transformer.get_metrics()
+            "active_models": len([m for m in self.models_hierarchy if self._is_model_available(m)]),
+            "middle_out_metrics": self.middle_out_transformer.get_metrics(),
+            "routing": self.router.get_status()
         }
 
     def reset_failed_models(self):
-        """Reativa todos os modelos falhados"""
+        """Reativa todos os modelos falhados (fecha os circuitos)"""
         for model in self.models_hierarchy:
             if model.status == "failed":
                 model.status = "active"
+                self.router.reset("openrouter", model.name)
                 logger.info(f"✅ Modelo {model.name} reativado manualmente")
 
     def update_middle_out_config(self, model_name: str, config: MiddleOutConfig):
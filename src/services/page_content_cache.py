@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Page Content Cache
+Cache persistente URL → conteúdo extraído compartilhado entre sessões.
+Índice SQLite + blobs endereçados pelo hash do conteúdo, com TTL,
+evicção LRU limitada por tamanho e revalidação via ETag/Last-Modified
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from utils.duplicate_remover import duplicate_remover
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    """Entrada do cache de páginas"""
+    url: str
+    content: str
+    extraction_method: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    ttl_seconds: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return (time.time() - self.stored_at) < self.ttl_seconds
+
+    @property
+    def can_revalidate(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+    def revalidation_headers(self) -> Dict[str, str]:
+        """Cabeçalhos para GET condicional"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PageContentCache:
+    """Cache em disco de páginas extraídas, chaveado pela URL normalizada"""
+
+    def __init__(self, base_dir: str = "analyses_data/page_cache"):
+        self.enabled = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+        self.ttl_seconds = float(os.getenv('PAGE_CACHE_TTL_HOURS', '24')) * 3600
+        self.max_size_bytes = int(float(os.getenv('PAGE_CACHE_MAX_MB', '500')) * 1024 * 1024)
+
+        self.base_dir = Path(base_dir)
+        self.blobs_dir = self.base_dir / "blobs"
+        self.db_path = self.base_dir / "index.db"
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'revalidated': 0,
+            'stores': 0,
+            'evictions': 0
+        }
+        self._total_size = 0
+
+        if self.enabled:
+            self.blobs_dir.mkdir(parents=True, exist_ok=True)
+            self._init_database()
+            logger.info(f"✅ Page Content Cache inicializado ({self._total_size / 1024 / 1024:.1f}MB em disco)")
+
+    def _init_database(self):
+        """Inicializa índice SQLite"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS pages (
+                        url_key TEXT PRIMARY KEY,
+                        url TEXT NOT NULL,
+                        content_hash TEXT NOT NULL,
+                        extraction_method TEXT,
+                        etag TEXT,
+                        last_modified TEXT,
+                        size INTEGER NOT NULL,
+                        stored_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages(last_access)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_content_hash ON pages(content_hash)")
+                row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()
+                self._total_size = row[0]
+        except Exception as e:
+            logger.error(f"❌ Erro ao inicializar cache de páginas: {e}")
+            self.enabled = False
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        normalized = duplicate_remover.normalize_url(url)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _blob_path(self, content_hash: str) -> Path:
+        return self.blobs_dir / content_hash[:2] / f"{content_hash}.txt"
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        """Retorna a entrada (fresca ou expirada) sem contar hit/miss"""
+        if not self.enabled or not url:
+            return None
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                row = conn.execute(
+                    "SELECT url, content_hash, extraction_method, etag, last_modified, stored_at "
+                    "FROM pages WHERE url_key = ?",
+                    (self._url_key(url),)
+                ).fetchone()
+            if not row:
+                return None
+            blob_path = self._blob_path(row[1])
+            if not blob_path.exists():
+                return None
+            return CachedPage(
+                url=row[0],
+                content=blob_path.read_text(encoding='utf-8'),
+                extraction_method=row[2] or 'cache',
+                etag=row[3],
+                last_modified=row[4],
+                stored_at=row[5],
+                ttl_seconds=self.ttl_seconds
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao consultar cache de páginas: {e}")
+            return None
+
+    def get(self, url: str) -> Optional[str]:
+        """Retorna o conteúdo apenas se a entrada estiver dentro do TTL"""
+        entry = self.lookup(url)
+        if entry and entry.is_fresh:
+            self.record_hit(url)
+            return entry.content
+        self.record_miss(stale=entry is not None)
+        return None
+
+    def record_hit(self, url: str):
+        """Registra hit e atualiza a posição LRU da entrada"""
+        self.stats['hits'] += 1
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                conn.execute("UPDATE pages SET last_access = ? WHERE url_key = ?", (time.time(), self._url_key(url)))
+        except Exception as e:
+            logger.debug(f"Falha ao atualizar last_access: {e}")
+
+    def record_miss(self, stale: bool = False):
+        self.stats['misses'] += 1
+        if stale:
+            self.stats['stale'] += 1
+
+    def mark_revalidated(self, url: str):
+        """Servidor respondeu 304: renova o TTL da entrada"""
+        now = time.time()
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                conn.execute(
+                    "UPDATE pages SET stored_at = ?, last_access = ? WHERE url_key = ?",
+                    (now, now, self._url_key(url))
+                )
+            self.stats['revalidated'] += 1
+            self.stats['hits'] += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao revalidar cache de {url}: {e}")
+
+    def put(
+        self,
+        url: str,
+        content: str,
+        extraction_method: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        """Armazena o conteúdo extraído de uma URL"""
+        if not self.enabled or not url or not content:
+            return
+        try:
+            data = content.encode('utf-8')
+            content_hash = hashlib.sha256(data).hexdigest()
+            blob_path = self._blob_path(content_hash)
+            if not blob_path.exists():
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = blob_path.with_suffix(f'.{threading.get_ident()}.tmp')
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, blob_path)
+
+            now = time.time()
+            url_key = self._url_key(url)
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                previous = conn.execute("SELECT size, content_hash FROM pages WHERE url_key = ?", (url_key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages "
+                    "(url_key, url, content_hash, extraction_method, etag, last_modified, size, stored_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url_key, url, content_hash, extraction_method, etag, last_modified, len(data), now, now)
+                )
+                self._total_size += len(data) - (previous[0] if previous else 0)
+                if previous and previous[1] != content_hash:
+                    self._delete_blob_if_orphan(conn, previous[1])
+                self.stats['stores'] += 1
+
+                if self._total_size > self.max_size_bytes:
+                    self._evict_lru(conn)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao salvar {url} no cache de páginas: {e}")
+
+    def _delete_blob_if_orphan(self, conn: sqlite3.Connection, content_hash: str):
+        still_used = conn.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone()
+        if not still_used:
+            try:
+                self._blob_path(content_hash).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _evict_lru(self, conn: sqlite3.Connection):
+        """Remove as entradas menos usadas até ficar em 90% do limite"""
+        target = int(self.max_size_bytes * 0.9)
+        rows = conn.execute("SELECT url_key, content_hash, size FROM pages ORDER BY last_access ASC").fetchall()
+        for url_key, content_hash, size in rows:
+            if self._total_size <= target:
+                break
+            conn.execute("DELETE FROM pages WHERE url_key = ?", (url_key,))
+            self._delete_blob_if_orphan(conn, content_hash)
+            self._total_size -= size
+            self.stats['evictions'] += 1
+        logger.info(f"🧹 Cache de páginas reduzido para {self._total_size / 1024 / 1024:.1f}MB")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(
+            self.stats,
+            enabled=self.enabled,
+            size_mb=round(self._total_size / 1024 / 1024, 2),
+            max_size_mb=round(self.max_size_bytes / 1024 / 1024, 2),
+            hit_rate=round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+        )
+
+
+# Instância global
+page_content_cache = PageContentCache()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Progress Events
+Canal de progresso por push: log de eventos limitado por sessão com ids
+sequenciais (retomada via Last-Event-ID no SSE) e uma única roda de timers
+para expirar sessões concluídas, no lugar de um thread dormindo por sessão
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUFFER = int(os.getenv('PROGRESS_EVENT_BUFFER', '200'))
+EVENT_MAX_FIELD_CHARS = int(os.getenv('PROGRESS_EVENT_MAX_FIELD_CHARS', '1000'))
+EVENT_MAX_BYTES = int(os.getenv('PROGRESS_EVENT_MAX_BYTES', '8192'))
+
+
+def bound_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Trunca textos longos e, se ainda passar do limite, mantém só os campos escalares"""
+    bounded = {}
+    for key, value in data.items():
+        if isinstance(value, str) and len(value) > EVENT_MAX_FIELD_CHARS:
+            value = value[:EVENT_MAX_FIELD_CHARS] + '…'
+        bounded[key] = value
+    if len(json.dumps(bounded, ensure_ascii=False, default=str).encode('utf-8')) <= EVENT_MAX_BYTES:
+        return bounded
+    compact = {k: v for k, v in bounded.items() if isinstance(v, (int, float, bool)) or v is None}
+    compact.update({k: v[:200] for k, v in bounded.items() if isinstance(v, str)})
+    compact['truncated'] = True
+    return compact
+
+
+class ProgressEventStream:
+    """Eventos recentes de uma sessão; consumidores leem a partir de um cursor (id)"""
+
+    def __init__(self, session_id: str, maxlen: int = EVENT_BUFFER):
+        self.session_id = session_id
+        self._events: deque = deque(maxlen=maxlen)
+        self._condition = threading.Condition()
+        self.last_id = 0
+        self.closed = False
+        # Cursor do endpoint de polling legado (sem cursor explícito do cliente)
+        self.poll_cursor = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        with self._condition:
+            self.last_id += 1
+            self._events.append((self.last_id, event_type, bound_payload(data)))
+            self._condition.notify_all()
+            return self.last_id
+
+    def since(self, cursor: int, limit: Optional[int] = None) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], bool]:
+        """(eventos com id > cursor, houve_perda) — perda quando o cursor saiu do buffer"""
+        with self._condition:
+            return self._since(cursor, limit)
+
+    def _since(self, cursor: int, limit: Optional[int]):
+        oldest = self._events[0][0] if self._events else self.last_id + 1
+        missed = cursor < oldest - 1
+        events = [event for event in self._events if event[0] > cursor]
+        return (events[:limit] if limit else events), missed
+
+    def wait(self, cursor: int, timeout: float) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], bool]:
+        """Bloqueia até haver eventos depois do cursor, a stream fechar ou o timeout"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.last_id > cursor or self.closed, timeout=timeout)
+            return self._since(cursor, None)
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class TimerWheel:
+    """
+    Roda de timers com hash: N slots avançados por um único thread a cada tick.
+    Um timer de `delay` segundos cai no slot (cursor + ticks) % N com
+    `ticks // N` voltas restantes.
+    """
+
+    def __init__(self, tick_seconds: float = 5.0, slots: int = 128):
+        self.tick_seconds = tick_seconds
+        self.slots: List[Dict[str, Tuple[int, Callable[[], None]]]] = [{} for _ in range(slots)]
+        self._where: Dict[str, int] = {}
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_running(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="progress-timer-wheel", daemon=True)
+            self._thread.start()
+
+    def schedule(self, key: str, delay: float, callback: Callable[[], None]):
+        """Agenda (ou reagenda) `callback` para daqui a `delay` segundos"""
+        ticks = max(1, int(-(-delay // self.tick_seconds)))
+        with self._lock:
+            self._cancel(key)
+            slot = (self._cursor + ticks) % len(self.slots)
+            self.slots[slot][key] = ((ticks - 1) // len(self.slots), callback)
+            self._where[key] = slot
+            self._ensure_running()
+
+    def _cancel(self, key: str) -> bool:
+        slot = self._where.pop(key, None)
+        if slot is None:
+            return False
+        self.slots[slot].pop(key, None)
+        return True
+
+    def cancel(self, key: str) -> bool:
+        with self._lock:
+            return self._cancel(key)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._where)
+
+    def _advance(self) -> List[Callable[[], None]]:
+        with self._lock:
+            self._cursor = (self._cursor + 1) % len(self.slots)
+            slot = self.slots[self._cursor]
+            due = []
+            for key, (rounds, callback) in list(slot.items()):
+                if rounds <= 0:
+                    del slot[key]
+                    self._where.pop(key, None)
+                    due.append(callback)
+                else:
+                    slot[key] = (rounds - 1, callback)
+            return due
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.tick_seconds
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            for callback in self._advance():
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Erro em timer de limpeza: {e}")
+
+
+# Instância global
+progress_timer_wheel = TimerWheel()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Rate Limiter por Provedor
+Token buckets independentes por (provedor, chave, modelo) com limites de
+requisições/min e tokens/min, realimentados pelos 429/Retry-After das APIs
+"""
+
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Any, Tuple, Iterable, Mapping
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BucketConfig:
+    """Limites de um bucket (por minuto)"""
+    requests_per_minute: float = 20.0
+    tokens_per_minute: float = 200000.0
+
+
+# Limites padrão por provedor (sobrescrevíveis via <PROVIDER>_RPM / <PROVIDER>_TPM)
+DEFAULT_PROVIDER_LIMITS: Dict[str, BucketConfig] = {
+    'openrouter': BucketConfig(requests_per_minute=20, tokens_per_minute=200000),
+    'gemini_direct': BucketConfig(requests_per_minute=10, tokens_per_minute=1000000),
+}
+
+# Penalidade aplicada quando um 429 chega sem Retry-After utilizável
+DEFAULT_429_PENALTY_SECONDS = 60.0
+
+
+class TokenBucket:
+    """Token bucket clássico com reabastecimento contínuo"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = max(1.0, float(capacity))
+        self.refill_per_second = max(1e-9, float(refill_per_second))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated_at = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Segundos até existir capacidade para `amount` tokens"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Corrige o saldo (ex.: uso real diferente do estimado)"""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class ProviderKeyLimiter:
+    """Limites de uma combinação (provedor, chave, modelo)"""
+
+    def __init__(self, config: BucketConfig):
+        self.config = config
+        self.request_bucket = TokenBucket(
+            capacity=config.requests_per_minute,
+            refill_per_second=config.requests_per_minute / 60.0
+        )
+        self.token_bucket = TokenBucket(
+            capacity=config.tokens_per_minute,
+            refill_per_second=config.tokens_per_minute / 60.0
+        )
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.rate_limited = 0
+
+    def time_until_available(self, estimated_tokens: float, now: float) -> float:
+        return max(
+            self.blocked_until - now,
+            self.request_bucket.time_until(1, now),
+            self.token_bucket.time_until(estimated_tokens, now)
+        )
+
+    def consume(self, estimated_tokens: float, now: float):
+        self.request_bucket.consume(1, now)
+        self.token_bucket.consume(estimated_tokens, now)
+        self.requests += 1
+
+
+class RateLimitRegistry:
+    """
+    Registro de buckets por (provedor, chave, modelo).
+    Despacha cada chamada para a chave com capacidade disponível, de modo que a
+    vazão escala com o número de chaves carregadas.
+    """
+
+    def __init__(self, provider_limits: Optional[Dict[str, BucketConfig]] = None, max_wait_seconds: float = 300.0):
+        self.provider_limits = dict(DEFAULT_PROVIDER_LIMITS)
+        self.provider_limits.update(self._load_env_limits())
+        if provider_limits:
+            self.provider_limits.update(provider_limits)
+        self.max_wait_seconds = max_wait_seconds
+        self._limiters: Dict[Tuple[str, str, str], ProviderKeyLimiter] = {}
+        # Lock de thread: os managers são usados a partir de vários event loops
+        self._lock = threading.Lock()
+
+    def _load_env_limits(self) -> Dict[str, BucketConfig]:
+        limits = {}
+        for provider, default in DEFAULT_PROVIDER_LIMITS.items():
+            prefix = provider.upper()
+            try:
+                rpm = float(os.getenv(f'{prefix}_RPM', default.requests_per_minute))
+                tpm = float(os.getenv(f'{prefix}_TPM', default.tokens_per_minute))
+            except ValueError:
+                logger.warning(f"⚠️ Limites inválidos em {prefix}_RPM/{prefix}_TPM, usando padrão")
+                continue
+            limits[provider] = BucketConfig(requests_per_minute=rpm, tokens_per_minute=tpm)
+        return limits
+
+    def configure(self, provider: str, requests_per_minute: float, tokens_per_minute: float):
+        """Altera os limites de um provedor e recria seus buckets"""
+        with self._lock:
+            self.provider_limits[provider] = BucketConfig(requests_per_minute, tokens_per_minute)
+            for key in [k for k in self._limiters if k[0] == provider]:
+                del self._limiters[key]
+
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        """Identificador não sensível da chave para logs e status"""
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]
+
+    def _get_limiter(self, provider: str, api_key: str, model: str) -> ProviderKeyLimiter:
+        bucket_key = (provider, self.key_id(api_key), model)
+        limiter = self._limiters.get(bucket_key)
+        if limiter is None:
+            config = self.provider_limits.get(provider, BucketConfig())
+            limiter = ProviderKeyLimiter(config)
+            self._limiters[bucket_key] = limiter
+        return limiter
+
+    async def acquire(
+        self,
+        provider: str,
+        model: str,
+        api_keys: List[str],
+        estimated_tokens: float = 0,
+        exclude: Optional[Iterable[str]] = None
+    ) -> Optional[str]:
+        """
+        Reserva capacidade na chave que ficar livre primeiro.
+
+        Returns:
+            A chave reservada ou None se nenhuma chave ficar disponível dentro
+            de `max_wait_seconds`
+        """
+        excluded = set(exclude or [])
+        candidates = [k for k in api_keys if k and k not in excluded]
+        if not candidates:
+            return None
+
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                best_key, best_wait = None, None
+                for api_key in candidates:
+                    wait = self._get_limiter(provider, api_key, model).time_until_available(estimated_tokens, now)
+                    if best_wait is None or wait < best_wait:
+                        best_key, best_wait = api_key, wait
+                    if wait <= 0:
+                        break
+
+                if best_wait <= 0:
+                    self._get_limiter(provider, best_key, model).consume(estimated_tokens, now)
+                    return best_key
+
+            if now + best_wait > deadline:
+                logger.warning(f"⚠️ Nenhuma chave {provider} disponível para {model} em {self.max_wait_seconds:.0f}s")
+                return None
+
+            logger.info(f"⏱️ Aguardando {best_wait:.2f}s por capacidade em {provider} ({model})")
+            await asyncio.sleep(best_wait)
+
+    def record_usage(self, provider: str, api_key: str, model: str, estimated_tokens: float, actual_tokens: float):
+        """Corrige o bucket de tokens com o uso real reportado pela API"""
+        with self._lock:
+            self._get_limiter(provider, api_key, model).token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def record_rate_limited(self, provider: str, api_key: str, model: str, retry_after: Optional[float] = None):
+        """Bloqueia a chave após um 429 pelo tempo indicado pelo provedor"""
+        penalty = retry_after if retry_after and retry_after > 0 else DEFAULT_429_PENALTY_SECONDS
+        with self._lock:
+            limiter = self._get_limiter(provider, api_key, model)
+            limiter.blocked_until = max(limiter.blocked_until, time.monotonic() + penalty)
+            limiter.rate_limited += 1
+        logger.warning(f"🚦 {provider} chave {self.key_id(api_key)} ({model}) limitada por {penalty:.1f}s")
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            buckets = []
+            for (provider, key_id, model), limiter in self._limiters.items():
+                buckets.append({
+                    'provider': provider,
+                    'key_id': key_id,
+                    'model': model,
+                    'requests': limiter.requests,
+                    'rate_limited': limiter.rate_limited,
+                    'available_requests': round(limiter.request_bucket.tokens, 2),
+                    'available_tokens': round(limiter.token_bucket.tokens),
+                    'blocked_for_seconds': round(max(0.0, limiter.blocked_until - now), 1)
+                })
+            return {
+                'limits': {
+                    p: {'requests_per_minute': c.requests_per_minute, 'tokens_per_minute': c.tokens_per_minute}
+                    for p, c in self.provider_limits.items()
+                },
+                'buckets': buckets
+            }
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Extrai a espera em segundos de Retry-After ou X-RateLimit-Reset"""
+    if not headers:
+        return None
+
+    retry_after = headers.get('Retry-After') or headers.get('retry-after')
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                retry_date = parsedate_to_datetime(retry_after)
+                return max(0.0, (retry_date - datetime.now(tz=retry_date.tzinfo)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    reset = headers.get('X-RateLimit-Reset') or headers.get('x-ratelimit-reset')
+    if reset:
+        try:
+            reset_value = float(reset)
+            # Valores pequenos são segundos relativos (não um instante)
+            if reset_value < 1e9:
+                return max(0.0, reset_value)
+            # OpenRouter envia epoch em milissegundos
+            if reset_value > 1e12:
+                reset_value /= 1000.0
+            return max(0.0, reset_value - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def parse_retry_delay_from_error(error: Exception) -> Optional[float]:
+    """Extrai retry_delay de exceções de cota do SDK Gemini (ResourceExhausted)"""
+    match = re.search(r'retry[_ ]delay\s*\{\s*seconds:\s*(\d+)', str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    text = str(error)
+    return '429' in text or 'ResourceExhausted' in type(error).__name__ or 'quota' in text.lower()
+
+
+# Instância global compartilhada por todos os managers de IA
+rate_limit_registry = RateLimitRegistry()
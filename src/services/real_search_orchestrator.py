@@ -6,6 +6,7 @@ Orquestrador de busca REAL massiva com rotação de APIs e captura visual
 """
 
 import os
+import re
 import logging
 import asyncio
 import time
@@ -27,10 +28,31 @@ except ImportError:
 from services.auto_save_manager import salvar_trecho_pesquisa_web
 
 # Sistema de remoção de duplicatas
-from utils.duplicate_remover import remove_duplicates_from_results, get_duplicate_stats
+from utils.duplicate_remover import duplicate_remover
+
+# Cache persistente de páginas extraídas
+from services.page_content_cache import page_content_cache
+
+# Cache de resultados por provedor de busca
+from services.search_result_cache import search_result_cache
+
+# Sessões aiohttp compartilhadas por event loop
+from services.http_client_pool import http_client_pool
+
+# Browser headless compartilhado para screenshots
+from services.browser_pool import browser_pool
 
 logger = logging.getLogger(__name__)
 
+# Marcas de dados de exemplo/simulação (mesma lista do filtro anti-simulação)
+SIMULATION_MARKERS = re.compile(
+    '|'.join(re.escape(word) for word in (
+        'exemplo', 'sample', 'test', 'mock', 'demo', 'placeholder',
+        'lorem ipsum', 'fake', 'dummy', 'template'
+    )),
+    re.IGNORECASE
+)
+
 # Now safely log the aiohttp warning if it wasn't available
 if not AIOHTTP_AVAILABLE:
     logger.warning("aiohttp não instalado – usando fallback síncrono com requests para Real Search Orchestrator")
@@ -79,6 +101,17 @@ class RealSearchOrchestrator:
             'screenshots_captured': 0
         }
 
+        # Cache de resultados: parâmetros fixos de cada provedor entram na chave.
+        # Firecrawl e Jina ficam fora: extraem e salvam o conteúdo na sessão atual
+        # (o conteúdo das páginas já é reaproveitado via page_content_cache)
+        self.search_cache = search_result_cache
+        self.search_cache_params = {
+            'GOOGLE': {'num': 10, 'lr': 'lang_pt', 'gl': 'br'},
+            'YOUTUBE': {'maxResults': 25, 'type': 'video', 'regionCode': 'BR', 'relevanceLanguage': 'pt'},
+            'EXA': {'numResults': 15, 'type': 'neural'},
+            'SERPER': {'gl': 'br', 'hl': 'pt', 'num': 15}
+        }
+
         logger.info(f"🚀 Real Search Orchestrator inicializado com {sum(len(keys) for keys in self.api_keys.values())} chaves totais")
         logger.info("🔥 MODO: 100% DADOS REAIS - ZERO SIMULAÇÃO - ZERO EXEMPLOS")
 
@@ -364,52 +397,17 @@ class RealSearchOrchestrator:
                 'search_duration': search_duration
             })
 
-            # VALIDAÇÃO ANTI-SIMULAÇÃO: Remove qualquer resultado que pareça ser exemplo
-            real_results = []
-            for result in all_results:
-                title = result.get('title', '').lower()
-                content = result.get('content', '').lower()
-                url = result.get('url', '').lower()
-
-                # Filtra dados que parecem ser exemplos/simulação
-                if not any(word in title + content + url for word in [
-                    'exemplo', 'sample', 'test', 'mock', 'demo', 'placeholder',
-                    'lorem ipsum', 'fake', 'dummy', 'template'
-                ]):
-                    real_results.append(result)
-
-            # Atualiza com apenas dados reais
-            search_results['web_results'] = [r for r in search_results['web_results'] if r in real_results]
-            search_results['social_results'] = [r for r in search_results['social_results'] if r in real_results]
-            search_results['youtube_results'] = [r for r in search_results['youtube_results'] if r in real_results]
-
-            # REMOÇÃO DE DUPLICATAS: Remove dados duplicados mantendo apenas únicos
-            logger.info("🔄 Removendo duplicatas dos resultados...")
-            
-            # Remove duplicatas de cada categoria
-            search_results['web_results'] = remove_duplicates_from_results(
-                search_results['web_results'], "search"
-            )
-            search_results['social_results'] = remove_duplicates_from_results(
-                search_results['social_results'], "search"
-            )
-            search_results['youtube_results'] = remove_duplicates_from_results(
-                search_results['youtube_results'], "search"
-            )
-            
-            # Estatísticas de duplicatas
-            duplicate_stats = get_duplicate_stats()
-            
-            final_count = len(real_results)
-            filtered_count = len(all_results) - final_count
-            unique_count = (len(search_results['web_results']) + 
-                          len(search_results['social_results']) + 
-                          len(search_results['youtube_results']))
+            # VALIDAÇÃO ANTI-SIMULAÇÃO + REMOÇÃO DE DUPLICATAS em passagem única
+            logger.info("🔄 Filtrando simulações e removendo duplicatas dos resultados...")
+            postprocess_stats = self._filter_and_deduplicate_results(search_results)
+
+            filtered_count = postprocess_stats['simulated_removed']
+            unique_count = postprocess_stats['unique']
 
             logger.info(f"✅ BUSCA 100% REAL CONCLUÍDA em {search_duration:.2f}s")
             logger.info(f"📊 {unique_count} resultados ÚNICOS de {len(search_results['providers_used'])} provedores")
             logger.info(f"🗑️ {filtered_count} resultados simulados/exemplo REMOVIDOS")
-            logger.info(f"🔄 {duplicate_stats.duplicates_removed} duplicatas REMOVIDAS")
+            logger.info(f"🔄 {postprocess_stats['duplicates_removed']} duplicatas REMOVIDAS ({postprocess_stats['elapsed_ms']:.1f}ms)")
             logger.info(f"📸 {len(search_results['screenshots_captured'])} screenshots REAIS capturados")
             logger.info(f"🔥 GARANTIA: 100% DADOS REAIS ÚNICOS - ZERO SIMULAÇÃO - ZERO DUPLICATAS")
 
@@ -428,6 +426,52 @@ class RealSearchOrchestrator:
             self._salvar_erro('massive_search_critical_error', {'error': str(e)})
             raise
 
+    def _filter_and_deduplicate_results(self, search_results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Passagem única sobre web/social/youtube: descarta resultados com marcas de
+        simulação e duplicatas por URL normalizada, hash de título ou de conteúdo
+        (os mesmos hashes exatos de duplicate_remover). Como antes, cada categoria
+        é deduplicada separadamente: um vídeo pode aparecer em youtube e em web.
+        """
+        start = time.perf_counter()
+        stats = {'total': 0, 'simulated_removed': 0, 'duplicates_removed': 0, 'unique': 0}
+
+        for category in ('web_results', 'social_results', 'youtube_results'):
+            seen_urls, seen_titles, seen_contents = set(), set(), set()
+            kept = []
+            for result in search_results[category]:
+                stats['total'] += 1
+                title = result.get('title') or ''
+                content = result.get('content') or ''
+                url = result.get('url') or ''
+
+                if SIMULATION_MARKERS.search(title) or SIMULATION_MARKERS.search(content) or SIMULATION_MARKERS.search(url):
+                    stats['simulated_removed'] += 1
+                    continue
+
+                url_key = duplicate_remover.normalize_url(url) if url else None
+                title_key = duplicate_remover.get_title_hash(title)
+                content_key = duplicate_remover.get_content_hash(content or result.get('snippet') or '')
+                if (url_key and url_key in seen_urls) or (title_key and title_key in seen_titles) \
+                        or (content_key and content_key in seen_contents):
+                    stats['duplicates_removed'] += 1
+                    continue
+
+                if url_key:
+                    seen_urls.add(url_key)
+                if title_key:
+                    seen_titles.add(title_key)
+                if content_key:
+                    seen_contents.add(content_key)
+                kept.append(result)
+
+            search_results[category] = kept
+            stats['unique'] += len(kept)
+
+        stats['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        search_results['statistics']['postprocessing'] = stats
+        return stats
+
     async def _search_alibaba_websailor(self, query: str, context: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
         """Busca REAL usando Alibaba WebSailor Agent"""
         try:
@@ -488,7 +532,37 @@ class RealSearchOrchestrator:
             salvar_erro('alibaba_websailor_error', {'error': str(e)})
             return {'success': False, 'error': str(e)}
 
+    async def _cached_search(self, provider: str, query: str, fetch) -> Dict[str, Any]:
+        """Consulta o cache de resultados antes de chamar a API do provedor"""
+        return await self.search_cache.get_or_fetch(
+            provider, query, fetch, self.search_cache_params.get(provider)
+        )
+
     async def _search_firecrawl(self, query: str, session_id: str = None) -> Dict[str, Any]:
+        """Busca Firecrawl (sem cache de resultados: cada sessão precisa salvar seus trechos)"""
+        return await self._fetch_firecrawl(query, session_id)
+
+    async def _search_jina(self, query: str, session_id: str = None) -> Dict[str, Any]:
+        """Busca Jina (sem cache de resultados: cada sessão precisa salvar seus trechos)"""
+        return await self._fetch_jina(query, session_id)
+
+    async def _search_google(self, query: str) -> Dict[str, Any]:
+        """Busca Google com cache de resultados"""
+        return await self._cached_search('GOOGLE', query, lambda: self._fetch_google(query))
+
+    async def _search_youtube(self, query: str) -> Dict[str, Any]:
+        """Busca YouTube com cache de resultados"""
+        return await self._cached_search('YOUTUBE', query, lambda: self._fetch_youtube(query))
+
+    async def _search_exa(self, query: str) -> Dict[str, Any]:
+        """Busca Exa com cache de resultados"""
+        return await self._cached_search('EXA', query, lambda: self._fetch_exa(query))
+
+    async def _search_serper(self, query: str) -> Dict[str, Any]:
+        """Busca Serper com cache de resultados"""
+        return await self._cached_search('SERPER', query, lambda: self._fetch_serper(query))
+
+    async def _fetch_firecrawl(self, query: str, session_id: str = None) -> Dict[str, Any]:
         """Busca REAL usando Firecrawl - SEARCH + SCRAPE"""
         try:
             api_key = self.get_next_api_key('FIRECRAWL')
@@ -497,7 +571,7 @@ class RealSearchOrchestrator:
 
             if AIOHTTP_AVAILABLE:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     headers = {
                         'Authorization': f'Bearer {api_key}',
                         'Content-Type': 'application/json'
@@ -536,6 +610,13 @@ class RealSearchOrchestrator:
 
                     for url in urls[:3]:  # Limita a 3 URLs para não sobrecarregar
                         try:
+                            cached_content = await asyncio.to_thread(page_content_cache.get, url)
+                            if cached_content:
+                                results = self._extract_search_results_from_content(cached_content, 'firecrawl', session_id, url)
+                                all_results.extend(results)
+                                logger.info(f"💾 FIRECRAWL (cache) {len(cached_content)} chars de {url}")
+                                continue
+
                             scrape_payload = {
                                 'url': url,
                                 'formats': ['markdown'],
@@ -550,6 +631,7 @@ class RealSearchOrchestrator:
                                     content = scrape_data.get('data', {}).get('markdown', '')
 
                                     if content and len(content) > 500:  # Exige conteúdo REALMENTE substancial
+                                        await asyncio.to_thread(page_content_cache.put, url, content, 'firecrawl')
                                         # Extrai e salva o conteúdo
                                         results = self._extract_search_results_from_content(content, 'firecrawl', session_id, url)
                                         all_results.extend(results)
@@ -578,7 +660,7 @@ class RealSearchOrchestrator:
             self._salvar_erro('firecrawl_error', {'error': str(e)})
             return {'success': False, 'error': str(e)}
 
-    async def _search_jina(self, query: str, session_id: str = None) -> Dict[str, Any]:
+    async def _fetch_jina(self, query: str, session_id: str = None) -> Dict[str, Any]:
         """Busca REAL usando Jina AI"""
         try:
             api_key = self.get_next_api_key('JINA')
@@ -596,7 +678,8 @@ class RealSearchOrchestrator:
 
             if AIOHTTP_AVAILABLE:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
+                    # Páginas de resultados de busca mudam a cada consulta: ficam fora do cache de páginas
                     for search_url in search_urls:
                         try:
                             jina_url = f"{self.service_urls['JINA']}{search_url}"
@@ -633,7 +716,7 @@ class RealSearchOrchestrator:
             self._salvar_erro('jina_error', {'error': str(e)})
             return {'success': False, 'error': str(e)}
 
-    async def _search_google(self, query: str) -> Dict[str, Any]:
+    async def _fetch_google(self, query: str) -> Dict[str, Any]:
         """Busca REAL usando Google Custom Search"""
         try:
             api_key = self.get_next_api_key('GOOGLE')
@@ -644,7 +727,7 @@ class RealSearchOrchestrator:
 
             if AIOHTTP_AVAILABLE:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     params = {
                         'key': api_key,
                         'cx': cse_id,
@@ -693,7 +776,7 @@ class RealSearchOrchestrator:
             self._salvar_erro('google_error', {'error': str(e)})
             return {'success': False, 'error': str(e)}
 
-    async def _search_youtube(self, query: str) -> Dict[str, Any]:
+    async def _fetch_youtube(self, query: str) -> Dict[str, Any]:
         """Busca REAL no YouTube com foco em conteúdo viral"""
         try:
             api_key = self.get_next_api_key('YOUTUBE')
@@ -702,7 +785,7 @@ class RealSearchOrchestrator:
 
             if AIOHTTP_AVAILABLE:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     params = {
                         'part': "snippet,id",
                         'q': f"{query} Brasil",
@@ -802,7 +885,7 @@ class RealSearchOrchestrator:
 
             if AIOHTTP_AVAILABLE:
                 timeout = aiohttp.ClientTimeout(total=45)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     headers = {
                         'Authorization': f'Bearer {api_key}',
                         'Content-Type': 'application/json'
@@ -873,7 +956,7 @@ class RealSearchOrchestrator:
 
             if AIOHTTP_AVAILABLE:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     headers = {
                         'Authorization': f'Bearer {api_key}',
                         'Content-Type': 'application/json'
@@ -938,7 +1021,7 @@ class RealSearchOrchestrator:
             self._salvar_erro('twitter_error', {'error': str(e)})
             return {'success': False, 'error': str(e)}
 
-    async def _search_exa(self, query: str) -> Dict[str, Any]:
+    async def _fetch_exa(self, query: str) -> Dict[str, Any]:
         """Busca REAL usando Exa Neural Search"""
         try:
             api_key = self.get_next_api_key('EXA')
@@ -947,7 +1030,7 @@ class RealSearchOrchestrator:
 
             if AIOHTTP_AVAILABLE:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     headers = {
                         'x-api-key': api_key,
                         'Content-Type': 'application/json'
@@ -1004,7 +1087,7 @@ class RealSearchOrchestrator:
             self._salvar_erro('exa_error', {'error': str(e)})
             return {'success': False, 'error': str(e)}
 
-    async def _search_serper(self, query: str) -> Dict[str, Any]:
+    async def _fetch_serper(self, query: str) -> Dict[str, Any]:
         """Busca REAL usando Serper"""
         try:
             api_key = self.get_next_api_key('SERPER')
@@ -1013,7 +1096,7 @@ class RealSearchOrchestrator:
 
             if AIOHTTP_AVAILABLE:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     headers = {
                         'X-API-KEY': api_key,
                         'Content-Type': 'application/json'
@@ -1244,8 +1327,47 @@ class RealSearchOrchestrator:
         logger.info(f"🔥 {len(viral_content)} conteúdos virais identificados")
         return viral_content
 
+    async def _capture_viral_screenshots_pooled(self, viral_content: List[Dict[str, Any]], session_id: str) -> List[Dict[str, Any]]:
+        """Captura os screenshots do conteúdo viral em paralelo no browser pool"""
+        screenshots_dir = f"analyses_data/files/{session_id}"
+        os.makedirs(screenshots_dir, exist_ok=True)
+
+        jobs = []
+        for i, content in enumerate(viral_content, 1):
+            if content.get('url'):
+                jobs.append((i, content, f"{screenshots_dir}/viral_content_{i:02d}.png"))
+
+        results = await browser_pool.screenshot_many([{'url': content['url'], 'path': path} for _, content, path in jobs])
+
+        screenshots = []
+        for (i, content, path), result in zip(jobs, results):
+            if result['success']:
+                screenshots.append({
+                    'content_data': content,
+                    'screenshot_path': path,
+                    'filename': f"viral_content_{i:02d}.png",
+                    'url': content['url'],
+                    'title': content.get('title', ''),
+                    'platform': content.get('platform', ''),
+                    'viral_score': content.get('viral_score', 0),
+                    'captured_at': datetime.now().isoformat(),
+                    'capture_seconds': result['seconds']
+                })
+                logger.info(f"✅ Screenshot {i} capturado: {path}")
+            else:
+                logger.warning(f"⚠️ Falha ao capturar screenshot {i}: {result.get('error')}")
+        return screenshots
+
     async def _capture_viral_screenshots(self, viral_content: List[Dict[str, Any]], session_id: str) -> List[Dict[str, Any]]:
-        """Captura screenshots do conteúdo viral usando Selenium"""
+        """Captura screenshots do conteúdo viral (browser pool; Selenium se o Playwright não estiver instalado)"""
+
+        if browser_pool.available:
+            try:
+                return await self._capture_viral_screenshots_pooled(viral_content, session_id)
+            except Exception as e:
+                logger.error(f"❌ Erro na captura de screenshots: {e}")
+                self._salvar_erro('screenshot_capture_error', {'error': str(e)})
+                return []
 
         screenshots = []
 
@@ -1256,7 +1378,6 @@ class RealSearchOrchestrator:
             from selenium.webdriver.common.by import By
             from selenium.webdriver.support.ui import WebDriverWait
             from selenium.webdriver.support import expected_conditions as EC
-            from webdriver_manager.chrome import ChromeDriverManager
 
             # Configura Chrome em modo headless
             chrome_options = Options()
@@ -1294,10 +1415,13 @@ class RealSearchOrchestrator:
             # Estratégia robusta para ChromeDriver
             service = None
             
-            # 1. Tentar ChromeDriverManager primeiro (mais confiável)
+            # 1. Tentar ChromeDriverManager primeiro (mais confiável; caminho instalado uma vez por processo)
             try:
                 logger.info("🔄 Tentativa 1: ChromeDriverManager...")
-                service = Service(ChromeDriverManager().install())
+                driver_path = browser_pool.chromedriver_setup()['driver_path']
+                if not driver_path:
+                    raise Exception("ChromeDriverManager não retornou caminho")
+                service = Service(driver_path)
                 # Testar se funciona
                 test_driver = webdriver.Chrome(service=service, options=chrome_options)
                 test_driver.quit()
@@ -1373,8 +1497,13 @@ class RealSearchOrchestrator:
                             EC.presence_of_element_located((By.TAG_NAME, "body"))
                         )
 
-                        # Aguarda renderização completa
-                        time.sleep(3)
+                        # Aguarda o documento terminar de carregar
+                        try:
+                            WebDriverWait(driver, 10).until(
+                                lambda d: d.execute_script("return document.readyState") == "complete"
+                            )
+                        except Exception:
+                            pass
 
                         # Captura screenshot
                         screenshot_path = f"{screenshots_dir}/viral_content_{i:02d}.png"
@@ -1467,7 +1596,11 @@ class RealSearchOrchestrator:
 
     def get_session_statistics(self) -> Dict[str, Any]:
         """Retorna estatísticas da sessão atual"""
-        return self.session_stats.copy()
+        stats = self.session_stats.copy()
+        stats['search_cache'] = self.search_cache.get_stats()
+        stats['page_cache'] = page_content_cache.get_stats()
+        stats['http_pool'] = http_client_pool.get_stats()
+        return stats
 
     def _salvar_erro(self, erro: str, detalhes: dict = None):
         """Salva erro do processo"""
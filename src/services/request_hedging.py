@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Request Hedging
+Requisições especulativas na hierarquia de modelos: se o modelo primário não
+responder (ou não produzir o primeiro token) dentro de um prazo derivado do
+p95 de latência observado, a mesma requisição é disparada no próximo modelo;
+vence quem responder primeiro e o perdedor é cancelado
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable, AsyncIterator
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# (nome do modelo, fábrica da requisição)
+CallCandidate = Tuple[str, Callable[[], Awaitable[Any]]]
+StreamCandidate = Tuple[str, Callable[[], AsyncIterator[str]]]
+
+
+class HedgePolicy:
+    """
+    Prazos de hedge por modelo (p95 das últimas latências) e orçamento de
+    requisições extras.
+
+    Configuração via ambiente:
+        LLM_HEDGING_ENABLED       liga o modo hedge, que paga requisições duplicadas (padrão: false)
+        LLM_HEDGE_MAX_EXTRA       requisições extras simultâneas por chamada (padrão: 1)
+        LLM_HEDGE_BUDGET_RATIO    fração máxima de chamadas que podem disparar hedge (padrão: 0.2)
+        LLM_HEDGE_P95_MULTIPLIER  prazo = p95 x multiplicador (padrão: 1.0)
+        LLM_HEDGE_MIN_DEADLINE / LLM_HEDGE_MAX_DEADLINE  limites do prazo em segundos
+        LLM_HEDGE_DEFAULT_DEADLINE  prazo do primeiro token (streams) enquanto não há amostras suficientes (padrão: 20)
+        LLM_HEDGE_DEFAULT_TOTAL_DEADLINE  idem para chamadas completas ('total'), que levam
+                                  a geração inteira (padrão: 120)
+    """
+
+    MIN_SAMPLES = 5
+    WINDOW = 100
+    # Hedges permitidos além da fração (evita bloquear o início da execução)
+    BURST = 3
+
+    def __init__(self):
+        self.enabled = os.getenv('LLM_HEDGING_ENABLED', 'false').lower() == 'true'
+        self.max_extra = int(os.getenv('LLM_HEDGE_MAX_EXTRA', '1'))
+        self.budget_ratio = float(os.getenv('LLM_HEDGE_BUDGET_RATIO', '0.2'))
+        self.p95_multiplier = float(os.getenv('LLM_HEDGE_P95_MULTIPLIER', '1.0'))
+        self.min_deadline = float(os.getenv('LLM_HEDGE_MIN_DEADLINE', '2'))
+        self.max_deadline = float(os.getenv('LLM_HEDGE_MAX_DEADLINE', '60'))
+        self.default_deadline = float(os.getenv('LLM_HEDGE_DEFAULT_DEADLINE', '20'))
+        self.default_total_deadline = float(os.getenv('LLM_HEDGE_DEFAULT_TOTAL_DEADLINE', '120'))
+
+        self._latencies: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+
+        logger.info(f"🏁 Hedge policy: {'ativo' if self.enabled else 'desativado'} (extra {self.max_extra}, orçamento {self.budget_ratio:.0%})")
+
+    def record(self, kind: str, model: str, seconds: float):
+        """Registra uma latência ('ttft' para streams, 'total' para chamadas completas)"""
+        with self._lock:
+            self._latencies.setdefault((kind, model), deque(maxlen=self.WINDOW)).append(seconds)
+
+    def p95(self, kind: str, model: str) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get((kind, model), ()))
+        if len(samples) < self.MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+
+    def deadline(self, kind: str, model: str) -> float:
+        p95 = self.p95(kind, model)
+        if p95 is None:
+            return self.default_total_deadline if kind == 'total' else self.default_deadline
+        return max(self.min_deadline, min(self.max_deadline, p95 * self.p95_multiplier))
+
+    def begin_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire_hedge(self, in_flight: int) -> bool:
+        """Autoriza uma requisição extra se houver orçamento"""
+        if not self.enabled or in_flight > self.max_extra:
+            return False
+        with self._lock:
+            if self.hedges >= self.budget_ratio * self.calls + self.BURST:
+                return False
+            self.hedges += 1
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = list(self._latencies)
+        return {
+            'enabled': self.enabled,
+            'calls': self.calls,
+            'hedges': self.hedges,
+            'deadlines': {f"{kind}:{model}": round(self.deadline(kind, model), 2) for kind, model in keys}
+        }
+
+
+def _model_stats(stats: Dict[str, Any], model: str) -> Dict[str, int]:
+    return stats.setdefault(model, {'wins': 0, 'losses': 0, 'hedges_fired': 0, 'failures': 0})
+
+
+async def _cancel_all(tasks) -> None:
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def hedged_call(
+    candidates: List[CallCandidate],
+    stats: Dict[str, Any],
+    policy: Optional['HedgePolicy'] = None,
+    kind: str = 'total'
+) -> Tuple[str, Any]:
+    """
+    Executa o primeiro candidato e, se ele não terminar dentro do prazo,
+    dispara o próximo; retorna (modelo, resultado) do primeiro que responder.
+    Resultado None ou exceção contam como falha (o próximo é disparado na hora).
+    """
+    policy = policy or hedge_policy
+    policy.begin_call()
+    pending: Dict[asyncio.Task, Tuple[str, float]] = {}
+    next_index = 0
+    last_error: Optional[BaseException] = None
+
+    def launch():
+        nonlocal next_index
+        name, factory = candidates[next_index]
+        next_index += 1
+        pending[asyncio.ensure_future(factory())] = (name, time.monotonic())
+        return name
+
+    current = launch()
+    try:
+        while pending:
+            can_hedge = next_index < len(candidates)
+            timeout = policy.deadline(kind, current) if can_hedge and policy.enabled else None
+            done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                if policy.try_acquire_hedge(len(pending)):
+                    _model_stats(stats, current)['hedges_fired'] += 1
+                    logger.info(f"🏁 {current} sem resposta em {timeout:.1f}s, disparando hedge")
+                    current = launch()
+                else:
+                    # Sem orçamento: espera o que já está em andamento
+                    done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                name, started = pending.pop(task)
+                error = task.exception() if not task.cancelled() else asyncio.CancelledError()
+                result = None if error else task.result()
+                if error or result is None:
+                    last_error = error or last_error
+                    _model_stats(stats, name)['failures'] += 1
+                    continue
+
+                policy.record(kind, name, time.monotonic() - started)
+                _model_stats(stats, name)['wins'] += 1
+                for loser_name, _ in pending.values():
+                    _model_stats(stats, loser_name)['losses'] += 1
+                return name, result
+
+            # Falha sem nada em andamento: passa direto para o próximo modelo
+            if not pending and next_index < len(candidates):
+                current = launch()
+
+        raise Exception(f"Todos os candidatos falharam: {last_error}")
+    finally:
+        await _cancel_all(list(pending))
+
+
+async def hedged_stream(
+    candidates: List[StreamCandidate],
+    stats: Dict[str, Any],
+    policy: Optional['HedgePolicy'] = None,
+    on_winner: Optional[Callable[[str], None]] = None
+) -> AsyncIterator[str]:
+    """
+    Versão para streams: a corrida é pelo primeiro token. O vencedor continua
+    sendo consumido e os demais streams são cancelados e fechados.
+    """
+    policy = policy or hedge_policy
+    policy.begin_call()
+    pending: Dict[asyncio.Task, Tuple[str, float, Any]] = {}
+    next_index = 0
+    last_error: Optional[BaseException] = None
+
+    def launch():
+        nonlocal next_index
+        name, factory = candidates[next_index]
+        next_index += 1
+        stream = factory()
+        pending[asyncio.ensure_future(stream.__anext__())] = (name, time.monotonic(), stream)
+        return name
+
+    async def close_pending():
+        entries = list(pending.items())
+        pending.clear()
+        await _cancel_all([task for task, _ in entries])
+        for _, (_, _, stream) in entries:
+            await stream.aclose()
+
+    winner = None
+    current = launch()
+    try:
+        while pending and winner is None:
+            can_hedge = next_index < len(candidates)
+            timeout = policy.deadline('ttft', current) if can_hedge and policy.enabled else None
+            done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                if policy.try_acquire_hedge(len(pending)):
+                    _model_stats(stats, current)['hedges_fired'] += 1
+                    logger.info(f"🏁 {current} sem primeiro token em {timeout:.1f}s, disparando hedge")
+                    current = launch()
+                else:
+                    done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                name, started, stream = pending.pop(task)
+                error = task.exception() if not task.cancelled() else asyncio.CancelledError()
+                if error:
+                    # StopAsyncIteration antes do primeiro token = resposta vazia
+                    last_error = error
+                    _model_stats(stats, name)['failures'] += 1
+                    await stream.aclose()
+                    continue
+                if winner is None:
+                    winner = (name, task.result(), stream)
+                    policy.record('ttft', name, time.monotonic() - started)
+                else:
+                    pending[task] = (name, started, stream)
+
+            if winner is None and not pending and next_index < len(candidates):
+                current = launch()
+
+        if winner is None:
+            raise Exception(f"Todos os candidatos falharam: {last_error}")
+
+        name, first_delta, stream = winner
+        _model_stats(stats, name)['wins'] += 1
+        for loser_name, _, _ in pending.values():
+            _model_stats(stats, loser_name)['losses'] += 1
+        await close_pending()
+        if on_winner:
+            on_winner(name)
+
+        yield first_delta
+        async for delta in stream:
+            yield delta
+    finally:
+        await close_pending()
+
+
+# Instância global
+hedge_policy = HedgePolicy()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Search Result Cache
+Cache de resultados por provedor de busca com normalização de query,
+TTL por provedor e stale-while-revalidate. Armazenamento plugável:
+SQLite local (padrão) ou Redis (SEARCH_CACHE_BACKEND=redis)
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# TTL padrão por provedor (horas); sobrescrevível via SEARCH_CACHE_TTL_<PROVEDOR>
+DEFAULT_PROVIDER_TTL_HOURS = {
+    'SERPER': 6,
+    'GOOGLE': 6,
+    'JINA': 6,
+    'EXA': 24,
+    'FIRECRAWL': 24,
+    'YOUTUBE': 3
+}
+
+
+class SQLiteSearchCacheBackend:
+    """Armazenamento local em SQLite"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path: str = "analyses_data/search_cache.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_expires ON search_cache(expires_at)")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT value, stored_at, expires_at FROM search_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if not row or row[2] < time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, provider: str, query: str, value: Any, keep_seconds: float):
+        now = time.time()
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (cache_key, provider, query, value, stored_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, query, json.dumps(value, ensure_ascii=False, default=str), now, now + keep_seconds)
+            )
+            conn.execute("DELETE FROM search_cache WHERE expires_at < ?", (now,))
+
+
+class RedisSearchCacheBackend:
+    """Armazenamento compartilhado em Redis (opcional)"""
+
+    name = 'redis'
+
+    def __init__(self, url: str, prefix: str = "arqv30:search:"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.client.ping()
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        raw = self.client.get(self.prefix + key)
+        if not raw:
+            return None
+        data = json.loads(raw)
+        return data['value'], data['stored_at']
+
+    def set(self, key: str, provider: str, query: str, value: Any, keep_seconds: float):
+        payload = json.dumps({'provider': provider, 'query': query, 'value': value, 'stored_at': time.time()},
+                             ensure_ascii=False, default=str)
+        self.client.set(self.prefix + key, payload, ex=max(1, int(keep_seconds)))
+
+
+class SearchResultCache:
+    """Cache de resultados de busca sensível ao provedor"""
+
+    def __init__(self):
+        self.enabled = os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+        self.stale_seconds = float(os.getenv('SEARCH_CACHE_STALE_HOURS', '24')) * 3600
+        self.provider_ttls = {
+            provider: float(os.getenv(f'SEARCH_CACHE_TTL_{provider}', hours)) * 3600
+            for provider, hours in DEFAULT_PROVIDER_TTL_HOURS.items()
+        }
+        self.default_ttl = 6 * 3600
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale_served': 0,
+            'background_refreshes': 0,
+            'stores': 0,
+            'errors': 0,
+            'by_provider': {}
+        }
+        self._refreshing = set()
+        self._background_tasks = set()
+        self.backend = self._create_backend() if self.enabled else None
+
+        if self.backend:
+            logger.info(f"✅ Search Result Cache inicializado (backend: {self.backend.name})")
+
+    def _create_backend(self):
+        """Redis se configurado e acessível; caso contrário SQLite local"""
+        if os.getenv('SEARCH_CACHE_BACKEND', 'sqlite').lower() == 'redis':
+            try:
+                return RedisSearchCacheBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+            except Exception as e:
+                logger.warning(f"⚠️ Redis indisponível para cache de busca ({e}), usando SQLite")
+        try:
+            return SQLiteSearchCacheBackend()
+        except Exception as e:
+            logger.error(f"❌ Erro ao inicializar cache de busca: {e}")
+            self.enabled = False
+            return None
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Minúsculas, Unicode NFKC, espaços colapsados e pontuação de borda removida"""
+        normalized = unicodedata.normalize('NFKC', query or '').lower()
+        normalized = re.sub(r'\s+', ' ', normalized)
+        return normalized.strip(' \t\n.,;:!?"\'')
+
+    def make_key(self, provider: str, query: str, params: Optional[Dict[str, Any]] = None) -> str:
+        raw = json.dumps(
+            {'provider': provider, 'query': self.normalize_query(query), 'params': params or {}},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _provider_stats(self, provider: str) -> Dict[str, int]:
+        return self.stats['by_provider'].setdefault(provider, {'hits': 0, 'misses': 0, 'stale_served': 0})
+
+    @staticmethod
+    def _is_cacheable(result: Any) -> bool:
+        return isinstance(result, dict) and result.get('success') and bool(result.get('results'))
+
+    async def _store(self, key: str, provider: str, query: str, result: Dict[str, Any]):
+        ttl = self.provider_ttls.get(provider, self.default_ttl)
+        try:
+            await asyncio.to_thread(self.backend.set, key, provider, self.normalize_query(query), result, ttl + self.stale_seconds)
+            self.stats['stores'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ Erro ao gravar cache de busca {provider}: {e}")
+
+    async def _refresh(self, key: str, provider: str, query: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]):
+        try:
+            result = await fetch()
+            if self._is_cacheable(result):
+                await self._store(key, provider, query, result)
+                self.stats['background_refreshes'] += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Revalidação em segundo plano falhou ({provider}): {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def get_or_fetch(
+        self,
+        provider: str,
+        query: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Retorna o resultado em cache ou executa `fetch`.
+        Entradas expiradas dentro da janela stale são servidas imediatamente e
+        revalidadas em segundo plano.
+        """
+        if not self.enabled or not self.backend:
+            return await fetch()
+
+        key = self.make_key(provider, query, params)
+        provider_stats = self._provider_stats(provider)
+
+        try:
+            cached = await asyncio.to_thread(self.backend.get, key)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ Erro ao ler cache de busca {provider}: {e}")
+            cached = None
+
+        if cached:
+            value, stored_at = cached
+            age = time.time() - stored_at
+            if age < self.provider_ttls.get(provider, self.default_ttl):
+                self.stats['hits'] += 1
+                provider_stats['hits'] += 1
+                logger.info(f"💾 Cache de busca {provider}: '{query}' ({age / 60:.0f}min)")
+                return dict(value, from_cache=True)
+
+            # Stale-while-revalidate
+            self.stats['stale_served'] += 1
+            provider_stats['stale_served'] += 1
+            if key not in self._refreshing:
+                self._refreshing.add(key)
+                task = asyncio.create_task(self._refresh(key, provider, query, fetch))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            logger.info(f"💾 Cache de busca {provider} (stale, revalidando): '{query}'")
+            return dict(value, from_cache=True, stale=True)
+
+        self.stats['misses'] += 1
+        provider_stats['misses'] += 1
+        result = await fetch()
+        if self._is_cacheable(result):
+            await self._store(key, provider, query, result)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['stale_served'] + self.stats['misses']
+        served = self.stats['hits'] + self.stats['stale_served']
+        return dict(
+            self.stats,
+            enabled=self.enabled,
+            backend=self.backend.name if self.backend else None,
+            hit_rate=round(served / lookups, 3) if lookups else 0.0
+        )
+
+
+# Instância global
+search_result_cache = SearchResultCache()
@@ -10,13 +10,15 @@ import json
 import time
 import asyncio
 import logging
-import ssl
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from urllib.parse import urlparse, parse_qs, unquote, urljoin
 from dataclasses import dataclass, asdict
 import hashlib
 
+from services.http_client_pool import http_client_pool
+from services.browser_pool import browser_pool
+
 # Import condicional do Google Generative AI
 try:
     import google.generativeai as genai
@@ -28,7 +30,7 @@ except ImportError:
 
 # Import condicional do Playwright
 try:
-    from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+    from playwright.async_api import Page, Browser, BrowserContext
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
@@ -652,7 +654,7 @@ class ViralImageFinder:
                 try:
                     if HAS_ASYNC_DEPS:
                         timeout = aiohttp.ClientTimeout(total=15)  # Reduzir timeout
-                        async with aiohttp.ClientSession(timeout=timeout) as session:
+                        async with http_client_pool.session(timeout=timeout) as session:
                             async with session.post(url, headers=headers, json=payload) as response:
                                 if response.status == 200:
                                     data = await response.json()
@@ -697,7 +699,7 @@ class ViralImageFinder:
                                     
                     else:
                         # Fallback síncrono
-                        response = self.session.post(url, headers=headers, json=payload, timeout=15)
+                        response = await asyncio.to_thread(self.session.post, url, headers=headers, json=payload, timeout=15)
                         if response.status_code == 200:
                             data = response.json()
                             # Processar resultados similar ao async
@@ -767,10 +769,9 @@ class ViralImageFinder:
             # DuckDuckGo Instant Answer API (gratuito)
             url = f"https://api.duckduckgo.com/?q={quote(query)}&format=json&no_html=1&skip_disambig=1"
             
-            if hasattr(self, 'session') and self.session:
-                response = self.session.get(url, timeout=10)
-            else:
-                response = requests.get(url, timeout=10)
+            # requests é bloqueante: roda fora do event loop
+            http_get = self.session.get if getattr(self, 'session', None) else requests.get
+            response = await asyncio.to_thread(http_get, url, timeout=10)
                 
             if response.status_code == 200:
                 data = response.json()
@@ -809,10 +810,9 @@ class ViralImageFinder:
             headers = {"Ocp-Apim-Subscription-Key": bing_key}
             params = {"q": query, "count": 5, "mkt": "pt-BR"}
             
-            if hasattr(self, 'session') and self.session:
-                response = self.session.get(url, headers=headers, params=params, timeout=10)
-            else:
-                response = requests.get(url, headers=headers, params=params, timeout=10)
+            # requests é bloqueante: roda fora do event loop
+            http_get = self.session.get if getattr(self, 'session', None) else requests.get
+            response = await asyncio.to_thread(http_get, url, headers=headers, params=params, timeout=10)
                 
             if response.status_code == 200:
                 data = response.json()
@@ -849,10 +849,9 @@ class ViralImageFinder:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            if hasattr(self, 'session') and self.session:
-                response = self.session.get(search_url, headers=headers, timeout=15)
-            else:
-                response = requests.get(search_url, headers=headers, timeout=15)
+            # requests é bloqueante: roda fora do event loop
+            http_get = self.session.get if getattr(self, 'session', None) else requests.get
+            response = await asyncio.to_thread(http_get, search_url, headers=headers, timeout=15)
                 
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -900,12 +899,12 @@ class ViralImageFinder:
         try:
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(url, params=params) as response:
                         response.raise_for_status()
                         data = await response.json()
             else:
-                response = self.session.get(url, params=params, timeout=self.config['timeout'])
+                response = await asyncio.to_thread(self.session.get, url, params=params, timeout=self.config['timeout'])
                 response.raise_for_status()
                 data = response.json()
             results = []
@@ -959,7 +958,7 @@ class ViralImageFinder:
                         
                         if HAS_ASYNC_DEPS:
                             timeout = aiohttp.ClientTimeout(total=30)
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
+                            async with http_client_pool.session(timeout=timeout) as session:
                                 async with session.post(url, json=payload, headers=headers) as response:
                                     if response.status == 200:
                                         data = await response.json()
@@ -1071,7 +1070,7 @@ class ViralImageFinder:
                         
                         if HAS_ASYNC_DEPS:
                             timeout = aiohttp.ClientTimeout(total=30)
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
+                            async with http_client_pool.session(timeout=timeout) as session:
                                 async with session.post(url, json=payload, headers=headers) as response:
                                     if response.status == 200:
                                         data = await response.json()
@@ -1157,7 +1156,7 @@ class ViralImageFinder:
                         
                         if HAS_ASYNC_DEPS:
                             timeout = aiohttp.ClientTimeout(total=30)
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
+                            async with http_client_pool.session(timeout=timeout) as session:
                                 async with session.post(url, json=payload, headers=headers) as response:
                                     if response.status == 200:
                                         data = await response.json()
@@ -1231,7 +1230,7 @@ class ViralImageFinder:
             
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.post(api_url, json=payload) as response:
                         if response.status == 200:
                             data = await response.json()
@@ -1297,7 +1296,7 @@ class ViralImageFinder:
                 
                 if HAS_ASYNC_DEPS:
                     timeout = aiohttp.ClientTimeout(total=30)
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with http_client_pool.session(timeout=timeout) as session:
                         async with session.get(embed_url) as response:
                             if response.status == 200:
                                 html_content = await response.text()
@@ -1343,7 +1342,7 @@ class ViralImageFinder:
                 try:
                     if HAS_ASYNC_DEPS:
                         timeout = aiohttp.ClientTimeout(total=30)
-                        async with aiohttp.ClientSession(timeout=timeout) as session:
+                        async with http_client_pool.session(timeout=timeout) as session:
                             async with session.get(url) as response:
                                 if response.status == 200:
                                     data = await response.json()
@@ -1448,7 +1447,7 @@ class ViralImageFinder:
             
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(embed_url) as response:
                         if response.status == 200:
                             html_content = await response.text()
@@ -1492,7 +1491,7 @@ class ViralImageFinder:
                 headers = {
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
                 }
-                async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+                async with http_client_pool.session(timeout=timeout, headers=headers) as session:
                     async with session.get(post_url) as response:
                         if response.status == 200:
                             html_content = await response.text()
@@ -1611,7 +1610,7 @@ class ViralImageFinder:
                 
                 if HAS_ASYNC_DEPS:
                     timeout = aiohttp.ClientTimeout(total=15)
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with http_client_pool.session(timeout=timeout) as session:
                         async with session.post(serper_url, json=payload, headers=headers) as response:
                             if response.status == 200:
                                 data = await response.json()
@@ -1710,7 +1709,7 @@ class ViralImageFinder:
             
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(post_url, headers=headers) as response:
                         if response.status == 200:
                             html = await response.text()
@@ -1801,7 +1800,7 @@ class ViralImageFinder:
             embed_url = f"https://api.instagram.com/oembed/?url=https://www.instagram.com/p/{shortcode}/"
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=15)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(embed_url) as response:
                         if response.status == 200:
                             data = await response.json()
@@ -1844,7 +1843,7 @@ class ViralImageFinder:
             }
             if HAS_ASYNC_DEPS:
                 timeout = aiohttp.ClientTimeout(total=20)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_client_pool.session(timeout=timeout) as session:
                     async with session.get(post_url, headers=headers) as response:
                         if response.status == 200:
                             content = await response.text()
@@ -1896,111 +1895,92 @@ class ViralImageFinder:
             return self._get_default_engagement('facebook')
 
     async def _analyze_with_playwright_robust(self, post_url: str, platform: str) -> Optional[Dict]:
-        """Análise robusta com Playwright e estratégia anti-login agressiva"""
+        """Análise robusta com Playwright e estratégia anti-login agressiva (browser pool compartilhado)"""
         if not self.playwright_enabled:
             return None
         logger.info(f"🎭 Análise Playwright robusta para {post_url}")
-        try:
-            async with async_playwright() as p:
-                # Configuração mais agressiva do browser
-                browser = await p.chromium.launch(
-                    headless=self.config['headless'],
-                    args=[
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-web-security',
-                        '--disable-features=VizDisplayCompositor',
-                        '--disable-extensions',
-                        '--no-first-run',
-                        '--disable-default-apps'
-                    ]
-                )
-                # Context com configurações específicas para redes sociais
-                context = await browser.new_context(
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    viewport={'width': 1920, 'height': 1080},
-                    # Bloquear popups automaticamente
-                    java_script_enabled=True,
-                    accept_downloads=False,
-                    # Configurações extras para evitar detecção
-                    extra_http_headers={
-                        'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-                    }
-                )
-                page = await context.new_page()
-                page.set_default_timeout(12000)  # 12 segundos timeout fixo
-                # Bloquear requests desnecessários que causam popups
-                await page.route('**/*', lambda route: (
-                    route.abort() if any(blocked in route.request.url for blocked in [
-                        'login', 'signin', 'signup', 'auth', 'oauth',
-                        'tracking', 'analytics', 'ads', 'advertising'
-                    ]) else route.continue_()
-                ))
-                # Navegar com estratégia específica por plataforma
-                if platform == 'instagram':
-                    # Para Instagram, múltiplas estratégias para evitar login
-                    navigation_success = False
-                    strategies = [
-                        # Estratégia 1: Embed (sem login)
-                        lambda url: url + 'embed/' if ('/p/' in url or '/reel/' in url) else url,
-                        # Estratégia 2: URL normal com parâmetros para evitar login
-                        lambda url: url + '?__a=1&__d=dis',
-                        # Estratégia 3: URL normal
-                        lambda url: url
-                    ]
+
+        async def analyze(page):
+            page.set_default_timeout(12000)  # 12 segundos timeout fixo
+            # Navegar com estratégia específica por plataforma
+            if platform == 'instagram':
+                # Para Instagram, múltiplas estratégias para evitar login
+                navigation_success = False
+                strategies = [
+                    # Estratégia 1: Embed (sem login)
+                    lambda url: url + 'embed/' if ('/p/' in url or '/reel/' in url) else url,
+                    # Estratégia 2: URL normal com parâmetros para evitar login
+                    lambda url: url + '?__a=1&__d=dis',
+                    # Estratégia 3: URL normal
+                    lambda url: url
+                ]
                     
-                    for i, strategy in enumerate(strategies):
-                        try:
-                            target_url = strategy(post_url)
-                            await page.goto(target_url, wait_until='domcontentloaded', timeout=15000)
-                            logger.info(f"✅ Instagram navegação estratégia {i+1}: {target_url}")
-                            navigation_success = True
-                            break
-                        except Exception as e:
-                            logger.warning(f"Estratégia {i+1} falhou: {e}")
-                            continue
+                for i, strategy in enumerate(strategies):
+                    try:
+                        target_url = strategy(post_url)
+                        await page.goto(target_url, wait_until='domcontentloaded', timeout=15000)
+                        logger.info(f"✅ Instagram navegação estratégia {i+1}: {target_url}")
+                        navigation_success = True
+                        break
+                    except Exception as e:
+                        logger.warning(f"Estratégia {i+1} falhou: {e}")
+                        continue
                     
-                    if not navigation_success:
-                        logger.error("❌ Todas as estratégias de navegação falharam")
-                        return None
+                if not navigation_success:
+                    logger.error("❌ Todas as estratégias de navegação falharam")
+                    return None
+            else:
+                # Para outras plataformas, acesso normal
+                await page.goto(post_url, wait_until='domcontentloaded', timeout=15000)
+            # Aguardar carregamento inicial (network-idle, no máximo 3s)
+            await browser_pool.wait_ready(page, timeout=3)
+            # Múltiplas tentativas de fechar popups
+            for attempt in range(3):
+                await self._close_common_popups(page, platform)
+                await asyncio.sleep(1)
+                # Verificar se ainda há popups visíveis
+                popup_indicators = [
+                    'div[role="dialog"]',
+                    '[data-testid="loginForm"]',
+                    'form[method="post"]',
+                    'input[name="username"]',
+                    'input[name="email"]'
+                ]
+                has_popup = False
+                for indicator in popup_indicators:
+                    try:
+                        element = await page.query_selector(indicator)
+                        if element and await element.is_visible():
+                            has_popup = True
+                            break
+                    except:
+                        continue
+                if not has_popup:
+                    logger.info(f"✅ Popups removidos na tentativa {attempt + 1}")
+                    break
                 else:
-                    # Para outras plataformas, acesso normal
-                    await page.goto(post_url, wait_until='domcontentloaded', timeout=15000)
-                # Aguardar carregamento inicial
-                await asyncio.sleep(3)
-                # Múltiplas tentativas de fechar popups
-                for attempt in range(3):
-                    await self._close_common_popups(page, platform)
-                    await asyncio.sleep(1)
-                    # Verificar se ainda há popups visíveis
-                    popup_indicators = [
-                        'div[role="dialog"]',
-                        '[data-testid="loginForm"]',
-                        'form[method="post"]',
-                        'input[name="username"]',
-                        'input[name="email"]'
-                    ]
-                    has_popup = False
-                    for indicator in popup_indicators:
-                        try:
-                            element = await page.query_selector(indicator)
-                            if element and await element.is_visible():
-                                has_popup = True
-                                break
-                        except:
-                            continue
-                    if not has_popup:
-                        logger.info(f"✅ Popups removidos na tentativa {attempt + 1}")
-                        break
-                    else:
-                        logger.warning(f"⚠️ Popup ainda presente, tentativa {attempt + 1}")
-                # Aguardar estabilização da página
-                await asyncio.sleep(2)
-                # Extrair dados específicos da plataforma
-                engagement_data = await self._extract_platform_data(page, platform)
-                await browser.close()
-                return engagement_data
+                    logger.warning(f"⚠️ Popup ainda presente, tentativa {attempt + 1}")
+            # Aguardar estabilização da página
+            await browser_pool.wait_ready(page, timeout=2)
+            # Extrair dados específicos da plataforma
+            return await self._extract_platform_data(page, platform)
+
+        try:
+            # Contexto isolado com configurações específicas para redes sociais;
+            # requests que causam popups são bloqueados
+            return await browser_pool.with_page(
+                analyze,
+                blocked_keywords=[
+                    'login', 'signin', 'signup', 'auth', 'oauth',
+                    'tracking', 'analytics', 'ads', 'advertising'
+                ],
+                java_script_enabled=True,
+                accept_downloads=False,
+                extra_http_headers={
+                    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+                }
+            )
         except Exception as e:
             logger.error(f"❌ Erro na análise Playwright robusta: {e}")
             return None
@@ -2422,16 +2402,12 @@ class ViralImageFinder:
         }
         try:
             if HAS_ASYNC_DEPS:
-                # Configurar SSL context permissivo
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-                connector = aiohttp.TCPConnector(ssl=ssl_context)
+                # SSL permissivo para CDNs de imagens
                 timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
-                async with aiohttp.ClientSession(
-                    connector=connector,
+                async with http_client_pool.session(
                     timeout=timeout,
-                    headers=headers
+                    headers=headers,
+                    verify_ssl=False
                 ) as session:
                     async with session.get(image_url) as response:
                         response.raise_for_status()
@@ -2510,47 +2486,46 @@ class ViralImageFinder:
         """Extrai URL real da imagem da página"""
         if not self.playwright_enabled:
             return None
+
+        async def extract(page):
+            await page.goto(post_url, wait_until='domcontentloaded')
+            await browser_pool.wait_ready(page, timeout=3)
+            # Fechar popups
+            await self._close_common_popups(page, platform)
+            # Extrair URL da imagem baseado na plataforma
+            image_url = None
+            if platform == 'instagram':
+                # Procurar pela imagem principal
+                img_selectors = [
+                    'article img[src*="scontent"]',
+                    'div[role="button"] img',
+                    'img[alt*="Foto"]',
+                    'img[style*="object-fit"]'
+                ]
+                for selector in img_selectors:
+                    img_elem = await page.query_selector(selector)
+                    if img_elem:
+                        image_url = await img_elem.get_attribute('src')
+                        if image_url and 'scontent' in image_url:
+                            break
+            elif platform == 'facebook':
+                # Procurar pela imagem do post
+                img_selectors = [
+                    'img[data-scale]',
+                    'img[src*="scontent"]',
+                    'img[src*="fbcdn"]',
+                    'div[data-sigil="photo-image"] img'
+                ]
+                for selector in img_selectors:
+                    img_elem = await page.query_selector(selector)
+                    if img_elem:
+                        image_url = await img_elem.get_attribute('src')
+                        if image_url and ('scontent' in image_url or 'fbcdn' in image_url):
+                            break
+            return image_url
+
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                context = await browser.new_context()
-                page = await context.new_page()
-                await page.goto(post_url, wait_until='domcontentloaded')
-                await asyncio.sleep(3)
-                # Fechar popups
-                await self._close_common_popups(page, platform)
-                # Extrair URL da imagem baseado na plataforma
-                image_url = None
-                if platform == 'instagram':
-                    # Procurar pela imagem principal
-                    img_selectors = [
-                        'article img[src*="scontent"]',
-                        'div[role="button"] img',
-                        'img[alt*="Foto"]',
-                        'img[style*="object-fit"]'
-                    ]
-                    for selector in img_selectors:
-                        img_elem = await page.query_selector(selector)
-                        if img_elem:
-                            image_url = await img_elem.get_attribute('src')
-                            if image_url and 'scontent' in image_url:
-                                break
-                elif platform == 'facebook':
-                    # Procurar pela imagem do post
-                    img_selectors = [
-                        'img[data-scale]',
-                        'img[src*="scontent"]',
-                        'img[src*="fbcdn"]',
-                        'div[data-sigil="photo-image"] img'
-                    ]
-                    for selector in img_selectors:
-                        img_elem = await page.query_selector(selector)
-                        if img_elem:
-                            image_url = await img_elem.get_attribute('src')
-                            if image_url and ('scontent' in image_url or 'fbcdn' in image_url):
-                                break
-                await browser.close()
-                return image_url
+            return await browser_pool.with_page(extract)
         except Exception as e:
             logger.error(f"❌ Erro ao extrair URL real: {e}")
             return None
@@ -2603,7 +2578,7 @@ class ViralImageFinder:
                 
                 try:
                     if HAS_ASYNC_DEPS:
-                        async with aiohttp.ClientSession() as session:
+                        async with http_client_pool.session() as session:
                             headers = {
                                 'X-API-KEY': serper_key,
                                 'Content-Type': 'application/json'
@@ -2669,7 +2644,7 @@ class ViralImageFinder:
         """
         try:
             if HAS_ASYNC_DEPS:
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     headers = {
                         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                         'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
@@ -2711,33 +2686,16 @@ class ViralImageFinder:
             return None
         
         try:
-            from playwright.async_api import async_playwright
+            # Captura simples da página no browser pool
+            result = await browser_pool.screenshot(post_url, screenshot_path)
+            if not result['success']:
+                logger.error(f"❌ Erro no fallback: {result.get('error')}")
+                return None
             
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                context = await browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                )
-                page = await context.new_page()
-                
-                try:
-                    await page.goto(post_url, wait_until='domcontentloaded', timeout=15000)
-                    await asyncio.sleep(2)
-                    
-                    # Captura simples da página
-                    await page.screenshot(path=screenshot_path, full_page=False)
-                    
-                    await browser.close()
-                    
-                    # Verificar se screenshot foi criado
-                    if os.path.exists(screenshot_path) and os.path.getsize(screenshot_path) > 5000:
-                        logger.info(f"✅ Screenshot fallback salvo: {screenshot_path}")
-                        return screenshot_path
-                    
-                except Exception as e:
-                    logger.error(f"❌ Erro no fallback: {e}")
-                    await browser.close()
+            # Verificar se screenshot foi criado
+            if os.path.exists(screenshot_path) and os.path.getsize(screenshot_path) > 5000:
+                logger.info(f"✅ Screenshot fallback salvo: {screenshot_path}")
+                return screenshot_path
             
             return None
             
@@ -2992,7 +2950,7 @@ class ViralImageFinder:
             # Estratégia de emergência: usar requests + PIL para capturar favicon ou imagem padrão
             try:
                 if HAS_ASYNC_DEPS:
-                    async with aiohttp.ClientSession() as session:
+                    async with http_client_pool.session() as session:
                         async with session.get(post_url, timeout=10) as response:
                             if response.status == 200:
                                 # Criar uma imagem placeholder com informações da URL
@@ -3196,7 +3154,7 @@ class ViralImageFinder:
         
         try:
             if HAS_ASYNC_DEPS:
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     headers = {
                         'Authorization': f'Bearer {jina_key}',
                         'Content-Type': 'application/json'
@@ -3245,7 +3203,7 @@ class ViralImageFinder:
         
         try:
             if HAS_ASYNC_DEPS:
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     headers = {
                         'x-api-key': exa_key,
                         'Content-Type': 'application/json'
@@ -3297,7 +3255,7 @@ class ViralImageFinder:
         
         try:
             if HAS_ASYNC_DEPS:
-                async with aiohttp.ClientSession() as session:
+                async with http_client_pool.session() as session:
                     headers = {
                         'Authorization': f'Bearer {firecrawl_key}',
                         'Content-Type': 'application/json'
@@ -22,12 +22,73 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
+
+from services.browser_pool import browser_pool
 
 logger = logging.getLogger(__name__)
 
+# Palavras-chave que indicam páginas de login/bloqueio
+LOGIN_TITLE_KEYWORDS = [
+    'login', 'sign in', 'log in', 'entrar', 'acesso', 'authentication',
+    'blocked', 'bloqueado', 'access denied', 'acesso negado',
+    'captcha', 'robot', 'verification', 'verificação',
+    'forbidden', 'proibido', '403', '401', 'unauthorized',
+    'please sign in', 'faça login', 'entre na sua conta'
+]
+LOGIN_URL_KEYWORDS = [
+    '/login', '/signin', '/auth', '/accounts/login',
+    '/user/login', '/entrar', '/acesso'
+]
+# Campos de login típicos
+LOGIN_ELEMENT_SELECTORS = [
+    'input[type="password"]',
+    'input[name*="password"]',
+    'input[name*="login"]',
+    'input[name*="email"]',
+    'input[name*="username"]',
+    'button[type="submit"]',
+    '.login-form',
+    '.signin-form',
+    '#login',
+    '#signin'
+]
+LOGIN_TEXT_KEYWORDS = [
+    'please sign in', 'faça login', 'entre na sua conta',
+    'access denied', 'acesso negado', 'login required',
+    'you need to sign in', 'você precisa fazer login'
+]
+GOOGLEBOT_USER_AGENT = "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+
+
+def looks_like_login_page(title: str, url: str, login_element_count: int, body_text: str) -> bool:
+    """Heurística de página de login/bloqueio a partir de título, URL, campos e texto"""
+    title = (title or "").lower()
+    for keyword in LOGIN_TITLE_KEYWORDS:
+        if keyword in title:
+            logger.info(f"🚫 Palavra-chave de login detectada no título: '{keyword}'")
+            return True
+
+    url = (url or "").lower()
+    for keyword in LOGIN_URL_KEYWORDS:
+        if keyword in url:
+            logger.info(f"🚫 Palavra-chave de login detectada na URL: '{keyword}'")
+            return True
+
+    # Se encontrar muitos elementos de login, provavelmente é uma página de login
+    if login_element_count >= 2:
+        logger.info(f"🚫 {login_element_count} elementos de login detectados na página")
+        return True
+
+    body_text = (body_text or "").lower()
+    for keyword in LOGIN_TEXT_KEYWORDS:
+        if keyword in body_text:
+            logger.info(f"🚫 Texto de login detectado: '{keyword}'")
+            return True
+
+    return False
+
 class VisualContentCapture:
-    """Capturador de conteúdo visual usando Selenium"""
+    """Capturador de conteúdo visual usando o browser pool (Playwright) ou Selenium"""
 
     def __init__(self):
         """Inicializa o capturador visual"""
@@ -329,28 +390,21 @@ class VisualContentCapture:
             chrome_options.add_argument("--disable-images")  # Para economizar banda
             chrome_options.add_argument("--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36")
             
-            # Usa selenium_checker para configuração robusta
-            from .selenium_checker import selenium_checker
+            # Verificação do Selenium e caminho do chromedriver (feitos uma vez por processo)
+            setup = browser_pool.chromedriver_setup()
             
-            # Executa verificação completa
-            check_results = selenium_checker.full_check()
-            
-            if not check_results['selenium_ready']:
+            if not setup['selenium_ready']:
                 raise Exception("Selenium não está configurado corretamente")
             
             # Configura o Chrome com o melhor caminho encontrado
-            best_chrome_path = check_results['best_chrome_path']
+            best_chrome_path = setup['chrome_binary']
             if best_chrome_path:
                 chrome_options.binary_location = best_chrome_path
                 logger.info(f"✅ Chrome configurado: {best_chrome_path}")
             
-            # Tenta usar ChromeDriverManager primeiro
-            try:
-                service = Service(ChromeDriverManager().install())
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                logger.info("✅ ChromeDriverManager funcionou")
-            except Exception as e:
-                logger.warning(f"⚠️ ChromeDriverManager falhou: {e}, usando chromedriver do sistema")
+            if setup['driver_path']:
+                driver = webdriver.Chrome(service=Service(setup['driver_path']), options=chrome_options)
+            else:
                 # Fallback para chromedriver do sistema
                 driver = webdriver.Chrome(options=chrome_options)
             
@@ -363,6 +417,15 @@ class VisualContentCapture:
             logger.error(f"❌ Erro ao configurar Chrome driver: {e}")
             raise
 
+    def _wait_document_complete(self):
+        """Aguarda document.readyState == 'complete' (no lugar de um sleep fixo)"""
+        try:
+            WebDriverWait(self.driver, self.wait_timeout).until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            )
+        except TimeoutException:
+            logger.debug("Timeout aguardando document.readyState")
+
     def _create_session_directory(self, session_id: str) -> Path:
         """Cria diretório para a sessão"""
         try:
@@ -403,8 +466,8 @@ class VisualContentCapture:
             except TimeoutException:
                 logger.warning(f"⚠️ Timeout aguardando carregamento de {url}")
             
-            # Aguarda um pouco mais para renderização completa
-            time.sleep(2)
+            # Aguarda o documento terminar de carregar
+            self._wait_document_complete()
             
             # NOVA FUNCIONALIDADE: Detectar páginas de login/bloqueio
             if self._is_login_or_blocked_page():
@@ -470,6 +533,157 @@ class VisualContentCapture:
                 'timestamp': datetime.now().isoformat()
             }
 
+    async def _take_screenshot_pooled(self, url: str, filename: str, session_dir: Path) -> Dict[str, Any]:
+        """_take_screenshot sobre o browser pool: Google Images primeiro, depois screenshot num contexto isolado"""
+        logger.info(f"🎯 ESTRATÉGIA PRIORITÁRIA: Google Images para {url}")
+        google_image_result = await asyncio.to_thread(self._try_google_images_extraction, url, filename, session_dir)
+        if google_image_result and google_image_result.get('success'):
+            logger.info(f"✅ SUCESSO VIA GOOGLE IMAGES: {url}")
+            return google_image_result
+
+        logger.info(f"🔄 FALLBACK: Screenshot via browser pool para {url}")
+        screenshot_path = session_dir / f"{filename}.png"
+
+        async def capture(page):
+            await page.goto(url, wait_until='domcontentloaded', timeout=browser_pool.navigation_timeout * 1000)
+            await browser_pool.wait_ready(page)
+            if await self._is_login_or_blocked_page_async(page):
+                return {'login_page': True}
+            try:
+                meta_description = await page.get_attribute('meta[name="description"]', 'content', timeout=1000)
+            except Exception:
+                meta_description = None
+            await page.screenshot(path=str(screenshot_path))
+            return {
+                'login_page': False,
+                'title': await page.title() or "Sem título",
+                'final_url': page.url,
+                'description': meta_description or ""
+            }
+
+        try:
+            info = await browser_pool.with_page(capture)
+        except Exception as e:
+            error_msg = f"Erro ao capturar screenshot de {url}: {e}"
+            logger.error(f"❌ {error_msg}")
+            return {'success': False, 'url': url, 'error': error_msg, 'timestamp': datetime.now().isoformat()}
+
+        if info['login_page']:
+            logger.warning(f"🚫 PÁGINA DE LOGIN/BLOQUEIO DETECTADA: {url}")
+            alternative_result = await self._try_alternative_content_extraction_pooled(url, filename, session_dir)
+            if alternative_result and alternative_result.get('success'):
+                return alternative_result
+            return {
+                'success': False,
+                'error': 'login_page_detected',
+                'url': url,
+                'message': 'Página de login ou bloqueio detectada - screenshot não capturado',
+                'timestamp': datetime.now().isoformat()
+            }
+
+        if screenshot_path.exists() and screenshot_path.stat().st_size > 0:
+            logger.info(f"✅ Screenshot salvo: {screenshot_path}")
+            return {
+                'success': True,
+                'url': url,
+                'final_url': info['final_url'],
+                'title': info['title'],
+                'description': info['description'],
+                'filename': f"{filename}.png",
+                'filepath': str(screenshot_path),
+                'filesize': screenshot_path.stat().st_size,
+                'method': 'browser_pool',
+                'timestamp': datetime.now().isoformat()
+            }
+        return {
+            'success': False,
+            'url': url,
+            'error': f"Erro ao capturar screenshot de {url}: Screenshot não foi criado ou está vazio",
+            'timestamp': datetime.now().isoformat()
+        }
+
+    async def _try_alternative_content_extraction_pooled(self, url: str, filename: str, session_dir: Path) -> Dict[str, Any]:
+        """_try_alternative_content_extraction sobre o browser pool (Google Images do domínio, depois User-Agent de crawler)"""
+        logger.info(f"🔄 Tentando extração alternativa para: {url}")
+        try:
+            from urllib.parse import urlparse
+            domain_query = f"site:{urlparse(url).netloc} screenshot content"
+            logger.info(f"🎯 Tentando Google Images com query específica: {domain_query}")
+            google_result = await asyncio.to_thread(self._try_google_images_with_query, domain_query, filename, session_dir)
+            if google_result and google_result.get('success'):
+                logger.info("✅ SUCESSO com Google Images alternativo")
+                return google_result
+        except Exception as e:
+            logger.warning(f"⚠️ Erro na estratégia alternativa 1: {e}")
+
+        screenshot_path = session_dir / f"{filename}_alt.png"
+
+        async def capture(page):
+            await page.goto(url, wait_until='domcontentloaded', timeout=browser_pool.navigation_timeout * 1000)
+            await browser_pool.wait_ready(page)
+            if await self._is_login_or_blocked_page_async(page):
+                return None
+            await page.screenshot(path=str(screenshot_path))
+            return await page.title()
+
+        try:
+            logger.info("🔄 Tentando com User-Agent alternativo")
+            title = await browser_pool.with_page(capture, user_agent=GOOGLEBOT_USER_AGENT)
+            if title is not None and screenshot_path.exists() and screenshot_path.stat().st_size > 0:
+                logger.info("✅ User-Agent alternativo funcionou!")
+                return {
+                    'success': True,
+                    'url': url,
+                    'title': title or "Conteúdo alternativo",
+                    'description': "Capturado com User-Agent alternativo",
+                    'filename': f"{filename}_alt.png",
+                    'filepath': str(screenshot_path),
+                    'filesize': screenshot_path.stat().st_size,
+                    'method': 'alternative_user_agent',
+                    'timestamp': datetime.now().isoformat()
+                }
+        except Exception as e:
+            logger.warning(f"⚠️ Erro na estratégia alternativa 2: {e}")
+
+        logger.warning(f"⚠️ Todas as estratégias alternativas falharam para: {url}")
+        return {'success': False, 'error': 'all_alternative_strategies_failed'}
+
+    async def _capture_with_pool(self, items: List[tuple], session_dir: Path) -> List[Dict[str, Any]]:
+        """Captura as URLs em paralelo, limitadas ao número de contextos do browser pool"""
+        semaphore = asyncio.Semaphore(browser_pool.max_contexts)
+
+        async def capture(url: str, filename: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self._take_screenshot_pooled(url, filename, session_dir)
+                except Exception as e:
+                    error_msg = f"Erro processando URL {url}: {e}"
+                    logger.error(f"❌ {error_msg}")
+                    return {'success': False, 'url': url, 'error': error_msg}
+
+        return await asyncio.gather(*[capture(url, filename) for url, filename in items])
+
+    def _capture_with_selenium(self, items: List[tuple], session_dir: Path) -> List[Dict[str, Any]]:
+        """Captura sequencial com Selenium (quando o Playwright não está instalado)"""
+        results = []
+        self.driver = self._setup_driver()
+        try:
+            for url, filename in items:
+                try:
+                    results.append(self._take_screenshot(url, filename, session_dir))
+                except Exception as e:
+                    error_msg = f"Erro processando URL {url}: {e}"
+                    logger.error(f"❌ {error_msg}")
+                    results.append({'success': False, 'url': url, 'error': error_msg})
+        finally:
+            try:
+                self.driver.quit()
+                logger.info("✅ Chrome driver fechado")
+            except Exception as e:
+                logger.error(f"❌ Erro ao fechar driver: {e}")
+            self.driver = None
+        return results
+
     async def capture_screenshots(self, urls: List[str], session_id: str) -> Dict[str, Any]:
         """
         Captura screenshots de uma lista de URLs
@@ -491,65 +705,48 @@ class VisualContentCapture:
             'start_time': datetime.now().isoformat(),
             'session_directory': None
         }
+        started = time.perf_counter()
         
         try:
             # Cria diretório da sessão
             session_dir = self._create_session_directory(session_id)
             capture_results['session_directory'] = str(session_dir)
             
-            # Configura o driver
-            self.driver = self._setup_driver()
-            
-            # Processa cada URL
+            # Valida URLs e define os nomes dos arquivos
+            items = []
             for i, url in enumerate(urls, 1):
                 if not url or not url.startswith(('http://', 'https://')):
                     logger.warning(f"⚠️ URL inválida ignorada: {url}")
                     capture_results['failed_captures'] += 1
                     capture_results['errors'].append(f"URL inválida: {url}")
                     continue
-                
-                try:
-                    # Gera nome do arquivo
-                    filename = f"screenshot_{i:03d}"
-                    
-                    # Captura o screenshot
-                    result = self._take_screenshot(url, filename, session_dir)
-                    
-                    if result['success']:
-                        capture_results['successful_captures'] += 1
-                        capture_results['screenshots'].append(result)
-                    else:
-                        capture_results['failed_captures'] += 1
-                        capture_results['errors'].append(result['error'])
-                    
-                    # Pequena pausa entre capturas para não sobrecarregar
-                    await asyncio.sleep(1)
-                    
-                except Exception as e:
-                    error_msg = f"Erro processando URL {url}: {e}"
-                    logger.error(f"❌ {error_msg}")
+                items.append((url, f"screenshot_{i:03d}"))
+            
+            if browser_pool.available:
+                results = await self._capture_with_pool(items, session_dir)
+                capture_results['capture_method'] = 'browser_pool'
+            else:
+                results = await asyncio.to_thread(self._capture_with_selenium, items, session_dir)
+                capture_results['capture_method'] = 'selenium'
+            
+            for result in results:
+                if result['success']:
+                    capture_results['successful_captures'] += 1
+                    capture_results['screenshots'].append(result)
+                else:
                     capture_results['failed_captures'] += 1
-                    capture_results['errors'].append(error_msg)
+                    capture_results['errors'].append(result['error'])
             
             # Finaliza a captura
             capture_results['end_time'] = datetime.now().isoformat()
+            capture_results['duration_seconds'] = round(time.perf_counter() - started, 2)
             
-            logger.info(f"✅ Captura concluída: {capture_results['successful_captures']}/{capture_results['total_urls']} sucessos")
+            logger.info(f"✅ Captura concluída: {capture_results['successful_captures']}/{capture_results['total_urls']} sucessos em {capture_results['duration_seconds']}s")
             
         except Exception as e:
             error_msg = f"Erro crítico na captura: {e}"
             logger.error(f"❌ {error_msg}")
             capture_results['critical_error'] = error_msg
-            
-        finally:
-            # Fecha o driver se estiver aberto
-            if self.driver:
-                try:
-                    self.driver.quit()
-                    logger.info("✅ Chrome driver fechado")
-                except Exception as e:
-                    logger.error(f"❌ Erro ao fechar driver: {e}")
-                self.driver = None
         
         return capture_results
 
@@ -634,88 +831,36 @@ class VisualContentCapture:
     def _is_login_or_blocked_page(self) -> bool:
         """Detecta se a página atual é uma página de login ou bloqueio"""
         try:
-            # Verifica o título da página
-            page_title = self.driver.title.lower() if self.driver.title else ""
-            
-            # Palavras-chave que indicam páginas de login/bloqueio
-            login_keywords = [
-                'login', 'sign in', 'log in', 'entrar', 'acesso', 'authentication',
-                'blocked', 'bloqueado', 'access denied', 'acesso negado',
-                'captcha', 'robot', 'verification', 'verificação',
-                'forbidden', 'proibido', '403', '401', 'unauthorized',
-                'please sign in', 'faça login', 'entre na sua conta'
-            ]
-            
-            # Verifica título
-            for keyword in login_keywords:
-                if keyword in page_title:
-                    logger.info(f"🚫 Palavra-chave de login detectada no título: '{keyword}'")
-                    return True
-            
-            # Verifica URL atual
-            current_url = self.driver.current_url.lower()
-            url_login_keywords = [
-                '/login', '/signin', '/auth', '/accounts/login',
-                '/user/login', '/entrar', '/acesso'
-            ]
-            
-            for keyword in url_login_keywords:
-                if keyword in current_url:
-                    logger.info(f"🚫 Palavra-chave de login detectada na URL: '{keyword}'")
-                    return True
-            
-            # Verifica elementos na página
-            try:
-                # Procura por campos de login típicos
-                login_elements = [
-                    'input[type="password"]',
-                    'input[name*="password"]',
-                    'input[name*="login"]',
-                    'input[name*="email"]',
-                    'input[name*="username"]',
-                    'button[type="submit"]',
-                    '.login-form',
-                    '.signin-form',
-                    '#login',
-                    '#signin'
-                ]
-                
-                login_element_count = 0
-                for selector in login_elements:
-                    try:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                        if elements:
-                            login_element_count += len(elements)
-                    except:
-                        continue
-                
-                # Se encontrar muitos elementos de login, provavelmente é uma página de login
-                if login_element_count >= 2:
-                    logger.info(f"🚫 {login_element_count} elementos de login detectados na página")
-                    return True
-                
-                # Verifica texto específico na página
+            login_element_count = 0
+            for selector in LOGIN_ELEMENT_SELECTORS:
                 try:
-                    body_text = self.driver.find_element(By.TAG_NAME, "body").text.lower()
-                    login_text_keywords = [
-                        'please sign in', 'faça login', 'entre na sua conta',
-                        'access denied', 'acesso negado', 'login required',
-                        'you need to sign in', 'você precisa fazer login'
-                    ]
-                    
-                    for keyword in login_text_keywords:
-                        if keyword in body_text:
-                            logger.info(f"🚫 Texto de login detectado: '{keyword}'")
-                            return True
-                            
+                    login_element_count += len(self.driver.find_elements(By.CSS_SELECTOR, selector))
                 except:
-                    pass
-                    
-            except Exception as e:
-                logger.warning(f"⚠️ Erro ao verificar elementos de login: {e}")
+                    continue
+            try:
+                body_text = self.driver.find_element(By.TAG_NAME, "body").text
+            except:
+                body_text = ""
+            return looks_like_login_page(self.driver.title, self.driver.current_url, login_element_count, body_text)
             
+        except Exception as e:
+            logger.error(f"❌ Erro na detecção de página de login: {e}")
             return False
-            
+
+    async def _is_login_or_blocked_page_async(self, page) -> bool:
+        """Mesma detecção de _is_login_or_blocked_page para uma página Playwright"""
+        try:
+            login_element_count = 0
+            for selector in LOGIN_ELEMENT_SELECTORS:
+                try:
+                    login_element_count += await page.locator(selector).count()
+                except Exception:
+                    continue
+            try:
+                body_text = await page.inner_text("body", timeout=2000)
+            except Exception:
+                body_text = ""
+            return looks_like_login_page(await page.title(), page.url, login_element_count, body_text)
         except Exception as e:
             logger.error(f"❌ Erro na detecção de página de login: {e}")
             return False
@@ -751,12 +896,12 @@ class VisualContentCapture:
             
             # Tenta com User-Agent de bot/crawler
             self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                "userAgent": "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+                "userAgent": GOOGLEBOT_USER_AGENT
             })
             
             # Tenta acessar novamente
             self.driver.get(url)
-            time.sleep(3)
+            self._wait_document_complete()
             
             # Verifica se ainda é página de login
             if not self._is_login_or_blocked_page():
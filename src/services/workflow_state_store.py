@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Workflow State Store
+Estado das etapas do workflow por sessão em SQLite, atualizado pelos próprios
+eventos do workflow (iniciada/concluída/erro gravados via salvar_etapa).
+Consultas de status viram uma leitura por chave; sessões anteriores ao índice
+são migradas a partir dos arquivos existentes na primeira consulta.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from glob import glob
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ordem das etapas no workflow (usada para progresso e etapa atual)
+STAGES = ['step1', 'step2', 'external_ai_verification', 'step3', 'cpl_devastador']
+
+# Prefixo do nome da etapa em salvar_etapa -> etapa
+STAGE_PREFIXES = {
+    'etapa1': 'step1',
+    'etapa2': 'step2',
+    'verificacao_ai': 'external_ai_verification',
+    'etapa3': 'step3',
+    'cpl_devastador': 'cpl_devastador',
+    'workflow_completo': 'workflow',
+    'workflow': 'workflow'
+}
+
+EVENT_NAME = re.compile(
+    r'^(?P<prefix>etapa1|etapa2|etapa3|verificacao_ai|cpl_devastador|workflow_completo|workflow)_'
+    r'(?P<event>iniciada|iniciado|concluida|concluido|erro)(?:_full_workflow)?$'
+)
+# Arquivos de salvar_etapa: <nome_etapa>_<AAAAMMDD_HHMMSS_mmm>.json
+EVENT_FILE = re.compile(r'^(?P<name>.+)_(?P<ts>\d{8}_\d{6}_\d{3})\.(?:json|txt)$')
+
+# Arquivos legados que indicam etapa concluída
+LEGACY_MARKERS = {
+    'step1': 'relatorio_coleta.md',
+    'step3': 'relatorio_final.md',
+    'cpl_devastador': 'cpl_protocol_result.json'
+}
+
+
+def parse_event(nome_etapa: str) -> Optional[Tuple[str, str]]:
+    """(etapa, evento) de um nome de salvar_etapa; None se não for evento de workflow"""
+    match = EVENT_NAME.match(nome_etapa or '')
+    if not match:
+        return None
+    raw_event = match.group('event')
+    if raw_event.startswith('inicia'):
+        event = 'started'
+    elif raw_event.startswith('conclu'):
+        event = 'completed'
+    else:
+        event = 'failed'
+    return STAGE_PREFIXES[match.group('prefix')], event
+
+
+class WorkflowStateStore:
+    """Índice de estado das etapas por sessão"""
+
+    def __init__(self, db_path: str = "analyses_data/workflow_state.db",
+                 base_dir: str = "analyses_data", relatorios_dir: str = "relatorios_intermediarios"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.base_dir = base_dir
+        self.relatorios_dir = relatorios_dir
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_stages (
+                    session_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    started_at REAL,
+                    completed_at REAL,
+                    failed_at REAL,
+                    error TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, stage)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    backfilled_at REAL NOT NULL
+                )
+            """)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, session_id: str, stage: str, event: str,
+               at: float, error: Optional[str]):
+        if event == 'started':
+            # Reexecução: zera conclusão/erro anteriores
+            conn.execute(
+                "INSERT INTO workflow_stages (session_id, stage, status, started_at, updated_at) "
+                "VALUES (?, ?, 'running', ?, ?) "
+                "ON CONFLICT(session_id, stage) DO UPDATE SET status = 'running', started_at = excluded.started_at, "
+                "completed_at = NULL, failed_at = NULL, error = NULL, updated_at = excluded.updated_at",
+                (session_id, stage, at, at)
+            )
+        elif event == 'completed':
+            conn.execute(
+                "INSERT INTO workflow_stages (session_id, stage, status, completed_at, updated_at) "
+                "VALUES (?, ?, 'completed', ?, ?) "
+                "ON CONFLICT(session_id, stage) DO UPDATE SET status = 'completed', completed_at = excluded.completed_at, "
+                "error = NULL, updated_at = excluded.updated_at",
+                (session_id, stage, at, at)
+            )
+        else:
+            conn.execute(
+                "INSERT INTO workflow_stages (session_id, stage, status, failed_at, error, updated_at) "
+                "VALUES (?, ?, 'failed', ?, ?, ?) "
+                "ON CONFLICT(session_id, stage) DO UPDATE SET status = 'failed', failed_at = excluded.failed_at, "
+                "error = excluded.error, updated_at = excluded.updated_at",
+                (session_id, stage, at, error, at)
+            )
+
+    def record(self, session_id: str, stage: str, event: str, at: Optional[float] = None, error: Optional[str] = None):
+        """Registra started/completed/failed de uma etapa"""
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            self._apply(conn, session_id, stage, event, at or time.time(), error)
+
+    def mark_started(self, session_id: str, stage: str):
+        self.record(session_id, stage, 'started')
+
+    def record_etapa(self, nome_etapa: str, session_id: Optional[str], dados: Any = None):
+        """Gancho de salvar_etapa: eventos de workflow atualizam o índice (nunca levanta)"""
+        if not session_id:
+            return
+        parsed = parse_event(nome_etapa)
+        if not parsed:
+            return
+        stage, event = parsed
+        error = dados.get('error') if event == 'failed' and isinstance(dados, dict) else None
+        try:
+            self.record(session_id, stage, event, error=str(error) if error else None)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao atualizar estado do workflow ({nome_etapa}): {e}")
+
+    # ------------------------------------------------------------------
+    # Migração a partir dos arquivos
+    # ------------------------------------------------------------------
+
+    def _session_files(self, session_id: str) -> List[str]:
+        patterns = [
+            os.path.join(self.relatorios_dir, categoria, session_id, '*')
+            for categoria in ('workflow', 'cpl')
+        ] + [os.path.join(self.base_dir, 'workflow', session_id, '*')]
+        return [path for pattern in patterns for path in glob(pattern)]
+
+    @staticmethod
+    def _read_error(path: str) -> Optional[str]:
+        """Mensagem de erro gravada num arquivo *_erro (dados vazios ficam em original_data)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        if isinstance(data, dict):
+            error = data.get('error') or (data.get('original_data') or {}).get('error')
+            return str(error) if error else None
+        return None
+
+    def _file_events(self, session_id: str) -> List[Tuple[float, str, str, Optional[str]]]:
+        events = []
+        for path in self._session_files(session_id):
+            name = os.path.basename(path)
+            match = EVENT_FILE.match(name)
+            if match:
+                base, at = match.group('name'), datetime.strptime(match.group('ts'), "%Y%m%d_%H%M%S_%f").timestamp()
+            else:
+                base, at = os.path.splitext(name)[0], os.path.getmtime(path)
+            parsed = parse_event(base)
+            if parsed:
+                stage, event = parsed
+                events.append((at, stage, event, self._read_error(path) if event == 'failed' else None))
+        for stage, marker in LEGACY_MARKERS.items():
+            path = os.path.join(self.base_dir, session_id, marker)
+            if os.path.exists(path):
+                events.append((os.path.getmtime(path), stage, 'completed', None))
+        return sorted(events, key=lambda e: e[0])
+
+    def backfill_session(self, session_id: str) -> int:
+        """
+        Reconstrói o estado da sessão a partir dos arquivos de salvar_etapa e dos
+        relatórios legados. Etapas já presentes no índice não são alteradas.
+        """
+        events = self._file_events(session_id)
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            known = {row[0] for row in conn.execute(
+                "SELECT stage FROM workflow_stages WHERE session_id = ?", (session_id,)
+            )}
+            applied = 0
+            for at, stage, event, error in events:
+                if stage in known:
+                    continue
+                self._apply(conn, session_id, stage, event, at, error)
+                applied += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO workflow_sessions (session_id, backfilled_at) VALUES (?, ?)",
+                (session_id, time.time())
+            )
+        return applied
+
+    def backfill_all(self) -> int:
+        """Migra todas as sessões com arquivos em disco; retorna quantas foram migradas"""
+        sessions = set()
+        for root in (os.path.join(self.relatorios_dir, 'workflow'), os.path.join(self.relatorios_dir, 'cpl'),
+                     os.path.join(self.base_dir, 'workflow')):
+            if os.path.isdir(root):
+                sessions.update(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+        for session_id in sessions:
+            self.backfill_session(session_id)
+        logger.info(f"📦 Estado do workflow migrado para {len(sessions)} sessões")
+        return len(sessions)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def _is_backfilled(self, session_id: str) -> bool:
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            return conn.execute(
+                "SELECT 1 FROM workflow_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone() is not None
+
+    def get_stages(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        """Estado de cada etapa registrada da sessão (migra dos arquivos na primeira consulta)"""
+        if not self._is_backfilled(session_id):
+            self.backfill_session(session_id)
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT * FROM workflow_stages WHERE session_id = ?", (session_id,)
+            ).fetchall()
+
+        stages = {}
+        now = time.time()
+        for row in rows:
+            started, completed, failed = row['started_at'], row['completed_at'], row['failed_at']
+            end = completed if row['status'] == 'completed' else failed if row['status'] == 'failed' else now
+            stages[row['stage']] = {
+                'status': row['status'],
+                'started_at': datetime.fromtimestamp(started).isoformat() if started else None,
+                'completed_at': datetime.fromtimestamp(completed).isoformat() if completed else None,
+                'failed_at': datetime.fromtimestamp(failed).isoformat() if failed else None,
+                'duration_seconds': round(end - started, 1) if started and end and end >= started else None,
+                'error': row['error'],
+                'updated_at': datetime.fromtimestamp(row['updated_at']).isoformat()
+            }
+        return stages
+
+
+# Instância global
+workflow_state_store = WorkflowStateStore()
+
+
+if __name__ == "__main__":
+    # Migração completa: python -m services.workflow_state_store
+    logging.basicConfig(level=logging.INFO)
+    workflow_state_store.backfill_all()
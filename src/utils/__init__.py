@@ -5,6 +5,7 @@ Módulo de utilitários do sistema
 from .duplicate_remover import (
     DuplicateRemover, 
     DuplicateStats, 
+    NearDuplicateIndex,
     duplicate_remover,
     remove_duplicates_from_results,
     get_duplicate_stats
@@ -13,6 +14,7 @@ from .duplicate_remover import (
 __all__ = [
     'DuplicateRemover',
     'DuplicateStats', 
+    'NearDuplicateIndex',
     'duplicate_remover',
     'remove_duplicates_from_results',
     'get_duplicate_stats'
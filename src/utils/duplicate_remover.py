@@ -5,12 +5,19 @@ Detecta e remove dados duplicados durante a coleta e processamento
 
 import hashlib
 import re
-from typing import List, Dict, Any, Set, Tuple
+from typing import List, Dict, Any, Set, Tuple, Union
 from urllib.parse import urlparse, parse_qs
 import difflib
+import random
 from dataclasses import dataclass
 import logging
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -21,6 +28,111 @@ class DuplicateStats:
     unique_items: int = 0
     similarity_threshold: float = 0.85
 
+class NearDuplicateIndex:
+    """
+    Índice de quase-duplicatas: shingles + assinaturas MinHash + bandas LSH.
+    Só os candidatos que colidem em alguma banda são confirmados com
+    SequenceMatcher, preservando a semântica do limiar de similaridade.
+    """
+
+    _MASK_32 = 0xFFFFFFFF
+
+    def __init__(self, threshold: float, num_perm: int = 128, bands: int = 32, seed: int = 42):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Hash multiply-shift: (a * x + b) >> 32 sobre inteiros de 64 bits
+        rng = random.Random(seed)
+        coefficients = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(num_perm)]
+        if HAS_NUMPY:
+            self._a = np.array([a for a, _ in coefficients], dtype=np.uint64)
+            self._b = np.array([b for _, b in coefficients], dtype=np.uint64)
+        else:
+            self._coefficients = coefficients
+        self._buckets: List[Dict[Any, List[int]]] = [{} for _ in range(bands)]
+        self._texts: List[str] = []
+        self._last_prepared = None
+        self.comparisons = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return re.sub(r'\s+', ' ', text.lower().strip())
+
+    @staticmethod
+    def _shingles(normalized: str) -> Set[int]:
+        """Trigramas de palavras para textos longos; 4-gramas de caracteres para curtos"""
+        words = normalized.split(' ')
+        if len(words) >= 8:
+            grams = {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+        elif len(normalized) > 4:
+            grams = {normalized[i:i + 4] for i in range(len(normalized) - 3)}
+        else:
+            grams = {normalized}
+        return {hash(g) & NearDuplicateIndex._MASK_32 for g in grams}
+
+    def _signature(self, shingles: Set[int]):
+        if HAS_NUMPY:
+            values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+            hashed = (values[:, None] * self._a + self._b) >> np.uint64(32)
+            return hashed.min(axis=0)
+        mask_64 = (1 << 64) - 1
+        return [
+            min((((a * x + b) & mask_64) >> 32) for x in shingles)
+            for a, b in self._coefficients
+        ]
+
+    def _band_keys(self, signature) -> List[Any]:
+        if HAS_NUMPY:
+            return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        return [tuple(signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def _prepare(self, text: str) -> Tuple[str, List[Any]]:
+        # has_similar() seguido de add() no mesmo texto reaproveita a assinatura
+        if self._last_prepared and self._last_prepared[0] == text:
+            return self._last_prepared[1]
+        normalized = self.normalize(text)
+        prepared = (normalized, self._band_keys(self._signature(self._shingles(normalized))))
+        self._last_prepared = (text, prepared)
+        return prepared
+
+    def _candidates(self, band_keys: List[Any]) -> List[int]:
+        found = set()
+        for bucket, key in zip(self._buckets, band_keys):
+            found.update(bucket.get(key, ()))
+        return sorted(found)
+
+    def _iter_similar(self, text: str, threshold: float = None, exclude: Set[int] = None):
+        threshold = self.threshold if threshold is None else threshold
+        normalized, band_keys = self._prepare(text)
+        for item_id in self._candidates(band_keys):
+            if exclude and item_id in exclude:
+                continue
+            self.comparisons += 1
+            if difflib.SequenceMatcher(None, normalized, self._texts[item_id]).ratio() >= threshold:
+                yield item_id
+
+    def add(self, text: str) -> int:
+        """Indexa um texto e retorna seu id (posição de inserção)"""
+        normalized, band_keys = self._prepare(text)
+        item_id = len(self._texts)
+        self._texts.append(normalized)
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, []).append(item_id)
+        return item_id
+
+    def has_similar(self, text: str, threshold: float = None) -> bool:
+        """Verifica se algum texto indexado tem similaridade >= threshold"""
+        return next(self._iter_similar(text, threshold), None) is not None
+
+    def find_similar(self, text: str, threshold: float = None, exclude: Set[int] = None) -> List[int]:
+        """Ids de todos os textos indexados com similaridade >= threshold"""
+        return list(self._iter_similar(text, threshold, exclude))
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+
 class DuplicateRemover:
     """Sistema inteligente de remoção de duplicatas"""
     
@@ -106,8 +218,9 @@ class DuplicateRemover:
         self.url_hashes.add(url_hash)
         return False
     
-    def is_duplicate_content(self, content: str, existing_contents: List[str] = None) -> bool:
-        """Verifica se conteúdo é duplicata"""
+    def is_duplicate_content(self, content: str,
+                             existing_contents: Union[List[str], NearDuplicateIndex] = None) -> bool:
+        """Verifica se conteúdo é duplicata (existing_contents pode ser um NearDuplicateIndex)"""
         content_hash = self.get_content_hash(content)
         
         if not content_hash:
@@ -118,7 +231,10 @@ class DuplicateRemover:
             return True
             
         # Verifica similaridade com conteúdos existentes
-        if existing_contents:
+        if isinstance(existing_contents, NearDuplicateIndex):
+            if existing_contents.has_similar(content, self.similarity_threshold):
+                return True
+        elif existing_contents:
             for existing in existing_contents:
                 similarity = self.calculate_similarity(content, existing)
                 if similarity >= self.similarity_threshold:
@@ -127,8 +243,9 @@ class DuplicateRemover:
         self.content_hashes.add(content_hash)
         return False
     
-    def is_duplicate_title(self, title: str, existing_titles: List[str] = None) -> bool:
-        """Verifica se título é duplicata"""
+    def is_duplicate_title(self, title: str,
+                           existing_titles: Union[List[str], NearDuplicateIndex] = None) -> bool:
+        """Verifica se título é duplicata (existing_titles pode ser um NearDuplicateIndex)"""
         title_hash = self.get_title_hash(title)
         
         if not title_hash:
@@ -139,7 +256,10 @@ class DuplicateRemover:
             return True
             
         # Verifica similaridade com títulos existentes
-        if existing_titles:
+        if isinstance(existing_titles, NearDuplicateIndex):
+            if existing_titles.has_similar(title, 0.9):
+                return True
+        elif existing_titles:
             for existing in existing_titles:
                 similarity = self.calculate_similarity(title, existing)
                 if similarity >= 0.9:  # Threshold mais alto para títulos
@@ -155,8 +275,8 @@ class DuplicateRemover:
             
         unique_results = []
         seen_urls = set()
-        seen_titles = []
-        seen_contents = []
+        seen_titles = NearDuplicateIndex(0.9)
+        seen_contents = NearDuplicateIndex(self.similarity_threshold)
         
         self.stats.total_items = len(results)
         
@@ -185,9 +305,9 @@ class DuplicateRemover:
             if url:
                 seen_urls.add(self.normalize_url(url))
             if title:
-                seen_titles.append(title)
+                seen_titles.add(title)
             if content:
-                seen_contents.append(content)
+                seen_contents.add(content)
         
         self.stats.unique_items = len(unique_results)
         
@@ -203,7 +323,7 @@ class DuplicateRemover:
             
         unique_articles = []
         seen_urls = set()
-        seen_contents = []
+        seen_contents = NearDuplicateIndex(self.similarity_threshold)
         
         self.stats.total_items = len(articles)
         
@@ -221,18 +341,11 @@ class DuplicateRemover:
             
             # Verifica duplicata por conteúdo
             if content and len(content) > 100:  # Só verifica conteúdos substanciais
-                is_duplicate = False
-                for existing_content in seen_contents:
-                    similarity = self.calculate_similarity(content, existing_content)
-                    if similarity >= self.similarity_threshold:
-                        is_duplicate = True
-                        break
-                
-                if is_duplicate:
+                if seen_contents.has_similar(content):
                     self.stats.duplicates_removed += 1
                     continue
                     
-                seen_contents.append(content)
+                seen_contents.add(content)
             
             unique_articles.append(article)
         
@@ -250,6 +363,11 @@ class DuplicateRemover:
             
         merged_items = []
         processed_indices = set()
+
+        # Índice LSH com todos os itens: candidatos em vez de todos os pares
+        index = NearDuplicateIndex(merge_threshold)
+        for item in items:
+            index.add(item.get('content', '') or item.get('text', '') or '')
         
         for i, item1 in enumerate(items):
             if i in processed_indices:
@@ -260,18 +378,14 @@ class DuplicateRemover:
             similar_indices = {i}
             
             content1 = item1.get('content', '') or item1.get('text', '')
+            processed_indices.add(i)
             
-            for j, item2 in enumerate(items[i+1:], i+1):
-                if j in processed_indices:
-                    continue
-                    
-                content2 = item2.get('content', '') or item2.get('text', '')
-                
-                if content1 and content2:
-                    similarity = self.calculate_similarity(content1, content2)
-                    if similarity >= merge_threshold:
-                        similar_items.append(item2)
-                        similar_indices.add(j)
+            if content1:
+                for j in index.find_similar(content1, exclude=processed_indices):
+                    if not (items[j].get('content', '') or items[j].get('text', '')):
+                        continue
+                    similar_items.append(items[j])
+                    similar_indices.add(j)
             
             # Mescla itens similares
             if len(similar_items) > 1: